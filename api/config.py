@@ -38,6 +38,85 @@ class Settings(BaseSettings):
     # Analysis settings
     max_concurrent_jobs: int = 2
 
+    # Live inference pools (per feature, one thread per worker, sessions pinned)
+    inference_workers_badminton: int = 2
+    inference_workers_challenge: int = 4
+    inference_workers_mimic: int = 2
+    inference_workers_default: int = 2
+    inference_max_sessions_per_worker: int = 8
+
+    # Basic badminton stream ingest: "latest" drops the oldest queued frame
+    # when the server falls behind, "sequential" processes every frame
+    stream_ingest_mode: str = "latest"
+    stream_ingest_queue_size: int = 2
+
+    # Advanced-mode FrameStore: per-session disk cap (0 = unbounded) and
+    # threads used to decode read batches in the background processor
+    frame_store_max_mb: int = 4096
+    frame_store_decode_workers: int = 2
+
+    # Live viewer fan-out: messages queued per viewer before the oldest is
+    # dropped, and how long one send may take before the viewer is closed
+    viewer_outbox_size: int = 8
+    viewer_send_timeout_s: float = 5.0
+
+    # Basic-mode live analyzers in separate worker processes (0 = keep
+    # them in the API process); sessions are placed on the least-loaded one
+    live_shard_workers: int = 0
+    live_shard_max_sessions_per_worker: int = 8
+    live_shard_call_timeout_s: float = 30.0
+
+    # Live recordings: "auto" uses ffmpeg/libx264 when installed, else mp4v.
+    # Frames queued for the encoder before new ones are dropped.
+    recording_encoder: str = "auto"
+    recording_crf: int = 28
+    recording_queue_frames: int = 16
+
+    # Reconnect-safe live sessions: how long a dropped streamer may take to
+    # reconnect before its session is reclaimed, how often analyzer state
+    # is checkpointed, and where (default: <output_dir>/checkpoints)
+    stream_resume_grace_s: float = 120.0
+    stream_checkpoint_interval_s: float = 10.0
+    stream_checkpoint_dir: Optional[str] = None
+
+    # Compressed video-chunk ingest (fMP4/H.264, WebM) for badminton
+    # streams; only offered in hello when ffmpeg is installed
+    stream_video_ingest: bool = True
+
+    # Shared MediaPipe pose detectors (challenges, workout, mimic): at most
+    # this many exist at once (0 = one per session the challenge and mimic
+    # inference pools can admit), how long a session start waits for a free
+    # one before failing with 503, and how many are built at startup
+    pose_pool_max_detectors: int = 0
+    pose_pool_checkout_timeout_s: float = 0.0
+    pose_pool_warm: int = 2
+    # Separate budget for offline mimic jobs (reference processing,
+    # comparison videos); they queue for longer instead of failing
+    pose_pool_offline_max_detectors: int = 4
+    pose_pool_offline_checkout_timeout_s: float = 600.0
+
+    # Pose detection on a crop around the tracked person, downscaled to
+    # this width (0 = full resolution); see core/streaming/pose_detector.py.
+    # Off: scripts/pose_benchmark.py measured no fps/core gain over full frame
+    pose_roi_tracking: bool = False
+    pose_roi_margin: float = 0.3
+    pose_target_width: int = 0
+
+    # Challenge pose timelines are written to storage in compressed chunks
+    # of this many frames; see core/streaming/pose_timeline.py
+    pose_timeline_chunk_frames: int = 300
+
+    # Per-second session screenshots are drawn, encoded and uploaded by
+    # background workers: at most this many raw frames wait across all
+    # sessions, and uploads go out in batches; see core/streaming/screenshots.py
+    screenshot_workers: int = 2
+    screenshot_queue_frames: int = 32
+    screenshot_batch_size: int = 10
+
+    # Mimic reference pose timelines kept in memory (LRU, per process);
+    # see features/mimic/services/reference_timeline.py
+    mimic_reference_cache_size: int = 16
+
     # CORS - comma-separated string from env
     cors_origins: str = "http://localhost:5173,http://localhost:3000,http://127.0.0.1:5173"
 
@@ -0,0 +1,242 @@
+"""
+Wire format for live-stream frames.
+
+Two encodings are accepted on every streaming WebSocket:
+
+- JSON (default / fallback): text message
+    { "type": "frame", "data": "<base64 jpeg>", "timestamp": <float>, ... }
+- Binary (``binary_v1``): one binary message per frame — a fixed
+  little-endian header followed by the raw JPEG bytes, no base64.
+
+Binary is negotiated per connection. The client sends
+    { "type": "hello", "frame_formats": ["binary_v1", "json"] }
+and the server answers
+    { "type": "hello", "frame_format": "binary_v1" }
+Clients that never send ``hello`` (or get no answer from an older server)
+keep using JSON.
+
+Endpoints that can decode video also offer ``video_fmp4`` (fragmented
+MP4, H.264) and ``video_webm``. A client that negotiates one of them
+sends compressed chunks instead of JPEGs: binary messages with
+``msg_type`` 3, the chunk's first-frame timestamp and the coded frame
+size in the header (see api/core/streaming/video_ingest.py).
+
+Binary header (``HEADER_STRUCT``, 28 bytes):
+
+    offset  size  field
+    0       1     version      (1)
+    1       1     msg_type     (1 = frame, 2 = audio, 3 = video chunk)
+    2       2     header_len   (bytes before the payload; allows extension)
+    4       4     seq          (uint32 sender sequence number)
+    8       8     timestamp    (float64 seconds)
+    16      2     width        (uint16, 0 = unknown)
+    18      2     height       (uint16, 0 = unknown)
+    20      8     ref_time     (float64 seconds, NaN = absent; mimic only)
+
+Keep ``tools/replay/protocols.py`` in sync when changing this layout.
+"""
+
+import base64
+import binascii
+import json
+import logging
+import math
+import struct
+import time
+from dataclasses import dataclass
+from typing import List, Optional, Sequence, Union
+
+from fastapi import WebSocket, WebSocketDisconnect
+
+from ..metrics import statsd
+
+logger = logging.getLogger(__name__)
+
+FRAME_FORMAT_JSON = "json"
+FRAME_FORMAT_BINARY = "binary_v1"
+SUPPORTED_FRAME_FORMATS = (FRAME_FORMAT_BINARY, FRAME_FORMAT_JSON)
+FRAME_FORMAT_VIDEO_FMP4 = "video_fmp4"
+FRAME_FORMAT_VIDEO_WEBM = "video_webm"
+VIDEO_FRAME_FORMATS = (FRAME_FORMAT_VIDEO_FMP4, FRAME_FORMAT_VIDEO_WEBM)
+
+PROTOCOL_VERSION = 1
+MSG_FRAME = 1
+MSG_AUDIO = 2
+MSG_VIDEO_CHUNK = 3
+
+HEADER_STRUCT = struct.Struct("<BBHIdHHd")
+HEADER_SIZE = HEADER_STRUCT.size  # 28
+
+_MSG_TYPE_NAMES = {MSG_FRAME: "frame", MSG_AUDIO: "audio", MSG_VIDEO_CHUNK: "video_chunk"}
+
+
+class FrameProtocolError(ValueError):
+    """Raised when a binary frame message cannot be decoded."""
+
+
+@dataclass
+class FrameMessage:
+    """A decoded frame (or audio / video chunk) regardless of wire encoding."""
+
+    data: bytes
+    timestamp: float = 0.0
+    seq: int = 0
+    width: int = 0
+    height: int = 0
+    ref_time: Optional[float] = None
+    msg_type: int = MSG_FRAME
+    frame_format: str = FRAME_FORMAT_JSON
+    sent_at: Optional[float] = None  # client wall clock (epoch s), JSON only
+
+
+def encode_binary_frame(
+    data: bytes,
+    timestamp: float,
+    seq: int = 0,
+    width: int = 0,
+    height: int = 0,
+    ref_time: Optional[float] = None,
+    msg_type: int = MSG_FRAME,
+) -> bytes:
+    """Pack a payload into a ``binary_v1`` message."""
+    header = HEADER_STRUCT.pack(
+        PROTOCOL_VERSION,
+        msg_type,
+        HEADER_SIZE,
+        seq & 0xFFFFFFFF,
+        float(timestamp),
+        min(max(int(width), 0), 0xFFFF),
+        min(max(int(height), 0), 0xFFFF),
+        float("nan") if ref_time is None else float(ref_time),
+    )
+    return header + bytes(data)
+
+
+def decode_binary_frame(buf: bytes) -> FrameMessage:
+    """Unpack a ``binary_v1`` message into a FrameMessage."""
+    if len(buf) < HEADER_SIZE:
+        raise FrameProtocolError(f"Binary message too short ({len(buf)} bytes)")
+    version, msg_type, header_len, seq, timestamp, width, height, ref_time = (
+        HEADER_STRUCT.unpack_from(buf)
+    )
+    if version != PROTOCOL_VERSION:
+        raise FrameProtocolError(f"Unsupported binary frame version {version}")
+    if msg_type not in _MSG_TYPE_NAMES:
+        raise FrameProtocolError(f"Unknown binary message type {msg_type}")
+    if header_len < HEADER_SIZE or header_len > len(buf):
+        raise FrameProtocolError(f"Invalid header length {header_len}")
+    return FrameMessage(
+        data=bytes(buf[header_len:]),
+        timestamp=timestamp,
+        seq=seq,
+        width=width,
+        height=height,
+        ref_time=None if math.isnan(ref_time) else ref_time,
+        msg_type=msg_type,
+        frame_format=FRAME_FORMAT_BINARY,
+    )
+
+
+def negotiate_frame_format(
+    offered: Optional[List[str]], supported: Sequence[str] = SUPPORTED_FRAME_FORMATS
+) -> str:
+    """Pick the first client-offered format the server supports."""
+    for fmt in offered or []:
+        if fmt in supported:
+            return fmt
+    return FRAME_FORMAT_JSON
+
+
+def hello_response(message: dict, video_formats: Sequence[str] = ()) -> dict:
+    """Server reply to a client ``hello`` negotiation message.
+
+    ``video_formats`` are the video-chunk formats this endpoint can decode
+    (``available_video_formats()``); none by default.
+    """
+    supported = list(video_formats) + list(SUPPORTED_FRAME_FORMATS)
+    response = {
+        "type": "hello",
+        "frame_format": negotiate_frame_format(message.get("frame_formats"), supported),
+        "frame_formats": supported,
+    }
+    if message.get("trace"):
+        # Results on this connection carry a "timing" field (api/core/tracing.py)
+        response["trace"] = True
+    return response
+
+
+async def receive_message(websocket: WebSocket) -> Union[str, bytes]:
+    """Receive one text or binary WebSocket message.
+
+    Raises WebSocketDisconnect on close, like ``receive_text()``.
+    """
+    message = await websocket.receive()
+    if message["type"] == "websocket.disconnect":
+        raise WebSocketDisconnect(message.get("code", 1000))
+    if message.get("bytes") is not None:
+        return message["bytes"]
+    return message.get("text") or ""
+
+
+def parse_client_message(raw: Union[str, bytes], tags: Optional[List[str]] = None) -> Optional[dict]:
+    """Parse a streaming client message from either encoding.
+
+    Returns the message dict (``None`` if it is unparseable). Frame, audio
+    and (binary only) video-chunk messages carry the payload as a
+    ``FrameMessage`` under ``"frame"``; JSON messages with empty ``data``
+    have no ``"frame"`` key.
+    Decode time per frame is reported as ``stream.frame.decode_us``
+    tagged by wire format.
+    """
+    t0 = time.perf_counter()
+
+    if isinstance(raw, (bytes, bytearray)):
+        try:
+            frame = decode_binary_frame(raw)
+        except FrameProtocolError as e:
+            logger.debug(f"Dropping binary message: {e}")
+            return None
+        message = {"type": _MSG_TYPE_NAMES[frame.msg_type], "frame": frame}
+    else:
+        if raw == "ping":
+            return {"type": "ping"}
+        try:
+            message = json.loads(raw)
+        except json.JSONDecodeError:
+            return None
+        if not isinstance(message, dict):
+            return None
+
+        msg_type = message.get("type")
+        if msg_type not in ("frame", "audio"):
+            return message
+        payload = message.get("data", "")
+        if payload:
+            try:
+                data = base64.b64decode(payload)
+            except (binascii.Error, ValueError):
+                return None
+            message["frame"] = FrameMessage(
+                data=data,
+                timestamp=message.get("timestamp", 0.0),
+                seq=message.get("seq", 0),
+                width=message.get("width", 0),
+                height=message.get("height", 0),
+                ref_time=message.get("ref_time"),
+                msg_type=MSG_FRAME if msg_type == "frame" else MSG_AUDIO,
+                sent_at=message.get("sent_at"),
+            )
+
+    frame = message.get("frame")
+    if frame is not None and frame.msg_type == MSG_FRAME:
+        statsd.histogram(
+            "stream.frame.decode_us",
+            (time.perf_counter() - t0) * 1e6,
+            tags=(tags or []) + [f"frame_format:{frame.frame_format}"],
+        )
+        statsd.histogram(
+            "stream.frame.bytes",
+            len(raw),
+            tags=(tags or []) + [f"frame_format:{frame.frame_format}"],
+        )
+    return message
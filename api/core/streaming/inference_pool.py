@@ -0,0 +1,194 @@
+"""
+Per-feature inference worker pools for live stream sessions.
+
+Live analyzers are stateful (MediaPipe graph, smoothing buffers, rep state
+machines) and were previously run on the event loop's default executor,
+so every session of every feature competed for the same few threads.
+
+An ``InferencePool`` owns N single-thread workers. Each session is pinned
+to one worker when it is admitted (least-loaded first) and all of its
+frames run there, in order, so an analyzer is never touched by two
+threads. Admission is capped at ``max_sessions_per_worker``; once every
+worker is full, ``admit`` raises ``InferencePoolFull`` and the WebSocket
+handler closes the connection with code 4003. ``run`` only accepts
+admitted sessions, so a frame arriving after ``release`` cannot quietly
+take a slot back.
+
+Metrics (tagged ``feature:`` and ``worker:``):
+    inference.queue_wait_ms   time between submit and start on the worker
+    inference.compute_ms      time spent inside the analyzer call
+    inference.sessions        sessions pinned to the worker (gauge)
+    inference.rejected        admissions refused because the pool was full
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Set
+
+from ..metrics import statsd
+
+logger = logging.getLogger(__name__)
+
+# WebSocket close code sent when a pool has no free session slot
+POOL_FULL_CLOSE_CODE = 4003
+
+
+class InferencePoolFull(RuntimeError):
+    """Raised when every worker already has its maximum number of sessions."""
+
+
+class SessionNotAdmitted(RuntimeError):
+    """Raised by ``run`` for a session that was never admitted or already released."""
+
+
+class _Worker:
+    """One pinned inference thread and the sessions assigned to it."""
+
+    def __init__(self, feature: str, index: int):
+        self.index = index
+        self.executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix=f"infer-{feature}-{index}"
+        )
+        self.sessions: Set[int] = set()
+        self.pending = 0
+        self.tags = [f"feature:{feature}", f"worker:{index}"]
+
+
+class InferencePool:
+    """Thread-pinned workers with session affinity and admission control."""
+
+    def __init__(self, feature: str, workers: int, max_sessions_per_worker: int):
+        self.feature = feature
+        self.max_sessions_per_worker = max(1, max_sessions_per_worker)
+        self._workers = [_Worker(feature, i) for i in range(max(1, workers))]
+        self._assignments: Dict[int, _Worker] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def capacity(self) -> int:
+        return len(self._workers) * self.max_sessions_per_worker
+
+    def admit(self, session_id: int) -> int:
+        """Pin a session to the least-loaded worker and return its index.
+
+        Re-admitting a session (e.g. on reconnect) keeps its worker.
+        """
+        with self._lock:
+            worker = self._assignments.get(session_id)
+            if worker is not None:
+                return worker.index
+
+            candidates = [
+                w for w in self._workers
+                if len(w.sessions) < self.max_sessions_per_worker
+            ]
+            if not candidates:
+                statsd.increment("inference.rejected", tags=[f"feature:{self.feature}"])
+                raise InferencePoolFull(
+                    f"{self.feature} inference pool is full "
+                    f"({self.capacity} sessions)"
+                )
+            worker = min(candidates, key=lambda w: (len(w.sessions), w.pending, w.index))
+            worker.sessions.add(session_id)
+            self._assignments[session_id] = worker
+            statsd.gauge("inference.sessions", len(worker.sessions), tags=worker.tags)
+
+        logger.info(
+            f"Session {session_id}: pinned to {self.feature} inference worker {worker.index}"
+        )
+        return worker.index
+
+    def release(self, session_id: int):
+        """Free a session's slot. Safe to call for unknown sessions."""
+        with self._lock:
+            worker = self._assignments.pop(session_id, None)
+            if worker is None:
+                return
+            worker.sessions.discard(session_id)
+            statsd.gauge("inference.sessions", len(worker.sessions), tags=worker.tags)
+
+    async def run(self, session_id: int, fn: Callable[..., Any], *args) -> Any:
+        """Run ``fn(*args)`` on the session's pinned worker.
+
+        Raises ``SessionNotAdmitted`` unless the session holds a slot.
+        """
+        with self._lock:
+            worker = self._assignments.get(session_id)
+        if worker is None:
+            raise SessionNotAdmitted(
+                f"Session {session_id} is not admitted to the {self.feature} inference pool"
+            )
+        submitted = time.perf_counter()
+
+        def _timed_call():
+            started = time.perf_counter()
+            try:
+                return fn(*args)
+            finally:
+                done = time.perf_counter()
+                statsd.histogram(
+                    "inference.queue_wait_ms", (started - submitted) * 1000, tags=worker.tags
+                )
+                statsd.histogram(
+                    "inference.compute_ms", (done - started) * 1000, tags=worker.tags
+                )
+
+        worker.pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(worker.executor, _timed_call)
+        finally:
+            worker.pending -= 1
+
+    def stats(self) -> List[Dict[str, int]]:
+        """Per-worker session and queue counts."""
+        with self._lock:
+            return [
+                {"worker": w.index, "sessions": len(w.sessions), "pending": w.pending}
+                for w in self._workers
+            ]
+
+    def shutdown(self, wait: bool = True):
+        for w in self._workers:
+            w.executor.shutdown(wait=wait, cancel_futures=True)
+        with self._lock:
+            self._assignments.clear()
+            for w in self._workers:
+                w.sessions.clear()
+
+
+# Global instances, one per feature
+_pools: Dict[str, InferencePool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_inference_pool(feature: str) -> InferencePool:
+    """Return the inference pool for a feature ("badminton", "challenge", "mimic")."""
+    pool = _pools.get(feature)
+    if pool is not None:
+        return pool
+    with _pools_lock:
+        pool = _pools.get(feature)
+        if pool is None:
+            from ...config import get_settings
+            settings = get_settings()
+            workers = getattr(
+                settings, f"inference_workers_{feature}", settings.inference_workers_default
+            )
+            pool = InferencePool(feature, workers, settings.inference_max_sessions_per_worker)
+            _pools[feature] = pool
+            logger.info(
+                f"Inference pool '{feature}': {workers} workers x "
+                f"{pool.max_sessions_per_worker} sessions"
+            )
+        return pool
+
+
+def shutdown_inference_pools(wait: bool = True):
+    with _pools_lock:
+        for pool in _pools.values():
+            pool.shutdown(wait=wait)
+        _pools.clear()
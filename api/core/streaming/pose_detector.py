@@ -4,17 +4,45 @@ Shared pose detection wrapper around MediaPipe.
 Extracted from FrameAnalyzer so that multiple features (badminton,
 challenges, workout) can reuse the same pose detection pipeline
 without duplicating MediaPipe initialization or coordinate transforms.
+
+ROI tracking (``roi_tracking=True``): fitness streams show one person who
+fills a fraction of a 720p/1080p frame, so instead of the full frame the
+detector runs on a crop around the previous frame's landmarks (plus
+``roi_margin``), optionally downscaled to ``target_width`` -- the same
+crop-and-shrink idea as ``CourtBoundedAnalyzer.analyze_pose_in_court``,
+with the crop following the person. Landmarks are mapped back to
+full-frame normalised coordinates, so analyzers see no difference. If
+the person is lost inside the crop, the same frame is re-run on the full
+frame. The crop only moves when the body nears its edge. MediaPipe's own
+tracker works in image coordinates, so a jump of more than
+``_ROI_RESET_SHIFT`` of the crop size (or switching to or from the full
+frame) resets the graph; smaller re-centring keeps the tracking state,
+which then sees the body shifted as if it had moved quickly.
+
+Both ROI tracking and downscaling are off by default (``pose_roi_tracking``
+and ``pose_target_width`` settings): ``scripts/pose_benchmark.py`` measured
+no throughput gain. MediaPipe Pose already tracks its own region of
+interest in video mode and resizes that to the model's small input, so
+inference costs the same on a crop; the crop and resize only add copies
+(ROI + 640px was 0.74-0.99x full-frame fps on 1080p) and move landmarks
+by 1.5-2.7 px.
 """
 
 import cv2
 import numpy as np
 import math
 import logging
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import Dict, List, Optional, Tuple
 
+from .pose_geometry import NX, NY, Z, VIS, landmarks_to_dicts
+
 logger = logging.getLogger(__name__)
 
+# Largest crop edge move, as a fraction of the crop size, that keeps
+# MediaPipe's tracking state instead of resetting the graph
+_ROI_RESET_SHIFT = 1 / 3
+
 # Skeleton connections for frontend visualization
 SKELETON_CONNECTIONS = [
     # Torso
@@ -40,11 +68,19 @@ SKELETON_CONNECTIONS = [
 @dataclass
 class PoseResult:
     """Result of a single-frame pose detection."""
-    landmarks: Optional[object] = None  # MediaPipe NormalizedLandmarkList
+    landmarks: Optional[object] = None  # MediaPipe NormalizedLandmarkList (crop-relative when ROI-tracked)
     player_detected: bool = False
-    landmark_list: Optional[List[Dict]] = None  # [{x, y, visibility}, ...]
     frame_width: int = 0
     frame_height: int = 0
+    array: Optional[np.ndarray] = None  # (33, 4) float32: nx, ny, z, visibility
+    _landmark_list: Optional[List[Dict]] = field(default=None, repr=False)
+
+    @property
+    def landmark_list(self) -> Optional[List[Dict]]:
+        """[{x, y, visibility, nx, ny}, ...], built from ``array`` on first use."""
+        if self._landmark_list is None and self.array is not None:
+            self._landmark_list = landmarks_to_dicts(self.array, self.frame_width, self.frame_height)
+        return self._landmark_list
 
 
 class PoseDetector:
@@ -61,9 +97,17 @@ class PoseDetector:
         model_complexity: int = 1,
         min_detection_confidence: float = 0.5,
         min_tracking_confidence: float = 0.4,
+        roi_tracking: bool = False,
+        roi_margin: float = 0.3,
+        target_width: int = 0,
     ):
         import mediapipe as mp
 
+        self.roi_tracking = roi_tracking
+        self.roi_margin = roi_margin
+        self.target_width = target_width  # 0 = never downscale
+        self._roi: Optional[Tuple[int, int, int, int]] = None  # x0, y0, x1, y1 (pixels)
+
         self.mp_pose = mp.solutions.pose
         self.pose = self.mp_pose.Pose(
             static_image_mode=False,
@@ -80,40 +124,109 @@ class PoseDetector:
         Run pose detection on a BGR frame.
 
         Returns a PoseResult with raw MediaPipe landmarks and a
-        serialisable landmark list (pixel coordinates).
+        ``(33, 4)`` landmark array; the serialisable landmark list (pixel
+        coordinates) is derived from it on demand.
         """
         h, w = frame.shape[:2]
-        frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        results = self.pose.process(frame_rgb)
+        roi = self._roi if self.roi_tracking else None
+        landmarks, array = self._process(frame, roi)
+        if landmarks is None and roi is not None:
+            # Lost inside the crop: look at the whole frame again
+            self._set_roi(None)
+            landmarks, array = self._process(frame, None)
 
-        if not results.pose_landmarks:
+        if landmarks is None:
             return PoseResult(frame_width=w, frame_height=h)
 
-        # Build serialisable list
-        lm_list = []
-        for lm in results.pose_landmarks.landmark:
-            lm_list.append({
-                "x": int(lm.x * w),
-                "y": int(lm.y * h),
-                "visibility": lm.visibility,
-                "nx": lm.x,   # normalised 0-1
-                "ny": lm.y,
-            })
+        if self.roi_tracking:
+            self._track(array, w, h)
 
         return PoseResult(
-            landmarks=results.pose_landmarks,
+            landmarks=landmarks,
             player_detected=True,
-            landmark_list=lm_list,
             frame_width=w,
             frame_height=h,
+            array=array,
+        )
+
+    def _process(self, frame: np.ndarray, roi: Optional[Tuple[int, int, int, int]]):
+        """Run MediaPipe on the ROI (or full frame); landmarks in full-frame coordinates."""
+        h, w = frame.shape[:2]
+        x0, y0 = (roi[0], roi[1]) if roi is not None else (0, 0)
+        image = frame[roi[1]:roi[3], roi[0]:roi[2]] if roi is not None else frame
+        ch, cw = image.shape[:2]
+        if self.target_width and cw > self.target_width:
+            # Normalised landmarks are unaffected by the resize
+            size = (self.target_width, max(1, round(ch * self.target_width / cw)))
+            image = cv2.resize(image, size, interpolation=cv2.INTER_AREA)
+
+        results = self.pose.process(cv2.cvtColor(image, cv2.COLOR_BGR2RGB))
+        if not results.pose_landmarks:
+            return None, None
+
+        array = np.array(
+            [(lm.x, lm.y, lm.z, lm.visibility) for lm in results.pose_landmarks.landmark],
+            dtype=np.float32,
+        )
+        if roi is not None:
+            array[:, NX] = (x0 + array[:, NX] * cw) / w
+            array[:, NY] = (y0 + array[:, NY] * ch) / h
+            array[:, Z] *= cw / w
+        return results.pose_landmarks, array
+
+    def _track(self, array: np.ndarray, w: int, h: int):
+        """Update the crop for the next frame from this frame's landmarks."""
+        if np.count_nonzero(array[:, VIS] >= 0.5) < 4:
+            self._set_roi(None)
+            return
+        # Every landmark MediaPipe places inside the frame, occluded or not,
+        # so a briefly hidden limb is not cropped out for good
+        inside = ((array[:, (NX, NY)] >= 0) & (array[:, (NX, NY)] <= 1)).all(axis=1)
+        if not inside.any():
+            self._set_roi(None)
+            return
+        xs = array[inside, NX] * w
+        ys = array[inside, NY] * h
+        bx0, bx1, by0, by1 = float(xs.min()), float(xs.max()), float(ys.min()), float(ys.max())
+
+        if self._roi is not None:
+            rx0, ry0, rx1, ry1 = self._roi
+            inset_x = (rx1 - rx0) * 0.05
+            inset_y = (ry1 - ry0) * 0.05
+            fits = (bx0 >= rx0 + inset_x and bx1 <= rx1 - inset_x
+                    and by0 >= ry0 + inset_y and by1 <= ry1 - inset_y)
+            # Keep the crop while the body fits and still fills a fair part of it
+            if fits and (bx1 - bx0) * (by1 - by0) >= 0.2 * (rx1 - rx0) * (ry1 - ry0):
+                return
+
+        pad = max(bx1 - bx0, by1 - by0) * self.roi_margin
+        roi = (
+            max(0, int(bx0 - pad)), max(0, int(by0 - pad)),
+            min(w, int(bx1 + pad) + 1), min(h, int(by1 + pad) + 1),
         )
+        if (roi[2] - roi[0]) * (roi[3] - roi[1]) >= 0.8 * w * h:
+            roi = None  # nearly the whole frame anyway
+        self._set_roi(roi)
+
+    def _set_roi(self, roi: Optional[Tuple[int, int, int, int]]):
+        if roi == self._roi:
+            return
+        old, self._roi = self._roi, roi
+        if old is None or roi is None:
+            self.pose.reset()
+            return
+        w, h = old[2] - old[0], old[3] - old[1]
+        shift = max(abs(roi[0] - old[0]) / w, abs(roi[2] - old[2]) / w,
+                    abs(roi[1] - old[1]) / h, abs(roi[3] - old[3]) / h)
+        if shift > _ROI_RESET_SHIFT:
+            self.pose.reset()
 
     def extract_pose_data(self, pose_result: PoseResult) -> Optional[Dict]:
         """
         Convert PoseResult into a frontend-friendly dict with landmarks
         and skeleton connections.
         """
-        if not pose_result.player_detected or not pose_result.landmark_list:
+        if not pose_result.player_detected or pose_result.array is None:
             return None
 
         return {
@@ -146,6 +259,15 @@ class PoseDetector:
         cos_angle = max(-1.0, min(1.0, dot / (mag_ba * mag_bc)))
         return math.degrees(math.acos(cos_angle))
 
+    def reset(self):
+        """Drop tracking state so the next frame is detected from scratch.
+
+        Used by the detector pool before a detector serves another session.
+        """
+        self._roi = None
+        if self.pose:
+            self.pose.reset()
+
     def close(self):
         """Release MediaPipe resources."""
         if self.pose:
@@ -0,0 +1,222 @@
+"""
+Array-backed pose landmarks and the joint-geometry kernel used by the
+challenge analyzers.
+
+``PoseDetector`` returns landmarks as a ``(33, 4)`` float32 array (columns
+``NX, NY, Z, VIS``: normalised x/y, depth, visibility). ``pose_geometry``
+turns one such array into every joint angle, midpoint and spread the
+analyzers use, instead of each analyzer pulling values out of
+per-landmark dicts and calling ``PoseDetector.angle_between`` once per
+joint.
+
+A single frame is too small for NumPy: per-call overhead on 8 angles
+costs more than the math, so ``pose_geometry`` reads the array into
+Python lists once and uses scalar math (see ``benchmarks/pose_geometry``).
+``pose_geometry_batch`` vectorises over many frames for offline paths
+(timeline replay), where the per-call overhead is shared.
+
+The dict form (``[{x, y, visibility, nx, ny}, ...]``) is still what the
+frontend receives on every live frame; ``landmarks_to_dicts`` builds it
+from the array.
+"""
+
+import math
+from dataclasses import dataclass
+from typing import Dict, List, Sequence, Tuple, Union
+
+import numpy as np
+
+# Landmark array columns
+NX, NY, Z, VIS = 0, 1, 2, 3
+
+# MediaPipe landmark indices
+NOSE = 0
+L_SHOULDER, R_SHOULDER = 11, 12
+L_ELBOW, R_ELBOW = 13, 14
+L_WRIST, R_WRIST = 15, 16
+L_HIP, R_HIP = 23, 24
+L_KNEE, R_KNEE = 25, 26
+L_ANKLE, R_ANKLE = 27, 28
+
+# Joint angles computed for every frame: name -> (a, vertex, c)
+JOINTS: Dict[str, Tuple[int, int, int]] = {
+    "l_knee": (L_HIP, L_KNEE, L_ANKLE),
+    "r_knee": (R_HIP, R_KNEE, R_ANKLE),
+    "l_hip": (L_SHOULDER, L_HIP, L_KNEE),
+    "r_hip": (R_SHOULDER, R_HIP, R_KNEE),
+    "l_elbow": (L_SHOULDER, L_ELBOW, L_WRIST),
+    "r_elbow": (R_SHOULDER, R_ELBOW, R_WRIST),
+    "l_body": (L_SHOULDER, L_HIP, L_ANKLE),
+    "r_body": (R_SHOULDER, R_HIP, R_ANKLE),
+}
+_JOINT_NAMES = list(JOINTS)
+_JOINT_ITEMS = list(JOINTS.items())
+_A, _B, _C = (np.array(column) for column in zip(*JOINTS.values()))
+
+# Left/right pairs averaged into midpoints
+_PAIRS = np.array([
+    (L_SHOULDER, R_SHOULDER),
+    (L_HIP, R_HIP),
+    (L_KNEE, R_KNEE),
+    (L_ANKLE, R_ANKLE),
+    (L_WRIST, R_WRIST),
+])
+
+# A precomputed PoseGeometry (from pose_geometry_batch) is passed through
+LandmarksLike = Union[np.ndarray, Sequence[Dict], "PoseGeometry"]
+
+
+def landmark_array(landmarks: LandmarksLike) -> np.ndarray:
+    """``(N, 4)`` landmark array from an array or a list of landmark dicts.
+
+    Dicts (tests, stored timelines) are converted to float64 so their
+    values are used exactly as given.
+    """
+    if isinstance(landmarks, np.ndarray):
+        return landmarks
+    return np.array(
+        [(lm["nx"], lm["ny"], lm.get("z", 0.0), lm.get("visibility", 0)) for lm in landmarks],
+        dtype=np.float64,
+    )
+
+
+def landmarks_to_dicts(array: np.ndarray, width: int, height: int) -> List[Dict]:
+    """Frontend landmark dicts (pixel ``x``/``y`` plus normalised values)."""
+    return [
+        {"x": int(nx * width), "y": int(ny * height), "visibility": vis, "nx": nx, "ny": ny}
+        for nx, ny, _, vis in array.tolist()
+    ]
+
+
+@dataclass
+class PoseGeometry:
+    """Geometry of one frame, as plain Python floats.
+
+    ``angles`` holds the ``JOINTS`` angles in degrees (0 when a limb has
+    zero length); midpoints are ``(nx, ny)`` averages of the left/right
+    landmarks.
+    """
+    angles: Dict[str, float]
+    nx: List[float]
+    ny: List[float]
+    visibility: List[float]
+    shoulder: Tuple[float, float]
+    hip: Tuple[float, float]
+    knee: Tuple[float, float]
+    ankle: Tuple[float, float]
+    wrist: Tuple[float, float]
+    shoulder_x_gap: float
+    hip_x_gap: float
+    knee_x_gap: float
+    lean_angle: float   # shoulder-hip line from vertical (0 when level)
+    y_spread: float     # vertical extent of shoulder/hip/ankle midpoints
+
+    def mean(self, joint: str) -> float:
+        """Average of the left and right angle of ``joint`` (e.g. "knee")."""
+        return (self.angles["l_" + joint] + self.angles["r_" + joint]) / 2
+
+
+def _angles(nx: List[float], ny: List[float]) -> Dict[str, float]:
+    """``PoseDetector.angle_between`` for every joint, inlined."""
+    angles = {}
+    for name, (a, b, c) in _JOINT_ITEMS:
+        bx, by = nx[b], ny[b]
+        bax, bay = nx[a] - bx, ny[a] - by
+        bcx, bcy = nx[c] - bx, ny[c] - by
+        mag = math.sqrt(bax * bax + bay * bay) * math.sqrt(bcx * bcx + bcy * bcy)
+        if mag == 0:
+            angles[name] = 0.0
+        else:
+            cos = (bax * bcx + bay * bcy) / mag
+            angles[name] = math.degrees(math.acos(-1.0 if cos < -1.0 else 1.0 if cos > 1.0 else cos))
+    return angles
+
+
+def _mid(nx: List[float], ny: List[float], left: int, right: int) -> Tuple[float, float]:
+    return ((nx[left] + nx[right]) / 2, (ny[left] + ny[right]) / 2)
+
+
+def _lean_angle(shoulder: Tuple[float, float], hip: Tuple[float, float]) -> float:
+    dx = shoulder[0] - hip[0]
+    dy = shoulder[1] - hip[1]
+    return abs(math.degrees(math.atan2(dx, -dy))) if abs(dy) > 0.01 else 0
+
+
+def pose_geometry(landmarks: LandmarksLike) -> PoseGeometry:
+    """Compute every analyzer metric for one frame of landmarks."""
+    if isinstance(landmarks, PoseGeometry):
+        return landmarks
+    if isinstance(landmarks, np.ndarray):
+        nx, ny, _, visibility = landmarks.T.tolist()
+    else:
+        nx = [lm["nx"] for lm in landmarks]
+        ny = [lm["ny"] for lm in landmarks]
+        visibility = [lm.get("visibility", 0) for lm in landmarks]
+
+    shoulder = _mid(nx, ny, L_SHOULDER, R_SHOULDER)
+    hip = _mid(nx, ny, L_HIP, R_HIP)
+    ankle = _mid(nx, ny, L_ANKLE, R_ANKLE)
+    ys = (shoulder[1], hip[1], ankle[1])
+
+    return PoseGeometry(
+        angles=_angles(nx, ny),
+        nx=nx,
+        ny=ny,
+        visibility=visibility,
+        shoulder=shoulder,
+        hip=hip,
+        knee=_mid(nx, ny, L_KNEE, R_KNEE),
+        ankle=ankle,
+        wrist=_mid(nx, ny, L_WRIST, R_WRIST),
+        shoulder_x_gap=abs(nx[L_SHOULDER] - nx[R_SHOULDER]),
+        hip_x_gap=abs(nx[L_HIP] - nx[R_HIP]),
+        knee_x_gap=abs(nx[L_KNEE] - nx[R_KNEE]),
+        lean_angle=_lean_angle(shoulder, hip),
+        y_spread=max(ys) - min(ys),
+    )
+
+
+def pose_geometry_batch(arrays: np.ndarray) -> List[PoseGeometry]:
+    """``pose_geometry`` for a ``(T, N, 4)`` stack of frames, vectorised
+    over the frames; equal to calling it per frame."""
+    arrays = np.asarray(arrays)
+    if len(arrays) == 0:
+        return []
+    xy = arrays[:, :, :2].astype(np.float64)
+
+    ba = xy[:, _A] - xy[:, _B]
+    bc = xy[:, _C] - xy[:, _B]
+    mag = np.sqrt((ba ** 2).sum(axis=2)) * np.sqrt((bc ** 2).sum(axis=2))
+    dot = (ba * bc).sum(axis=2)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cos = np.clip(dot / mag, -1.0, 1.0)
+    angles = np.where(mag == 0, 0.0, np.degrees(np.arccos(cos)))
+
+    mids = (xy[:, _PAIRS[:, 0]] + xy[:, _PAIRS[:, 1]]) / 2
+    gaps = np.abs(xy[:, _PAIRS[:3, 0], 0] - xy[:, _PAIRS[:3, 1], 0])
+    ys = mids[:, (0, 1, 3), 1]
+    spread = ys.max(axis=1) - ys.min(axis=1)
+
+    geometries = []
+    for angle_row, mid_row, gap_row, y_spread, nx, ny, visibility in zip(
+        angles.tolist(), mids.tolist(), gaps.tolist(), spread.tolist(),
+        arrays[:, :, NX].tolist(), arrays[:, :, NY].tolist(), arrays[:, :, VIS].tolist(),
+    ):
+        shoulder, hip, knee, ankle, wrist = (tuple(m) for m in mid_row)
+        geometries.append(PoseGeometry(
+            angles=dict(zip(_JOINT_NAMES, angle_row)),
+            nx=nx,
+            ny=ny,
+            visibility=visibility,
+            shoulder=shoulder,
+            hip=hip,
+            knee=knee,
+            ankle=ankle,
+            wrist=wrist,
+            shoulder_x_gap=gap_row[0],
+            hip_x_gap=gap_row[1],
+            knee_x_gap=gap_row[2],
+            lean_angle=_lean_angle(shoulder, hip),
+            y_spread=y_spread,
+        ))
+    return geometries
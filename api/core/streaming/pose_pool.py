@@ -0,0 +1,312 @@
+"""
+Shared pool of MediaPipe pose detectors.
+
+Every challenge/workout analyzer, mimic session and offline mimic job used
+to build its own ``PoseDetector`` -- a full MediaPipe Pose graph, slow to
+construct and resident for the life of the session. With many concurrent
+users that is one model per user, and each session paid the construction
+cost before its first frame.
+
+``PoseDetectorPool`` keeps idle detectors per configuration (model
+complexity, detection and tracking confidence). ``checkout`` hands one
+out exclusively; ``checkin`` returns it. Detectors run in video mode
+(``static_image_mode=False``), so MediaPipe carries tracking state from
+frame to frame; ``checkin`` resets the graph so the next session never
+tracks from the previous user's last pose.
+
+At most ``max_detectors`` exist at once (idle + in use). When the pool is
+at its limit, idle detectors of another configuration are closed (outside
+the pool lock) to make room; otherwise ``checkout`` waits up to ``checkout_timeout_s`` for a
+checkin and then raises ``PoseDetectorPoolExhausted``. ``warm`` builds
+detectors ahead of time and runs at startup. Every pooled detector uses
+the ROI-tracking options from the ``pose_roi_*`` settings. A detector
+checked out with an ``owner`` comes back by itself if the owner is
+garbage-collected without checking it in, so a leaked analyzer doesn't
+hold a slot forever.
+
+A live session keeps its detector for its whole duration (video mode
+carries tracking state between its frames), so the live pool can't hold
+fewer detectors than there are live sessions. It is sized to what the
+challenge and mimic inference pools admit
+(``inference_workers_{challenge,mimic} * inference_max_sessions_per_worker``):
+any session the inference pools could serve gets a detector, and detectors
+are only built as sessions need them, so memory follows the peak session
+count. Past that size ``checkout`` fails at once by default
+(``pose_pool_checkout_timeout_s = 0``); the session-start endpoints turn
+``PoseDetectorPoolExhausted`` into a 503, rather than stalling the request.
+
+Offline mimic jobs (reference processing, comparison videos) check out
+from a separate, smaller pool (``get_offline_pose_detector_pool``), so a
+burst of uploads can't take the detectors live sessions are waiting for.
+
+Metrics:
+    pose_pool.wait_ms     time ``checkout`` took (including construction)
+    pose_pool.in_use      detectors checked out (gauge)
+    pose_pool.idle        detectors waiting in the pool (gauge)
+    pose_pool.created     detectors constructed
+    pose_pool.exhausted   checkouts that timed out at the size limit
+"""
+
+import logging
+import threading
+import time
+import weakref
+from typing import Any, Dict, List, Optional, Tuple
+
+from ..metrics import statsd
+from .pose_detector import PoseDetector
+
+logger = logging.getLogger(__name__)
+
+_DetectorKey = Tuple[int, float, float]
+
+
+class PoseDetectorPoolExhausted(RuntimeError):
+    """Raised when no detector became free within the checkout timeout."""
+
+
+class PoseDetectorPool:
+    """Bounded, per-configuration pool of ``PoseDetector`` instances."""
+
+    def __init__(self, max_detectors: int = 32, checkout_timeout_s: float = 0.0,
+                 **detector_options):
+        self.max_detectors = max(1, max_detectors)
+        self.checkout_timeout_s = checkout_timeout_s
+        self.detector_options = detector_options  # e.g. roi_tracking, target_width
+        self._idle: Dict[_DetectorKey, List[PoseDetector]] = {}
+        # id(detector) -> (key, detector, finalizer watching its owner)
+        self._in_use: Dict[int, Tuple[_DetectorKey, PoseDetector, Optional[weakref.finalize]]] = {}
+        self._total = 0
+        self._closed = False
+        self._cond = threading.Condition()
+        self.created = 0
+        self.exhausted = 0
+
+    @staticmethod
+    def _key(model_complexity: int, min_detection_confidence: float,
+             min_tracking_confidence: float) -> _DetectorKey:
+        return (int(model_complexity), float(min_detection_confidence),
+                float(min_tracking_confidence))
+
+    def checkout(
+        self,
+        model_complexity: int = 1,
+        min_detection_confidence: float = 0.5,
+        min_tracking_confidence: float = 0.4,
+        timeout: Optional[float] = None,
+        owner: Any = None,
+    ) -> PoseDetector:
+        """Take a detector for exclusive use until ``checkin``.
+
+        With ``owner``, the detector is checked in automatically if the
+        owner is garbage-collected first.
+        """
+        key = self._key(model_complexity, min_detection_confidence, min_tracking_confidence)
+        timeout = self.checkout_timeout_s if timeout is None else timeout
+        start = time.perf_counter()
+        deadline = time.monotonic() + timeout
+        evicted = None
+
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise RuntimeError("PoseDetectorPool is shut down")
+                idle = self._idle.get(key)
+                if idle:
+                    detector = idle.pop()
+                    break
+                if self._total >= self.max_detectors:
+                    evicted = self._evict_idle()
+                if self._total < self.max_detectors:
+                    # Reserve the slot, build outside the lock
+                    self._total += 1
+                    detector = None
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.exhausted += 1
+                    statsd.increment("pose_pool.exhausted")
+                    raise PoseDetectorPoolExhausted(
+                        f"All {self.max_detectors} pose detectors are in use"
+                    )
+                self._cond.wait(remaining)
+
+        if evicted is not None:
+            evicted.close()
+        if detector is None:
+            try:
+                detector = PoseDetector(*key, **self.detector_options)
+            except Exception:
+                with self._cond:
+                    self._total -= 1
+                    self._cond.notify()
+                raise
+            self.created += 1
+            statsd.increment("pose_pool.created")
+
+        finalizer = None
+        if owner is not None:
+            finalizer = weakref.finalize(owner, self._checkin, id(detector))
+            finalizer.atexit = False
+        with self._cond:
+            self._in_use[id(detector)] = (key, detector, finalizer)
+            self._report()
+        statsd.histogram("pose_pool.wait_ms", (time.perf_counter() - start) * 1000)
+        return detector
+
+    def checkin(self, detector: Optional[PoseDetector]):
+        """Return a detector; its tracking state is reset for the next user."""
+        if detector is None:
+            return
+        if not self._checkin(id(detector)):
+            # Not ours (or returned twice): don't let it into the pool
+            logger.warning("Pose detector checked in that was not checked out")
+
+    def _checkin(self, detector_id: int) -> bool:
+        with self._cond:
+            entry = self._in_use.pop(detector_id, None)
+        if entry is None:
+            return False
+        key, detector, finalizer = entry
+        if finalizer is not None:
+            finalizer.detach()
+
+        keep = not self._closed
+        if keep:
+            try:
+                detector.reset()
+            except Exception as e:
+                logger.warning(f"Pose detector reset failed, discarding it: {e}")
+                keep = False
+
+        with self._cond:
+            if keep and not self._closed:
+                self._idle.setdefault(key, []).append(detector)
+            else:
+                self._total -= 1
+                keep = False
+            self._report()
+            self._cond.notify()
+        if not keep:
+            detector.close()
+        return True
+
+    def warm(
+        self,
+        count: int,
+        model_complexity: int = 1,
+        min_detection_confidence: float = 0.5,
+        min_tracking_confidence: float = 0.4,
+    ) -> int:
+        """Pre-build up to ``count`` idle detectors; returns how many were built."""
+        config = dict(
+            model_complexity=model_complexity,
+            min_detection_confidence=min_detection_confidence,
+            min_tracking_confidence=min_tracking_confidence,
+        )
+        key = self._key(**config)
+        with self._cond:
+            wanted = min(count - len(self._idle.get(key, [])), self.max_detectors - self._total)
+        detectors = []
+        try:
+            for _ in range(max(0, wanted)):
+                detectors.append(self.checkout(timeout=0, **config))
+        finally:
+            for detector in detectors:
+                self.checkin(detector)
+        return len(detectors)
+
+    def _evict_idle(self) -> Optional[PoseDetector]:
+        """Take one idle detector (any configuration) out of the pool to free
+        a slot; the caller closes it after releasing the lock."""
+        for key, idle in self._idle.items():
+            if idle:
+                self._total -= 1
+                return idle.pop()
+        return None
+
+    def _report(self):
+        statsd.gauge("pose_pool.in_use", len(self._in_use))
+        statsd.gauge("pose_pool.idle", sum(len(v) for v in self._idle.values()))
+
+    def stats(self) -> Dict[str, int]:
+        with self._cond:
+            return {
+                "max_detectors": self.max_detectors,
+                "in_use": len(self._in_use),
+                "idle": sum(len(v) for v in self._idle.values()),
+                "created": self.created,
+                "exhausted": self.exhausted,
+            }
+
+    def shutdown(self):
+        """Close idle detectors; checked-out ones are closed on checkin."""
+        with self._cond:
+            self._closed = True
+            idle = [d for detectors in self._idle.values() for d in detectors]
+            self._total -= len(idle)
+            self._idle.clear()
+            self._cond.notify_all()
+        for detector in idle:
+            detector.close()
+
+
+_pose_detector_pool: Optional[PoseDetectorPool] = None
+_offline_pose_detector_pool: Optional[PoseDetectorPool] = None
+_pool_lock = threading.Lock()
+
+
+def _build_pool(max_detectors: int, checkout_timeout_s: float) -> PoseDetectorPool:
+    from ...config import get_settings
+    settings = get_settings()
+    return PoseDetectorPool(
+        max_detectors,
+        checkout_timeout_s,
+        roi_tracking=settings.pose_roi_tracking,
+        roi_margin=settings.pose_roi_margin,
+        target_width=settings.pose_target_width,
+    )
+
+
+def live_session_capacity(settings) -> int:
+    """Live pose sessions the challenge and mimic inference pools admit at once."""
+    workers = settings.inference_workers_challenge + settings.inference_workers_mimic
+    return workers * settings.inference_max_sessions_per_worker
+
+
+def get_pose_detector_pool() -> PoseDetectorPool:
+    """Detectors for live sessions (challenges, workout, mimic)."""
+    global _pose_detector_pool
+    with _pool_lock:
+        if _pose_detector_pool is None:
+            from ...config import get_settings
+            settings = get_settings()
+            _pose_detector_pool = _build_pool(
+                settings.pose_pool_max_detectors or live_session_capacity(settings),
+                settings.pose_pool_checkout_timeout_s,
+            )
+        return _pose_detector_pool
+
+
+def get_offline_pose_detector_pool() -> PoseDetectorPool:
+    """Detectors for offline mimic jobs, budgeted apart from live sessions."""
+    global _offline_pose_detector_pool
+    with _pool_lock:
+        if _offline_pose_detector_pool is None:
+            from ...config import get_settings
+            settings = get_settings()
+            _offline_pose_detector_pool = _build_pool(
+                settings.pose_pool_offline_max_detectors,
+                settings.pose_pool_offline_checkout_timeout_s,
+            )
+        return _offline_pose_detector_pool
+
+
+def shutdown_pose_detector_pool():
+    global _pose_detector_pool, _offline_pose_detector_pool
+    with _pool_lock:
+        pools = (_pose_detector_pool, _offline_pose_detector_pool)
+        _pose_detector_pool = _offline_pose_detector_pool = None
+    for pool in pools:
+        if pool is not None:
+            pool.shutdown()
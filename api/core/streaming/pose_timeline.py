@@ -0,0 +1,309 @@
+"""
+Chunked, columnar storage for challenge pose timelines.
+
+``RepCounterAnalyzer`` used to keep a dict per processed frame in
+``frame_timeline`` (33 landmarks as nested lists, plus angle/state/
+feedback) and hand the whole list back in the final report, which was
+stored as JSON in ``ChallengeSession.extra_data``. A five-minute session
+is several MB of JSON per row, held in memory for the life of the
+session and dragged along by every query that touches the row.
+
+A ``PoseTimelineWriter`` buffers frames as columns and writes them out
+every ``chunk_frames`` frames as a compressed ``.npz`` chunk appended to
+a local file, so memory stays bounded by one chunk. ``finish`` writes
+the chunk index and returns a ``PoseTimelineFile`` that the session-end
+code uploads to storage; the DB row keeps only the storage key and the
+frame count. Once finished (or discarded) a writer ignores further
+frames, so one arriving from the inference thread after session end
+can't write into the handed-over file. Writers are thread-safe.
+
+File layout::
+
+    MAGIC | chunk 0 | chunk 1 | ... | footer JSON | footer length (<Q) | MAGIC
+
+Each chunk is an ``np.savez_compressed`` archive with the columns ``t``
+(float64), ``lm`` (float32, ``(n, 33, 3)``: nx, ny, visibility),
+``angle`` (float32, NaN for none), ``reps`` (int32), ``hold`` (float32)
+and ``state``/``fb`` (int16 codes into the footer's ``labels`` list).
+The footer lists every chunk's byte offset, length, first frame index
+and time range, so ``PoseTimelineReader.read(start, stop)`` fetches only
+the chunks it needs -- through ``StorageBackend.load_range`` when the
+file lives in S3.
+
+Metrics:
+    pose_timeline.chunk_bytes   compressed size of each chunk written
+"""
+
+import io
+import json
+import logging
+import os
+import shutil
+import struct
+import tempfile
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+from ..metrics import statsd
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"PTL1"
+_TRAILER = struct.Struct("<Q4s")
+
+# (offset, length) -> bytes; a negative offset counts from the end of the file
+RangeReader = Callable[[int, Optional[int]], bytes]
+
+
+@dataclass
+class PoseTimelineFile:
+    """A finished timeline on local disk."""
+    path: str
+    frame_count: int
+    duration: float
+    size_bytes: int
+
+    def move_to(self, destination: str) -> str:
+        """Move the file to its final location and return the new path."""
+        Path(destination).parent.mkdir(parents=True, exist_ok=True)
+        shutil.move(self.path, destination)
+        self.path = destination
+        return destination
+
+    def discard(self):
+        Path(self.path).unlink(missing_ok=True)
+
+
+class PoseTimelineWriter:
+    """Append frames and write them to disk one compressed chunk at a time."""
+
+    def __init__(self, path: Optional[str] = None, chunk_frames: Optional[int] = None):
+        if chunk_frames is None:
+            from ...config import get_settings
+            chunk_frames = get_settings().pose_timeline_chunk_frames
+        self.chunk_frames = max(1, chunk_frames)
+        self.path = path
+        self.frame_count = 0
+        self._file = None  # opened on the first flush
+        self._chunks: List[Dict[str, Any]] = []
+        self._labels: Dict[Any, int] = {}
+        self._first_t: Optional[float] = None
+        self._last_t = 0.0
+        self._done = False  # finished or discarded
+        self._lock = threading.Lock()
+        self._reset_buffer()
+
+    def _reset_buffer(self):
+        self._t: List[float] = []
+        self._lm: List[np.ndarray] = []
+        self._angle: List[float] = []
+        self._state: List[int] = []
+        self._fb: List[int] = []
+        self._reps: List[int] = []
+        self._hold: List[float] = []
+
+    def _label(self, value: Any) -> int:
+        if isinstance(value, np.generic):
+            value = value.item()
+        code = self._labels.get(value)
+        if code is None:
+            code = self._labels[value] = len(self._labels)
+        return code
+
+    def append(
+        self,
+        t: float,
+        landmarks: np.ndarray,
+        angle: Optional[float] = None,
+        state: Any = None,
+        feedback: str = "",
+        reps: int = 0,
+        hold: float = 0.0,
+    ):
+        """Add one frame; ``landmarks`` is ``(33, 3)``: nx, ny, visibility.
+
+        Ignored once the writer is finished or discarded.
+        """
+        t = float(t)
+        landmarks = np.asarray(landmarks, dtype=np.float32)
+        with self._lock:
+            if self._done:
+                return
+            if self._first_t is None:
+                self._first_t = t
+            self._last_t = t
+            self._t.append(t)
+            self._lm.append(landmarks)
+            self._angle.append(np.nan if angle is None else angle)
+            self._state.append(self._label(state))
+            self._fb.append(self._label(feedback or ""))
+            self._reps.append(int(reps))
+            self._hold.append(hold)
+            self.frame_count += 1
+            if len(self._t) >= self.chunk_frames:
+                self._flush()
+
+    def _flush(self):
+        # Callers hold the lock
+        if not self._t or self._done:
+            return
+        if self._file is None:
+            if self.path is None:
+                fd, self.path = tempfile.mkstemp(prefix="pose_timeline_", suffix=".ptl")
+                self._file = os.fdopen(fd, "wb")
+            else:
+                Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+                self._file = open(self.path, "wb")
+            self._file.write(MAGIC)
+
+        buf = io.BytesIO()
+        np.savez_compressed(
+            buf,
+            t=np.array(self._t, np.float64),
+            lm=np.stack(self._lm),
+            angle=np.array(self._angle, np.float32),
+            state=np.array(self._state, np.int16),
+            fb=np.array(self._fb, np.int16),
+            reps=np.array(self._reps, np.int32),
+            hold=np.array(self._hold, np.float32),
+        )
+        data = buf.getvalue()
+        self._chunks.append({
+            "offset": self._file.tell(),
+            "length": len(data),
+            "start": self.frame_count - len(self._t),
+            "frames": len(self._t),
+            "t0": self._t[0],
+            "t1": self._t[-1],
+        })
+        self._file.write(data)
+        statsd.histogram("pose_timeline.chunk_bytes", len(data))
+        self._reset_buffer()
+
+    def finish(self) -> Optional[PoseTimelineFile]:
+        """Flush, write the index and close; ``None`` if no frames were added
+        (or the writer was already finished or discarded)."""
+        with self._lock:
+            if self._done:
+                return None
+            if self.frame_count == 0:
+                self._discard()
+                return None
+            return self._finish()
+
+    def _finish(self) -> PoseTimelineFile:
+        self._flush()
+        self._done = True
+        footer = json.dumps({
+            "version": 1,
+            "frames": self.frame_count,
+            "labels": list(self._labels),
+            "chunks": self._chunks,
+        }).encode()
+        self._file.write(footer)
+        self._file.write(_TRAILER.pack(len(footer), MAGIC))
+        size = self._file.tell()
+        self._file.close()
+        self._file = None
+        return PoseTimelineFile(
+            path=self.path,
+            frame_count=self.frame_count,
+            duration=round(self._last_t - self._first_t, 3),
+            size_bytes=size,
+        )
+
+    def discard(self):
+        """Drop buffered frames and delete the partial file. A finished
+        file belongs to its ``PoseTimelineFile`` and is left alone."""
+        with self._lock:
+            if not self._done:
+                self._discard()
+
+    def _discard(self):
+        self._done = True
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if self.path is not None and self._chunks:
+            Path(self.path).unlink(missing_ok=True)
+        self._chunks = []
+        self._reset_buffer()
+
+
+class PoseTimelineReader:
+    """Random access to a timeline written by ``PoseTimelineWriter``.
+
+    Frames come back in the dict format the admin tools have always used:
+    ``{"t", "lm": [[nx, ny, vis], ...], "angle", "state", "fb", "reps", "hold"}``.
+    """
+
+    def __init__(self, read_range: RangeReader):
+        self._read_range = read_range
+        trailer = read_range(-_TRAILER.size, None)
+        footer_len, magic = _TRAILER.unpack(trailer)
+        if magic != MAGIC:
+            raise ValueError("Not a pose timeline file")
+        footer = json.loads(read_range(-(_TRAILER.size + footer_len), footer_len))
+        self.frame_count: int = footer["frames"]
+        self._labels: List[Any] = footer["labels"]
+        self._chunks: List[Dict[str, Any]] = footer["chunks"]
+
+    @classmethod
+    def from_path(cls, path: str) -> "PoseTimelineReader":
+        def read_range(offset: int, length: Optional[int]) -> bytes:
+            with open(path, "rb") as f:
+                f.seek(offset, os.SEEK_END if offset < 0 else os.SEEK_SET)
+                return f.read() if length is None else f.read(length)
+        return cls(read_range)
+
+    @classmethod
+    def from_storage(cls, backend, key: str) -> "PoseTimelineReader":
+        return cls(lambda offset, length: backend.load_range(key, offset, length))
+
+    @property
+    def duration(self) -> float:
+        if not self._chunks:
+            return 0.0
+        return round(self._chunks[-1]["t1"] - self._chunks[0]["t0"], 3)
+
+    def read(self, start: int = 0, stop: Optional[int] = None) -> List[Dict]:
+        """Frames ``start`` (inclusive) to ``stop`` (exclusive)."""
+        stop = self.frame_count if stop is None else min(stop, self.frame_count)
+        start = max(0, start)
+        frames: List[Dict] = []
+        for chunk in self._chunks:
+            first, count = chunk["start"], chunk["frames"]
+            if first + count <= start or first >= stop:
+                continue
+            frames.extend(self._decode(chunk, max(start - first, 0), min(stop - first, count)))
+        return frames
+
+    def _decode(self, chunk: Dict[str, Any], lo: int, hi: int) -> List[Dict]:
+        data = self._read_range(chunk["offset"], chunk["length"])
+        with np.load(io.BytesIO(data), allow_pickle=False) as cols:
+            t = cols["t"][lo:hi].round(3).tolist()
+            lm = cols["lm"][lo:hi].astype(np.float64)
+            lm = np.concatenate((lm[:, :, :2].round(4), lm[:, :, 2:].round(2)), axis=2).tolist()
+            angle = cols["angle"][lo:hi].astype(np.float64)
+            angle = [None if np.isnan(a) else round(a, 2) for a in angle.tolist()]
+            state = cols["state"][lo:hi].tolist()
+            fb = cols["fb"][lo:hi].tolist()
+            reps = cols["reps"][lo:hi].tolist()
+            hold = cols["hold"][lo:hi].astype(np.float64).round(1).tolist()
+        labels = self._labels
+        return [
+            {
+                "t": t[i],
+                "lm": lm[i],
+                "angle": angle[i],
+                "state": labels[state[i]],
+                "fb": labels[fb[i]],
+                "reps": reps[i],
+                "hold": hold[i],
+            }
+            for i in range(len(t))
+        ]
@@ -0,0 +1,239 @@
+"""
+Streaming recorders for live sessions.
+
+Recordings used to be kept as a list of JPEG bytes on the analyzer until
+``stop_recording``, then decoded, written to an ``mp4v`` file and (for
+challenges) re-encoded with ffmpeg on the request path -- hundreds of MB
+per session for a ten-minute recording.
+
+A ``StreamingRecorder`` encodes annotated frames as they arrive. The
+analyzer hands each frame to ``add_frame`` (a bounded queue, never
+blocks) and a background thread feeds the encoder:
+
+* ``libx264`` through an ffmpeg rawvideo pipe when ffmpeg is installed
+  (H.264, yuv420p, ``+faststart`` -- ready for browser/mobile playback;
+  odd widths/heights are padded by one pixel, as yuv420p needs even ones);
+* OpenCV's ``mp4v`` writer otherwise.
+
+Memory per session is bounded by ``max_queue`` frames. If the encoder
+falls behind, new frames are dropped (live analysis always wins) and
+counted. ``finish`` flushes and returns a ``RecordingResult`` whose file
+is complete and ready to upload.
+
+Metrics (tagged ``encoder:``):
+    recording.encode_ms         per-frame time inside the encoder
+    recording.frames_dropped    frames dropped because the queue was full
+"""
+
+import logging
+import os
+import queue
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+import cv2
+import numpy as np
+
+from ..metrics import statsd
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+@dataclass
+class RecordingResult:
+    """A finished recording on local disk."""
+    path: str
+    frame_count: int
+    frames_dropped: int
+    encoder: str
+    width: int = 0
+    height: int = 0
+
+    def move_to(self, destination: str) -> str:
+        """Move the file to its final location and return the new path."""
+        Path(destination).parent.mkdir(parents=True, exist_ok=True)
+        shutil.move(self.path, destination)
+        self.path = destination
+        return destination
+
+    def discard(self):
+        Path(self.path).unlink(missing_ok=True)
+
+
+def choose_encoder(preference: str = "auto") -> str:
+    """Resolve "auto" to libx264 when ffmpeg is available, else mp4v."""
+    if preference == "auto":
+        return "libx264" if shutil.which("ffmpeg") else "mp4v"
+    if preference == "libx264" and not shutil.which("ffmpeg"):
+        logger.warning("ffmpeg not found, recording with mp4v")
+        return "mp4v"
+    return preference
+
+
+class StreamingRecorder:
+    """Encode frames into a video file on a background thread."""
+
+    def __init__(
+        self,
+        fps: float,
+        path: Optional[str] = None,
+        max_queue: Optional[int] = None,
+        encoder: Optional[str] = None,
+        crf: Optional[int] = None,
+    ):
+        if max_queue is None or encoder is None or crf is None:
+            from ...config import get_settings
+            settings = get_settings()
+            max_queue = settings.recording_queue_frames if max_queue is None else max_queue
+            encoder = settings.recording_encoder if encoder is None else encoder
+            crf = settings.recording_crf if crf is None else crf
+
+        if path is None:
+            fd, path = tempfile.mkstemp(prefix="recording_", suffix=".mp4")
+            os.close(fd)
+        self.path = path
+        self.fps = max(1.0, float(fps or 10))
+        self.encoder = choose_encoder(encoder)
+        self.crf = crf
+        self.frame_count = 0
+        self.frames_dropped = 0
+        self.width = 0
+        self.height = 0
+        self._tags = [f"encoder:{self.encoder}"]
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max(1, max_queue))
+        self._error: Optional[Exception] = None
+        self._thread = threading.Thread(target=self._run, name="recording-encoder", daemon=True)
+        self._thread.start()
+
+    def add_frame(self, frame: np.ndarray) -> bool:
+        """Queue a BGR frame for encoding; returns False if it was dropped."""
+        try:
+            self._queue.put_nowait(frame)
+            return True
+        except queue.Full:
+            self.frames_dropped += 1
+            statsd.increment("recording.frames_dropped", tags=self._tags)
+            return False
+
+    def finish(self, timeout: float = 60.0) -> Optional[RecordingResult]:
+        """Flush the encoder and return the finished file (None if empty)."""
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            logger.error(f"Recording encoder did not finish within {timeout}s: {self.path}")
+            return None
+        if self._error is not None or self.frame_count == 0:
+            if self._error is not None:
+                logger.error(f"Recording failed: {self._error}")
+            Path(self.path).unlink(missing_ok=True)
+            return None
+        if self.frames_dropped:
+            logger.warning(
+                f"Recording {self.path}: {self.frames_dropped} frames dropped "
+                f"(encoder could not keep up)"
+            )
+        return RecordingResult(
+            self.path, self.frame_count, self.frames_dropped,
+            self.encoder, self.width, self.height,
+        )
+
+    def abort(self):
+        """Stop encoding and delete the partial file."""
+        self.finish(timeout=5.0)
+        Path(self.path).unlink(missing_ok=True)
+
+    # -- encoder thread ------------------------------------------------------
+
+    def _run(self):
+        sink = None
+        try:
+            while True:
+                frame = self._queue.get()
+                if frame is _STOP:
+                    break
+                if self._error is not None:
+                    continue
+                if sink is None:
+                    self.height, self.width = frame.shape[:2]
+                    sink = self._open_sink()
+                start = time.perf_counter()
+                sink.write(frame)
+                self.frame_count += 1
+                statsd.histogram(
+                    "recording.encode_ms", (time.perf_counter() - start) * 1000, tags=self._tags
+                )
+        except Exception as e:
+            self._error = e
+        finally:
+            if sink is not None:
+                try:
+                    sink.close()
+                except Exception as e:
+                    self._error = self._error or e
+
+    def _open_sink(self):
+        if self.encoder == "libx264":
+            return _FfmpegSink(self.path, self.width, self.height, self.fps, self.crf)
+        return _OpenCVSink(self.path, self.width, self.height, self.fps)
+
+
+class _FfmpegSink:
+    """Raw BGR frames piped into ffmpeg/libx264."""
+
+    def __init__(self, path: str, width: int, height: int, fps: float, crf: int):
+        self.width = width
+        self.height = height
+        # yuv420p subsamples chroma 2x2, so libx264 rejects odd dimensions
+        self._pad_w = width % 2
+        self._pad_h = height % 2
+        # stderr is discarded: an unread pipe would eventually block ffmpeg
+        self._proc = subprocess.Popen(
+            [
+                "ffmpeg", "-y", "-loglevel", "error",
+                "-f", "rawvideo", "-pix_fmt", "bgr24",
+                "-s", f"{width + self._pad_w}x{height + self._pad_h}", "-r", f"{fps:g}", "-i", "-",
+                "-c:v", "libx264", "-preset", "veryfast", "-crf", str(crf),
+                "-pix_fmt", "yuv420p", "-movflags", "+faststart",
+                path,
+            ],
+            stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+
+    def write(self, frame: np.ndarray):
+        if frame.shape[0] != self.height or frame.shape[1] != self.width:
+            frame = cv2.resize(frame, (self.width, self.height))
+        if self._pad_w or self._pad_h:
+            frame = cv2.copyMakeBorder(frame, 0, self._pad_h, 0, self._pad_w, cv2.BORDER_REPLICATE)
+        self._proc.stdin.write(np.ascontiguousarray(frame).tobytes())
+
+    def close(self):
+        self._proc.stdin.close()
+        if self._proc.wait(timeout=120) != 0:
+            raise RuntimeError(f"ffmpeg exited with {self._proc.returncode}")
+
+
+class _OpenCVSink:
+    """OpenCV mp4v writer (no ffmpeg available)."""
+
+    def __init__(self, path: str, width: int, height: int, fps: float):
+        self.width = width
+        self.height = height
+        self._writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), fps, (width, height))
+        if not self._writer.isOpened():
+            raise RuntimeError(f"could not open video writer for {path}")
+
+    def write(self, frame: np.ndarray):
+        if frame.shape[0] != self.height or frame.shape[1] != self.width:
+            frame = cv2.resize(frame, (self.width, self.height))
+        self._writer.write(frame)
+
+    def close(self):
+        self._writer.release()
@@ -0,0 +1,124 @@
+"""
+Versioned delta encoding for live classification results.
+
+Advanced-mode streams re-run ``classify_all`` over the whole session every
+few seconds, so most of each result is unchanged from the previous one.
+``ResultDeltaTracker`` keeps the last few published versions and builds,
+for a client that acknowledged version ``b``, a message with only the
+items added or changed since ``b`` plus the keys that disappeared:
+
+    { "type": "chunk_results", "version": 7, "base_version": 5, "delta": true,
+      "shots": [...], "rallies": [...], "shuttle_hits": [...],
+      "removed": {"shots": [1234], "rallies": [], "shuttle_hits": []},
+      "summary": {...}, "shot_distribution": {...} }
+
+Items are keyed by ``frame`` (shots, shuttle_hits) or ``rally_id``
+(rallies); clients upsert by key and drop removed keys. A collection
+whose key is not unique (two shots on one frame) in either version can't
+be upserted that way, so it is sent in full and named in ``replace``:
+
+    { ..., "delta": true, "shots": [...every shot...], "replace": ["shots"],
+      "removed": {"shots": [], ...} }
+
+and the client replaces that list. Clients ack with
+    { "type": "results_ack", "version": 7 }
+
+A full snapshot (``"delta": false``, ``base_version`` null) is sent when
+the client has never acked (older clients keep getting what they always
+got), when its base has fallen out of the history, and on every
+``snapshot_every``-th version so clients that missed a delta resync.
+"""
+
+import json
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+# collection name -> key field
+COLLECTION_KEYS = {
+    "shots": "frame",
+    "rallies": "rally_id",
+    "shuttle_hits": "frame",
+}
+SCALAR_FIELDS = ("summary", "shot_distribution")
+
+# collection name -> (items by key, or None if a key repeats; items as published)
+_Keyed = Dict[str, Tuple[Optional["OrderedDict[Any, dict]"], List[dict]]]
+
+
+def _keyed(items: List[dict], field: str) -> Optional["OrderedDict[Any, dict]"]:
+    """Index items by ``field``; None if a key repeats."""
+    out: "OrderedDict[Any, dict]" = OrderedDict()
+    for item in items:
+        key = item.get(field)
+        if key in out:
+            return None
+        out[key] = item
+    return out
+
+
+def dumps_compact(message: dict) -> str:
+    """JSON encoding used for every result message."""
+    return json.dumps(message, separators=(",", ":"), default=str)
+
+
+class ResultDeltaTracker:
+    """Per-session history of published results for delta encoding."""
+
+    def __init__(self, history: int = 16, snapshot_every: int = 20):
+        self.history = max(1, history)
+        self.snapshot_every = max(1, snapshot_every)
+        self.version = 0
+        self._versions: "OrderedDict[int, Tuple[_Keyed, dict]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def publish(self, results: dict) -> int:
+        """Record a new result set and return its version number."""
+        keyed = {}
+        for name, field in COLLECTION_KEYS.items():
+            items = list(results.get(name) or [])
+            keyed[name] = (_keyed(items, field), items)
+        scalars = {name: results.get(name) or {} for name in SCALAR_FIELDS}
+        with self._lock:
+            self.version += 1
+            self._versions[self.version] = (keyed, scalars)
+            while len(self._versions) > self.history:
+                self._versions.popitem(last=False)
+            return self.version
+
+    def message_for(self, base_version: Optional[int]) -> dict:
+        """Delta from ``base_version`` to the latest version (or a snapshot)."""
+        with self._lock:
+            if not self._versions:
+                return {"version": 0, "base_version": None, "delta": False}
+            version = self.version
+            keyed, scalars = self._versions[version]
+            base = self._versions.get(base_version) if base_version is not None else None
+            snapshot = base is None or version % self.snapshot_every == 0
+
+        message: Dict[str, Any] = {"version": version}
+        if snapshot:
+            message["base_version"] = None
+            message["delta"] = False
+            for name in COLLECTION_KEYS:
+                message[name] = list(keyed[name][1])
+        else:
+            base_keyed = base[0]
+            message["base_version"] = base_version
+            message["delta"] = True
+            removed, replace = {}, []
+            for name in COLLECTION_KEYS:
+                new, items = keyed[name]
+                old = base_keyed[name][0]
+                if new is None or old is None:
+                    message[name] = list(items)
+                    removed[name] = []
+                    replace.append(name)
+                    continue
+                message[name] = [item for key, item in new.items() if old.get(key) != item]
+                removed[name] = [key for key in old if key not in new]
+            message["removed"] = removed
+            if replace:
+                message["replace"] = replace
+        message.update(scalars)
+        return message
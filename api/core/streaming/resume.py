@@ -0,0 +1,300 @@
+"""
+Reconnect-safe live sessions: checkpoints and a resume grace window.
+
+A phone that drops its connection used to leave the session's analyzer
+orphaned in the session manager (never freed) and, if the server
+restarted, lost its state entirely.
+
+Two pieces fix that:
+
+* ``SessionCheckpoint`` keeps a resumable copy of an analyzer's state on
+  disk. The handler snapshots the analyzer every
+  ``stream_checkpoint_interval_s`` and when the streamer disconnects. The
+  small scalar state (stats, shot history, rally and classifier state,
+  FrameStore offsets) is rewritten atomically each time. ``raw_frame_data``
+  and the other per-frame lists only grow, so only new entries are
+  appended to a log and a checkpoint never re-serializes the whole
+  session. If the analyzer is gone when the streamer comes back (server
+  restart), the handler builds a new one and restores it from here.
+
+* ``ResumeRegistry`` tracks sessions whose streamer disconnected without
+  ending the stream. A streamer that reconnects within
+  ``stream_resume_grace_s`` reattaches to the same analyzer and continues;
+  nothing is reprocessed. Sessions still detached after the grace window
+  are reclaimed by a reaper task (``on_expire`` callback), so they stop
+  holding memory.
+
+Checkpoint layout (``<stream_checkpoint_dir>/stream_<id>/``):
+    state.pkl   pickled dict, replaced atomically; ``log_bytes`` is the
+                committed length of ``frames.log``
+    frames.log  [4-byte BE length][pickled {list name: new items}]...
+                bytes past ``log_bytes`` (a torn write) are ignored
+
+Metrics:
+    stream.checkpoint.ms        time to write one checkpoint
+    stream.checkpoint.bytes     bytes written per checkpoint
+    stream.resume               reconnects (tagged ``source:memory|checkpoint``)
+    stream.resume.expired       sessions reclaimed after the grace window
+    stream.resume.detached      sessions waiting for their streamer (gauge)
+"""
+
+import asyncio
+import inspect
+import logging
+import os
+import pickle
+import shutil
+import threading
+import time
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Union
+
+from ..metrics import statsd
+
+logger = logging.getLogger(__name__)
+
+_STATE_FILE = "state.pkl"
+_LOG_FILE = "frames.log"
+
+
+class SessionCheckpoint:
+    """On-disk checkpoint for one live session.
+
+    Analyzers produce snapshots with ``checkpoint_state(since)``: a dict
+    whose ``"append"`` entry maps each append-only list (``raw_frame_data``,
+    ``serialized_landmarks``, ...) to the items after ``since[name]``;
+    pass ``since()`` for the next snapshot.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = Path(directory)
+        self._state_path = self.directory / _STATE_FILE
+        self._log_path = self.directory / _LOG_FILE
+        self._lock = threading.Lock()
+        # How much of each append-only list is already on disk
+        self.saved: Dict[str, int] = {}
+        self._log_bytes = 0
+        self._synced = False
+
+    @classmethod
+    def for_session(cls, session_id: int) -> "SessionCheckpoint":
+        from ...config import get_settings
+        settings = get_settings()
+        root = settings.stream_checkpoint_dir or str(settings.output_path / "checkpoints")
+        return cls(os.path.join(root, f"stream_{session_id}"))
+
+    def exists(self) -> bool:
+        return self._state_path.exists()
+
+    def since(self) -> Dict[str, int]:
+        """How many items of each append-only list are already saved."""
+        with self._lock:
+            self._sync()
+            return dict(self.saved)
+
+    def _sync(self):
+        """Pick up offsets from an existing checkpoint (e.g. after a restart)."""
+        if self._synced:
+            return
+        self._synced = True
+        try:
+            with open(self._state_path, "rb") as f:
+                state = pickle.load(f)
+        except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+            return
+        self.saved = dict(state.get("saved", {}))
+        self._log_bytes = state.get("log_bytes", 0)
+
+    def write(self, state: Dict[str, Any]) -> int:
+        """Persist a snapshot; returns the number of bytes written."""
+        start = time.perf_counter()
+        with self._lock:
+            self._sync()
+            self.directory.mkdir(parents=True, exist_ok=True)
+            state = dict(state)
+            appended = {k: v for k, v in (state.pop("append", None) or {}).items() if v}
+
+            written = 0
+            if appended:
+                record = pickle.dumps(appended, pickle.HIGHEST_PROTOCOL)
+                with open(self._log_path, "r+b" if self._log_path.exists() else "wb") as log:
+                    # Drop anything past the committed length (torn write)
+                    log.truncate(self._log_bytes)
+                    log.seek(self._log_bytes)
+                    log.write(len(record).to_bytes(4, "big"))
+                    log.write(record)
+                    log.flush()
+                    os.fsync(log.fileno())
+                written += 4 + len(record)
+
+            saved = dict(self.saved)
+            for name, items in appended.items():
+                saved[name] = saved.get(name, 0) + len(items)
+            state["saved"] = saved
+            state["log_bytes"] = self._log_bytes + written
+            state["saved_at"] = time.time()
+
+            tmp = self._state_path.with_suffix(".tmp")
+            data = pickle.dumps(state, pickle.HIGHEST_PROTOCOL)
+            with open(tmp, "wb") as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self._state_path)
+            written += len(data)
+
+            self.saved = saved
+            self._log_bytes = state["log_bytes"]
+
+        statsd.histogram("stream.checkpoint.ms", (time.perf_counter() - start) * 1000)
+        statsd.histogram("stream.checkpoint.bytes", written)
+        return written
+
+    def load(self) -> Optional[Dict[str, Any]]:
+        """The last checkpoint, with ``"append"`` holding the full lists,
+        or None if there is none."""
+        with self._lock:
+            try:
+                with open(self._state_path, "rb") as f:
+                    state = pickle.load(f)
+            except FileNotFoundError:
+                return None
+            except Exception as e:
+                logger.warning(f"Unreadable checkpoint {self._state_path}: {e}")
+                return None
+
+            lists: Dict[str, List[Any]] = {}
+            committed = state.get("log_bytes", 0)
+            if committed:
+                with open(self._log_path, "rb") as log:
+                    data = log.read(committed)
+                pos = 0
+                while pos + 4 <= len(data):
+                    length = int.from_bytes(data[pos:pos + 4], "big")
+                    for name, items in pickle.loads(data[pos + 4:pos + 4 + length]).items():
+                        lists.setdefault(name, []).extend(items)
+                    pos += 4 + length
+
+            state["append"] = lists
+            self.saved = {name: len(items) for name, items in lists.items()}
+            self._log_bytes = committed
+            self._synced = True
+            return state
+
+    def discard(self):
+        with self._lock:
+            shutil.rmtree(self.directory, ignore_errors=True)
+            self.saved = {}
+            self._log_bytes = 0
+            self._synced = True
+
+
+_ExpireCallback = Callable[[], Union[None, Awaitable[None]]]
+
+
+class ResumeRegistry:
+    """Sessions whose streamer disconnected and may still come back."""
+
+    def __init__(self, grace_s: float = 120.0, reap_interval_s: float = 5.0):
+        self.grace_s = grace_s
+        self.reap_interval_s = reap_interval_s
+        self._detached: Dict[int, float] = {}  # session_id -> detached at (monotonic)
+        self._on_expire: Dict[int, _ExpireCallback] = {}
+        self._reaper: Optional[asyncio.Task] = None
+        self.resumed = 0
+        self.expired = 0
+
+    def detach(self, session_id: int, on_expire: _ExpireCallback):
+        """Start the grace window; ``on_expire`` reclaims the session if it ends."""
+        self._detached[session_id] = time.monotonic()
+        self._on_expire[session_id] = on_expire
+        statsd.gauge("stream.resume.detached", len(self._detached))
+        if self._reaper is None or self._reaper.done():
+            self._reaper = asyncio.get_running_loop().create_task(self._reap_loop())
+
+    def reattach(self, session_id: int) -> bool:
+        """Cancel the grace window. Returns True if the session was detached."""
+        self._on_expire.pop(session_id, None)
+        if self._detached.pop(session_id, None) is None:
+            return False
+        self.resumed += 1
+        statsd.gauge("stream.resume.detached", len(self._detached))
+        return True
+
+    def forget(self, session_id: int):
+        """The session ended some other way (e.g. the REST end endpoint)."""
+        self._detached.pop(session_id, None)
+        self._on_expire.pop(session_id, None)
+        statsd.gauge("stream.resume.detached", len(self._detached))
+
+    def is_detached(self, session_id: int) -> bool:
+        return session_id in self._detached
+
+    def remaining_s(self, session_id: int) -> Optional[float]:
+        detached_at = self._detached.get(session_id)
+        if detached_at is None:
+            return None
+        return max(0.0, self.grace_s - (time.monotonic() - detached_at))
+
+    async def reap(self, now: Optional[float] = None) -> List[int]:
+        """Reclaim every session whose grace window has passed."""
+        now = time.monotonic() if now is None else now
+        expired = [
+            sid for sid, detached_at in self._detached.items()
+            if now - detached_at >= self.grace_s
+        ]
+        for session_id in expired:
+            self._detached.pop(session_id, None)
+            callback = self._on_expire.pop(session_id, None)
+            self.expired += 1
+            statsd.increment("stream.resume.expired")
+            logger.info(f"Session {session_id}: streamer did not return within {self.grace_s:.0f}s, reclaiming")
+            if callback is None:
+                continue
+            try:
+                outcome = callback()
+                if inspect.isawaitable(outcome):
+                    await outcome
+            except Exception as e:
+                logger.error(f"Session {session_id}: reclaim failed: {e}", exc_info=True)
+        if expired:
+            statsd.gauge("stream.resume.detached", len(self._detached))
+        return expired
+
+    async def _reap_loop(self):
+        while self._detached:
+            await asyncio.sleep(self.reap_interval_s)
+            await self.reap()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "detached": len(self._detached),
+            "resumed": self.resumed,
+            "expired": self.expired,
+            "grace_s": self.grace_s,
+        }
+
+    def shutdown(self):
+        if self._reaper is not None:
+            self._reaper.cancel()
+            self._reaper = None
+        self._detached.clear()
+        self._on_expire.clear()
+
+
+_resume_registry: Optional[ResumeRegistry] = None
+
+
+def get_resume_registry() -> ResumeRegistry:
+    global _resume_registry
+    if _resume_registry is None:
+        from ...config import get_settings
+        _resume_registry = ResumeRegistry(get_settings().stream_resume_grace_s)
+    return _resume_registry
+
+
+def shutdown_resume_registry():
+    global _resume_registry
+    if _resume_registry is not None:
+        _resume_registry.shutdown()
+        _resume_registry = None
@@ -0,0 +1,353 @@
+"""
+Background screenshot pipeline for live sessions.
+
+Challenge and mimic analyzers take one annotated screenshot per second
+for admin review. They used to draw the overlay (two full-frame copies)
+and JPEG-encode it inline on the inference thread, keep every JPEG on
+the analyzer, and upload them all one PUT at a time when the session
+ended -- on the request path of the end-session call.
+
+Now an analyzer owns a ``ScreenshotStream``. ``capture`` takes a
+``render`` callable (the raw frame plus a snapshot of the HUD state, not
+yet drawn) and hands it to the shared ``ScreenshotUploader``, whose
+worker threads draw, encode and upload. Encoded JPEGs are uploaded in
+batches of ``batch_size`` as the session runs, so ``finish`` at the end
+of a session only schedules the last partial batch and returns the
+screenshot count without waiting.
+
+Memory is bounded by ``screenshot_queue_frames`` raw frames waiting for
+a worker across all sessions, plus at most one batch of JPEGs per
+session. Captures beyond that are dropped (the live session always
+wins) and counted. A stream must be ``bind``-ed to its storage prefix
+before it captures anything; unbound streams ignore captures.
+
+Storage indices are assigned as screenshots are uploaded (in capture
+order within a batch), so a failed render or upload leaves no gap: a session's
+screenshots are always ``<prefix>0000.jpg`` .. ``<prefix><count-1>.jpg``.
+``finish`` returns the number accepted, which is the final count unless
+something failed; ``on_uploaded`` reports the real count once the last
+batch is stored. Discarding a stream that was never finished (an
+abandoned session) deletes what it already uploaded.
+
+Metrics:
+    screenshots.render_ms       draw + encode time per screenshot
+    screenshots.upload_ms       time to upload one batch
+    screenshots.dropped         captures dropped because the queue was full
+    screenshots.upload_failed   screenshots whose upload failed
+    screenshots.deleted         uploaded screenshots of discarded streams deleted
+"""
+
+import logging
+import queue
+import threading
+import time
+from typing import Callable, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from ..metrics import statsd
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+_DELETE = object()
+
+
+class ScreenshotStream:
+    """Screenshots of one session, rendered and uploaded in the background."""
+
+    def __init__(self, prefix: Optional[str] = None, uploader: Optional["ScreenshotUploader"] = None):
+        self.prefix = prefix
+        self._uploader = uploader
+        self._lock = threading.Lock()
+        self._accepted = 0     # captures accepted; also their capture order
+        self._pending = 0      # captures queued or being rendered
+        self._uploading = 0    # batches taken for upload, not yet stored
+        self._batch: List[Tuple[int, bytes]] = []
+        self._finishing = False
+        self._discarded = False
+        self._completed = False
+        self._callbacks: List[Callable[[int], None]] = []
+        self._done = threading.Event()
+        # One upload or delete at a time, so stored indices stay contiguous
+        self._upload_lock = threading.Lock()
+        self._stored = 0
+
+    @property
+    def count(self) -> int:
+        """Screenshots uploaded so far (their storage indices are 0..count-1)."""
+        return self._stored
+
+    def bind(self, prefix: str):
+        """Set the storage prefix; captures are ignored until this is called."""
+        self.prefix = prefix
+
+    def capture(self, render: Callable[[], np.ndarray]) -> bool:
+        """Queue a screenshot; ``render`` returns the annotated BGR frame.
+
+        Never blocks. Returns False if the screenshot was dropped.
+        """
+        if self.prefix is None:
+            return False
+        uploader = self._uploader or get_screenshot_uploader()
+        with self._lock:
+            if self._finishing or self._discarded:
+                return False
+            if not uploader.reserve():
+                statsd.increment("screenshots.dropped")
+                return False
+            index = self._accepted
+            self._accepted += 1
+            self._pending += 1
+        uploader.submit(self, index, render)
+        return True
+
+    def finish(self) -> int:
+        """Stop capturing and schedule the last batch; returns the number
+        of screenshots accepted (the final count unless a render or upload
+        fails).
+
+        Does not wait for the uploads (see ``wait`` and ``on_uploaded``).
+        """
+        with self._lock:
+            if self._finishing or self._discarded:
+                return self._accepted
+            self._finishing = True
+            ready = self._pending == 0
+        if self.prefix is None:
+            self._complete()
+        elif ready:
+            uploader = self._uploader or get_screenshot_uploader()
+            uploader.submit_flush(self)
+        return self._accepted
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until every screenshot of a finished stream is uploaded."""
+        return self._done.wait(timeout)
+
+    def on_uploaded(self, callback: Callable[[int], None]):
+        """Call ``callback(count)`` once a finished stream is fully uploaded
+        (right away if it already is); usually on an uploader thread."""
+        with self._lock:
+            if not self._completed:
+                self._callbacks.append(callback)
+                return
+        callback(self._stored)
+
+    def discard(self, wait: bool = False):
+        """Drop everything not yet uploaded and delete what already was
+        (no-op once finished). The delete runs on an uploader thread
+        unless ``wait``."""
+        with self._lock:
+            if self._finishing or self._discarded:
+                return
+            self._discarded = True
+            self._batch = []
+        if self.prefix is not None:
+            uploader = self._uploader or get_screenshot_uploader()
+            if wait:
+                uploader.delete_uploaded(self)
+            else:
+                uploader.submit_delete(self)
+        self._done.set()
+
+    # -- called on uploader threads --
+
+    def _rendered(self, index: int, jpg: Optional[bytes]) -> Optional[List[Tuple[int, bytes]]]:
+        """Record a finished render; returns a batch to upload, if one is due."""
+        with self._lock:
+            self._pending -= 1
+            if self._discarded:
+                return None
+            if jpg is not None:
+                self._batch.append((index, jpg))
+            batch_size = (self._uploader or get_screenshot_uploader()).batch_size
+            if self._batch and (len(self._batch) >= batch_size
+                                or (self._finishing and self._pending == 0)):
+                batch, self._batch = self._batch, []
+                self._uploading += 1
+                return batch
+        return None
+
+    def _take_last_batch(self) -> List[Tuple[int, bytes]]:
+        with self._lock:
+            batch, self._batch = self._batch, []
+            if batch:
+                self._uploading += 1
+            return batch
+
+    def _uploaded(self, had_batch: bool):
+        with self._lock:
+            if had_batch:
+                self._uploading -= 1
+            done = (self._finishing and self._pending == 0
+                    and not self._batch and not self._uploading)
+        if done:
+            self._complete()
+
+    def _complete(self):
+        with self._lock:
+            if self._completed:
+                return
+            self._completed = True
+            callbacks, self._callbacks = self._callbacks, []
+        self._done.set()
+        for callback in callbacks:
+            try:
+                callback(self._stored)
+            except Exception as e:
+                logger.error(f"Screenshot upload callback failed: {e}")
+
+
+class ScreenshotUploader:
+    """Shared worker threads that render, encode and upload screenshots."""
+
+    def __init__(
+        self,
+        workers: int = 2,
+        max_queue: int = 32,
+        batch_size: int = 10,
+        jpeg_quality: int = 80,
+        storage=None,
+    ):
+        self.batch_size = max(1, batch_size)
+        self.jpeg_quality = jpeg_quality
+        self.max_queue = max(1, max_queue)
+        self._storage = storage
+        self._queue: "queue.Queue" = queue.Queue()
+        self._queued = 0
+        self._count_lock = threading.Lock()
+        self.dropped = 0
+        self.upload_failed = 0
+        self._threads = [
+            threading.Thread(target=self._run, name=f"screenshot-worker-{i}", daemon=True)
+            for i in range(max(1, workers))
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    @property
+    def storage(self):
+        if self._storage is None:
+            from ...services.storage_service import get_storage_service
+            self._storage = get_storage_service().outputs
+        return self._storage
+
+    def reserve(self) -> bool:
+        """Claim a queue slot for one raw frame; False when the queue is full."""
+        with self._count_lock:
+            if self._queued >= self.max_queue:
+                self.dropped += 1
+                return False
+            self._queued += 1
+            return True
+
+    def submit(self, stream: ScreenshotStream, index: int, render: Callable[[], np.ndarray]):
+        self._queue.put((stream, index, render))
+
+    def submit_flush(self, stream: ScreenshotStream):
+        self._queue.put((stream, None, None))
+
+    def submit_delete(self, stream: ScreenshotStream):
+        self._queue.put((stream, None, _DELETE))
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                break
+            stream, index, render = item
+            try:
+                if render is _DELETE:
+                    self.delete_uploaded(stream)
+                    continue
+                if render is None:
+                    batch = stream._take_last_batch()
+                else:
+                    jpg = None if stream._discarded else self._render(render)
+                    with self._count_lock:
+                        self._queued -= 1
+                    batch = stream._rendered(index, jpg)
+                try:
+                    if batch:
+                        self._upload(stream, batch)
+                finally:
+                    stream._uploaded(bool(batch))
+            except Exception as e:
+                logger.error(f"Screenshot worker error: {e}")
+
+    def _render(self, render: Callable[[], np.ndarray]) -> Optional[bytes]:
+        start = time.perf_counter()
+        try:
+            image = render()
+            ok, buf = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality])
+        except Exception as e:
+            logger.warning(f"Screenshot render failed: {e}")
+            return None
+        statsd.histogram("screenshots.render_ms", (time.perf_counter() - start) * 1000)
+        return buf.tobytes() if ok else None
+
+    def _upload(self, stream: ScreenshotStream, batch: List[Tuple[int, bytes]]):
+        start = time.perf_counter()
+        with stream._upload_lock:
+            for _, jpg in sorted(batch, key=lambda item: item[0]):
+                if stream._discarded:
+                    break
+                key = f"{stream.prefix}{stream._stored:04d}.jpg"
+                try:
+                    self.storage.save(key, jpg, content_type="image/jpeg")
+                except Exception as e:
+                    self.upload_failed += 1
+                    statsd.increment("screenshots.upload_failed")
+                    logger.error(f"Failed to upload screenshot {key}: {e}")
+                    continue
+                stream._stored += 1
+        statsd.histogram("screenshots.upload_ms", (time.perf_counter() - start) * 1000)
+
+    def delete_uploaded(self, stream: ScreenshotStream):
+        """Delete a discarded stream's uploaded screenshots (after any
+        upload still in progress)."""
+        with stream._upload_lock:
+            for index in range(stream._stored):
+                key = f"{stream.prefix}{index:04d}.jpg"
+                try:
+                    self.storage.delete(key)
+                    statsd.increment("screenshots.deleted")
+                except Exception as e:
+                    logger.warning(f"Failed to delete screenshot {key}: {e}")
+            stream._stored = 0
+
+    def shutdown(self, timeout: float = 10.0):
+        """Let queued work finish (up to ``timeout``), then stop the workers."""
+        for _ in self._threads:
+            self._queue.put(_STOP)
+        deadline = time.monotonic() + timeout
+        for thread in self._threads:
+            thread.join(max(0.0, deadline - time.monotonic()))
+
+
+_screenshot_uploader: Optional[ScreenshotUploader] = None
+_uploader_lock = threading.Lock()
+
+
+def get_screenshot_uploader() -> ScreenshotUploader:
+    global _screenshot_uploader
+    with _uploader_lock:
+        if _screenshot_uploader is None:
+            from ...config import get_settings
+            settings = get_settings()
+            _screenshot_uploader = ScreenshotUploader(
+                workers=settings.screenshot_workers,
+                max_queue=settings.screenshot_queue_frames,
+                batch_size=settings.screenshot_batch_size,
+            )
+        return _screenshot_uploader
+
+
+def shutdown_screenshot_uploader():
+    global _screenshot_uploader
+    with _uploader_lock:
+        uploader, _screenshot_uploader = _screenshot_uploader, None
+    if uploader is not None:
+        uploader.shutdown()
@@ -0,0 +1,517 @@
+"""
+Process-sharded live analyzers.
+
+Live analyzers normally live inside the API process, so every session on
+a node shares one interpreter and one GIL no matter how many inference
+threads there are. An ``AnalysisShardPool`` runs N analysis worker
+processes and places each session's analyzer in one of them (least
+loaded first). The WebSocket front end keeps a ``ShardedAnalyzer`` proxy
+whose method calls are forwarded over a local pipe (a Unix socketpair)
+and block until the worker replies, so the existing handlers -- which
+already call analyzers from a pinned inference thread -- need no changes.
+
+Inside a worker each session has its own single-thread executor: calls
+for one session run in order, sessions run concurrently. Long calls such
+as ``run_post_analysis`` stream progress callbacks back to the caller.
+The proxy only forwards the methods it was opened with
+(``ShardedAnalyzer.REMOTE_METHODS`` by default), so ``hasattr`` probes
+answer the same as on the real analyzer. Frames decoded from video
+chunks are JPEG-encoded before they cross the pipe: a pickled 1080p BGR
+array is ~6 MB per frame, the JPEG a few hundred KB.
+
+Only basic-mode badminton analyzers are sharded. Challenge and mimic
+sessions (``GenericSessionManager``) stay in the API process: they
+check out detectors from the process's bounded ``PoseDetectorPool``,
+share the process-wide mimic reference-timeline cache, and hand
+screenshot uploads and chunked pose-timeline files to REST handlers in
+the API process, none of which would survive the move to a worker.
+
+If a worker process dies, its in-flight calls fail with
+``ShardWorkerDied``, the process is restarted and its sessions are
+re-created (fresh analyzer state) on the least-loaded live workers.
+
+Wire format, pickled over the pipe:
+    front -> worker   (req_id, op, session_id, payload)
+    worker -> front   (req_id, "ok" | "error" | "progress", value)
+with ops ``open``, ``call``, ``get``, ``close`` and ``ping``.
+
+Metrics (tagged ``shard:``):
+    shard.call_ms             round trip of a forwarded call
+    shard.sessions            sessions placed on the worker (gauge)
+    shard.worker.restarts     worker processes restarted after dying
+    shard.sessions.migrated   sessions re-created after a worker died
+"""
+
+import itertools
+import logging
+import multiprocessing
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from ..metrics import statsd
+
+logger = logging.getLogger(__name__)
+
+
+class ShardWorkerDied(RuntimeError):
+    """The worker process holding a session exited during a call."""
+
+
+class ShardPoolFull(RuntimeError):
+    """Every worker already has its maximum number of sessions."""
+
+
+class RemoteAnalyzerError(RuntimeError):
+    """An analyzer method raised inside the worker process."""
+
+
+# ---------------------------------------------------------------------------
+# Worker process side
+# ---------------------------------------------------------------------------
+
+def _worker_main(conn, index: int):
+    """Entry point of an analysis worker process."""
+    analyzers: Dict[int, Any] = {}
+    executors: Dict[int, ThreadPoolExecutor] = {}
+    # Guards ``executors``: the main loop looks up and submits, ``close``
+    # handlers (on the session's own thread) drop and shut down
+    executors_lock = threading.Lock()
+    send_lock = threading.Lock()
+
+    def send(msg):
+        with send_lock:
+            try:
+                conn.send(msg)
+            except (OSError, EOFError):
+                pass
+
+    def handle(req_id, op, session_id, payload):
+        try:
+            if op == "open":
+                factory, kwargs = payload
+                old = analyzers.pop(session_id, None)
+                if old is not None:
+                    old.close()
+                analyzers[session_id] = factory(**kwargs)
+                value = None
+            elif op == "call":
+                method, args, kwargs, with_progress = payload
+                if with_progress:
+                    kwargs = dict(kwargs, progress_callback=lambda *a: send((req_id, "progress", a)))
+                value = getattr(analyzers[session_id], method)(*args, **kwargs)
+            elif op == "get":
+                value = getattr(analyzers[session_id], payload)
+            elif op == "close":
+                analyzer = analyzers.pop(session_id, None)
+                if analyzer is not None:
+                    analyzer.close()
+                value = None
+            else:
+                raise ValueError(f"unknown op {op!r}")
+            send((req_id, "ok", value))
+        except Exception as e:
+            send((req_id, "error", f"{type(e).__name__}: {e}"))
+        if op == "close":
+            # Drop the entry first so the main loop can't submit to it after
+            # shutdown; anything it queued before runs and finds no analyzer.
+            # A later "open" for the same session gets a new executor.
+            with executors_lock:
+                executor = executors.pop(session_id, None)
+            if executor is not None:
+                executor.shutdown(wait=False)
+
+    while True:
+        try:
+            req_id, op, session_id, payload = conn.recv()
+        except (EOFError, OSError):
+            break
+        if op == "ping":
+            send((req_id, "ok", index))
+            continue
+        if op == "shutdown":
+            break
+        with executors_lock:
+            executor = executors.get(session_id)
+            if executor is None:
+                executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"shard-{index}-{session_id}")
+                executors[session_id] = executor
+            try:
+                executor.submit(handle, req_id, op, session_id, payload)
+            except RuntimeError as e:
+                send((req_id, "error", f"{type(e).__name__}: {e}"))
+
+    for analyzer in analyzers.values():
+        try:
+            analyzer.close()
+        except Exception:
+            pass
+
+
+# ---------------------------------------------------------------------------
+# Front end side
+# ---------------------------------------------------------------------------
+
+class _ShardWorker:
+    """One analysis process, its pipe and the calls waiting on it."""
+
+    def __init__(self, pool: "AnalysisShardPool", index: int):
+        self.pool = pool
+        self.index = index
+        self.tags = [f"shard:{index}"]
+        self.sessions: set = set()
+        self.process = None
+        self.conn = None
+        self.alive = False
+        self._pending: Dict[int, Tuple[Future, Optional[Callable]]] = {}
+        self._send_lock = threading.Lock()
+
+    def start(self):
+        ctx = multiprocessing.get_context(self.pool.start_method)
+        parent_conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(
+            target=_worker_main, args=(child_conn, self.index),
+            name=f"analysis-shard-{self.index}", daemon=True,
+        )
+        self.process.start()
+        child_conn.close()
+        self.conn = parent_conn
+        self.alive = True
+        threading.Thread(
+            target=self._read_loop, args=(parent_conn,),
+            name=f"shard-reader-{self.index}", daemon=True,
+        ).start()
+
+    def submit(self, req_id: int, op: str, session_id: int, payload,
+               progress: Optional[Callable] = None) -> Future:
+        future: Future = Future()
+        if not self.alive:
+            future.set_exception(ShardWorkerDied(f"shard {self.index} is not running"))
+            return future
+        self._pending[req_id] = (future, progress)
+        try:
+            with self._send_lock:
+                self.conn.send((req_id, op, session_id, payload))
+        except (OSError, EOFError, BrokenPipeError) as e:
+            self._pending.pop(req_id, None)
+            future.set_exception(ShardWorkerDied(f"shard {self.index}: {e}"))
+        return future
+
+    def _read_loop(self, conn):
+        while True:
+            try:
+                req_id, status, value = conn.recv()
+            except (EOFError, OSError):
+                break
+            if status == "progress":
+                entry = self._pending.get(req_id)
+                if entry and entry[1] is not None:
+                    try:
+                        entry[1](*value)
+                    except Exception:
+                        pass
+                continue
+            entry = self._pending.pop(req_id, None)
+            if entry is None:
+                continue
+            if status == "ok":
+                entry[0].set_result(value)
+            else:
+                entry[0].set_exception(RemoteAnalyzerError(value))
+        if conn is self.conn:
+            self.pool._on_worker_lost(self)
+
+    def fail_pending(self):
+        pending, self._pending = self._pending, {}
+        for future, _ in pending.values():
+            if not future.done():
+                future.set_exception(ShardWorkerDied(f"shard {self.index} exited"))
+
+    def stop(self, timeout: float = 5.0):
+        self.alive = False
+        if self.conn is not None:
+            try:
+                with self._send_lock:
+                    self.conn.send((0, "shutdown", 0, None))
+            except (OSError, EOFError):
+                pass
+        if self.process is not None:
+            self.process.join(timeout)
+            if self.process.is_alive():
+                self.process.kill()
+                self.process.join(1.0)
+        if self.conn is not None:
+            self.conn.close()
+        self.fail_pending()
+
+
+class AnalysisShardPool:
+    """Least-loaded placement of live analyzers across worker processes."""
+
+    def __init__(
+        self,
+        workers: int,
+        max_sessions_per_worker: int = 8,
+        call_timeout: float = 30.0,
+        start_method: str = "spawn",
+    ):
+        self.max_sessions_per_worker = max(1, max_sessions_per_worker)
+        self.call_timeout = call_timeout
+        self.start_method = start_method
+        self._workers = [_ShardWorker(self, i) for i in range(max(1, workers))]
+        self._assignments: Dict[int, _ShardWorker] = {}
+        self._specs: Dict[int, Tuple[Callable, dict]] = {}
+        self._lock = threading.RLock()
+        self._req_ids = itertools.count(1)
+        self._closing = False
+        self.restarts = 0
+        for w in self._workers:
+            w.start()
+
+    @property
+    def capacity(self) -> int:
+        return len(self._workers) * self.max_sessions_per_worker
+
+    def _pick_worker(self) -> _ShardWorker:
+        candidates = [
+            w for w in self._workers
+            if w.alive and len(w.sessions) < self.max_sessions_per_worker
+        ]
+        if not candidates:
+            raise ShardPoolFull(f"analysis shards are full ({self.capacity} sessions)")
+        return min(candidates, key=lambda w: (len(w.sessions), len(w._pending), w.index))
+
+    def open_session(
+        self, session_id: int, factory: Callable, kwargs: dict,
+        methods: Optional[Tuple[str, ...]] = None,
+    ) -> "ShardedAnalyzer":
+        """Create ``factory(**kwargs)`` in the least-loaded worker.
+
+        ``factory`` must be importable (a class or module-level function)
+        and ``kwargs`` picklable. ``methods`` are the analyzer methods the
+        proxy forwards (default ``ShardedAnalyzer.REMOTE_METHODS``).
+        """
+        with self._lock:
+            worker = self._assignments.get(session_id) or self._pick_worker()
+            self._place(session_id, worker)
+            self._specs[session_id] = (factory, kwargs)
+        self._wait(worker, worker.submit(next(self._req_ids), "open", session_id, (factory, kwargs)))
+        logger.info(f"Session {session_id}: analyzer placed on shard {worker.index}")
+        return ShardedAnalyzer(self, session_id, methods)
+
+    def _place(self, session_id: int, worker: _ShardWorker):
+        worker.sessions.add(session_id)
+        self._assignments[session_id] = worker
+        statsd.gauge("shard.sessions", len(worker.sessions), tags=worker.tags)
+
+    def worker_index(self, session_id: int) -> Optional[int]:
+        worker = self._assignments.get(session_id)
+        return worker.index if worker is not None else None
+
+    def request(self, session_id: int, op: str, payload=None,
+                progress: Optional[Callable] = None, timeout: Optional[float] = None) -> Any:
+        """Forward one op for a session and block for the reply."""
+        worker = self._assignments.get(session_id)
+        if worker is None:
+            raise KeyError(f"session {session_id} has no analyzer shard")
+        started = time.perf_counter()
+        future = worker.submit(next(self._req_ids), op, session_id, payload, progress)
+        try:
+            return self._wait(worker, future, timeout)
+        finally:
+            statsd.histogram(
+                "shard.call_ms", (time.perf_counter() - started) * 1000, tags=worker.tags
+            )
+
+    def _wait(self, worker: _ShardWorker, future: Future, timeout: Optional[float] = None):
+        try:
+            return future.result(timeout=timeout if timeout is not None else self.call_timeout)
+        except FutureTimeout:
+            raise TimeoutError(f"shard {worker.index} did not reply in time")
+
+    def close_session(self, session_id: int):
+        with self._lock:
+            worker = self._assignments.pop(session_id, None)
+            self._specs.pop(session_id, None)
+            if worker is None:
+                return
+            worker.sessions.discard(session_id)
+            statsd.gauge("shard.sessions", len(worker.sessions), tags=worker.tags)
+        try:
+            self._wait(worker, worker.submit(next(self._req_ids), "close", session_id, None))
+        except Exception as e:
+            logger.warning(f"Session {session_id}: shard close failed: {e}")
+
+    def _on_worker_lost(self, worker: _ShardWorker):
+        """Restart a dead worker and re-create its sessions elsewhere."""
+        with self._lock:
+            if self._closing or not worker.alive:
+                return
+            worker.alive = False
+            worker.fail_pending()
+            worker.process.join(1.0)
+            orphans = sorted(worker.sessions)
+            worker.sessions.clear()
+            logger.error(
+                f"Analysis shard {worker.index} exited "
+                f"(code {worker.process.exitcode}); restarting, {len(orphans)} sessions affected"
+            )
+            statsd.increment("shard.worker.restarts", tags=worker.tags)
+            self.restarts += 1
+            worker.start()
+
+            for session_id in orphans:
+                spec = self._specs.get(session_id)
+                self._assignments.pop(session_id, None)
+                if spec is None:
+                    continue
+                try:
+                    target = self._pick_worker()
+                except ShardPoolFull:
+                    logger.error(f"Session {session_id}: no shard capacity to restart analyzer")
+                    continue
+                self._place(session_id, target)
+                target.submit(next(self._req_ids), "open", session_id, spec)
+                statsd.increment("shard.sessions.migrated", tags=target.tags)
+                logger.warning(
+                    f"Session {session_id}: analyzer restarted on shard {target.index} "
+                    f"(live state since the last checkpoint is lost)"
+                )
+
+    def stats(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [
+                {
+                    "shard": w.index,
+                    "pid": w.process.pid if w.process else None,
+                    "alive": w.alive,
+                    "sessions": len(w.sessions),
+                    "pending": len(w._pending),
+                }
+                for w in self._workers
+            ]
+
+    def shutdown(self):
+        with self._lock:
+            self._closing = True
+            self._assignments.clear()
+            self._specs.clear()
+        for w in self._workers:
+            w.stop()
+
+
+# Decoded frames forwarded to a shard; matches the advanced FrameStore
+_FRAME_JPEG_QUALITY = 90
+
+
+def _encode_frame(frame: np.ndarray) -> Any:
+    """JPEG bytes for a decoded BGR frame (the frame itself if encoding fails)."""
+    ok, buf = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, _FRAME_JPEG_QUALITY])
+    return buf.tobytes() if ok else frame
+
+
+class ShardedAnalyzer:
+    """Front-end proxy for an analyzer living in a shard worker.
+
+    Calls to the allowed methods are forwarded and block until the worker
+    replies; ``run_post_analysis`` progress callbacks are relayed. Plain
+    attributes listed in ``REMOTE_ATTRIBUTES`` are fetched on access.
+    Anything else raises ``AttributeError``.
+    """
+
+    # BasicStreamAnalyzer's interface as used by the stream handlers
+    REMOTE_METHODS = (
+        "process_frame", "get_final_report", "get_heatmap_data", "run_post_analysis",
+        "start_recording", "stop_recording", "release_raw_video_writer",
+        "start_video_passthrough", "append_video_chunk",
+        "checkpoint_state", "restore_state", "resume_info",
+        "update_thresholds", "get_current_thresholds", "reset",
+        "_get_stats_dict",  # StreamConnectionManager.get_session_stats
+    )
+    REMOTE_ATTRIBUTES = ("raw_video_path", "stats", "session_id", "frame_rate")
+    _PROGRESS_METHODS = ("run_post_analysis",)
+
+    def __init__(
+        self, pool: AnalysisShardPool, session_id: int,
+        methods: Optional[Tuple[str, ...]] = None,
+    ):
+        self._pool = pool
+        self._session_id = session_id
+        self._methods = frozenset(methods if methods is not None else self.REMOTE_METHODS)
+        self._closed = False
+
+    @property
+    def shard_index(self) -> Optional[int]:
+        return self._pool.worker_index(self._session_id)
+
+    def __getattr__(self, name: str):
+        if name in self.REMOTE_ATTRIBUTES:
+            return self._pool.request(self._session_id, "get", name)
+        if name not in self._methods:
+            raise AttributeError(f"{type(self).__name__} does not forward {name!r}")
+
+        def remote_method(*args, **kwargs):
+            progress = None
+            timeout = None
+            if name in self._PROGRESS_METHODS:
+                progress = kwargs.pop("progress_callback", None)
+                if progress is None and len(args) > 1:
+                    progress, args = args[1], args[:1]
+                # Post-analysis runs far longer than a live call
+                timeout = 24 * 3600.0
+            elif name == "process_frame" and args and isinstance(args[0], np.ndarray):
+                args = (_encode_frame(args[0]),) + args[1:]
+            return self._pool.request(
+                self._session_id, "call",
+                (name, args, kwargs, progress is not None),
+                progress=progress, timeout=timeout,
+            )
+
+        remote_method.__name__ = name
+        return remote_method
+
+    def close(self):
+        if not self._closed:
+            self._closed = True
+            self._pool.close_session(self._session_id)
+
+
+# Global instance
+_shard_pool: Optional[AnalysisShardPool] = None
+_shard_pool_lock = threading.Lock()
+
+
+def get_shard_pool() -> Optional[AnalysisShardPool]:
+    """Return the analysis shard pool, or None when sharding is disabled."""
+    global _shard_pool
+    if _shard_pool is not None:
+        return _shard_pool
+    from ...config import get_settings
+    settings = get_settings()
+    if settings.live_shard_workers <= 0:
+        return None
+    with _shard_pool_lock:
+        if _shard_pool is None:
+            _shard_pool = AnalysisShardPool(
+                settings.live_shard_workers,
+                settings.live_shard_max_sessions_per_worker,
+                settings.live_shard_call_timeout_s,
+            )
+            logger.info(
+                f"Analysis shards: {settings.live_shard_workers} processes x "
+                f"{_shard_pool.max_sessions_per_worker} sessions"
+            )
+        return _shard_pool
+
+
+def shutdown_shard_pool():
+    global _shard_pool
+    with _shard_pool_lock:
+        if _shard_pool is not None:
+            _shard_pool.shutdown()
+            _shard_pool = None
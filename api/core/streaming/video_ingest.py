@@ -0,0 +1,263 @@
+"""
+Compressed video-chunk ingest for live streams.
+
+JPEG-per-frame ingest is bandwidth-heavy on mobile networks and caps the
+usable frame rate. Clients that can encode video instead negotiate
+``video_fmp4`` (fragmented MP4, H.264) or ``video_webm`` in ``hello`` and
+send short chunks as binary_v1 messages with ``msg_type`` 3 (see
+frame_protocol.py). The first chunk starts with the init segment; the
+header carries the stream time of the chunk's first frame and the coded
+frame size.
+
+Each connection gets a ``ChunkDecoder``: an ffmpeg process fed the
+chunks on stdin that writes raw BGR frames to stdout, with ``showinfo``
+reporting each frame's pts on stderr. Decoded frames reach the analyzers
+as arrays, through the same paths as JPEG frames. The chunks themselves
+are appended to the session's raw recording as received -- concatenated
+fragments are a playable file -- so nothing is re-encoded.
+
+Video formats are only offered when ffmpeg is installed and
+``stream_video_ingest`` is on; otherwise negotiation falls back to JPEG
+frames.
+
+Metrics (tagged ``frame_format:``):
+    stream.video.chunk_bytes     size of each received chunk
+    stream.video.frames          frames decoded
+    stream.video.decode_errors   decoder processes that failed
+"""
+
+import asyncio
+import logging
+import re
+import shutil
+import subprocess
+import threading
+from collections import deque
+from concurrent.futures import TimeoutError as FutureTimeout
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import numpy as np
+
+from ..metrics import statsd
+from .frame_protocol import FRAME_FORMAT_VIDEO_FMP4, FRAME_FORMAT_VIDEO_WEBM
+
+logger = logging.getLogger(__name__)
+
+# ffmpeg demuxer and raw recording extension per video format
+_CONTAINERS = {
+    FRAME_FORMAT_VIDEO_FMP4: ("mp4", ".mp4"),
+    FRAME_FORMAT_VIDEO_WEBM: ("matroska", ".webm"),
+}
+
+_PTS_RE = re.compile(rb"pts_time:\s*(-?[0-9.]+)")
+_N_RE = re.compile(rb"\bn:\s*([0-9]+)")
+
+# How long a decoded frame waits for its showinfo line before its pts is estimated
+_PTS_WAIT_S = 1.0
+
+
+def available_video_formats() -> Tuple[str, ...]:
+    """Video-chunk formats to offer in ``hello`` (none without ffmpeg)."""
+    from ...config import get_settings
+    if not get_settings().stream_video_ingest or not shutil.which("ffmpeg"):
+        return ()
+    return tuple(_CONTAINERS)
+
+
+def recording_extension(video_format: str) -> str:
+    """File extension of a raw recording made of ``video_format`` chunks."""
+    return _CONTAINERS[video_format][1]
+
+
+def parse_pts(line: bytes) -> Optional[float]:
+    """pts (seconds) from an ffmpeg ``showinfo`` log line, if it has one."""
+    if b"showinfo" not in line:
+        return None
+    match = _PTS_RE.search(line)
+    return float(match.group(1)) if match else None
+
+
+def parse_frame_info(line: bytes) -> Optional[Tuple[int, float]]:
+    """``(frame number, pts)`` from an ffmpeg ``showinfo`` log line, if it has them."""
+    pts = parse_pts(line)
+    match = _N_RE.search(line) if pts is not None else None
+    return (int(match.group(1)), pts) if match else None
+
+
+class ChunkDecoder:
+    """Decode a stream of video chunks with ffmpeg.
+
+    ``feed`` writes a chunk to ffmpeg; a reader thread calls
+    ``on_frame(image, timestamp, index)`` for every decoded frame, in
+    order. ``timestamp`` is ``start_ts`` plus the frame's pts. With
+    ``loop``, ``on_frame`` is a coroutine function run on that loop and
+    the reader waits for it, so a slow consumer backpressures ffmpeg
+    (and eventually ``feed``).
+    """
+
+    def __init__(
+        self,
+        video_format: str,
+        width: int,
+        height: int,
+        on_frame: Callable[..., Any],
+        loop: Optional[asyncio.AbstractEventLoop] = None,
+        start_ts: float = 0.0,
+    ):
+        if video_format not in _CONTAINERS:
+            raise ValueError(f"Unsupported video format {video_format!r}")
+        if width <= 0 or height <= 0:
+            raise ValueError("Video chunks must declare the frame size")
+        self.video_format = video_format
+        self.width = width
+        self.height = height
+        self.start_ts = start_ts
+        self.frames_decoded = 0
+        self.bytes_fed = 0
+        self.failed = False
+        self._on_frame = on_frame
+        self._loop = loop
+        self._tags = [f"frame_format:{video_format}"]
+        # showinfo pts by frame number, so a late log line can't shift later frames
+        self._pts: Dict[int, float] = {}
+        self._pts_ready = threading.Condition()
+        self._log_done = False
+        self._last_pts = -1.0 / 30
+        self._log_tail: deque = deque(maxlen=5)
+        self._aborted = threading.Event()
+
+        # Small probe + no input buffering: decoding starts with the first
+        # fragment instead of after several seconds of video
+        self._proc = subprocess.Popen(
+            [
+                "ffmpeg", "-hide_banner", "-nostats", "-loglevel", "info",
+                "-probesize", "32768", "-analyzeduration", "0",
+                "-fflags", "nobuffer", "-flags", "low_delay",
+                "-f", _CONTAINERS[video_format][0], "-i", "pipe:0",
+                "-an", "-vf", f"scale={width}:{height},showinfo",
+                "-vsync", "passthrough",
+                "-f", "rawvideo", "-pix_fmt", "bgr24", "pipe:1",
+            ],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+        )
+        self._stderr_thread = threading.Thread(
+            target=self._read_log, name="video-decoder-log", daemon=True
+        )
+        self._reader_thread = threading.Thread(
+            target=self._read_frames, name="video-decoder", daemon=True
+        )
+        self._stderr_thread.start()
+        self._reader_thread.start()
+
+    @property
+    def extension(self) -> str:
+        return recording_extension(self.video_format)
+
+    def feed(self, chunk: bytes) -> bool:
+        """Write a chunk to the decoder; False once the decoder has failed."""
+        if self.failed:
+            return False
+        statsd.histogram("stream.video.chunk_bytes", len(chunk), tags=self._tags)
+        try:
+            self._proc.stdin.write(chunk)
+            self._proc.stdin.flush()
+        except (BrokenPipeError, OSError, ValueError) as e:
+            self._fail(f"decoder input closed: {e}")
+            return False
+        self.bytes_fed += len(chunk)
+        return True
+
+    def close(self, timeout: float = 30.0) -> int:
+        """End of stream: decode what is buffered and wait for the last
+        frame to be delivered. Returns the number of frames decoded."""
+        try:
+            self._proc.stdin.close()
+        except (BrokenPipeError, OSError):
+            pass
+        self._reader_thread.join(timeout)
+        try:
+            code = self._proc.wait(timeout=5.0)
+        except subprocess.TimeoutExpired:
+            self._proc.kill()
+            code = None
+        if code and not self._aborted.is_set():
+            self._fail(f"ffmpeg exited with {code}")
+        return self.frames_decoded
+
+    def abort(self):
+        """Stop decoding now (connection lost); undelivered frames are dropped."""
+        self._aborted.set()
+        if self._proc.poll() is None:
+            self._proc.kill()
+
+    def _fail(self, reason: str):
+        if self.failed:
+            return
+        self.failed = True
+        statsd.increment("stream.video.decode_errors", tags=self._tags)
+        tail = b" | ".join(self._log_tail).decode(errors="replace")
+        logger.error(f"Video decoder ({self.video_format}) failed: {reason} {tail}".rstrip())
+
+    # -- threads -------------------------------------------------------------
+
+    def _read_log(self):
+        for line in self._proc.stderr:
+            info = parse_frame_info(line)
+            if info is not None:
+                with self._pts_ready:
+                    self._pts[info[0]] = info[1]
+                    self._pts_ready.notify_all()
+            elif line.strip():
+                self._log_tail.append(line.strip())
+        with self._pts_ready:
+            self._log_done = True
+            self._pts_ready.notify_all()
+
+    def _next_pts(self, index: int) -> float:
+        # showinfo logs a frame before ffmpeg writes it, so its pts is
+        # normally there already. If the log is behind, estimate this one;
+        # pts are matched by frame number, so the next frame whose line has
+        # arrived gets its real pts again
+        with self._pts_ready:
+            self._pts_ready.wait_for(
+                lambda: index in self._pts or self._log_done, timeout=_PTS_WAIT_S
+            )
+            pts = self._pts.pop(index, None)
+            for stale in [n for n in self._pts if n < index]:
+                del self._pts[stale]
+        if pts is None:
+            pts = self._last_pts + 1.0 / 30
+        self._last_pts = pts
+        return pts
+
+    def _read_frames(self):
+        frame_bytes = self.width * self.height * 3
+        stdout = self._proc.stdout
+        while not self._aborted.is_set():
+            # A fresh writable buffer per frame: analyzers draw on frames
+            buf = bytearray(frame_bytes)
+            if stdout.readinto(buf) < frame_bytes:
+                break
+            image = np.frombuffer(buf, np.uint8).reshape(self.height, self.width, 3)
+            index = self.frames_decoded
+            self.frames_decoded += 1
+            statsd.increment("stream.video.frames", tags=self._tags)
+            try:
+                self._deliver(image, self.start_ts + self._next_pts(index), index)
+            except Exception as e:
+                logger.error(f"Video decoder: frame {index} not delivered: {e}")
+
+    def _deliver(self, image: np.ndarray, timestamp: float, index: int):
+        if self._loop is None:
+            self._on_frame(image, timestamp, index)
+            return
+        future = asyncio.run_coroutine_threadsafe(
+            self._on_frame(image, timestamp, index), self._loop
+        )
+        while not self._aborted.is_set():
+            try:
+                future.result(timeout=0.5)
+                return
+            except FutureTimeout:
+                continue
+        future.cancel()
@@ -0,0 +1,289 @@
+"""
+Serialize-once, concurrent fan-out to stream viewers.
+
+Viewers used to be sent to one at a time with ``await send_json(...)``,
+so every message was re-encoded per viewer and a single slow viewer
+(e.g. a parent on bad Wi-Fi) held up every other viewer and the
+streamer's own receive loop.
+
+A ``ViewerFanout`` per session encodes each message once and hands the
+text to a bounded ``ViewerOutbox`` per viewer. Each outbox has its own
+sender task, so viewers are written concurrently and publishing never
+awaits a socket. When an outbox is full:
+
+* a message with a ``coalesce_key`` replaces the queued message with the
+  same key (e.g. only the newest live result matters);
+* otherwise the oldest droppable message is discarded;
+* non-droppable messages (``stream_ended``) are always queued.
+
+A viewer whose send does not complete within ``send_timeout`` is closed
+and removed.
+
+Metrics (tagged ``feature:``):
+    stream.viewer.lag_ms        enqueue -> sent, per message
+    stream.viewer.dropped       messages discarded (``reason:drop|coalesce``)
+    stream.viewer.queue_depth   deepest outbox after a publish (gauge)
+    stream.viewer.count         connected viewers (gauge)
+    stream.viewer.disconnected  viewers removed after a failed/slow send
+"""
+
+import asyncio
+import json
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Callable, Deque, Dict, List, Optional, Union
+
+from fastapi import WebSocket
+
+from ..metrics import statsd
+
+logger = logging.getLogger(__name__)
+
+# Close code sent to a viewer that stopped draining its outbox
+SLOW_VIEWER_CLOSE_CODE = 1013
+
+
+@dataclass
+class _OutboxItem:
+    text: str
+    enqueued_at: float
+    coalesce_key: Optional[str] = None
+    droppable: bool = True
+
+
+class ViewerOutbox:
+    """Bounded send queue and sender task for one viewer socket."""
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        max_pending: int = 8,
+        send_timeout: float = 5.0,
+        tags: Optional[List[str]] = None,
+        on_close: Optional[Callable[[WebSocket], None]] = None,
+    ):
+        self.websocket = websocket
+        self.max_pending = max(1, max_pending)
+        self.send_timeout = send_timeout
+        self.tags = tags or []
+        self._on_close = on_close
+        self._items: Deque[_OutboxItem] = deque()
+        self._ready = asyncio.Event()
+        # Set when nothing is queued or being sent; drain() waits on it
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._closed = False
+
+        self.sent = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.last_lag_ms = 0.0
+        self.max_lag_ms = 0.0
+
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    @property
+    def pending(self) -> int:
+        return len(self._items)
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    def offer(
+        self, text: str, coalesce_key: Optional[str] = None, droppable: bool = True
+    ) -> bool:
+        """Queue a message without blocking. Returns False if it was dropped."""
+        if self._closed:
+            return False
+        now = time.perf_counter()
+
+        if coalesce_key is not None:
+            for item in self._items:
+                if item.coalesce_key == coalesce_key:
+                    # Keep the original enqueue time so lag shows how stale
+                    # this viewer's view has become
+                    item.text = text
+                    self.coalesced += 1
+                    statsd.increment("stream.viewer.dropped", tags=self.tags + ["reason:coalesce"])
+                    return True
+
+        if len(self._items) >= self.max_pending:
+            victim = next((item for item in self._items if item.droppable), None)
+            if victim is None and not droppable:
+                # Only must-deliver messages queued: let this one overflow
+                pass
+            else:
+                self.dropped += 1
+                statsd.increment("stream.viewer.dropped", tags=self.tags + ["reason:drop"])
+                if victim is None:
+                    return False
+                self._items.remove(victim)
+
+        self._items.append(_OutboxItem(text, now, coalesce_key, droppable))
+        self._idle.clear()
+        self._ready.set()
+        return True
+
+    async def _run(self):
+        try:
+            while not self._closed:
+                if not self._items:
+                    # Only idle once the last popped item has been sent
+                    self._idle.set()
+                    self._ready.clear()
+                    await self._ready.wait()
+                    continue
+                item = self._items.popleft()
+                await asyncio.wait_for(
+                    self.websocket.send_text(item.text), timeout=self.send_timeout
+                )
+                lag_ms = (time.perf_counter() - item.enqueued_at) * 1000
+                self.sent += 1
+                self.last_lag_ms = lag_ms
+                self.max_lag_ms = max(self.max_lag_ms, lag_ms)
+                statsd.histogram("stream.viewer.lag_ms", lag_ms, tags=self.tags)
+        except asyncio.CancelledError:
+            return
+        except Exception as e:
+            reason = "timeout" if isinstance(e, asyncio.TimeoutError) else "error"
+            logger.warning(f"Viewer send failed ({reason}): {e!r}")
+            statsd.increment("stream.viewer.disconnected", tags=self.tags + [f"reason:{reason}"])
+            self._closed = True
+            self._items.clear()
+            self._idle.set()
+            if reason == "timeout":
+                try:
+                    await self.websocket.close(
+                        code=SLOW_VIEWER_CLOSE_CODE, reason="Viewer too slow"
+                    )
+                except Exception:
+                    pass
+            if self._on_close is not None:
+                self._on_close(self.websocket)
+
+    async def drain(self, timeout: float):
+        """Wait until everything queued so far, including a send in flight, is sent (or timeout)."""
+        if self._closed:
+            return
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    def close(self):
+        self._closed = True
+        self._items.clear()
+        self._idle.set()
+        self._task.cancel()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "pending": self.pending,
+            "sent": self.sent,
+            "dropped": self.dropped,
+            "coalesced": self.coalesced,
+            "lag_ms": round(self.last_lag_ms, 1),
+            "max_lag_ms": round(self.max_lag_ms, 1),
+        }
+
+
+class ViewerFanout:
+    """All viewers of one session, each behind its own outbox."""
+
+    def __init__(
+        self,
+        session_id: int,
+        feature: str = "badminton",
+        max_pending: int = 8,
+        send_timeout: float = 5.0,
+    ):
+        self.session_id = session_id
+        self.max_pending = max_pending
+        self.send_timeout = send_timeout
+        self.tags = [f"feature:{feature}"]
+        self._outboxes: Dict[WebSocket, ViewerOutbox] = {}
+
+    def __len__(self) -> int:
+        return len(self._outboxes)
+
+    def __contains__(self, websocket: WebSocket) -> bool:
+        return websocket in self._outboxes
+
+    @property
+    def viewers(self) -> List[WebSocket]:
+        return list(self._outboxes)
+
+    def add(self, websocket: WebSocket):
+        if websocket not in self._outboxes:
+            self._outboxes[websocket] = ViewerOutbox(
+                websocket, self.max_pending, self.send_timeout,
+                tags=self.tags, on_close=self.remove,
+            )
+        statsd.gauge("stream.viewer.count", len(self._outboxes), tags=self.tags)
+
+    def remove(self, websocket: WebSocket):
+        outbox = self._outboxes.pop(websocket, None)
+        if outbox is not None:
+            outbox.close()
+            statsd.gauge("stream.viewer.count", len(self._outboxes), tags=self.tags)
+
+    def publish(
+        self,
+        message: Union[dict, str],
+        coalesce_key: Optional[str] = None,
+        droppable: bool = True,
+    ) -> int:
+        """Encode ``message`` once and queue it for every viewer.
+
+        Returns the number of viewers it was queued for.
+        """
+        if not self._outboxes:
+            return 0
+        text = message if isinstance(message, str) else json.dumps(message)
+        return self.publish_encoded(
+            {ws: text for ws in self._outboxes}, coalesce_key, droppable
+        )
+
+    def publish_encoded(
+        self,
+        texts: Dict[WebSocket, str],
+        coalesce_key: Optional[str] = None,
+        droppable: bool = True,
+    ) -> int:
+        """Queue already-encoded, possibly per-viewer texts (e.g. result deltas)."""
+        queued = 0
+        depth = 0
+        for ws, text in texts.items():
+            outbox = self._outboxes.get(ws)
+            if outbox is None:
+                continue
+            if outbox.offer(text, coalesce_key, droppable):
+                queued += 1
+            depth = max(depth, outbox.pending)
+        statsd.gauge("stream.viewer.queue_depth", depth, tags=self.tags)
+        return queued
+
+    async def drain(self, timeout: float = 2.0):
+        """Give queued messages (e.g. the final report) a chance to go out."""
+        await asyncio.gather(
+            *(outbox.drain(timeout) for outbox in list(self._outboxes.values()))
+        )
+
+    def close(self):
+        for outbox in self._outboxes.values():
+            outbox.close()
+        self._outboxes.clear()
+        statsd.gauge("stream.viewer.count", 0, tags=self.tags)
+
+    def stats(self) -> Dict[str, Any]:
+        per_viewer = [outbox.stats() for outbox in self._outboxes.values()]
+        return {
+            "viewers": len(per_viewer),
+            "max_pending": max((v["pending"] for v in per_viewer), default=0),
+            "max_lag_ms": max((v["lag_ms"] for v in per_viewer), default=0.0),
+            "dropped": sum(v["dropped"] for v in per_viewer),
+            "coalesced": sum(v["coalesced"] for v in per_viewer),
+        }
@@ -0,0 +1,178 @@
+"""
+Per-frame latency tracing for live sessions.
+
+Each received frame gets a ``FrameTrace``: a flat record of how many
+milliseconds the frame spent in each stage on its way through the
+server. The WebSocket handlers time the stages they own (decode, queue,
+inference-pool wait, send) and run the analyzer under ``run_traced`` so
+analyzers can time their own stages with ``stage(...)``, without any
+change to their ``process_frame`` signatures:
+
+    with stage("pose"):
+        result = self.detector.detect(frame)
+
+``stage`` is a no-op when no trace is active (offline analysis, tests).
+
+Stages:
+    network      client ``sent_at`` (epoch s) -> server receive; only when
+                 the client stamps frames, and only meaningful when both
+                 clocks agree (e.g. the replay tool on the same host)
+    decode       base64/JSON or binary_v1 parse
+    queue        waiting in the handler's ingest queue
+    pool_wait    waiting for the session's inference worker
+    jpeg_decode  ``cv2.imdecode``
+    pose         pose detection
+    shuttle      shuttle tracking (badminton)
+    classify     shot classification / rep counting / similarity
+    send         result serialization + WebSocket send (metrics only)
+
+Every stage is exported as ``live.stage_ms`` tagged ``stage:`` and
+``feature:``, plus ``live.server_ms`` (receive -> result sent). Clients
+that send ``"trace": true`` in their ``hello`` also get a ``timing``
+field on every result:
+
+    "timing": {"seq": 41, "server_ms": 23.4,
+               "stages_ms": {"decode": 0.1, "pose": 17.9, ...}}
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional
+
+from .metrics import statsd
+
+STAGES = (
+    "network", "decode", "queue", "pool_wait",
+    "jpeg_decode", "pose", "shuttle", "classify", "send",
+)
+
+_local = threading.local()
+
+
+class FrameTrace:
+    """Stage timings for one live frame."""
+
+    __slots__ = ("feature", "seq", "received_at", "stages", "_wait_started")
+
+    def __init__(
+        self,
+        feature: str,
+        received_at: Optional[float] = None,
+        seq: int = 0,
+    ):
+        self.feature = feature
+        self.seq = seq
+        self.received_at = time.perf_counter() if received_at is None else received_at
+        self.stages: Dict[str, float] = {}
+        self._wait_started: Optional[float] = None
+
+    @classmethod
+    def for_frame(cls, feature: str, frame, received_at: float, received_wall: float) -> "FrameTrace":
+        """Trace for a just-parsed ``FrameMessage``; parse time counts as ``decode``."""
+        trace = cls(feature, received_at, getattr(frame, "seq", 0))
+        trace.add("decode", (time.perf_counter() - received_at) * 1000)
+        trace.set_network(getattr(frame, "sent_at", None), received_wall)
+        return trace
+
+    def add(self, name: str, ms: float):
+        self.stages[name] = self.stages.get(name, 0.0) + ms
+
+    @contextmanager
+    def span(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield self
+        finally:
+            self.add(name, (time.perf_counter() - start) * 1000)
+
+    def set_network(self, client_sent_at: Optional[float], received_wall: float):
+        """Record network transit from a client ``sent_at`` epoch timestamp."""
+        if client_sent_at:
+            self.add("network", max(0.0, (received_wall - float(client_sent_at)) * 1000))
+
+    def begin_wait(self):
+        """Mark a hand-off (to a queue or the inference pool)."""
+        self._wait_started = time.perf_counter()
+
+    def end_wait(self, name: str):
+        """Record the time since ``begin_wait`` as stage ``name``."""
+        if self._wait_started is not None:
+            self.add(name, (time.perf_counter() - self._wait_started) * 1000)
+            self._wait_started = None
+
+    def server_ms(self) -> float:
+        return (time.perf_counter() - self.received_at) * 1000
+
+    def timing(self) -> Dict[str, Any]:
+        """The ``timing`` field attached to results."""
+        return {
+            "seq": self.seq,
+            "server_ms": round(self.server_ms(), 2),
+            "stages_ms": {k: round(v, 2) for k, v in self.stages.items()},
+        }
+
+    def emit(self, tags: Optional[List[str]] = None):
+        """Export every stage and the total as histograms."""
+        base = (tags or []) + [f"feature:{self.feature}"]
+        for name, ms in self.stages.items():
+            statsd.histogram("live.stage_ms", ms, tags=base + [f"stage:{name}"])
+        statsd.histogram("live.server_ms", self.server_ms(), tags=base)
+
+
+def current_trace() -> Optional[FrameTrace]:
+    return getattr(_local, "trace", None)
+
+
+@contextmanager
+def stage(name: str):
+    """Time a block into the frame trace active on this thread, if any."""
+    trace = getattr(_local, "trace", None)
+    if trace is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        trace.add(name, (time.perf_counter() - start) * 1000)
+
+
+def run_traced(trace: Optional[FrameTrace], fn: Callable[..., Any], *args) -> Any:
+    """Call ``fn(*args)`` with ``trace`` active on this thread.
+
+    Meant to be the callable handed to ``InferencePool.run`` so the
+    worker thread records ``pool_wait`` and the analyzer's own stages.
+    """
+    if trace is None:
+        return fn(*args)
+    trace.end_wait("pool_wait")
+    previous = getattr(_local, "trace", None)
+    _local.trace = trace
+    try:
+        return fn(*args)
+    finally:
+        _local.trace = previous
+
+
+async def send_traced(
+    websocket,
+    result: dict,
+    trace: Optional[FrameTrace],
+    include_timing: bool = False,
+    tags: Optional[List[str]] = None,
+):
+    """Send a result dict, timing the send and exporting the trace."""
+    if trace is None:
+        await websocket.send_json(result)
+        return
+    if include_timing:
+        result = {**result, "timing": trace.timing()}
+    with trace.span("send"):
+        await websocket.send_json(result)
+    trace.emit(tags)
+
+
+def wants_trace(hello: dict) -> bool:
+    """Whether a client ``hello`` asked for per-result ``timing`` fields."""
+    return bool(hello.get("trace"))
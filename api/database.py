@@ -43,10 +43,13 @@ def init_db():
     _migrate_user_google_auth()
     _migrate_user_profile()
     _migrate_challenge_form_summary()
+    _migrate_challenge_session_pose_timeline()
+    _migrate_challenge_daily_bests()
     _migrate_squat_variants()
     _migrate_feature_access_catalog()
     _migrate_user_signup_code()
     _migrate_mimic_session_screenshots()
+    _migrate_mimic_challenge_pose_timeline()
     _migrate_mimic_session_uploaded_video()
     _migrate_mimic_session_audio_fields()
     _migrate_fix_non_ascii_s3_keys()
@@ -149,6 +152,72 @@ def _migrate_challenge_session_screenshots():
         logger.debug(f"challenge_sessions screenshot migration skipped: {e}")
 
 
+def _migrate_challenge_session_pose_timeline():
+    """Add pose timeline pointer columns to challenge_sessions if missing."""
+    import logging
+    logger = logging.getLogger(__name__)
+
+    new_columns = {
+        "pose_timeline_key": "VARCHAR(512)",
+        "pose_frame_count": "INTEGER DEFAULT 0",
+    }
+
+    from sqlalchemy import text, inspect
+    try:
+        inspector = inspect(engine)
+        existing = {c["name"] for c in inspector.get_columns("challenge_sessions")}
+        with engine.begin() as conn:
+            for col_name, col_type in new_columns.items():
+                if col_name not in existing:
+                    conn.execute(text(
+                        f"ALTER TABLE challenge_sessions ADD COLUMN {col_name} {col_type}"
+                    ))
+                    logger.info(f"Added column challenge_sessions.{col_name}")
+    except Exception as e:
+        logger.debug(f"challenge_sessions pose timeline migration skipped: {e}")
+
+
+def _migrate_challenge_daily_bests():
+    """Backfill challenge_daily_bests from ended sessions when the table is new."""
+    import logging
+    from datetime import date
+    logger = logging.getLogger(__name__)
+
+    from sqlalchemy import func
+    from .features.challenges.db_models.challenge import ChallengeSession, ChallengeStatus, ChallengeDailyBest
+
+    db = SessionLocal()
+    try:
+        if db.query(ChallengeDailyBest.id).first() is not None:
+            return
+        day = func.date(ChallengeSession.created_at)
+        rows = (
+            db.query(day, ChallengeSession.challenge_type, ChallengeSession.user_id,
+                     func.max(ChallengeSession.score))
+            .filter(
+                ChallengeSession.status == ChallengeStatus.ENDED,
+                ChallengeSession.score > 0,
+            )
+            .group_by(day, ChallengeSession.challenge_type, ChallengeSession.user_id)
+            .all()
+        )
+        for d, challenge_type, user_id, best in rows:
+            db.add(ChallengeDailyBest(
+                day=date.fromisoformat(d) if isinstance(d, str) else d,
+                challenge_type=challenge_type,
+                user_id=user_id,
+                best_score=best,
+            ))
+        db.commit()
+        if rows:
+            logger.info(f"Backfilled {len(rows)} challenge_daily_bests rows")
+    except Exception as e:
+        db.rollback()
+        logger.error(f"challenge_daily_bests backfill failed: {e}")
+    finally:
+        db.close()
+
+
 def _migrate_user_lockout():
     """Add lockout columns to users table if missing."""
     import logging
@@ -443,6 +512,31 @@ def _migrate_mimic_session_screenshots():
         logger.debug(f"mimic_sessions screenshot migration skipped: {e}")
 
 
+def _migrate_mimic_challenge_pose_timeline():
+    """Add compact pose timeline columns to mimic_challenges if missing."""
+    import logging
+    logger = logging.getLogger(__name__)
+
+    new_columns = {
+        "pose_timeline_key": "VARCHAR(512)",
+        "pose_timeline_version": "INTEGER DEFAULT 0",
+    }
+
+    from sqlalchemy import text, inspect
+    try:
+        inspector = inspect(engine)
+        existing = {c["name"] for c in inspector.get_columns("mimic_challenges")}
+        with engine.begin() as conn:
+            for col_name, col_type in new_columns.items():
+                if col_name not in existing:
+                    conn.execute(text(
+                        f"ALTER TABLE mimic_challenges ADD COLUMN {col_name} {col_type}"
+                    ))
+                    logger.info(f"Added column mimic_challenges.{col_name}")
+    except Exception as e:
+        logger.debug(f"mimic_challenges pose timeline migration skipped: {e}")
+
+
 def _migrate_mimic_session_uploaded_video():
     """Add uploaded_video_path column to mimic_sessions if missing."""
     import logging
@@ -3,7 +3,9 @@
 import enum
 from datetime import datetime
 
-from sqlalchemy import Boolean, Column, Integer, String, Float, Enum, DateTime, ForeignKey, JSON
+from sqlalchemy import (
+    Boolean, Column, Integer, String, Float, Enum, Date, DateTime, ForeignKey, JSON, Index, UniqueConstraint,
+)
 from sqlalchemy.orm import relationship
 
 from ....database import Base
@@ -31,6 +33,8 @@ class ChallengeSession(Base):
     is_recording = Column(Boolean, default=False)
     screenshots_s3_prefix = Column(String(512), nullable=True)
     screenshot_count = Column(Integer, default=0)
+    pose_timeline_key = Column(String(512), nullable=True)  # storage key of the chunked timeline
+    pose_frame_count = Column(Integer, default=0)
     created_at = Column(DateTime, default=datetime.utcnow)
     ended_at = Column(DateTime, nullable=True)
 
@@ -46,6 +50,26 @@ class ChallengeRecord(Base):
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
 
+class ChallengeDailyBest(Base):
+    """Best score per user per challenge type per day (backs the leaderboards).
+
+    Maintained on session end; ``day`` is the date the session was created.
+    Only positive scores are stored.
+    """
+    __tablename__ = "challenge_daily_bests"
+    __table_args__ = (
+        UniqueConstraint("day", "challenge_type", "user_id", name="uq_daily_best_user"),
+        Index("ix_daily_best_board", "challenge_type", "day", "best_score"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    day = Column(Date, nullable=False)
+    challenge_type = Column(String(32), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    best_score = Column(Integer, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
 class ChallengeConfig(Base):
     """Admin-configurable angle thresholds per challenge type."""
     __tablename__ = "challenge_configs"
@@ -1,21 +1,19 @@
 """Challenges REST endpoints — create, list, end, and recording."""
 
-import cv2
-import numpy as np
 import logging
-import shutil
-import subprocess
 from datetime import datetime, date, timedelta
+from functools import partial
 from pathlib import Path
-from typing import List, Optional
+from typing import Optional
 
+import anyio.from_thread
 from fastapi import APIRouter, Depends, HTTPException, Query, status
 from fastapi.responses import FileResponse, JSONResponse, Response
 from sqlalchemy import func as sa_func
 from sqlalchemy.orm import Session, defer
 
 from ....config import get_settings
-from ....database import get_db
+from ....database import SessionLocal, get_db
 from ....db_models.user import User
 from ....routers.auth import get_current_user
 from ....services.storage_service import get_storage_service
@@ -24,12 +22,17 @@ from ..models.challenge import (
     ChallengeCreate, ChallengeResponse, ChallengeSessionStart,
     ChallengeConfigResponse, ChallengeConfigUpdate, AdminSessionResponse,
 )
+from ....core.streaming.pose_timeline import PoseTimelineFile, PoseTimelineReader
+from ....core.streaming.recording import RecordingResult
+from ..services.leaderboard import get_leaderboard_cache, record_session_result, session_day
 from ..services.rep_counter import CHALLENGE_DEFAULTS
 from ..services.plank_analyzer import PlankAnalyzer
 from ..services.squat_analyzer import SquatAnalyzer
 from ..services.squat_hold_analyzer import SquatHoldAnalyzer
 from ..services.pushup_analyzer import PushupAnalyzer
 from ..services.arm_curl_analyzer import ArmRepAnalyzer
+from ....core.streaming.inference_pool import SessionNotAdmitted, get_inference_pool
+from ....core.streaming.pose_pool import PoseDetectorPoolExhausted
 from ....core.streaming.session_manager import get_generic_session_manager
 
 logger = logging.getLogger(__name__)
@@ -99,83 +102,23 @@ def _build_response(session: ChallengeSession, personal_best=None, daily_rank=No
 
 
 def _compute_daily_rank(db: Session, user_id: int, challenge_type: str) -> Optional[int]:
-    """Compute the user's rank on today's leaderboard for a challenge type."""
-    day_start = datetime.combine(date.today(), datetime.min.time())
-    rows = (
-        db.query(
-            ChallengeSession.user_id,
-            sa_func.max(ChallengeSession.score).label("best_score"),
-        )
-        .filter(
-            ChallengeSession.status == ChallengeStatus.ENDED,
-            ChallengeSession.challenge_type == challenge_type,
-            ChallengeSession.created_at >= day_start,
-            ChallengeSession.score > 0,
-        )
-        .group_by(ChallengeSession.user_id)
-        .order_by(sa_func.max(ChallengeSession.score).desc())
-        .all()
-    )
-    for idx, row in enumerate(rows, start=1):
-        if row.user_id == user_id:
-            return idx
-    return None
+    """The user's rank on today's leaderboard for a challenge type."""
+    return get_leaderboard_cache().rank(db, "daily", challenge_type, user_id)
 
 
-def _save_recording(frames: list, session: ChallengeSession, user_id: int):
-    """Encode recorded frames to H.264 MP4 and persist to S3 or local storage."""
-    if not frames:
+def _save_recording(recording: Optional[RecordingResult], session: ChallengeSession, user_id: int):
+    """Persist a finished recording (already encoded while streaming) to S3 or local storage."""
+    if recording is None:
         return
 
     settings = get_settings()
     storage = get_storage_service()
 
     output_dir = settings.output_path / str(user_id) / f"challenge_{session.id}"
-    output_dir.mkdir(parents=True, exist_ok=True)
-    raw_path = str(output_dir / "recording_raw.mp4")
     video_path = str(output_dir / "recording.mp4")
 
     try:
-        first_frame = cv2.imdecode(np.frombuffer(frames[0], np.uint8), cv2.IMREAD_COLOR)
-        height, width = first_frame.shape[:2]
-
-        fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-        fps = 10
-        out = cv2.VideoWriter(raw_path, fourcc, fps, (width, height))
-
-        for frame_data in frames:
-            frame = cv2.imdecode(np.frombuffer(frame_data, np.uint8), cv2.IMREAD_COLOR)
-            if frame is not None:
-                out.write(frame)
-        out.release()
-
-        # Re-encode to H.264 with faststart for browser/mobile playback
-        if shutil.which("ffmpeg"):
-            result = subprocess.run(
-                [
-                    "ffmpeg", "-y", "-i", raw_path,
-                    "-c:v", "libx264", "-preset", "fast", "-crf", "28",
-                    "-movflags", "+faststart",
-                    "-pix_fmt", "yuv420p",
-                    video_path,
-                ],
-                capture_output=True, timeout=120,
-            )
-            Path(raw_path).unlink(missing_ok=True)
-            if result.returncode != 0:
-                logger.warning(f"ffmpeg re-encode failed: {result.stderr[:500]}")
-                # Fallback: use the raw mp4v file
-                Path(raw_path).touch()  # may already be deleted
-                if not Path(video_path).exists():
-                    video_path = raw_path
-        else:
-            # No ffmpeg available — use raw mp4v file directly
-            logger.warning("ffmpeg not found, saving raw mp4v recording")
-            Path(raw_path).rename(video_path)
-
-        if not Path(video_path).exists():
-            logger.error("Recording file not produced")
-            return
+        recording.move_to(video_path)
 
         if storage.is_s3():
             try:
@@ -191,23 +134,104 @@ def _save_recording(frames: list, session: ChallengeSession, user_id: int):
             session.recording_local_path = video_path
 
     except Exception as e:
-        logger.error(f"Failed to create challenge recording: {e}")
-        # Clean up partial files
-        Path(raw_path).unlink(missing_ok=True)
+        logger.error(f"Failed to save challenge recording: {e}")
+        recording.discard()
+
+
+def _screenshot_prefix(user_id: int, session_id: int) -> str:
+    return f"challenges/{user_id}/challenge_{session_id}/screenshots/"
 
 
-def _save_screenshots(screenshots: List[bytes], session: ChallengeSession, user_id: int):
-    """Save per-second annotated screenshots to S3."""
-    if not screenshots:
+def _save_screenshots(screenshot_count: int, session: ChallengeSession, user_id: int):
+    """Point the session at its per-second screenshots.
+
+    The analyzer's screenshot stream uploads them while the session runs;
+    only the last batch may still be in flight. ``screenshot_count`` is
+    what the stream accepted; ``_watch_screenshots`` corrects it if some
+    fail to render or upload.
+    """
+    if not screenshot_count:
+        return
+    session.screenshots_s3_prefix = _screenshot_prefix(user_id, session.id)
+    session.screenshot_count = screenshot_count
+    logger.info(f"Session {session.id}: {screenshot_count} screenshots")
+
+
+def _watch_screenshots(analyzer, screenshot_count: int, session_id: int):
+    """Correct the session's screenshot count once the uploads finish.
+
+    Call after committing the session, so the correction lands last.
+    """
+    if analyzer and screenshot_count:
+        analyzer.on_screenshots_uploaded(
+            partial(_correct_screenshot_count, session_id, screenshot_count))
+
+
+def _correct_screenshot_count(session_id: int, accepted: int, stored: int):
+    """Runs on a screenshot worker; stored screenshots have no gaps."""
+    if stored == accepted:
+        return
+    db = SessionLocal()
+    try:
+        db.query(ChallengeSession).filter(ChallengeSession.id == session_id).update(
+            {"screenshot_count": stored}, synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
+    logger.warning(f"Session {session_id}: {stored} of {accepted} screenshots stored")
+
+
+def _finish_pose_timeline(session_id: int, analyzer) -> Optional[PoseTimelineFile]:
+    """Finish the analyzer's pose timeline from a sync endpoint.
+
+    With the WebSocket still open the inference worker may be appending
+    frames, so the finish runs on that worker, after the frames queued
+    there. Once the socket has released its slot nothing else touches
+    the analyzer and it runs here.
+    """
+    pool = get_inference_pool("challenge")
+    try:
+        return anyio.from_thread.run(pool.run, session_id, analyzer.finish_pose_timeline)
+    except SessionNotAdmitted:
+        return analyzer.finish_pose_timeline()
+
+
+def _save_pose_timeline(timeline: Optional[PoseTimelineFile], session: ChallengeSession, user_id: int):
+    """Upload the chunked pose timeline; the row keeps only its key and frame count."""
+    if timeline is None:
         return
     storage = get_storage_service()
-    prefix = f"challenges/{user_id}/challenge_{session.id}/screenshots/"
-    for i, jpg_bytes in enumerate(screenshots):
-        key = f"{prefix}{i:04d}.jpg"
-        storage.outputs.save(key, jpg_bytes, content_type="image/jpeg")
-    session.screenshots_s3_prefix = prefix
-    session.screenshot_count = len(screenshots)
-    logger.info(f"Saved {len(screenshots)} screenshots for session {session.id}")
+    key = f"challenges/{user_id}/challenge_{session.id}/pose_timeline.ptl"
+    try:
+        with open(timeline.path, 'rb') as f:
+            storage.outputs.save(key, f, content_type='application/octet-stream')
+        session.pose_timeline_key = key
+        session.pose_frame_count = timeline.frame_count
+        logger.info(f"Saved pose timeline for session {session.id}: "
+                    f"{timeline.frame_count} frames, {timeline.size_bytes} bytes")
+    except Exception as e:
+        logger.error(f"Failed to save pose timeline for session {session.id}: {e}")
+    finally:
+        timeline.discard()
+
+
+def _read_pose_timeline(session: ChallengeSession, start: int = 0, stop: Optional[int] = None):
+    """``(frame_count, frames[start:stop])`` for a session, or ``(0, [])``.
+
+    Sessions ended before timelines moved to storage still carry the whole
+    list in ``extra_data["frame_timeline"]``.
+    """
+    if session.pose_timeline_key:
+        try:
+            reader = PoseTimelineReader.from_storage(
+                get_storage_service().outputs, session.pose_timeline_key,
+            )
+            return reader.frame_count, reader.read(start, stop)
+        except Exception as e:
+            logger.error(f"Failed to read pose timeline for session {session.id}: {e}")
+            raise HTTPException(status_code=500, detail="Failed to read pose data")
+    timeline = (session.extra_data or {}).get("frame_timeline") or []
+    return len(timeline), timeline[start:stop]
 
 
 @router.get("/enabled")
@@ -288,11 +312,18 @@ def create_challenge_session(
         ChallengeConfig.challenge_type == body.challenge_type
     ).first()
     config_val = config_row.thresholds if config_row else None
-    # SquatAnalyzer needs challenge_type to pick the right defaults
-    if analyzer_cls is SquatAnalyzer:
-        analyzer = analyzer_cls(challenge_type=body.challenge_type, config=config_val)
-    else:
-        analyzer = analyzer_cls(config=config_val)
+    try:
+        # SquatAnalyzer needs challenge_type to pick the right defaults
+        if analyzer_cls is SquatAnalyzer:
+            analyzer = analyzer_cls(challenge_type=body.challenge_type, config=config_val)
+        else:
+            analyzer = analyzer_cls(config=config_val)
+    except PoseDetectorPoolExhausted as e:
+        logger.warning(f"Challenge session {session.id}: {e}")
+        db.delete(session)
+        db.commit()
+        raise HTTPException(status_code=503, detail="Server busy — try again shortly")
+    analyzer.start_screenshots(_screenshot_prefix(user.id, session.id))
     gsm = get_generic_session_manager()
     gsm.register_session(session.id, f"challenge_{body.challenge_type}", analyzer)
 
@@ -329,21 +360,24 @@ def end_challenge_session(
     gsm = get_generic_session_manager()
     analyzer = gsm.get_session(session_id)
 
-    # Grab screenshots before ending session (end_session pops the analyzer)
-    screenshots = []
+    # Finish screenshots and pose timeline before ending session (end_session pops the analyzer)
+    screenshot_count = 0
+    pose_timeline = None
     if analyzer:
-        screenshots = analyzer.get_screenshots()
+        screenshot_count = analyzer.finish_screenshots()
+        pose_timeline = _finish_pose_timeline(session_id, analyzer)
 
     # Auto-save recording if still active
     if analyzer and getattr(analyzer, 'is_recording', False):
-        frames = analyzer.stop_recording()
-        _save_recording(frames, session, user.id)
+        recording = analyzer.stop_recording()
+        _save_recording(recording, session, user.id)
         session.is_recording = False
 
     report = gsm.end_session(session_id) or {}
 
-    # Save per-second screenshots
-    _save_screenshots(screenshots, session, user.id)
+    # Per-second screenshots (uploaded in the background during the session)
+    _save_screenshots(screenshot_count, session, user.id)
+    _save_pose_timeline(pose_timeline, session, user.id)
 
     session.status = ChallengeStatus.ENDED
     session.ended_at = datetime.utcnow()
@@ -352,28 +386,13 @@ def end_challenge_session(
     session.extra_data = report
     session.form_summary = report.get("form_summary")
 
-    # Update personal best
-    record = db.query(ChallengeRecord).filter(
-        ChallengeRecord.user_id == user.id,
-        ChallengeRecord.challenge_type == session.challenge_type,
-    ).first()
-
-    personal_best = None
-    if record:
-        if session.score > record.best_score:
-            record.best_score = session.score
-        personal_best = record.best_score
-    else:
-        record = ChallengeRecord(
-            user_id=user.id,
-            challenge_type=session.challenge_type,
-            best_score=session.score,
-        )
-        db.add(record)
-        personal_best = session.score
+    # Update personal best and today's leaderboard
+    personal_best = record_session_result(db, session)
 
     db.commit()
+    _watch_screenshots(analyzer, screenshot_count, session.id)
     db.refresh(session)
+    get_leaderboard_cache().submit(session_day(session), session.challenge_type, user.id, session.score)
 
     daily_rank = _compute_daily_rank(db, user.id, session.challenge_type)
     return _build_response(session, personal_best, daily_rank=daily_rank)
@@ -430,17 +449,17 @@ def stop_recording(
             return {"recording": False, "message": "Recording already saved", "has_video": True}
         raise HTTPException(status_code=400, detail="Session not active")
 
-    frames = analyzer.stop_recording()
+    recording = analyzer.stop_recording()
     session.is_recording = False
 
-    _save_recording(frames, session, user.id)
+    _save_recording(recording, session, user.id)
 
     db.commit()
 
     return {
         "recording": False,
         "message": "Recording stopped and saved" if _has_recording(session) else "Recording stopped",
-        "frame_count": len(frames),
+        "frame_count": recording.frame_count if recording else 0,
         "has_video": _has_recording(session),
     }
 
@@ -644,62 +663,40 @@ def get_leaderboard(
     if challenge_type not in VALID_TYPES:
         raise HTTPException(status_code=400, detail=f"Invalid challenge type. Must be one of: {VALID_TYPES}")
 
-    today = date.today()
-    monday = today - timedelta(days=today.weekday())
-    day_start = datetime.combine(today, datetime.min.time())
-    week_start = datetime.combine(monday, datetime.min.time())
+    leaderboards = get_leaderboard_cache()
 
-    def _build_board(since: datetime):
+    def _build_board(period: str):
         """Build leaderboard entries and user rank for a time period."""
-        # Subquery: best score per user in the period
-        rows = (
-            db.query(
-                ChallengeSession.user_id,
-                sa_func.max(ChallengeSession.score).label("best_score"),
-            )
-            .filter(
-                ChallengeSession.status == ChallengeStatus.ENDED,
-                ChallengeSession.challenge_type == challenge_type,
-                ChallengeSession.created_at >= since,
-                ChallengeSession.score > 0,
-            )
-            .group_by(ChallengeSession.user_id)
-            .order_by(sa_func.max(ChallengeSession.score).desc())
-            .all()
-        )
+        board = leaderboards.board(db, period, challenge_type)
+        user_rank = leaderboards.rank(db, period, challenge_type, user.id)
 
-        # Build ranked list
-        ranked = []
-        user_rank = None
-        for idx, row in enumerate(rows, start=1):
-            u = db.query(User).filter(User.id == row.user_id).first()
+        # Top 3, plus the user's own entry if they're outside it
+        rows = [(idx, uid, score) for idx, (uid, score) in
+                enumerate(leaderboards.top(db, period, challenge_type, 3), start=1)]
+        if user_rank and user_rank > 3:
+            rows.append((user_rank, user.id, board.score(user.id)))
+
+        users = {u.id: u for u in db.query(User).filter(User.id.in_([uid for _, uid, _ in rows]))}
+        entries = []
+        for idx, uid, score in rows:
+            u = users.get(uid)
             if not u:
                 continue
             is_self = u.id == user.id
-            ranked.append({
+            entries.append({
                 "rank": idx,
                 "username": u.username if is_self else _anonymize_username(u.username),
                 "email": u.email if is_self else _anonymize_email(u.email),
-                "score": int(row.best_score),
+                "score": int(score),
                 "is_self": is_self,
             })
-            if is_self:
-                user_rank = idx
-
-        # Return top 3 entries
-        top = ranked[:3]
-
-        # If user is outside top 3, append their entry
-        if user_rank and user_rank > 3:
-            user_entry = next(e for e in ranked if e["is_self"])
-            top.append(user_entry)
 
-        return {"entries": top, "user_rank": user_rank}
+        return {"entries": entries, "user_rank": user_rank}
 
     return {
         "challenge_type": challenge_type,
-        "daily": _build_board(day_start),
-        "weekly": _build_board(week_start),
+        "daily": _build_board("daily"),
+        "weekly": _build_board("weekly"),
     }
 
 
@@ -731,7 +728,6 @@ def admin_list_sessions(
 
     sessions = []
     for session, username, email in rows:
-        extra = session.extra_data or {}
         sessions.append(AdminSessionResponse(
             id=session.id,
             user_id=session.user_id,
@@ -741,7 +737,7 @@ def admin_list_sessions(
             status=session.status.value,
             score=session.score,
             duration_seconds=session.duration_seconds,
-            has_pose_data=bool(extra.get("frame_timeline")),
+            has_pose_data=bool(session.pose_timeline_key),
             has_recording=_has_recording(session),
             has_screenshots=bool(session.screenshots_s3_prefix),
             screenshot_count=session.screenshot_count or 0,
@@ -754,19 +750,25 @@ def admin_list_sessions(
 @router.get("/admin/sessions/{session_id}/pose-data")
 def admin_get_pose_data(
     session_id: int,
+    start: int = Query(0, ge=0),
+    limit: Optional[int] = Query(None, ge=1),
     db: Session = Depends(get_db),
     admin=Depends(require_admin),
 ):
-    """Download per-frame pose data for a session (admin only)."""
+    """Download per-frame pose data for a session (admin only).
+
+    ``start``/``limit`` select a range of frames for playback; only the
+    chunks covering that range are read from storage.
+    """
     session = db.query(ChallengeSession).filter(
         ChallengeSession.id == session_id
     ).first()
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
 
-    extra = session.extra_data or {}
-    timeline = extra.get("frame_timeline")
-    if not timeline:
+    stop = start + limit if limit is not None else None
+    frame_count, timeline = _read_pose_timeline(session, start, stop)
+    if not frame_count:
         raise HTTPException(status_code=404, detail="No pose data available for this session")
 
     return JSONResponse(content={
@@ -774,7 +776,8 @@ def admin_get_pose_data(
         "challenge_type": session.challenge_type,
         "score": session.score,
         "duration_seconds": session.duration_seconds,
-        "frame_count": len(timeline),
+        "frame_count": frame_count,
+        "start": start,
         "frame_timeline": timeline,
     })
 
@@ -795,8 +798,7 @@ def admin_get_refined_pose_data(
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
 
-    extra = session.extra_data or {}
-    timeline = extra.get("frame_timeline")
+    _, timeline = _read_pose_timeline(session)
     if not timeline:
         raise HTTPException(status_code=404, detail="No pose data available for this session")
 
@@ -893,7 +895,7 @@ def admin_get_refined_pose_data(
         "total_frames": len(timeline),
         "full_reps": sorted(full_rep_nums),
         "summary_reps": sorted(summary_rep_nums),
-        "end_reason": extra.get("end_reason"),
+        "end_reason": (session.extra_data or {}).get("end_reason"),
         "refined_timeline": refined,
     })
 
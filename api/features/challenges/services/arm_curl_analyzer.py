@@ -10,16 +10,14 @@ Covers: bicep curl, hammer curl, lateral raise, front raise, shoulder press,
 import logging
 from typing import Dict
 
-from ....core.streaming.pose_detector import PoseDetector
+from ....core.streaming.pose_geometry import (
+    L_SHOULDER, R_SHOULDER, L_ELBOW, R_ELBOW, L_WRIST, R_WRIST,
+    LandmarksLike, PoseGeometry, pose_geometry,
+)
 from .rep_counter import RepCounterAnalyzer
 
 logger = logging.getLogger(__name__)
 
-L_SHOULDER, R_SHOULDER = 11, 12
-L_ELBOW, R_ELBOW = 13, 14
-L_WRIST, R_WRIST = 15, 16
-L_HIP, R_HIP = 23, 24
-
 # Movement patterns determine which angle/metric to track
 PATTERNS = {
     # Elbow flexion (arm bends at elbow): curls, tricep extensions
@@ -98,8 +96,8 @@ class ArmRepAnalyzer(RepCounterAnalyzer):
     Adapts thresholds based on exercise pattern (curl vs raise vs press vs row).
     """
 
-    def __init__(self, exercise_slug: str = "bicep-curl", config=None):
-        super().__init__(challenge_type="arm_rep", config=config)
+    def __init__(self, exercise_slug: str = "bicep-curl", config=None, replay: bool = False):
+        super().__init__(challenge_type="arm_rep", config=config, replay=replay)
         self.exercise_slug = exercise_slug
         cfg = config or {}
 
@@ -122,63 +120,52 @@ class ArmRepAnalyzer(RepCounterAnalyzer):
         self._total_active_frames = 0
         self._form_good_frames = 0
 
-    def _get_elbow_angle(self, landmarks):
+    def _get_elbow_angle(self, geo: PoseGeometry):
         """Average shoulder-elbow-wrist angle (both arms)."""
-        left = PoseDetector.angle_between(
-            (landmarks[L_SHOULDER]["nx"], landmarks[L_SHOULDER]["ny"]),
-            (landmarks[L_ELBOW]["nx"], landmarks[L_ELBOW]["ny"]),
-            (landmarks[L_WRIST]["nx"], landmarks[L_WRIST]["ny"]),
-        )
-        right = PoseDetector.angle_between(
-            (landmarks[R_SHOULDER]["nx"], landmarks[R_SHOULDER]["ny"]),
-            (landmarks[R_ELBOW]["nx"], landmarks[R_ELBOW]["ny"]),
-            (landmarks[R_WRIST]["nx"], landmarks[R_WRIST]["ny"]),
-        )
-        return (left + right) / 2
-
-    def _get_arm_height(self, landmarks):
+        return geo.mean("elbow")
+
+    def _get_arm_height(self, geo: PoseGeometry):
         """Wrist height relative to shoulder (for raises). Lower = arms raised."""
-        shoulder_y = (landmarks[L_SHOULDER]["ny"] + landmarks[R_SHOULDER]["ny"]) / 2
-        wrist_y = (landmarks[L_WRIST]["ny"] + landmarks[R_WRIST]["ny"]) / 2
+        shoulder_y = geo.shoulder[1]
+        wrist_y = geo.wrist[1]
         # Return as pseudo-angle: arms at sides ≈ 180, arms raised ≈ 90
         delta = wrist_y - shoulder_y  # positive = wrists below shoulders
         # Map to 0-180 range: 0.3 delta = ~180 (relaxed), 0.0 delta = ~90 (raised)
         return max(60, min(180, 90 + delta * 300))
 
-    def _get_shoulder_height(self, landmarks):
+    def _get_shoulder_height(self, geo: PoseGeometry):
         """Shoulder elevation for shrugs. Shoulder-to-hip distance."""
-        shoulder_y = (landmarks[L_SHOULDER]["ny"] + landmarks[R_SHOULDER]["ny"]) / 2
-        hip_y = (landmarks[L_HIP]["ny"] + landmarks[R_HIP]["ny"]) / 2
+        shoulder_y = geo.shoulder[1]
+        hip_y = geo.hip[1]
         gap = hip_y - shoulder_y  # larger = shoulders lower (relaxed)
         return max(100, min(180, 100 + gap * 400))
 
-    def _get_angle(self, landmarks):
+    def _get_angle(self, geo: PoseGeometry):
         """Get the appropriate angle metric based on pattern."""
         if self.pattern_name == "shoulder_raise":
-            return self._get_arm_height(landmarks)
+            return self._get_arm_height(geo)
         elif self.pattern_name == "shrug":
-            return self._get_shoulder_height(landmarks)
+            return self._get_shoulder_height(geo)
         else:
-            return self._get_elbow_angle(landmarks)
+            return self._get_elbow_angle(geo)
 
-    def _is_standing(self, landmarks):
+    def _is_standing(self, geo: PoseGeometry):
         """Check if person is roughly upright (not lying down)."""
-        shoulder_y = (landmarks[L_SHOULDER]["ny"] + landmarks[R_SHOULDER]["ny"]) / 2
-        hip_y = (landmarks[L_HIP]["ny"] + landmarks[R_HIP]["ny"]) / 2
-        return hip_y > shoulder_y + 0.05  # hips below shoulders
+        return geo.hip[1] > geo.shoulder[1] + 0.05  # hips below shoulders
 
-    def _upper_body_visible(self, landmarks):
+    def _upper_body_visible(self, geo: PoseGeometry):
         """Check if shoulders, elbows, wrists are visible."""
         min_vis = 0.4
         for idx in [L_SHOULDER, R_SHOULDER, L_ELBOW, R_ELBOW, L_WRIST, R_WRIST]:
-            if landmarks[idx].get("visibility", 0) < min_vis:
+            if geo.visibility[idx] < min_vis:
                 return False
         return True
 
-    def _process_pose(self, landmarks: list, timestamp: float) -> Dict:
-        angle = self._get_angle(landmarks)
-        is_standing = self._is_standing(landmarks)
-        visible = self._upper_body_visible(landmarks)
+    def _process_pose(self, landmarks: LandmarksLike, timestamp: float) -> Dict:
+        geo = pose_geometry(landmarks)
+        angle = self._get_angle(geo)
+        is_standing = self._is_standing(geo)
+        visible = self._upper_body_visible(geo)
 
         # Ready gate
         if not self._ready:
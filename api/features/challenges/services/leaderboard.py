@@ -0,0 +1,290 @@
+"""
+Daily and weekly challenge leaderboards, maintained incrementally.
+
+Rank lookups used to run a GROUP BY over every ended session of the day
+(or week) for a challenge type and scan the result for the user, on
+every session response; the leaderboard endpoint additionally loaded
+each ranked user one query at a time.
+
+Now each session end folds its score into ``challenge_daily_bests`` (one
+row per user, type and day, see ``record_session_result``) with a single
+upsert that keeps the higher score, so two sessions of the same user
+ending together can't both insert the row. ``LeaderboardCache`` keeps
+today's and this week's boards per challenge type in memory as sorted
+arrays. A board is loaded from the table the first time it's asked for
+(outside the cache lock: one query per board at a time, other boards
+stay readable, and scores submitted meanwhile are replayed onto it),
+updated in place by ``submit`` after a session end commits, and all
+boards are dropped when the date changes. Rank is a bisect on the sorted
+array, top-N a slice.
+
+Ties are ordered by user id so ranks are stable between requests. The
+cache is per process, which matches the single uvicorn worker we run;
+with more workers each would need the table as its source of truth.
+"""
+
+import bisect
+import logging
+import threading
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import case, func
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from ..db_models.challenge import ChallengeDailyBest, ChallengeRecord, ChallengeSession
+
+logger = logging.getLogger(__name__)
+
+PERIODS = ("daily", "weekly")
+
+
+def period_start(period: str, today: date) -> date:
+    """First day counted by a leaderboard period."""
+    if period == "weekly":
+        return today - timedelta(days=today.weekday())  # Monday
+    return today
+
+
+class RankedBoard:
+    """Best score per user, kept sorted by (score desc, user id)."""
+
+    def __init__(self, scores: Optional[Dict[int, int]] = None):
+        self._scores: Dict[int, int] = dict(scores or {})
+        self._keys: List[Tuple[int, int]] = sorted((-s, uid) for uid, s in self._scores.items())
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def submit(self, user_id: int, score: int) -> bool:
+        """Record a score; returns True if it improved the user's best."""
+        old = self._scores.get(user_id)
+        if score <= 0 or (old is not None and score <= old):
+            return False
+        if old is not None:
+            del self._keys[bisect.bisect_left(self._keys, (-old, user_id))]
+        bisect.insort(self._keys, (-score, user_id))
+        self._scores[user_id] = score
+        return True
+
+    def score(self, user_id: int) -> Optional[int]:
+        return self._scores.get(user_id)
+
+    def rank(self, user_id: int) -> Optional[int]:
+        """1-based rank of the user, or None if they have no score."""
+        score = self._scores.get(user_id)
+        if score is None:
+            return None
+        return bisect.bisect_left(self._keys, (-score, user_id)) + 1
+
+    def top(self, n: int) -> List[Tuple[int, int]]:
+        """``(user_id, score)`` of the best ``n`` users."""
+        return [(uid, -neg) for neg, uid in self._keys[:n]]
+
+
+class _BoardLoad:
+    """A board being loaded, and the scores submitted while it loads."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.board: Optional[RankedBoard] = None
+        self.submitted: List[Tuple[int, int]] = []
+
+
+class LeaderboardCache:
+    """Today's and this week's boards per challenge type, loaded lazily."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._today: Optional[date] = None
+        self._boards: Dict[Tuple[str, str], RankedBoard] = {}
+        self._loading: Dict[Tuple[str, str], _BoardLoad] = {}
+
+    def _roll_over(self, today: date):
+        if today != self._today:
+            self._today = today
+            self._boards = {}
+            self._loading = {}
+
+    def board(self, db: Session, period: str, challenge_type: str) -> RankedBoard:
+        """The board for a period, loading it from ``challenge_daily_bests`` if needed.
+
+        The query runs outside the cache lock; concurrent callers for the
+        same board wait for the first one's load.
+        """
+        key = (period, challenge_type)
+        with self._lock:
+            self._roll_over(date.today())
+            board = self._boards.get(key)
+            if board is not None:
+                return board
+            today = self._today
+            load = self._loading.get(key)
+            loading_elsewhere = load is not None
+            if not loading_elsewhere:
+                load = self._loading[key] = _BoardLoad()
+        if loading_elsewhere:
+            load.done.wait()
+            if load.board is not None:
+                return load.board
+            return self.board(db, period, challenge_type)  # that load failed
+
+        try:
+            board = RankedBoard(self._load(db, period_start(period, today), challenge_type))
+        except Exception:
+            with self._lock:
+                if self._loading.get(key) is load:
+                    del self._loading[key]
+            load.done.set()
+            raise
+        with self._lock:
+            for user_id, score in load.submitted:
+                board.submit(user_id, score)
+            if self._loading.get(key) is load:
+                del self._loading[key]
+                self._boards[key] = board
+            load.board = board
+        load.done.set()
+        logger.info(f"Loaded {period} {challenge_type} leaderboard ({len(board)} users)")
+        return board
+
+    @staticmethod
+    def _load(db: Session, since: date, challenge_type: str) -> Dict[int, int]:
+        rows = (
+            db.query(ChallengeDailyBest.user_id, func.max(ChallengeDailyBest.best_score))
+            .filter(
+                ChallengeDailyBest.challenge_type == challenge_type,
+                ChallengeDailyBest.day >= since,
+            )
+            .group_by(ChallengeDailyBest.user_id)
+            .all()
+        )
+        return {user_id: int(best) for user_id, best in rows}
+
+    def rank(self, db: Session, period: str, challenge_type: str, user_id: int) -> Optional[int]:
+        board = self.board(db, period, challenge_type)
+        with self._lock:
+            return board.rank(user_id)
+
+    def top(self, db: Session, period: str, challenge_type: str, n: int) -> List[Tuple[int, int]]:
+        board = self.board(db, period, challenge_type)
+        with self._lock:
+            return board.top(n)
+
+    def submit(self, day: date, challenge_type: str, user_id: int, score: int):
+        """Fold a committed session score into the loaded boards it counts for."""
+        with self._lock:
+            self._roll_over(date.today())
+            for period in PERIODS:
+                if day < period_start(period, self._today):
+                    continue
+                board = self._boards.get((period, challenge_type))
+                if board is not None:
+                    board.submit(user_id, score)
+                load = self._loading.get((period, challenge_type))
+                if load is not None:
+                    load.submitted.append((user_id, score))
+
+    def clear(self):
+        with self._lock:
+            self._today = None
+            self._boards = {}
+            self._loading = {}
+
+
+def record_session_result(db: Session, session: ChallengeSession) -> int:
+    """Fold an ended session into the user's personal best and daily best.
+
+    Adds/updates rows on ``db`` without committing; call
+    ``get_leaderboard_cache().submit`` once the commit succeeds.
+    Returns the personal best after this session.
+    """
+    record = db.query(ChallengeRecord).filter(
+        ChallengeRecord.user_id == session.user_id,
+        ChallengeRecord.challenge_type == session.challenge_type,
+    ).first()
+    if record is None:
+        record = ChallengeRecord(
+            user_id=session.user_id,
+            challenge_type=session.challenge_type,
+            best_score=session.score,
+        )
+        db.add(record)
+    elif session.score > record.best_score:
+        record.best_score = session.score
+
+    if session.score > 0:
+        _upsert_daily_best(db, session_day(session), session.challenge_type,
+                           session.user_id, session.score)
+
+    return record.best_score
+
+
+def _upsert_daily_best(db: Session, day: date, challenge_type: str, user_id: int, score: int):
+    """Insert the user's daily best, or raise it, in one statement.
+
+    A query-then-insert lets two sessions of the same user ending together
+    both miss and the second commit fail on ``uq_daily_best_user``.
+    """
+    table = ChallengeDailyBest.__table__
+    values = dict(day=day, challenge_type=challenge_type, user_id=user_id,
+                  best_score=score, updated_at=datetime.utcnow())
+    dialect = db.get_bind().dialect.name
+    if dialect == "mysql":
+        from sqlalchemy.dialects.mysql import insert
+        stmt = insert(table).values(**values)
+        stmt = stmt.on_duplicate_key_update(
+            best_score=func.greatest(table.c.best_score, stmt.inserted.best_score),
+            updated_at=stmt.inserted.updated_at,
+        )
+    elif dialect in ("sqlite", "postgresql"):
+        if dialect == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert
+        stmt = insert(table).values(**values)
+        higher = stmt.excluded.best_score > table.c.best_score
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["day", "challenge_type", "user_id"],
+            set_={
+                "best_score": case((higher, stmt.excluded.best_score), else_=table.c.best_score),
+                "updated_at": stmt.excluded.updated_at,
+            },
+        )
+    else:
+        _upsert_daily_best_savepoint(db, values)
+        return
+    db.execute(stmt)
+
+
+def _upsert_daily_best_savepoint(db: Session, values: Dict):
+    """Other databases: insert in a savepoint, update on a duplicate."""
+    try:
+        with db.begin_nested():
+            db.execute(ChallengeDailyBest.__table__.insert().values(**values))
+    except IntegrityError:
+        db.query(ChallengeDailyBest).filter(
+            ChallengeDailyBest.day == values["day"],
+            ChallengeDailyBest.challenge_type == values["challenge_type"],
+            ChallengeDailyBest.user_id == values["user_id"],
+            ChallengeDailyBest.best_score < values["best_score"],
+        ).update({"best_score": values["best_score"], "updated_at": values["updated_at"]},
+                 synchronize_session=False)
+
+
+def session_day(session: ChallengeSession) -> date:
+    """Leaderboard day of a session: the day it was created."""
+    return session.created_at.date() if session.created_at else date.today()
+
+
+_leaderboard_cache: Optional[LeaderboardCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_leaderboard_cache() -> LeaderboardCache:
+    global _leaderboard_cache
+    with _cache_lock:
+        if _leaderboard_cache is None:
+            _leaderboard_cache = LeaderboardCache()
+        return _leaderboard_cache
@@ -3,18 +3,14 @@
 import logging
 from typing import Dict
 
-from ....core.streaming.pose_detector import PoseDetector
+from ....core.streaming.pose_geometry import (
+    L_SHOULDER, R_SHOULDER, L_HIP, R_HIP, L_KNEE, R_KNEE, L_ANKLE, R_ANKLE,
+    LandmarksLike, pose_geometry,
+)
 from .rep_counter import RepCounterAnalyzer
 
 logger = logging.getLogger(__name__)
 
-# MediaPipe landmark indices
-L_SHOULDER, R_SHOULDER = 11, 12
-L_WRIST, R_WRIST = 15, 16
-L_HIP, R_HIP = 23, 24
-L_KNEE, R_KNEE = 25, 26
-L_ANKLE, R_ANKLE = 27, 28
-
 VISIBILITY_GROUPS = {
     "head": [0],                          # nose
     "shoulders": [L_SHOULDER, R_SHOULDER],
@@ -44,8 +40,8 @@ class PlankAnalyzer(RepCounterAnalyzer):
     - collapse: body on ground, form lost too long, or stood up
     """
 
-    def __init__(self, config=None):
-        super().__init__(challenge_type="plank", config=config)
+    def __init__(self, config=None, replay: bool = False):
+        super().__init__(challenge_type="plank", config=config, replay=replay)
         cfg = config or {}
         self.good_angle_min = cfg.get("good_angle_min", 150)
         self.good_angle_max = cfg.get("good_angle_max", 195)
@@ -78,46 +74,35 @@ class PlankAnalyzer(RepCounterAnalyzer):
         self.collapse_gap = cfg.get("collapse_gap", 0.03)
         self.collapse_hip_gap = cfg.get("collapse_hip_gap", 0.06)
 
-    def _process_pose(self, landmarks: list, timestamp: float) -> Dict:
+    def _process_pose(self, landmarks: LandmarksLike, timestamp: float) -> Dict:
+        geo = pose_geometry(landmarks)
+        vis = geo.visibility
+
         # Use the side with better visibility
-        left_vis = min(
-            landmarks[L_SHOULDER]["visibility"],
-            landmarks[L_HIP]["visibility"],
-            landmarks[L_ANKLE]["visibility"],
-        )
-        right_vis = min(
-            landmarks[R_SHOULDER]["visibility"],
-            landmarks[R_HIP]["visibility"],
-            landmarks[R_ANKLE]["visibility"],
-        )
+        left_vis = min(vis[L_SHOULDER], vis[L_HIP], vis[L_ANKLE])
+        right_vis = min(vis[R_SHOULDER], vis[R_HIP], vis[R_ANKLE])
 
         best_vis = max(left_vis, right_vis)
 
-        if left_vis >= right_vis:
-            shoulder = (landmarks[L_SHOULDER]["nx"], landmarks[L_SHOULDER]["ny"])
-            hip = (landmarks[L_HIP]["nx"], landmarks[L_HIP]["ny"])
-            knee = (landmarks[L_KNEE]["nx"], landmarks[L_KNEE]["ny"])
-            ankle = (landmarks[L_ANKLE]["nx"], landmarks[L_ANKLE]["ny"])
-            knee_vis = min(landmarks[L_HIP]["visibility"], landmarks[L_KNEE]["visibility"], landmarks[L_ANKLE]["visibility"])
+        side = "l" if left_vis >= right_vis else "r"
+        if side == "l":
+            knee_vis = min(vis[L_HIP], vis[L_KNEE], vis[L_ANKLE])
         else:
-            shoulder = (landmarks[R_SHOULDER]["nx"], landmarks[R_SHOULDER]["ny"])
-            hip = (landmarks[R_HIP]["nx"], landmarks[R_HIP]["ny"])
-            knee = (landmarks[R_KNEE]["nx"], landmarks[R_KNEE]["ny"])
-            ankle = (landmarks[R_ANKLE]["nx"], landmarks[R_ANKLE]["ny"])
-            knee_vis = min(landmarks[R_HIP]["visibility"], landmarks[R_KNEE]["visibility"], landmarks[R_ANKLE]["visibility"])
+            knee_vis = min(vis[R_HIP], vis[R_KNEE], vis[R_ANKLE])
 
-        angle = PoseDetector.angle_between(shoulder, hip, ankle)
+        # Shoulder-hip-ankle angle
+        angle = geo.angles[side + "_body"]
 
         # Knee straightness check: hip-knee-ankle angle must be near 180°.
         # Dropping to knees keeps shoulder-hip-ankle ~174° but bends knee to ~90-120°.
-        knee_angle = PoseDetector.angle_between(hip, knee, ankle)
+        knee_angle = geo.angles[side + "_knee"]
         knees_straight = knee_vis < 0.3 or knee_angle >= self.knee_angle_min
 
         # Horizontal check (same concept as pushup)
-        shoulder_y = (landmarks[L_SHOULDER]["ny"] + landmarks[R_SHOULDER]["ny"]) / 2
-        hip_y = (landmarks[L_HIP]["ny"] + landmarks[R_HIP]["ny"]) / 2
-        ankle_y = (landmarks[L_ANKLE]["ny"] + landmarks[R_ANKLE]["ny"]) / 2
-        y_spread = max(shoulder_y, hip_y, ankle_y) - min(shoulder_y, hip_y, ankle_y)
+        shoulder_y = geo.shoulder[1]
+        hip_y = geo.hip[1]
+        ankle_y = geo.ankle[1]
+        y_spread = geo.y_spread
         is_horizontal = y_spread < self.horizontal_threshold
 
         # Flat-on-ground check: if y_spread is near zero, the person is lying
@@ -136,16 +121,14 @@ class PlankAnalyzer(RepCounterAnalyzer):
             good_form = landmarks_visible and knees_straight and not_flat and angle >= self.good_angle_min
 
         # --- Front-facing camera detection ---
-        shoulder_x_gap = abs(landmarks[L_SHOULDER]["nx"] - landmarks[R_SHOULDER]["nx"])
-        hip_x_gap = abs(landmarks[L_HIP]["nx"] - landmarks[R_HIP]["nx"])
-        if not self._ready and shoulder_x_gap > 0.15 and hip_x_gap > 0.15:
+        if not self._ready and geo.shoulder_x_gap > 0.15 and geo.hip_x_gap > 0.15:
             self.form_feedback = "Place your camera to the side for best results"
             return {"angle": round(angle, 1), "in_plank": False}
 
         # --- Visibility gate: all body parts must be visible before ready ---
         if not self._ready:
             for group_name, indices in VISIBILITY_GROUPS.items():
-                best_vis = max(landmarks[i].get("visibility", 0) for i in indices)
+                best_vis = max(vis[i] for i in indices)
                 if best_vis < VISIBILITY_THRESHOLD:
                     self.form_feedback = VISIBILITY_MESSAGES[group_name]
                     return {
@@ -233,7 +216,7 @@ class PlankAnalyzer(RepCounterAnalyzer):
 
         if grace_expired and not self._session_ended:
             # Wrist Y for ground-level reference
-            wrist_ny = (landmarks[L_WRIST]["ny"] + landmarks[R_WRIST]["ny"]) / 2
+            wrist_ny = geo.wrist[1]
 
             # Signal 1: Body on ground — shoulders AND hips near wrist (ground) level
             if (wrist_ny - shoulder_y < self.collapse_gap
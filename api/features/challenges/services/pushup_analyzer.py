@@ -3,18 +3,14 @@
 import logging
 from typing import Dict
 
-from ....core.streaming.pose_detector import PoseDetector
+from ....core.streaming.pose_geometry import (
+    L_SHOULDER, R_SHOULDER, L_HIP, R_HIP, L_KNEE, R_KNEE, L_ANKLE, R_ANKLE,
+    LandmarksLike, pose_geometry,
+)
 from .rep_counter import RepCounterAnalyzer
 
 logger = logging.getLogger(__name__)
 
-L_SHOULDER, R_SHOULDER = 11, 12
-L_ELBOW, R_ELBOW = 13, 14
-L_WRIST, R_WRIST = 15, 16
-L_HIP, R_HIP = 23, 24
-L_KNEE, R_KNEE = 25, 26
-L_ANKLE, R_ANKLE = 27, 28
-
 VISIBILITY_GROUPS = {
     "head": [0],                          # nose
     "shoulders": [L_SHOULDER, R_SHOULDER],
@@ -46,8 +42,8 @@ class PushupAnalyzer(RepCounterAnalyzer):
     - inactivity_timeout: user leaves pushup position for 10s
     """
 
-    def __init__(self, config=None):
-        super().__init__(challenge_type="pushup", config=config)
+    def __init__(self, config=None, replay: bool = False):
+        super().__init__(challenge_type="pushup", config=config, replay=replay)
         cfg = config or {}
         self.down_angle = cfg.get("down_angle", 90)
         self.up_angle = cfg.get("up_angle", 145)
@@ -75,62 +71,31 @@ class PushupAnalyzer(RepCounterAnalyzer):
         self._legs_bent_frames = 0
         self._total_active_frames = 0
 
-    def _process_pose(self, landmarks: list, timestamp: float) -> Dict:
+    def _process_pose(self, landmarks: LandmarksLike, timestamp: float) -> Dict:
+        geo = pose_geometry(landmarks)
+
         # --- Elbow angle (primary rep metric) ---
-        left_angle = PoseDetector.angle_between(
-            (landmarks[L_SHOULDER]["nx"], landmarks[L_SHOULDER]["ny"]),
-            (landmarks[L_ELBOW]["nx"], landmarks[L_ELBOW]["ny"]),
-            (landmarks[L_WRIST]["nx"], landmarks[L_WRIST]["ny"]),
-        )
-        right_angle = PoseDetector.angle_between(
-            (landmarks[R_SHOULDER]["nx"], landmarks[R_SHOULDER]["ny"]),
-            (landmarks[R_ELBOW]["nx"], landmarks[R_ELBOW]["ny"]),
-            (landmarks[R_WRIST]["nx"], landmarks[R_WRIST]["ny"]),
-        )
-        angle = (left_angle + right_angle) / 2
+        angle = geo.mean("elbow")
 
         # --- Knee angle (hip→knee→ankle) — straight legs check ---
-        left_knee = PoseDetector.angle_between(
-            (landmarks[L_HIP]["nx"], landmarks[L_HIP]["ny"]),
-            (landmarks[L_KNEE]["nx"], landmarks[L_KNEE]["ny"]),
-            (landmarks[L_ANKLE]["nx"], landmarks[L_ANKLE]["ny"]),
-        )
-        right_knee = PoseDetector.angle_between(
-            (landmarks[R_HIP]["nx"], landmarks[R_HIP]["ny"]),
-            (landmarks[R_KNEE]["nx"], landmarks[R_KNEE]["ny"]),
-            (landmarks[R_ANKLE]["nx"], landmarks[R_ANKLE]["ny"]),
-        )
-        knee_angle = (left_knee + right_knee) / 2
+        knee_angle = geo.mean("knee")
         legs_straight = knee_angle > self.knee_threshold
 
         # --- Body alignment (shoulder-hip-ankle angle) ---
-        left_body = PoseDetector.angle_between(
-            (landmarks[L_SHOULDER]["nx"], landmarks[L_SHOULDER]["ny"]),
-            (landmarks[L_HIP]["nx"], landmarks[L_HIP]["ny"]),
-            (landmarks[L_ANKLE]["nx"], landmarks[L_ANKLE]["ny"]),
-        )
-        right_body = PoseDetector.angle_between(
-            (landmarks[R_SHOULDER]["nx"], landmarks[R_SHOULDER]["ny"]),
-            (landmarks[R_HIP]["nx"], landmarks[R_HIP]["ny"]),
-            (landmarks[R_ANKLE]["nx"], landmarks[R_ANKLE]["ny"]),
-        )
-        body_angle = (left_body + right_body) / 2
+        body_angle = geo.mean("body")
 
         # --- Horizontal check: vertical spread of shoulder/hip/ankle ---
         # Small spread = lying horizontal (pushup), large spread = standing
-        shoulder_y = (landmarks[L_SHOULDER]["ny"] + landmarks[R_SHOULDER]["ny"]) / 2
-        hip_y = (landmarks[L_HIP]["ny"] + landmarks[R_HIP]["ny"]) / 2
-        ankle_y = (landmarks[L_ANKLE]["ny"] + landmarks[R_ANKLE]["ny"]) / 2
-        y_spread = max(shoulder_y, hip_y, ankle_y) - min(shoulder_y, hip_y, ankle_y)
+        shoulder_y = geo.shoulder[1]
+        hip_y = geo.hip[1]
+        y_spread = geo.y_spread
         is_horizontal = y_spread < self.body_spread_threshold
 
         # --- Front-facing camera detection ---
         # If both shoulders are at similar X and both hips are at similar X,
         # the camera is facing the user head-on. Elbow angles are unreliable
         # from this perspective (depth is lost in 2D projection).
-        shoulder_x_gap = abs(landmarks[L_SHOULDER]["nx"] - landmarks[R_SHOULDER]["nx"])
-        hip_x_gap = abs(landmarks[L_HIP]["nx"] - landmarks[R_HIP]["nx"])
-        is_front_facing = shoulder_x_gap > 0.15 and hip_x_gap > 0.15
+        is_front_facing = geo.shoulder_x_gap > 0.15 and geo.hip_x_gap > 0.15
 
         if not self._ready and is_front_facing:
             self.form_feedback = "Place your camera to the side for best results"
@@ -146,7 +111,7 @@ class PushupAnalyzer(RepCounterAnalyzer):
         # --- Visibility gate: all body parts must be visible ---
         if not self._ready:
             for group_name, indices in VISIBILITY_GROUPS.items():
-                best_vis = max(landmarks[i].get("visibility", 0) for i in indices)
+                best_vis = max(geo.visibility[i] for i in indices)
                 if best_vis < VISIBILITY_THRESHOLD:
                     self.form_feedback = VISIBILITY_MESSAGES[group_name]
                     return {
@@ -191,7 +156,7 @@ class PushupAnalyzer(RepCounterAnalyzer):
             self._stood_up_since = timestamp
 
         # --- Ground reference & gap metrics ---
-        wrist_ny = (landmarks[L_WRIST]["ny"] + landmarks[R_WRIST]["ny"]) / 2
+        wrist_ny = geo.wrist[1]
         torso_gap = wrist_ny - shoulder_y  # positive = shoulders above wrists
         hip_ground_gap = wrist_ny - hip_y  # positive = hips above wrists (ground)
         # Half-pushup: hips on ground (gap tiny), only chest lifts = cobra pose
@@ -10,10 +10,17 @@ import numpy as np
 import logging
 from abc import abstractmethod
 from datetime import datetime
-from typing import Dict, List, Optional
+from functools import partial
+from typing import Callable, Dict, Optional, Tuple
 
 from ....core.streaming.base_analyzer import BaseStreamAnalyzer
-from ....core.streaming.pose_detector import PoseDetector, SKELETON_CONNECTIONS
+from ....core.streaming.pose_detector import SKELETON_CONNECTIONS, PoseResult
+from ....core.streaming.pose_geometry import NX, NY, VIS, LandmarksLike, PoseGeometry
+from ....core.streaming.pose_pool import get_pose_detector_pool
+from ....core.streaming.pose_timeline import PoseTimelineFile, PoseTimelineWriter
+from ....core.streaming.recording import RecordingResult, StreamingRecorder
+from ....core.streaming.screenshots import ScreenshotStream
+from ....core.tracing import stage
 
 logger = logging.getLogger(__name__)
 
@@ -54,16 +61,20 @@ class RepCounterAnalyzer(BaseStreamAnalyzer):
     logic (angle thresholds, state machines, etc.).
     """
 
-    def __init__(self, challenge_type: str, config: dict = None):
+    def __init__(self, challenge_type: str, config: dict = None, replay: bool = False):
         self.challenge_type = challenge_type
-        self.detector = PoseDetector(model_complexity=1)
+        # Borrowed from the shared pool for the life of the session. Replay
+        # analyzers get their poses from process_landmarks and need none.
+        self._detector_pool = None if replay else get_pose_detector_pool()
+        self.detector = None if replay else self._detector_pool.checkout(model_complexity=1, owner=self)
         self.reps = 0
         self.hold_seconds = 0.0
         self.form_feedback = ""
         self._frame_counter = 0
         self._start_time = datetime.now()
         self._last_timestamp = 0.0
-        self.frame_timeline: List[Dict] = []
+        # Per-frame pose data, streamed to disk in chunks (admin review)
+        self._timeline = PoseTimelineWriter()
         self._ready = True  # subclasses can override (e.g. pushup)
         self._ready_timestamp = None  # timestamp when player first became ready
         self._ready_wall_time = None  # wall clock when player first became ready
@@ -80,12 +91,14 @@ class RepCounterAnalyzer(BaseStreamAnalyzer):
         self._session_ended = False
         self._end_reason = ""
 
-        # Recording state
+        # Recording state (annotated frames are encoded as they arrive)
         self.is_recording = False
-        self.recorded_frames: List[bytes] = []
+        self.recording_fps = 10
+        self._recorder: Optional[StreamingRecorder] = None
 
-        # Per-second screenshots (always captured, for admin review)
-        self._screenshots: List[bytes] = []
+        # Per-second screenshots (always captured, for admin review);
+        # drawn, encoded and uploaded in the background once bound
+        self._screenshots = ScreenshotStream()
         self._last_screenshot_ts: float = -1.0
 
     def mark_active(self, timestamp: float):
@@ -103,8 +116,9 @@ class RepCounterAnalyzer(BaseStreamAnalyzer):
 
         # Decode JPEG
         try:
-            nparr = np.frombuffer(frame_data, np.uint8)
-            frame = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+            with stage("jpeg_decode"):
+                nparr = np.frombuffer(frame_data, np.uint8)
+                frame = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
             if frame is None:
                 return self._empty_result()
         except Exception as e:
@@ -112,34 +126,66 @@ class RepCounterAnalyzer(BaseStreamAnalyzer):
             return self._empty_result()
 
         # Detect pose
-        pose_result = self.detector.detect(frame)
-        pose_data = self.detector.extract_pose_data(pose_result)
+        with stage("pose"):
+            pose_result = self.detector.detect(frame)
+            pose_data = self.detector.extract_pose_data(pose_result)
 
+        return self._advance(pose_result, pose_data, timestamp, frame)
+
+    def process_landmarks(self, landmarks: Optional[np.ndarray], timestamp: float,
+                          geometry: Optional[PoseGeometry] = None) -> Dict:
+        """Feed an already-detected pose straight into the state machine.
+
+        Used for offline replay of stored timelines: no JPEG decode and no
+        MediaPipe. ``landmarks`` is a ``(33, 4)`` array as produced by
+        ``PoseDetector`` (None for a frame without a player); ``geometry``
+        is its precomputed ``pose_geometry``, if the caller has it. Injected
+        frames are not recorded, screenshotted or added to the timeline.
+        """
+        self._frame_counter += 1
+        if self._session_ended:
+            return self._auto_end_result()
+        pose_result = PoseResult(player_detected=landmarks is not None, array=landmarks)
+        return self._advance(pose_result, None, timestamp, None, geometry)
+
+    def _advance(self, pose_result: PoseResult, pose_data: Optional[Dict], timestamp: float,
+                 frame: Optional[np.ndarray], geometry: Optional[PoseGeometry] = None) -> Dict:
+        """Everything after pose detection; ``frame`` is None for injected poses."""
         # Exercise-specific logic
         exercise_data = {}
-        if pose_result.player_detected and pose_result.landmark_list:
-            exercise_data = self._process_pose(pose_result.landmark_list, timestamp)
-            self.frame_timeline.append({
-                "t": round(timestamp, 3),
-                "lm": [[round(l["nx"], 4), round(l["ny"], 4), round(l.get("visibility", 0), 2)] for l in pose_result.landmark_list],
-                "angle": exercise_data.get("angle"),
-                "state": exercise_data.get("state") or exercise_data.get("in_plank"),
-                "fb": self.form_feedback,
-                "reps": self.reps,
-                "hold": round(self.hold_seconds, 1),
-            })
+        if pose_result.player_detected and pose_result.array is not None:
+            with stage("classify"):
+                exercise_data = self._process_pose(
+                    geometry if geometry is not None else pose_result.array, timestamp
+                )
+            if frame is not None:
+                self._timeline.append(
+                    timestamp,
+                    pose_result.array[:, (NX, NY, VIS)],
+                    angle=exercise_data.get("angle"),
+                    state=exercise_data.get("state") or exercise_data.get("in_plank"),
+                    feedback=self.form_feedback,
+                    reps=self.reps,
+                    hold=self.hold_seconds,
+                )
 
         # Record annotated frame if recording
-        if self.is_recording:
+        # stop_recording may clear _recorder from a REST thread at any point
+        annotated = None
+        recorder = self._recorder
+        if recorder is not None and frame is not None:
             annotated = self._draw_annotations(frame, pose_result, timestamp)
-            _, buf = cv2.imencode('.jpg', annotated, [cv2.IMWRITE_JPEG_QUALITY, 90])
-            self.recorded_frames.append(buf.tobytes())
+            recorder.add_frame(annotated)
 
         # Capture 1 screenshot per second (always, regardless of recording)
-        if pose_result.player_detected and timestamp - self._last_screenshot_ts >= 1.0:
-            annotated = self._draw_annotations(frame, pose_result, timestamp)
-            _, buf = cv2.imencode('.jpg', annotated, [cv2.IMWRITE_JPEG_QUALITY, 80])
-            self._screenshots.append(buf.tobytes())
+        if (frame is not None and pose_result.player_detected
+                and timestamp - self._last_screenshot_ts >= 1.0):
+            if annotated is not None:
+                self._screenshots.capture(lambda: annotated)
+            else:
+                self._screenshots.capture(partial(
+                    self._draw_annotations, frame, pose_result, timestamp, self._hud_state(),
+                ))
             self._last_screenshot_ts = timestamp
 
         self._last_timestamp = timestamp
@@ -204,12 +250,13 @@ class RepCounterAnalyzer(BaseStreamAnalyzer):
         }
 
     @abstractmethod
-    def _process_pose(self, landmarks: list, timestamp: float) -> Dict:
+    def _process_pose(self, landmarks: LandmarksLike, timestamp: float) -> Dict:
         """
         Exercise-specific pose processing.
 
         Args:
-            landmarks: List of dicts with x, y, visibility, nx, ny.
+            landmarks: (33, 4) landmark array from PoseDetector (or a list
+                of landmark dicts); see ``pose_geometry``.
             timestamp: Current frame timestamp.
 
         Returns:
@@ -234,9 +281,17 @@ class RepCounterAnalyzer(BaseStreamAnalyzer):
             "frames_processed": self._frame_counter,
             "end_reason": self._end_reason,
             "max_duration": self.max_duration,
-            "frame_timeline": self.frame_timeline,
         }
 
+    def finish_pose_timeline(self) -> Optional[PoseTimelineFile]:
+        """Close the pose timeline and hand over its file (None if empty).
+
+        Frames processed afterwards are not added to it. While a WebSocket
+        is live, call this on the session's inference worker so it runs
+        after the frames already queued there.
+        """
+        return self._timeline.finish()
+
     def reset(self):
         self.reps = 0
         self.hold_seconds = 0.0
@@ -246,16 +301,26 @@ class RepCounterAnalyzer(BaseStreamAnalyzer):
         self._last_timestamp = 0.0
         self._ready_timestamp = None
         self._ready_wall_time = None
-        self.frame_timeline = []
+        self._timeline.discard()
+        self._timeline = PoseTimelineWriter(chunk_frames=self._timeline.chunk_frames)
         self._last_active_ts = 0.0
         self._activity_started = False
         self._session_ended = False
         self._end_reason = ""
-        self._screenshots = []
+        # Delete what it uploaded before the new stream reuses the prefix
+        self._screenshots.discard(wait=True)
+        self._screenshots = ScreenshotStream(self._screenshots.prefix)
         self._last_screenshot_ts = -1.0
 
     def close(self):
-        self.detector.close()
+        if self._recorder is not None:
+            self._recorder.abort()
+            self._recorder = None
+        self._timeline.discard()
+        self._screenshots.discard()
+        if self.detector is not None:
+            self._detector_pool.checkin(self.detector)
+            self.detector = None
 
     def _empty_result(self) -> Dict:
         active_time = (self._last_timestamp - self._ready_timestamp) if self._ready_timestamp is not None else 0.0
@@ -296,46 +361,66 @@ class RepCounterAnalyzer(BaseStreamAnalyzer):
     # ---------- Recording ----------
 
     def start_recording(self):
+        if self._recorder is not None:
+            self._recorder.abort()
+        self._recorder = StreamingRecorder(self.recording_fps)
         self.is_recording = True
-        self.recorded_frames = []
         logger.info(f"Recording started for {self.challenge_type} challenge")
 
-    def stop_recording(self) -> List[bytes]:
+    def stop_recording(self) -> Optional[RecordingResult]:
         self.is_recording = False
-        frames = self.recorded_frames
-        self.recorded_frames = []
-        logger.info(f"Recording stopped: {len(frames)} frames captured")
-        return frames
+        recorder, self._recorder = self._recorder, None
+        recording = recorder.finish() if recorder is not None else None
+        logger.info(f"Recording stopped: {recording.frame_count if recording else 0} frames captured")
+        return recording
+
+    def start_screenshots(self, prefix: str):
+        """Upload per-second screenshots under ``prefix`` as the session runs."""
+        self._screenshots.bind(prefix)
+
+    def finish_screenshots(self) -> int:
+        """Stop capturing; returns the screenshot count (uploads finish in the background)."""
+        return self._screenshots.finish()
 
-    def get_screenshots(self) -> List[bytes]:
-        return self._screenshots
+    def on_screenshots_uploaded(self, callback: Callable[[int], None]):
+        """Call ``callback(count)`` once the finished screenshots are uploaded;
+        ``count`` is lower than ``finish_screenshots`` returned if some failed."""
+        self._screenshots.on_uploaded(callback)
 
-    def _draw_annotations(self, frame: np.ndarray, pose_result, timestamp: float) -> np.ndarray:
-        """Draw skeleton overlay and HUD onto the frame."""
+    def _hud_state(self) -> Tuple[int, float, str]:
+        """Snapshot of what the HUD shows, for drawing a frame later."""
+        return self.reps, self.hold_seconds, self.form_feedback
+
+    def _draw_annotations(self, frame: np.ndarray, pose_result, timestamp: float,
+                          hud: Optional[Tuple[int, float, str]] = None) -> np.ndarray:
+        """Draw skeleton overlay and HUD onto the frame.
+
+        ``hud`` is a ``_hud_state()`` snapshot (current state if omitted).
+        """
+        reps, hold_seconds, form_feedback = hud or self._hud_state()
         annotated = frame.copy()
         h, w = annotated.shape[:2]
 
         # Draw skeleton if pose detected
-        if pose_result.player_detected and pose_result.landmark_list:
-            landmarks = pose_result.landmark_list
-            good_form = self.form_feedback.lower().startswith("good") if self.form_feedback else False
+        if pose_result.player_detected and pose_result.array is not None:
+            points = (pose_result.array[:, (NX, NY)].astype(np.float64) * (w, h)).astype(np.int64).tolist()
+            visible = (pose_result.array[:, VIS] >= 0.3).tolist()
+            good_form = form_feedback.lower().startswith("good") if form_feedback else False
             joint_color = (0, 200, 0) if good_form else (0, 220, 220)  # green or yellow (BGR)
             line_color = (0, 220, 220)  # yellow
 
             # Draw connections
             for (a, b) in SKELETON_CONNECTIONS:
-                if a >= len(landmarks) or b >= len(landmarks):
+                if a >= len(points) or b >= len(points):
                     continue
-                la, lb = landmarks[a], landmarks[b]
-                if la.get("visibility", 0) < 0.3 or lb.get("visibility", 0) < 0.3:
+                if not (visible[a] and visible[b]):
                     continue
-                cv2.line(annotated, (la["x"], la["y"]), (lb["x"], lb["y"]), line_color, 2)
+                cv2.line(annotated, tuple(points[a]), tuple(points[b]), line_color, 2)
 
             # Draw joints
-            for lm in landmarks:
-                if lm.get("visibility", 0) < 0.3:
-                    continue
-                cv2.circle(annotated, (lm["x"], lm["y"]), 4, joint_color, -1)
+            for point, shown in zip(points, visible):
+                if shown:
+                    cv2.circle(annotated, tuple(point), 4, joint_color, -1)
 
         # HUD background strip at top
         overlay = annotated.copy()
@@ -348,9 +433,9 @@ class RepCounterAnalyzer(BaseStreamAnalyzer):
 
         # Score
         if self.challenge_type in ("plank", "squat_hold"):
-            score_text = f"{self.hold_seconds:.1f}s"
+            score_text = f"{hold_seconds:.1f}s"
         else:
-            score_text = f"{self.reps} reps"
+            score_text = f"{reps} reps"
         cv2.putText(annotated, score_text, (w // 2 - 40, 35), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
 
         # Elapsed time
@@ -361,8 +446,8 @@ class RepCounterAnalyzer(BaseStreamAnalyzer):
         cv2.putText(annotated, time_text, (w - 80, 35), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (200, 200, 200), 2)
 
         # Form feedback at bottom
-        if self.form_feedback:
-            fb = self.form_feedback
+        if form_feedback:
+            fb = form_feedback
             good = fb.lower().startswith("good")
             fb_color = (0, 200, 0) if good else (0, 100, 230)  # green or orange-red (BGR)
             text_size = cv2.getTextSize(fb, cv2.FONT_HERSHEY_SIMPLEX, 0.6, 2)[0]
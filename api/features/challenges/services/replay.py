@@ -0,0 +1,313 @@
+"""
+Offline replay of stored challenge pose timelines.
+
+Checking a threshold change used to mean streaming recorded videos back
+through the live WebSocket stack (``tools/replay``), or reading exported
+JSON with the standalone scripts in ``scripts/session_analysis``, which
+re-implement the angle math instead of running the real analyzers.
+
+``replay_timeline`` feeds a stored landmark timeline (the frames written
+by ``PoseTimelineWriter`` or exported by the admin pose-data endpoint)
+into the real analyzer state machine through
+``RepCounterAnalyzer.process_landmarks`` -- no JPEG decode, no MediaPipe,
+no pooled detector. ``replay_sessions`` does that for many sessions and
+several alternative configs at once, spread over worker processes, and
+``summarize`` reports each config's rep/score deltas against a baseline.
+A session's joint geometry is computed once, vectorised over all its
+frames (``timeline_geometry``), and shared by every config.
+
+Timelines only hold frames in which a player was detected, so replay
+sees the same poses the live analyzer classified but not the gaps
+between them; timeouts that depend on frames without a player can
+differ from the live run.
+"""
+
+import json
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+from ....core.streaming.pose_geometry import NX, NY, VIS, PoseGeometry, pose_geometry_batch
+from .plank_analyzer import PlankAnalyzer
+from .pushup_analyzer import PushupAnalyzer
+from .rep_counter import CHALLENGE_DEFAULTS, RepCounterAnalyzer
+from .squat_analyzer import SquatAnalyzer
+from .squat_hold_analyzer import SquatHoldAnalyzer
+
+logger = logging.getLogger(__name__)
+
+REPLAYABLE_TYPES = ("plank", "squat_hold", "squat_half", "squat_full", "pushup")
+
+BASELINE = "baseline"
+
+
+@dataclass
+class ReplaySource:
+    """One stored session: a local file or a key in output storage.
+
+    Files may be a pose timeline (``.ptl``) or a pose-data JSON export
+    (``{"challenge_type", "frame_timeline", ...}``). ``challenge_type``
+    and ``recorded_score`` are taken from the export when not given.
+    """
+    path: Optional[str] = None
+    storage_key: Optional[str] = None
+    challenge_type: Optional[str] = None
+    session_id: Optional[int] = None
+    recorded_score: Optional[int] = None
+
+    @property
+    def label(self) -> str:
+        if self.session_id is not None:
+            return f"session {self.session_id}"
+        return self.path or self.storage_key or "?"
+
+
+@dataclass
+class ReplayResult:
+    """Final state of one session replayed under one config."""
+    source: str
+    challenge_type: str
+    config: str
+    score: int
+    reps: int
+    hold_seconds: float
+    end_reason: str
+    frames: int
+    recorded_score: Optional[int] = None
+    error: Optional[str] = None
+
+
+@dataclass
+class ConfigSummary:
+    """Deltas of one config against the baseline across all sessions."""
+    config: str
+    sessions: int = 0
+    changed: int = 0
+    total_delta: int = 0
+    mean_abs_delta: float = 0.0
+    biggest: List[Dict] = field(default_factory=list)
+
+
+def create_replay_analyzer(challenge_type: str, config: Optional[Dict] = None) -> RepCounterAnalyzer:
+    """Analyzer for ``challenge_type`` that takes injected poses only."""
+    if challenge_type in ("squat_half", "squat_full"):
+        return SquatAnalyzer(challenge_type=challenge_type, config=config, replay=True)
+    analyzer_cls = {
+        "plank": PlankAnalyzer,
+        "squat_hold": SquatHoldAnalyzer,
+        "pushup": PushupAnalyzer,
+    }.get(challenge_type)
+    if analyzer_cls is None:
+        raise ValueError(f"Cannot replay challenge type: {challenge_type}")
+    return analyzer_cls(config=config, replay=True)
+
+
+def landmarks_from_frame(lm: Sequence[Sequence[float]]) -> np.ndarray:
+    """``(33, 4)`` landmark array from a stored ``[[nx, ny, vis], ...]`` frame."""
+    stored = np.asarray(lm, dtype=np.float32)
+    array = np.zeros((len(stored), 4), np.float32)
+    array[:, (NX, NY, VIS)] = stored[:, :3]
+    return array
+
+
+def timeline_geometry(frames: Sequence[Dict]) -> List[Optional[PoseGeometry]]:
+    """``pose_geometry`` of every stored frame (None without a pose), computed
+    in one vectorised pass per landmark count."""
+    geometries: List[Optional[PoseGeometry]] = [None] * len(frames)
+    by_count: Dict[int, List[int]] = {}
+    for i, frame in enumerate(frames):
+        if frame.get("lm"):
+            by_count.setdefault(len(frame["lm"]), []).append(i)
+    for indices in by_count.values():
+        stack = np.stack([landmarks_from_frame(frames[i]["lm"]) for i in indices])
+        for i, geometry in zip(indices, pose_geometry_batch(stack)):
+            geometries[i] = geometry
+    return geometries
+
+
+def replay_timeline(
+    challenge_type: str,
+    frames: Sequence[Dict],
+    config: Optional[Dict] = None,
+    geometries: Optional[Sequence[Optional[PoseGeometry]]] = None,
+) -> Dict:
+    """Run stored frames through a fresh analyzer; returns its final report.
+
+    ``geometries`` (from ``timeline_geometry``) saves recomputing the
+    joint geometry when the same frames are replayed more than once.
+    """
+    analyzer = create_replay_analyzer(challenge_type, config)
+    try:
+        for i, frame in enumerate(frames):
+            lm = frame.get("lm")
+            analyzer.process_landmarks(
+                landmarks_from_frame(lm) if lm else None, frame["t"],
+                geometries[i] if geometries is not None else None,
+            )
+            if analyzer._session_ended:
+                break
+        return analyzer.get_final_report()
+    finally:
+        analyzer.close()
+
+
+def merged_config(challenge_type: str, overrides: Optional[Dict]) -> Dict:
+    """``CHALLENGE_DEFAULTS`` for the type with ``overrides[challenge_type]`` applied."""
+    config = dict(CHALLENGE_DEFAULTS.get(challenge_type, {}))
+    config.update((overrides or {}).get(challenge_type, {}))
+    return config
+
+
+def _load_frames(source: ReplaySource) -> List[Dict]:
+    """Stored frames of a source; JSON exports also fill in its metadata."""
+    from ....core.streaming.pose_timeline import PoseTimelineReader
+
+    if source.storage_key:
+        from ....services.storage_service import get_storage_service
+        return PoseTimelineReader.from_storage(get_storage_service().outputs, source.storage_key).read()
+    if source.path.endswith(".json"):
+        with open(source.path) as f:
+            data = json.load(f)
+        if source.challenge_type is None:
+            source.challenge_type = data.get("challenge_type")
+        if source.recorded_score is None:
+            source.recorded_score = data.get("score")
+        if source.session_id is None:
+            source.session_id = data.get("session_id")
+        return data.get("frame_timeline") or []
+    return PoseTimelineReader.from_path(source.path).read()
+
+
+def _replay_source(source: ReplaySource, configs: Dict[str, Optional[Dict]]) -> List[ReplayResult]:
+    """Load one session once and replay it under every config (worker entry point)."""
+    try:
+        frames = _load_frames(source)
+        geometries = timeline_geometry(frames) if len(configs) > 1 else None
+    except Exception as e:
+        return [ReplayResult(source.label, source.challenge_type or "?", name, 0, 0, 0.0, "", 0,
+                             source.recorded_score, error=f"load failed: {e}")
+                for name in configs]
+
+    results = []
+    for name, overrides in configs.items():
+        try:
+            report = replay_timeline(
+                source.challenge_type, frames, merged_config(source.challenge_type, overrides),
+                geometries,
+            )
+            results.append(ReplayResult(
+                source=source.label,
+                challenge_type=source.challenge_type,
+                config=name,
+                score=report["score"],
+                reps=report["reps"],
+                hold_seconds=report["hold_seconds"],
+                end_reason=report["end_reason"],
+                frames=len(frames),
+                recorded_score=source.recorded_score,
+            ))
+        except Exception as e:
+            results.append(ReplayResult(source.label, source.challenge_type or "?", name, 0, 0, 0.0, "",
+                                        len(frames), source.recorded_score, error=str(e)))
+    return results
+
+
+def replay_sessions(
+    sources: Sequence[ReplaySource],
+    configs: Optional[Dict[str, Optional[Dict]]] = None,
+    workers: Optional[int] = None,
+) -> List[ReplayResult]:
+    """Replay every source under every config, in parallel worker processes.
+
+    ``configs`` maps a name to per-challenge-type threshold overrides
+    (``{"squat_full": {"down_angle": 95}}``); a ``BASELINE`` entry with
+    the plain defaults is always included. ``workers=1`` runs inline.
+    """
+    configs = {BASELINE: None, **(configs or {})}
+    workers = workers or os.cpu_count() or 1
+    if workers <= 1 or len(sources) <= 1:
+        return [r for source in sources for r in _replay_source(source, configs)]
+
+    results: List[ReplayResult] = []
+    chunksize = max(1, len(sources) // (workers * 8))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for batch in pool.map(_replay_source, sources, [configs] * len(sources), chunksize=chunksize):
+            results.extend(batch)
+    return results
+
+
+def summarize(results: Iterable[ReplayResult], top: int = 10) -> Dict[str, ConfigSummary]:
+    """Per-config score deltas against ``BASELINE`` (sessions that replayed cleanly)."""
+    by_source: Dict[str, Dict[str, ReplayResult]] = {}
+    for r in results:
+        if r.error is None:
+            by_source.setdefault(r.source, {})[r.config] = r
+
+    summaries: Dict[str, ConfigSummary] = {}
+    for source, per_config in by_source.items():
+        base = per_config.get(BASELINE)
+        if base is None:
+            continue
+        for name, r in per_config.items():
+            s = summaries.setdefault(name, ConfigSummary(config=name))
+            delta = r.score - base.score
+            s.sessions += 1
+            s.total_delta += delta
+            s.mean_abs_delta += abs(delta)
+            if delta:
+                s.changed += 1
+                s.biggest.append({
+                    "source": source, "challenge_type": r.challenge_type,
+                    "baseline": base.score, "score": r.score, "delta": delta,
+                })
+
+    for s in summaries.values():
+        if s.sessions:
+            s.mean_abs_delta = round(s.mean_abs_delta / s.sessions, 3)
+        s.biggest = sorted(s.biggest, key=lambda d: abs(d["delta"]), reverse=True)[:top]
+    return summaries
+
+
+def sources_from_paths(paths: Iterable[str], challenge_type: Optional[str] = None) -> List[ReplaySource]:
+    """Sources for files and for ``.ptl``/``.json`` files inside directories."""
+    sources = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, names in os.walk(path):
+                for name in sorted(names):
+                    if name.endswith((".ptl", ".json")):
+                        sources.append(ReplaySource(path=os.path.join(root, name), challenge_type=challenge_type))
+        else:
+            sources.append(ReplaySource(path=path, challenge_type=challenge_type))
+    return sources
+
+
+def sources_from_db(
+    db,
+    challenge_type: Optional[str] = None,
+    limit: Optional[int] = None,
+) -> List[ReplaySource]:
+    """Sources for ended sessions whose pose timeline is in storage."""
+    from ..db_models.challenge import ChallengeSession, ChallengeStatus
+
+    q = db.query(
+        ChallengeSession.id, ChallengeSession.challenge_type,
+        ChallengeSession.score, ChallengeSession.pose_timeline_key,
+    ).filter(
+        ChallengeSession.status == ChallengeStatus.ENDED,
+        ChallengeSession.pose_timeline_key.isnot(None),
+        ChallengeSession.challenge_type.in_(REPLAYABLE_TYPES),
+    )
+    if challenge_type:
+        q = q.filter(ChallengeSession.challenge_type == challenge_type)
+    q = q.order_by(ChallengeSession.created_at.desc())
+    if limit:
+        q = q.limit(limit)
+    return [
+        ReplaySource(storage_key=key, challenge_type=ct, session_id=sid, recorded_score=score)
+        for sid, ct, score, key in q.all()
+    ]
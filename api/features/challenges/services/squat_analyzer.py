@@ -3,22 +3,17 @@
 Used by both squat_half and squat_full challenge types (different down_angle thresholds).
 """
 
-import math
 import logging
 from typing import Dict
 
-from ....core.streaming.pose_detector import PoseDetector
+from ....core.streaming.pose_geometry import (
+    NOSE, L_SHOULDER, R_SHOULDER, L_HIP, R_HIP, L_KNEE, R_KNEE, L_ANKLE, R_ANKLE,
+    LandmarksLike, PoseGeometry, pose_geometry,
+)
 from .rep_counter import RepCounterAnalyzer
 
 logger = logging.getLogger(__name__)
 
-# MediaPipe landmark indices
-NOSE = 0
-L_SHOULDER, R_SHOULDER = 11, 12
-L_HIP, R_HIP = 23, 24
-L_KNEE, R_KNEE = 25, 26
-L_ANKLE, R_ANKLE = 27, 28
-
 VISIBILITY_GROUPS = {
     "head": [NOSE],
     "shoulders": [L_SHOULDER, R_SHOULDER],
@@ -55,8 +50,8 @@ class SquatAnalyzer(RepCounterAnalyzer):
     - Left frame: key landmarks not visible for > left_frame_timeout (3s)
     """
 
-    def __init__(self, challenge_type="squat_full", config=None):
-        super().__init__(challenge_type=challenge_type, config=config)
+    def __init__(self, challenge_type="squat_full", config=None, replay: bool = False):
+        super().__init__(challenge_type=challenge_type, config=config, replay=replay)
         cfg = config or {}
         from .rep_counter import CHALLENGE_DEFAULTS
         defaults = CHALLENGE_DEFAULTS.get(challenge_type, {})
@@ -92,83 +87,56 @@ class SquatAnalyzer(RepCounterAnalyzer):
         self._went_partial = False  # tracking partial descent (challenge mode)
         self._prev_valid_angle = 170.0  # last trusted knee angle
 
-    def _ankle_above_knee(self, landmarks):
+    def _ankle_above_knee(self, geo: PoseGeometry):
         """True if either ankle is above its knee (impossible geometry)."""
-        return (landmarks[L_ANKLE]["ny"] < landmarks[L_KNEE]["ny"] - 0.02
-                or landmarks[R_ANKLE]["ny"] < landmarks[R_KNEE]["ny"] - 0.02)
+        return (geo.ny[L_ANKLE] < geo.ny[L_KNEE] - 0.02
+                or geo.ny[R_ANKLE] < geo.ny[R_KNEE] - 0.02)
 
-    def _lower_body_confidence(self, landmarks):
+    def _lower_body_confidence(self, geo: PoseGeometry):
         """Min visibility across hips, knees, ankles."""
+        vis = geo.visibility
         return min(
-            max(landmarks[L_HIP].get("visibility", 0), landmarks[R_HIP].get("visibility", 0)),
-            max(landmarks[L_KNEE].get("visibility", 0), landmarks[R_KNEE].get("visibility", 0)),
-            max(landmarks[L_ANKLE].get("visibility", 0), landmarks[R_ANKLE].get("visibility", 0)),
+            max(vis[L_HIP], vis[R_HIP]),
+            max(vis[L_KNEE], vis[R_KNEE]),
+            max(vis[L_ANKLE], vis[R_ANKLE]),
         )
 
-    def _process_pose(self, landmarks: list, timestamp: float) -> Dict:
+    def _process_pose(self, landmarks: LandmarksLike, timestamp: float) -> Dict:
+        geo = pose_geometry(landmarks)
+        vis = geo.visibility
+
         # --- Knee angle (primary rep metric) ---
-        left_angle = PoseDetector.angle_between(
-            (landmarks[L_HIP]["nx"], landmarks[L_HIP]["ny"]),
-            (landmarks[L_KNEE]["nx"], landmarks[L_KNEE]["ny"]),
-            (landmarks[L_ANKLE]["nx"], landmarks[L_ANKLE]["ny"]),
-        )
-        right_angle = PoseDetector.angle_between(
-            (landmarks[R_HIP]["nx"], landmarks[R_HIP]["ny"]),
-            (landmarks[R_KNEE]["nx"], landmarks[R_KNEE]["ny"]),
-            (landmarks[R_ANKLE]["nx"], landmarks[R_ANKLE]["ny"]),
-        )
-        raw_angle = (left_angle + right_angle) / 2
+        raw_angle = geo.mean("knee")
 
         # --- Guard: reject garbage angles from bad landmarks ---
         # If ankle is above knee (physically impossible) or confidence
         # is too low, hold the previous valid angle to prevent false reps.
-        lower_conf = self._lower_body_confidence(landmarks)
-        if self._ankle_above_knee(landmarks) or lower_conf < 0.5:
+        lower_conf = self._lower_body_confidence(geo)
+        if self._ankle_above_knee(geo) or lower_conf < 0.5:
             angle = self._prev_valid_angle
         else:
             angle = raw_angle
             self._prev_valid_angle = angle
 
         # --- Hip angle (shoulder-hip-knee) for lean detection ---
-        left_hip_angle = PoseDetector.angle_between(
-            (landmarks[L_SHOULDER]["nx"], landmarks[L_SHOULDER]["ny"]),
-            (landmarks[L_HIP]["nx"], landmarks[L_HIP]["ny"]),
-            (landmarks[L_KNEE]["nx"], landmarks[L_KNEE]["ny"]),
-        )
-        right_hip_angle = PoseDetector.angle_between(
-            (landmarks[R_SHOULDER]["nx"], landmarks[R_SHOULDER]["ny"]),
-            (landmarks[R_HIP]["nx"], landmarks[R_HIP]["ny"]),
-            (landmarks[R_KNEE]["nx"], landmarks[R_KNEE]["ny"]),
-        )
-        hip_angle = (left_hip_angle + right_hip_angle) / 2
+        hip_angle = geo.mean("hip")
 
         # --- Forward lean: angle of shoulder-hip line from vertical ---
-        shoulder_y = (landmarks[L_SHOULDER]["ny"] + landmarks[R_SHOULDER]["ny"]) / 2
-        shoulder_x = (landmarks[L_SHOULDER]["nx"] + landmarks[R_SHOULDER]["nx"]) / 2
-        hip_y = (landmarks[L_HIP]["ny"] + landmarks[R_HIP]["ny"]) / 2
-        hip_x = (landmarks[L_HIP]["nx"] + landmarks[R_HIP]["nx"]) / 2
-        dx = shoulder_x - hip_x
-        dy = shoulder_y - hip_y
-        lean_angle = abs(math.degrees(math.atan2(dx, -dy))) if abs(dy) > 0.01 else 0
+        lean_angle = geo.lean_angle
         leaning = lean_angle > self.lean_threshold
 
         # --- Knee cave detection ---
-        left_knee_x = landmarks[L_KNEE]["nx"]
-        right_knee_x = landmarks[R_KNEE]["nx"]
-        left_hip_x = landmarks[L_HIP]["nx"]
-        right_hip_x = landmarks[R_HIP]["nx"]
-        knee_spread = abs(left_knee_x - right_knee_x)
-        hip_spread = abs(left_hip_x - right_hip_x)
+        knee_spread = geo.knee_x_gap
+        hip_spread = geo.hip_x_gap
         knees_caving = knee_spread < hip_spread * self.knee_cave_ratio if hip_spread > 0.01 else False
 
         # --- Sat-down detection: hips below ankle level ---
-        ankle_y = (landmarks[L_ANKLE]["ny"] + landmarks[R_ANKLE]["ny"]) / 2
-        hips_below_ankles = hip_y > ankle_y + 0.02
+        hips_below_ankles = geo.hip[1] > geo.ankle[1] + 0.02
 
         # --- Left frame tracking ---
-        hip_vis = max(landmarks[L_HIP].get("visibility", 0), landmarks[R_HIP].get("visibility", 0))
-        knee_vis = max(landmarks[L_KNEE].get("visibility", 0), landmarks[R_KNEE].get("visibility", 0))
-        ankle_vis = max(landmarks[L_ANKLE].get("visibility", 0), landmarks[R_ANKLE].get("visibility", 0))
+        hip_vis = max(vis[L_HIP], vis[R_HIP])
+        knee_vis = max(vis[L_KNEE], vis[R_KNEE])
+        ankle_vis = max(vis[L_ANKLE], vis[R_ANKLE])
         key_visible = hip_vis >= 0.4 and knee_vis >= 0.4 and ankle_vis >= 0.4
 
         if key_visible:
@@ -181,7 +149,7 @@ class SquatAnalyzer(RepCounterAnalyzer):
         # --- Visibility gate before ready ---
         if not self._ready:
             for group_name, indices in VISIBILITY_GROUPS.items():
-                best_vis = max(landmarks[i].get("visibility", 0) for i in indices)
+                best_vis = max(vis[i] for i in indices)
                 if best_vis < VISIBILITY_THRESHOLD:
                     self.form_feedback = VISIBILITY_MESSAGES[group_name]
                     return self._build_result(angle, hip_angle, lean_angle, depth_good, knees_caving, leaning)
@@ -4,22 +4,17 @@ Plank-like hold pattern: timer accumulates while in good squat form (knee angle
 below threshold, torso upright). Pauses when standing up or leaning too far.
 """
 
-import math
 import logging
 from typing import Dict
 
-from ....core.streaming.pose_detector import PoseDetector
+from ....core.streaming.pose_geometry import (
+    NOSE, L_SHOULDER, R_SHOULDER, L_HIP, R_HIP, L_KNEE, R_KNEE, L_ANKLE, R_ANKLE,
+    LandmarksLike, PoseGeometry, pose_geometry,
+)
 from .rep_counter import RepCounterAnalyzer
 
 logger = logging.getLogger(__name__)
 
-# MediaPipe landmark indices
-NOSE = 0
-L_SHOULDER, R_SHOULDER = 11, 12
-L_HIP, R_HIP = 23, 24
-L_KNEE, R_KNEE = 25, 26
-L_ANKLE, R_ANKLE = 27, 28
-
 VISIBILITY_GROUPS = {
     "head": [NOSE],
     "shoulders": [L_SHOULDER, R_SHOULDER],
@@ -50,8 +45,8 @@ class SquatHoldAnalyzer(RepCounterAnalyzer):
     - Left frame: key landmarks not visible for > left_frame_timeout (3s)
     """
 
-    def __init__(self, config=None):
-        super().__init__(challenge_type="squat_hold", config=config)
+    def __init__(self, config=None, replay: bool = False):
+        super().__init__(challenge_type="squat_hold", config=config, replay=replay)
         cfg = config or {}
         from .rep_counter import CHALLENGE_DEFAULTS
         defaults = CHALLENGE_DEFAULTS.get("squat_hold", {})
@@ -87,55 +82,43 @@ class SquatHoldAnalyzer(RepCounterAnalyzer):
         self._half_hold_seconds = 0.0   # hold_angle_max > angle >= full_depth_angle
         self._full_hold_seconds = 0.0   # angle < full_depth_angle
 
-    def _ankle_above_knee(self, landmarks):
+    def _ankle_above_knee(self, geo: PoseGeometry):
         """True if either ankle is above its knee (impossible geometry)."""
-        return (landmarks[L_ANKLE]["ny"] < landmarks[L_KNEE]["ny"] - 0.02
-                or landmarks[R_ANKLE]["ny"] < landmarks[R_KNEE]["ny"] - 0.02)
+        return (geo.ny[L_ANKLE] < geo.ny[L_KNEE] - 0.02
+                or geo.ny[R_ANKLE] < geo.ny[R_KNEE] - 0.02)
 
-    def _lower_body_confidence(self, landmarks):
+    def _lower_body_confidence(self, geo: PoseGeometry):
         """Min visibility across hips, knees, ankles."""
+        vis = geo.visibility
         return min(
-            max(landmarks[L_HIP].get("visibility", 0), landmarks[R_HIP].get("visibility", 0)),
-            max(landmarks[L_KNEE].get("visibility", 0), landmarks[R_KNEE].get("visibility", 0)),
-            max(landmarks[L_ANKLE].get("visibility", 0), landmarks[R_ANKLE].get("visibility", 0)),
+            max(vis[L_HIP], vis[R_HIP]),
+            max(vis[L_KNEE], vis[R_KNEE]),
+            max(vis[L_ANKLE], vis[R_ANKLE]),
         )
 
-    def _process_pose(self, landmarks: list, timestamp: float) -> Dict:
+    def _process_pose(self, landmarks: LandmarksLike, timestamp: float) -> Dict:
+        geo = pose_geometry(landmarks)
+        vis = geo.visibility
+
         # --- Knee angle ---
-        left_angle = PoseDetector.angle_between(
-            (landmarks[L_HIP]["nx"], landmarks[L_HIP]["ny"]),
-            (landmarks[L_KNEE]["nx"], landmarks[L_KNEE]["ny"]),
-            (landmarks[L_ANKLE]["nx"], landmarks[L_ANKLE]["ny"]),
-        )
-        right_angle = PoseDetector.angle_between(
-            (landmarks[R_HIP]["nx"], landmarks[R_HIP]["ny"]),
-            (landmarks[R_KNEE]["nx"], landmarks[R_KNEE]["ny"]),
-            (landmarks[R_ANKLE]["nx"], landmarks[R_ANKLE]["ny"]),
-        )
-        raw_angle = (left_angle + right_angle) / 2
+        raw_angle = geo.mean("knee")
 
         # --- Guard: reject garbage angles from bad landmarks ---
-        lower_conf = self._lower_body_confidence(landmarks)
-        if self._ankle_above_knee(landmarks) or lower_conf < 0.5:
+        lower_conf = self._lower_body_confidence(geo)
+        if self._ankle_above_knee(geo) or lower_conf < 0.5:
             angle = self._prev_valid_angle
         else:
             angle = raw_angle
             self._prev_valid_angle = angle
 
         # --- Forward lean ---
-        shoulder_y = (landmarks[L_SHOULDER]["ny"] + landmarks[R_SHOULDER]["ny"]) / 2
-        shoulder_x = (landmarks[L_SHOULDER]["nx"] + landmarks[R_SHOULDER]["nx"]) / 2
-        hip_y = (landmarks[L_HIP]["ny"] + landmarks[R_HIP]["ny"]) / 2
-        hip_x = (landmarks[L_HIP]["nx"] + landmarks[R_HIP]["nx"]) / 2
-        dx = shoulder_x - hip_x
-        dy = shoulder_y - hip_y
-        lean_angle = abs(math.degrees(math.atan2(dx, -dy))) if abs(dy) > 0.01 else 0
+        lean_angle = geo.lean_angle
         leaning = lean_angle > self.lean_threshold
 
         # --- Left frame tracking ---
-        hip_vis = max(landmarks[L_HIP].get("visibility", 0), landmarks[R_HIP].get("visibility", 0))
-        knee_vis = max(landmarks[L_KNEE].get("visibility", 0), landmarks[R_KNEE].get("visibility", 0))
-        ankle_vis = max(landmarks[L_ANKLE].get("visibility", 0), landmarks[R_ANKLE].get("visibility", 0))
+        hip_vis = max(vis[L_HIP], vis[R_HIP])
+        knee_vis = max(vis[L_KNEE], vis[R_KNEE])
+        ankle_vis = max(vis[L_ANKLE], vis[R_ANKLE])
         key_visible = hip_vis >= 0.4 and knee_vis >= 0.4 and ankle_vis >= 0.4
 
         if key_visible:
@@ -150,7 +133,7 @@ class SquatHoldAnalyzer(RepCounterAnalyzer):
         # --- Visibility gate before ready ---
         if not self._ready:
             for group_name, indices in VISIBILITY_GROUPS.items():
-                best_vis = max(landmarks[i].get("visibility", 0) for i in indices)
+                best_vis = max(vis[i] for i in indices)
                 if best_vis < VISIBILITY_THRESHOLD:
                     self.form_feedback = VISIBILITY_MESSAGES[group_name]
                     return {"angle": round(angle, 1), "in_hold": False, "leaning": leaning}
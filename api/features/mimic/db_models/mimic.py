@@ -43,7 +43,9 @@ class MimicChallenge(Base):
     annotated_video_local_path = Column(String(512), nullable=True)
     annotated_video_s3_key = Column(String(512), nullable=True)
 
-    pose_timeline = Column(JSON, nullable=True)
+    pose_timeline = Column(JSON, nullable=True)  # legacy; new challenges use pose_timeline_key
+    pose_timeline_key = Column(String(512), nullable=True)  # .npz in output storage
+    pose_timeline_version = Column(Integer, default=0)
     total_frames = Column(Integer, default=0)
     processing_status = Column(
         Enum(MimicProcessingStatus), default=MimicProcessingStatus.PENDING
@@ -5,6 +5,7 @@ import logging
 import shutil
 import zipfile
 from datetime import datetime
+from functools import partial
 from pathlib import Path
 from typing import Optional
 
@@ -13,9 +14,10 @@ from fastapi.responses import FileResponse, Response
 from sqlalchemy.orm import Session, defer
 
 from ....config import get_settings
-from ....database import get_db
+from ....database import SessionLocal, get_db
 from ....routers.auth import get_current_user
 from ....services.storage_service import get_storage_service
+from ....core.streaming.pose_pool import PoseDetectorPoolExhausted
 from ....core.streaming.session_manager import get_generic_session_manager
 from ..db_models.mimic import (
     MimicChallenge, MimicSession, MimicRecord,
@@ -27,6 +29,7 @@ from ..models.mimic import (
 )
 from ..services.mimic_analyzer import MimicAnalyzer
 from ..services.reference_processor import process_reference_video
+from ..services.reference_timeline import get_reference_timeline, get_reference_timeline_cache
 from ..services.pose_similarity import generate_summary_feedback
 from ..services.video_comparator import compare_video
 
@@ -374,7 +377,9 @@ def create_mimic_session(
     user=Depends(get_current_user),
 ):
     """Create a mimic session and register the analyzer."""
-    challenge = db.query(MimicChallenge).filter(
+    challenge = db.query(MimicChallenge).options(
+        defer(MimicChallenge.pose_timeline)
+    ).filter(
         MimicChallenge.id == body.challenge_id
     ).first()
     if not challenge:
@@ -399,12 +404,27 @@ def create_mimic_session(
     challenge.play_count = (challenge.play_count or 0) + 1
     db.commit()
 
+    try:
+        reference_timeline = get_reference_timeline(challenge)
+    except Exception as e:
+        logger.error(f"Mimic session {session.id}: failed to load reference timeline: {e}")
+        db.delete(session)
+        db.commit()
+        raise HTTPException(status_code=500, detail="Failed to load challenge reference")
+
     # Create analyzer with reference data
-    analyzer = MimicAnalyzer(
-        reference_timeline=challenge.pose_timeline or [],
-        reference_fps=challenge.video_fps or 30.0,
-        reference_duration=challenge.video_duration or 1.0,
-    )
+    try:
+        analyzer = MimicAnalyzer(
+            reference_timeline=reference_timeline,
+            reference_fps=challenge.video_fps or 30.0,
+            reference_duration=challenge.video_duration or 1.0,
+        )
+    except PoseDetectorPoolExhausted as e:
+        logger.warning(f"Mimic session {session.id}: {e}")
+        db.delete(session)
+        db.commit()
+        raise HTTPException(status_code=503, detail="Server busy — try again shortly")
+    analyzer.start_screenshots(_mimic_screenshot_prefix(user.id, session.id))
 
     gsm = get_generic_session_manager()
     gsm.register_session(session.id, "mimic", analyzer)
@@ -441,11 +461,11 @@ def end_mimic_session(
 
     gsm = get_generic_session_manager()
 
-    # Grab screenshots before ending session (which destroys the analyzer)
-    screenshots = []
+    # Finish screenshots before ending session (which destroys the analyzer)
+    screenshot_count = 0
     analyzer_ref = gsm.get_session(session_id)
-    if analyzer_ref and hasattr(analyzer_ref, 'get_screenshots'):
-        screenshots = analyzer_ref.get_screenshots()
+    if analyzer_ref and hasattr(analyzer_ref, 'finish_screenshots'):
+        screenshot_count = analyzer_ref.finish_screenshots()
 
     report = gsm.end_session(session_id) or {}
 
@@ -477,9 +497,10 @@ def end_mimic_session(
         db.add(record)
 
     # Save screenshots
-    _save_mimic_screenshots(screenshots, session, user.id)
+    _save_mimic_screenshots(screenshot_count, session, user.id)
 
     db.commit()
+    _watch_mimic_screenshots(analyzer_ref, screenshot_count, session.id)
     db.refresh(session)
 
     return _build_session_response(session, record)
@@ -1021,23 +1042,45 @@ def get_annotated_video(
 # ---------- Helpers ----------
 
 
-def _save_mimic_screenshots(screenshots: list, session: MimicSession, user_id: int):
-    """Save per-second annotated screenshots to storage."""
-    if not screenshots:
+def _mimic_screenshot_prefix(user_id: int, session_id: int) -> str:
+    return f"mimic/{user_id}/session_{session_id}/screenshots/"
+
+
+def _save_mimic_screenshots(screenshot_count: int, session: MimicSession, user_id: int):
+    """Point the session at its per-second screenshots (uploaded by the analyzer's stream)."""
+    if not screenshot_count:
         return
-    storage = get_storage_service()
-    prefix = f"mimic/{user_id}/session_{session.id}/screenshots/"
-    for i, jpg_bytes in enumerate(screenshots):
-        key = f"{prefix}{i:04d}.jpg"
-        storage.outputs.save(key, jpg_bytes, content_type="image/jpeg")
-    session.screenshots_s3_prefix = prefix
-    session.screenshot_count = len(screenshots)
-    logger.info(f"Saved {len(screenshots)} mimic screenshots for session {session.id}")
+    session.screenshots_s3_prefix = _mimic_screenshot_prefix(user_id, session.id)
+    session.screenshot_count = screenshot_count
+    logger.info(f"Mimic session {session.id}: {screenshot_count} screenshots")
+
+
+def _watch_mimic_screenshots(analyzer, screenshot_count: int, session_id: int):
+    """Correct the session's screenshot count once the uploads finish
+    (some may fail to render or upload). Call after committing the session."""
+    if analyzer and screenshot_count and hasattr(analyzer, 'on_screenshots_uploaded'):
+        analyzer.on_screenshots_uploaded(
+            partial(_correct_mimic_screenshot_count, session_id, screenshot_count))
+
+
+def _correct_mimic_screenshot_count(session_id: int, accepted: int, stored: int):
+    """Runs on a screenshot worker; stored screenshots have no gaps."""
+    if stored == accepted:
+        return
+    db = SessionLocal()
+    try:
+        db.query(MimicSession).filter(MimicSession.id == session_id).update(
+            {"screenshot_count": stored}, synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
+    logger.warning(f"Mimic session {session_id}: {stored} of {accepted} screenshots stored")
 
 
 def _cleanup_challenge_files(challenge: MimicChallenge, db: Session):
     """Clean up local + S3 files for a challenge and its sessions."""
     storage = get_storage_service()
+    get_reference_timeline_cache().invalidate(challenge.id)
 
     # Clean up local files
     for path in (
@@ -1064,6 +1107,13 @@ def _cleanup_challenge_files(challenge: MimicChallenge, db: Session):
                 except Exception as e:
                     logger.warning(f"Failed to delete S3 key {key}: {e}")
 
+    # The reference timeline lives in outputs storage on either backend
+    if challenge.pose_timeline_key:
+        try:
+            storage.outputs.delete(challenge.pose_timeline_key)
+        except Exception as e:
+            logger.warning(f"Failed to delete reference timeline {challenge.pose_timeline_key}: {e}")
+
     # Clean up session screenshots from S3
     sessions = db.query(MimicSession).filter(
         MimicSession.challenge_id == challenge.id
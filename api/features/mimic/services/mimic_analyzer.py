@@ -9,11 +9,16 @@ similarity scores per frame.
 import cv2
 import numpy as np
 import logging
-from typing import Dict, List, Optional
+from functools import partial
+from typing import Callable, Dict, List, Optional
 
 from ....core.streaming.base_analyzer import BaseStreamAnalyzer
-from ....core.streaming.pose_detector import PoseDetector, SKELETON_CONNECTIONS
+from ....core.streaming.pose_detector import SKELETON_CONNECTIONS
+from ....core.streaming.pose_pool import get_pose_detector_pool
+from ....core.streaming.screenshots import ScreenshotStream
+from ....core.tracing import stage
 from .pose_similarity import compute_all_similarities, generate_feedback
+from .reference_timeline import ReferenceTimeline
 
 logger = logging.getLogger(__name__)
 
@@ -23,18 +28,21 @@ class MimicAnalyzer(BaseStreamAnalyzer):
 
     def __init__(
         self,
-        reference_timeline: List[dict],
+        reference_timeline: ReferenceTimeline,
         reference_fps: float,
         reference_duration: float,
     ):
-        self.ref_timeline = reference_timeline
+        self.ref_timeline = reference_timeline  # shared between sessions; read-only
+        self._ref_cursor = self.ref_timeline.cursor()
         self.ref_fps = reference_fps or 30.0
         self.ref_duration = reference_duration or 1.0
 
-        self.detector = PoseDetector(
+        self._detector_pool = get_pose_detector_pool()
+        self.detector = self._detector_pool.checkout(
             model_complexity=1,
             min_detection_confidence=0.5,
             min_tracking_confidence=0.4,
+            owner=self,
         )
 
         # Session state
@@ -43,8 +51,9 @@ class MimicAnalyzer(BaseStreamAnalyzer):
         self.frames_processed = 0
         self._prev_landmarks: Optional[List[Dict]] = None
 
-        # Per-second screenshots (for admin review)
-        self._screenshots: List[bytes] = []
+        # Per-second screenshots (for admin review); drawn, encoded and
+        # uploaded in the background once bound
+        self._screenshots = ScreenshotStream()
         self._last_screenshot_ts: float = -1.0
 
     _EMA_ALPHA = 0.4  # responsive but smooth
@@ -81,14 +90,16 @@ class MimicAnalyzer(BaseStreamAnalyzer):
         elapsed = timestamp - self.start_time
 
         # Decode frame
-        frame = cv2.imdecode(
-            np.frombuffer(frame_data, np.uint8), cv2.IMREAD_COLOR
-        )
+        with stage("jpeg_decode"):
+            frame = cv2.imdecode(
+                np.frombuffer(frame_data, np.uint8), cv2.IMREAD_COLOR
+            )
         if frame is None:
             return {"type": "mimic_update", "error": "invalid_frame"}
 
         # Detect user pose
-        pose_result = self.detector.detect(frame)
+        with stage("pose"):
+            pose_result = self.detector.detect(frame)
         self.frames_processed += 1
 
         # Time alignment: use client-provided ref_time when available,
@@ -97,8 +108,7 @@ class MimicAnalyzer(BaseStreamAnalyzer):
             ref_time = ref_time % self.ref_duration if self.ref_duration > 0 else 0
         else:
             ref_time = elapsed % self.ref_duration if self.ref_duration > 0 else 0
-        ref_frame_idx = self._find_closest_ref_frame(ref_time)
-        ref_entry = self.ref_timeline[ref_frame_idx] if ref_frame_idx is not None else None
+        ref_frame_idx = self._ref_cursor.seek(ref_time)
 
         # Build response
         response: Dict = {
@@ -124,12 +134,9 @@ class MimicAnalyzer(BaseStreamAnalyzer):
             }
 
         # Add reference landmarks for overlay
-        if ref_entry and ref_entry.get("lm"):
-            ref_lm_dicts = [
-                {"nx": lm[0], "ny": lm[1], "visibility": lm[2]}
-                for lm in ref_entry["lm"]
-            ]
-            response["ref_landmarks"] = ref_entry["lm"]
+        if ref_frame_idx is not None and self.ref_timeline.has_pose(ref_frame_idx):
+            ref_lm_dicts = self.ref_timeline.landmark_dicts(ref_frame_idx)
+            response["ref_landmarks"] = self.ref_timeline.landmarks(ref_frame_idx)
         else:
             ref_lm_dicts = None
 
@@ -139,8 +146,14 @@ class MimicAnalyzer(BaseStreamAnalyzer):
             user_lm_smoothed
             and ref_lm_dicts
         ):
-            scores = compute_all_similarities(user_lm_smoothed, ref_lm_dicts)
-            feedback = generate_feedback(user_lm_smoothed, ref_lm_dicts)
+            with stage("classify"):
+                ref_angles = self.ref_timeline.joint_angles(ref_frame_idx)
+                scores = compute_all_similarities(
+                    user_lm_smoothed, ref_lm_dicts,
+                    ref_norm=self.ref_timeline.normalized_dicts(ref_frame_idx),
+                    ref_angles=ref_angles,
+                )
+                feedback = generate_feedback(user_lm_smoothed, ref_lm_dicts, ref_angles=ref_angles)
 
             response["scores"] = scores
             response["feedback"] = feedback
@@ -165,9 +178,9 @@ class MimicAnalyzer(BaseStreamAnalyzer):
 
         # Capture 1 screenshot per second (for admin review)
         if pose_result.player_detected and elapsed - self._last_screenshot_ts >= 1.0:
-            annotated = self._draw_screenshot_overlay(frame, pose_result, scores, ref_time)
-            _, buf = cv2.imencode('.jpg', annotated, [cv2.IMWRITE_JPEG_QUALITY, 80])
-            self._screenshots.append(buf.tobytes())
+            self._screenshots.capture(partial(
+                self._draw_screenshot_overlay, frame, pose_result, scores, ref_time,
+            ))
             self._last_screenshot_ts = elapsed
 
         return response
@@ -211,9 +224,18 @@ class MimicAnalyzer(BaseStreamAnalyzer):
 
         return img
 
-    def get_screenshots(self) -> List[bytes]:
-        """Return captured per-second screenshots."""
-        return self._screenshots
+    def start_screenshots(self, prefix: str):
+        """Upload per-second screenshots under ``prefix`` as the session runs."""
+        self._screenshots.bind(prefix)
+
+    def finish_screenshots(self) -> int:
+        """Stop capturing; returns the screenshot count (uploads finish in the background)."""
+        return self._screenshots.finish()
+
+    def on_screenshots_uploaded(self, callback: Callable[[int], None]):
+        """Call ``callback(count)`` once the finished screenshots are uploaded;
+        ``count`` is lower than ``finish_screenshots`` returned if some failed."""
+        self._screenshots.on_uploaded(callback)
 
     def get_final_report(self) -> Dict:
         """Generate summary report when the session ends."""
@@ -280,35 +302,21 @@ class MimicAnalyzer(BaseStreamAnalyzer):
 
         return sections
 
-    def _find_closest_ref_frame(self, ref_time: float) -> Optional[int]:
-        """Find the timeline frame closest to the given reference time."""
-        if not self.ref_timeline:
-            return None
-
-        best_idx = 0
-        best_diff = abs(self.ref_timeline[0].get("t", 0) - ref_time)
-
-        for i, entry in enumerate(self.ref_timeline):
-            diff = abs(entry.get("t", 0) - ref_time)
-            if diff < best_diff:
-                best_diff = diff
-                best_idx = i
-            elif diff > best_diff:
-                # Timeline is sorted — once diff increases, stop
-                break
-
-        return best_idx
-
     def reset(self):
         """Reset state for a new session."""
         self.frame_scores = []
         self.start_time = None
         self.frames_processed = 0
         self._prev_landmarks = None
-        self._screenshots = []
+        self._ref_cursor = self.ref_timeline.cursor()
+        # Delete what it uploaded before the new stream reuses the prefix
+        self._screenshots.discard(wait=True)
+        self._screenshots = ScreenshotStream(self._screenshots.prefix)
         self._last_screenshot_ts = -1.0
 
     def close(self):
         """Release resources."""
+        self._screenshots.discard()
         if self.detector:
-            self.detector.close()
+            self._detector_pool.checkin(self.detector)
+            self.detector = None
@@ -9,6 +9,11 @@ Three scoring methods computed per frame:
 All functions are pure — no DB or session dependencies.
 Landmarks are expected as lists of dicts with keys: nx, ny, visibility
 (normalized 0-1 coordinates from MediaPipe).
+
+The reference side of a comparison never changes between users, so its
+normalised landmarks (``ref_norm``) and joint angles (``ref_angles``)
+can be passed in precomputed (see ``reference_timeline``); when omitted
+they are computed from ``ref_lm``.
 """
 
 import math
@@ -79,6 +84,17 @@ def _magnitude(v: List[float]) -> float:
     return math.sqrt(sum(x * x for x in v))
 
 
+def _ref_angle(
+    ref_lm: List[Dict], ref_angles: Optional[Dict[str, float]], name: str, a_idx: int, b_idx: int, c_idx: int
+) -> float:
+    """Reference joint angle: precomputed if given, else from the landmarks."""
+    if ref_angles is not None and name in ref_angles:
+        return ref_angles[name]
+    return PoseDetector.angle_between(
+        _lm_to_xy(ref_lm[a_idx]), _lm_to_xy(ref_lm[b_idx]), _lm_to_xy(ref_lm[c_idx])
+    )
+
+
 def _sigmoid_map(raw: float, center: float = 50.0, steepness: float = 0.08) -> float:
     """Map raw 0-100 through sigmoid for intuitive distribution.
 
@@ -147,7 +163,9 @@ def weighted_cosine_score(user_lm: List[Dict], ref_lm: List[Dict]) -> float:
     return max(0.0, min(100.0, (cos_sim - 0.5) / 0.5 * 100.0))
 
 
-def normalized_cosine_score(user_lm: List[Dict], ref_lm: List[Dict]) -> float:
+def normalized_cosine_score(
+    user_lm: List[Dict], ref_lm: List[Dict], ref_norm: Optional[List[Dict]] = None
+) -> float:
     """
     Method B: Normalized cosine similarity.
 
@@ -159,14 +177,16 @@ def normalized_cosine_score(user_lm: List[Dict], ref_lm: List[Dict]) -> float:
         return 0.0
 
     u_norm = _normalize_landmarks(user_lm)
-    r_norm = _normalize_landmarks(ref_lm)
+    r_norm = ref_norm or _normalize_landmarks(ref_lm)
     if u_norm is None or r_norm is None:
         return weighted_cosine_score(user_lm, ref_lm)
 
     return weighted_cosine_score(u_norm, r_norm)
 
 
-def angle_comparison_score(user_lm: List[Dict], ref_lm: List[Dict]) -> float:
+def angle_comparison_score(
+    user_lm: List[Dict], ref_lm: List[Dict], ref_angles: Optional[Dict[str, float]] = None
+) -> float:
     """
     Method C: Joint angle comparison.
 
@@ -196,9 +216,7 @@ def angle_comparison_score(user_lm: List[Dict], ref_lm: List[Dict]) -> float:
         u_angle = PoseDetector.angle_between(
             _lm_to_xy(user_lm[a_idx]), _lm_to_xy(user_lm[b_idx]), _lm_to_xy(user_lm[c_idx])
         )
-        r_angle = PoseDetector.angle_between(
-            _lm_to_xy(ref_lm[a_idx]), _lm_to_xy(ref_lm[b_idx]), _lm_to_xy(ref_lm[c_idx])
-        )
+        r_angle = _ref_angle(ref_lm, ref_angles, name, a_idx, b_idx, c_idx)
 
         diff = abs(u_angle - r_angle)
         sigma = JOINT_SIGMA.get(name, 20.0)
@@ -213,14 +231,15 @@ def angle_comparison_score(user_lm: List[Dict], ref_lm: List[Dict]) -> float:
 
 
 def region_score(
-    user_lm: List[Dict], ref_lm: List[Dict], indices: List[int]
+    user_lm: List[Dict], ref_lm: List[Dict], indices: List[int],
+    ref_norm: Optional[List[Dict]] = None,
 ) -> float:
     """Score a subset of landmarks using normalized cosine similarity."""
     if not user_lm or not ref_lm:
         return 0.0
 
     u_norm = _normalize_landmarks(user_lm) or user_lm
-    r_norm = _normalize_landmarks(ref_lm) or ref_lm
+    r_norm = ref_norm or _normalize_landmarks(ref_lm) or ref_lm
 
     n = min(len(u_norm), len(r_norm))
     valid_indices = [i for i in indices if i < n]
@@ -234,7 +253,10 @@ def region_score(
 
 
 def compute_all_similarities(
-    user_lm: List[Dict], ref_lm: List[Dict]
+    user_lm: List[Dict],
+    ref_lm: List[Dict],
+    ref_norm: Optional[List[Dict]] = None,
+    ref_angles: Optional[Dict[str, float]] = None,
 ) -> Dict:
     """
     Compute all similarity metrics for a single frame.
@@ -243,14 +265,16 @@ def compute_all_similarities(
     """
     return {
         "cosine_raw": round(weighted_cosine_score(user_lm, ref_lm), 1),
-        "cosine_normalized": round(normalized_cosine_score(user_lm, ref_lm), 1),
-        "angle_score": round(_sigmoid_map(angle_comparison_score(user_lm, ref_lm)), 1),
-        "upper_body": round(region_score(user_lm, ref_lm, UPPER_INDICES), 1),
-        "lower_body": round(region_score(user_lm, ref_lm, LOWER_INDICES), 1),
+        "cosine_normalized": round(normalized_cosine_score(user_lm, ref_lm, ref_norm), 1),
+        "angle_score": round(_sigmoid_map(angle_comparison_score(user_lm, ref_lm, ref_angles)), 1),
+        "upper_body": round(region_score(user_lm, ref_lm, UPPER_INDICES, ref_norm), 1),
+        "lower_body": round(region_score(user_lm, ref_lm, LOWER_INDICES, ref_norm), 1),
     }
 
 
-def generate_feedback(user_lm: List[Dict], ref_lm: List[Dict]) -> str:
+def generate_feedback(
+    user_lm: List[Dict], ref_lm: List[Dict], ref_angles: Optional[Dict[str, float]] = None
+) -> str:
     """
     Generate actionable feedback by finding the joint with the largest
     angle difference between user and reference poses.
@@ -281,9 +305,7 @@ def generate_feedback(user_lm: List[Dict], ref_lm: List[Dict]) -> str:
         u_angle = PoseDetector.angle_between(
             _lm_to_xy(user_lm[a_idx]), _lm_to_xy(user_lm[b_idx]), _lm_to_xy(user_lm[c_idx])
         )
-        r_angle = PoseDetector.angle_between(
-            _lm_to_xy(ref_lm[a_idx]), _lm_to_xy(ref_lm[b_idx]), _lm_to_xy(ref_lm[c_idx])
-        )
+        r_angle = _ref_angle(ref_lm, ref_angles, name, a_idx, b_idx, c_idx)
 
         diff = abs(u_angle - r_angle)
         if diff > worst_diff:
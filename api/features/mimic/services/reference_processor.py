@@ -1,8 +1,9 @@
 """
 Background job: process a reference video into a pose timeline.
 
-Opens the video with cv2, runs PoseDetector on each frame, stores
-the resulting landmark+angle timeline as JSON on the MimicChallenge row.
+Opens the video with cv2, runs PoseDetector on each frame, and stores
+the resulting timeline as a compact ``.npz`` in output storage (see
+reference_timeline.py), pointed to by the MimicChallenge row.
 Also generates an annotated video with skeleton overlay for admin review.
 """
 
@@ -15,6 +16,7 @@ from pathlib import Path
 from typing import List, Optional
 
 from ....core.streaming.pose_detector import PoseDetector, SKELETON_CONNECTIONS
+from ....core.streaming.pose_pool import get_offline_pose_detector_pool
 
 logger = logging.getLogger(__name__)
 
@@ -72,7 +74,7 @@ def _process(challenge_id: int):
         # Extract thumbnail at ~2 second mark
         thumbnail_path = _extract_thumbnail(video_path, challenge_id)
 
-        challenge.pose_timeline = timeline["frames"]
+        superseded_timeline = _save_reference_timeline(challenge, timeline["frames"])
         challenge.total_frames = timeline["total_frames"]
         challenge.video_duration = timeline["duration"]
         challenge.video_fps = timeline["fps"]
@@ -89,6 +91,8 @@ def _process(challenge_id: int):
             challenge.annotated_video_local_path = annotated_path
 
         db.commit()
+        if superseded_timeline:
+            _delete_reference_timeline(superseded_timeline)
 
         # Upload processed files to S3 (non-fatal on failure)
         try:
@@ -133,6 +137,43 @@ def _process(challenge_id: int):
         _processing_semaphore.release()
 
 
+def _save_reference_timeline(challenge, frames: List[dict]) -> Optional[str]:
+    """Store the timeline as a new ``.npz`` version (JSON column if storage fails).
+
+    Returns the previous version's key, to delete once the challenge row
+    pointing at the new one is committed.
+    """
+    from ....services.storage_service import get_storage_service
+    from .reference_timeline import ReferenceTimeline, get_reference_timeline_cache, reference_timeline_key
+
+    previous_key = challenge.pose_timeline_key
+    version = (challenge.pose_timeline_version or 0) + 1
+    key = reference_timeline_key(challenge.id, version)
+    try:
+        data = ReferenceTimeline.from_frames(frames).to_npz()
+        get_storage_service().outputs.save(key, data, content_type="application/octet-stream")
+    except Exception as e:
+        logger.warning(f"Failed to store reference timeline for challenge {challenge.id}, keeping JSON: {e}")
+        challenge.pose_timeline = frames
+        challenge.pose_timeline_key = None
+    else:
+        logger.info(f"Stored reference timeline {key} ({len(data) / 1e3:.0f} kB)")
+        challenge.pose_timeline = None
+        challenge.pose_timeline_key = key
+    challenge.pose_timeline_version = version
+    get_reference_timeline_cache().invalidate(challenge.id)
+    return previous_key if previous_key != challenge.pose_timeline_key else None
+
+
+def _delete_reference_timeline(key: str):
+    """Best-effort delete of a superseded reference timeline."""
+    from ....services.storage_service import get_storage_service
+    try:
+        get_storage_service().outputs.delete(key)
+    except Exception as e:
+        logger.warning(f"Failed to delete old reference timeline {key}: {e}")
+
+
 def _extract_pose_timeline(video_path: str) -> Optional[dict]:
     """Extract pose landmarks from every frame of a video."""
     cap = cv2.VideoCapture(video_path)
@@ -143,7 +184,8 @@ def _extract_pose_timeline(video_path: str) -> Optional[dict]:
     fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
     total_frames_est = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
 
-    detector = PoseDetector(
+    pool = get_offline_pose_detector_pool()
+    detector = pool.checkout(
         model_complexity=1,
         min_detection_confidence=0.5,
         min_tracking_confidence=0.4,
@@ -182,7 +224,7 @@ def _extract_pose_timeline(video_path: str) -> Optional[dict]:
             frame_idx += 1
 
     finally:
-        detector.close()
+        pool.checkin(detector)
         cap.release()
 
     duration = frame_idx / fps if fps > 0 else 0
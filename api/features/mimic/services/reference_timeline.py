@@ -0,0 +1,327 @@
+"""
+Reference pose timelines for mimic comparison: indexed, compact, cached.
+
+Lookup. Both the live ``MimicAnalyzer`` and the offline
+``video_comparator`` need the reference frame closest to a playback time
+for every user frame. ``ReferenceTimeline`` keeps the frame times sorted
+and finds it with bisect; a ``ReferenceCursor`` remembers its last
+position so sequential playback only steps to a neighbouring frame. Both
+return the same frame as the old linear scan: the nearest one, the
+earlier on a tie. (A uniform-grid index was tried too; for fixed-rate
+timelines it was no faster than ``bisect``, which runs in C.)
+
+Storage. Reference timelines used to live only as JSON on
+``MimicChallenge.pose_timeline`` -- ``{"t", "lm", "angles"}`` per frame,
+re-read and re-parsed from the database for every session and
+comparison, with normalisation and joint angles recomputed per frame.
+``ReferenceTimeline`` holds typed arrays instead:
+
+    t       (n,)         float32  frame time in seconds
+    lm      (n, 33, 3)   float32  nx, ny, visibility (NaN: no pose)
+    norm    (n, 33, 2)   float32  landmarks centred on mid-hip and scaled
+                                  by shoulder width
+    angles  (n, 8)       float32  ``ANGLE_DEFINITIONS`` joint angles
+
+and serialises to a compressed ``.npz`` in output storage
+(``MimicChallenge.pose_timeline_key``), written by the reference
+processor under a new key per version; reprocessing deletes the previous
+version once the challenge row points at the new one.
+
+Cache. ``get_reference_timeline`` loads a challenge's timeline through a
+process-wide LRU of ``mimic_reference_cache_size`` entries keyed by
+challenge id and ``pose_timeline_version``, so a trending challenge is
+read from storage once, not once per player. Concurrent misses on the
+same challenge wait for a single load. Challenges processed before the
+``.npz`` format fall back to the JSON column.
+"""
+
+import bisect
+import io
+import logging
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, List, Optional, Sequence
+
+import numpy as np
+
+from .pose_similarity import ANGLE_DEFINITIONS
+
+logger = logging.getLogger(__name__)
+
+NUM_LANDMARKS = 33
+FORMAT_VERSION = 1
+
+_L_SHOULDER, _R_SHOULDER, _L_HIP, _R_HIP = 11, 12, 23, 24
+
+# Steps a cursor takes before it gives up and does an index lookup
+_MAX_CURSOR_STEPS = 4
+
+
+def _normalize(lm: np.ndarray) -> np.ndarray:
+    """``pose_similarity._normalize_landmarks`` for ``(n, 33, 3)`` arrays."""
+    xy = np.round(lm[:, :, :2].astype(np.float64), 4)
+    centre = (xy[:, _L_HIP] + xy[:, _R_HIP]) / 2
+    shoulders = xy[:, _L_SHOULDER] - xy[:, _R_SHOULDER]
+    width = np.sqrt(shoulders[:, 0] ** 2 + shoulders[:, 1] ** 2)
+    width = np.where(width < 1e-6, 1.0, width)
+    return (xy - centre[:, None, :]) / width[:, None, None]
+
+
+def _joint_angles(lm: np.ndarray) -> np.ndarray:
+    """``PoseDetector.angle_between`` at every ``ANGLE_DEFINITIONS`` joint of ``(n, 33, 3)`` arrays."""
+    xy = np.round(lm[:, :, :2].astype(np.float64), 4)
+    a, b, c = (np.array([d[k] for d in ANGLE_DEFINITIONS]) for k in (1, 2, 3))
+    ba = xy[:, a] - xy[:, b]
+    bc = xy[:, c] - xy[:, b]
+    mag = np.sqrt(ba[..., 0] ** 2 + ba[..., 1] ** 2) * np.sqrt(bc[..., 0] ** 2 + bc[..., 1] ** 2)
+    dot = ba[..., 0] * bc[..., 0] + ba[..., 1] * bc[..., 1]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        angles = np.degrees(np.arccos(np.clip(dot / mag, -1.0, 1.0)))
+    return np.where(mag == 0, 0.0, angles)
+
+
+class ReferenceTimeline:
+    """A reference pose timeline as typed arrays, indexed by time."""
+
+    def __init__(
+        self,
+        t: np.ndarray,
+        lm: np.ndarray,
+        norm: Optional[np.ndarray] = None,
+        angles: Optional[np.ndarray] = None,
+    ):
+        t = np.asarray(t, np.float32).reshape(-1)
+        lm = np.asarray(lm, np.float32).reshape(len(t), NUM_LANDMARKS, 3)
+        if len(t) > 1 and np.any(np.diff(t) < 0):
+            order = np.argsort(t, kind="stable")
+            t, lm = t[order], lm[order]
+            norm = norm[order] if norm is not None else None
+            angles = angles[order] if angles is not None else None
+        self.t = t
+        self.lm = lm
+        self.norm = np.asarray(norm if norm is not None else _normalize(lm), np.float32)
+        self.angles = np.asarray(angles if angles is not None else _joint_angles(lm), np.float32)
+        # Plain floats: bisect on a list beats np.searchsorted for one value at a time
+        self.times: List[float] = [round(v, 3) for v in t.tolist()]
+        self._has_pose = ~np.isnan(lm[:, 0, 0])
+
+    @classmethod
+    def from_frames(cls, frames: Sequence[dict]) -> "ReferenceTimeline":
+        """From the JSON form (``[{"t": ..., "lm": [[nx, ny, vis], ...] or None}, ...]``)."""
+        n = len(frames)
+        t = np.zeros(n, np.float32)
+        lm = np.full((n, NUM_LANDMARKS, 3), np.nan, np.float32)
+        for i, frame in enumerate(frames):
+            t[i] = frame.get("t", 0)
+            points = frame.get("lm")
+            if points and len(points) == NUM_LANDMARKS:
+                lm[i] = points
+        return cls(t, lm)
+
+    @classmethod
+    def from_npz(cls, data: bytes) -> "ReferenceTimeline":
+        with np.load(io.BytesIO(data)) as z:
+            if int(z["format"]) != FORMAT_VERSION:
+                raise ValueError(f"Unsupported reference timeline format {int(z['format'])}")
+            return cls(z["t"], z["lm"], z["norm"], z["angles"])
+
+    def to_npz(self) -> bytes:
+        buf = io.BytesIO()
+        np.savez_compressed(
+            buf, format=np.int32(FORMAT_VERSION),
+            t=self.t, lm=self.lm, norm=self.norm, angles=self.angles,
+        )
+        return buf.getvalue()
+
+    @property
+    def nbytes(self) -> int:
+        return self.t.nbytes + self.lm.nbytes + self.norm.nbytes + self.angles.nbytes
+
+    def __len__(self) -> int:
+        return len(self.times)
+
+    def __bool__(self) -> bool:
+        return bool(self.times)
+
+    # -- lookup --
+
+    def index_at(self, t: float) -> Optional[int]:
+        """Index of the frame closest to ``t`` (None if the timeline is empty)."""
+        times = self.times
+        n = len(times)
+        if n == 0:
+            return None
+        j = bisect.bisect_left(times, t)
+        if j == n or (j > 0 and t - times[j - 1] <= times[j] - t):
+            # Frame before t; the first of any frames sharing its time
+            return bisect.bisect_left(times, times[j - 1], 0, j)
+        return j
+
+    def cursor(self) -> "ReferenceCursor":
+        return ReferenceCursor(self)
+
+    # -- per-frame views, built on demand so the arrays stay the only copy --
+
+    def has_pose(self, i: int) -> bool:
+        return bool(self._has_pose[i])
+
+    def landmarks(self, i: int) -> Optional[List[List[float]]]:
+        """``[[nx, ny, vis], ...]`` of frame ``i``, as in the JSON form."""
+        if not self._has_pose[i]:
+            return None
+        return np.round(self.lm[i].astype(np.float64), 4).tolist()
+
+    def landmark_dicts(self, i: int) -> Optional[List[Dict]]:
+        """Frame ``i`` as the ``[{"nx", "ny", "visibility"}, ...]`` list ``pose_similarity`` takes."""
+        points = self.landmarks(i)
+        if points is None:
+            return None
+        return [{"nx": p[0], "ny": p[1], "visibility": p[2]} for p in points]
+
+    def normalized_dicts(self, i: int) -> Optional[List[Dict]]:
+        """Precomputed normalised landmarks of frame ``i`` (``ref_norm`` for ``pose_similarity``)."""
+        if not self._has_pose[i]:
+            return None
+        vis = np.round(self.lm[i, :, 2].astype(np.float64), 4).tolist()
+        return [{"nx": x, "ny": y, "visibility": v} for (x, y), v in zip(self.norm[i].tolist(), vis)]
+
+    def joint_angles(self, i: int) -> Optional[Dict[str, float]]:
+        """Precomputed joint angles of frame ``i`` (``ref_angles`` for ``pose_similarity``)."""
+        if not self._has_pose[i]:
+            return None
+        return {d[0]: a for d, a in zip(ANGLE_DEFINITIONS, self.angles[i].tolist())}
+
+
+class ReferenceCursor:
+    """Closest-frame lookups for mostly-forward playback.
+
+    Steps from the previous frame while playback moves forward; seeking
+    backwards (a loop or a scrub) or far ahead uses the timeline index.
+    """
+
+    def __init__(self, timeline: ReferenceTimeline):
+        self.timeline = timeline
+        self._index: Optional[int] = None
+        self._last_t = float("-inf")
+
+    def seek(self, t: float) -> Optional[int]:
+        times = self.timeline.times
+        i = self._index
+        if i is None or t < self._last_t:
+            i = self.timeline.index_at(t)
+        else:
+            # Same answer as index_at: step to the last frame at or before
+            # t, then take the next one only if strictly closer; otherwise
+            # the first of any frames sharing this one's time
+            steps = 0
+            while i + 1 < len(times) and times[i + 1] <= t:
+                i += 1
+                steps += 1
+                if steps > _MAX_CURSOR_STEPS:
+                    break
+            if steps > _MAX_CURSOR_STEPS:
+                i = self.timeline.index_at(t)
+            elif i + 1 < len(times) and times[i + 1] - t < t - times[i]:
+                i += 1
+            else:
+                while i > 0 and times[i - 1] == times[i]:
+                    i -= 1
+        self._index = i
+        self._last_t = t
+        return i
+
+
+class ReferenceTimelineCache:
+    """LRU of loaded reference timelines; one load per key at a time."""
+
+    def __init__(self, max_entries: int = 16):
+        self.max_entries = max(1, max_entries)
+        self._entries: "OrderedDict[Hashable, ReferenceTimeline]" = OrderedDict()
+        self._loading: Dict[Hashable, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _lookup(self, key: Hashable) -> Optional[ReferenceTimeline]:
+        timeline = self._entries.get(key)
+        if timeline is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+        return timeline
+
+    def get(self, key: Hashable, load: Callable[[], ReferenceTimeline]) -> ReferenceTimeline:
+        with self._lock:
+            timeline = self._lookup(key)
+            if timeline is not None:
+                return timeline
+            key_lock = self._loading.setdefault(key, threading.Lock())
+
+        with key_lock:
+            with self._lock:
+                timeline = self._lookup(key)
+                if timeline is not None:
+                    return timeline
+            try:
+                timeline = load()
+            finally:
+                with self._lock:
+                    self._loading.pop(key, None)
+            with self._lock:
+                self.misses += 1
+                self._entries[key] = timeline
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return timeline
+
+    def invalidate(self, challenge_id: int):
+        """Drop every cached version of a challenge's timeline."""
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == challenge_id]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+def reference_timeline_key(challenge_id: int, version: int) -> str:
+    return f"mimic/challenges/{challenge_id}/pose_timeline_v{version}.npz"
+
+
+def load_reference_timeline(challenge, storage=None) -> ReferenceTimeline:
+    """Read a challenge's timeline: its ``.npz`` if it has one, else the JSON column."""
+    if challenge.pose_timeline_key:
+        if storage is None:
+            from ....services.storage_service import get_storage_service
+            storage = get_storage_service().outputs
+        timeline = ReferenceTimeline.from_npz(storage.load(challenge.pose_timeline_key))
+    else:
+        timeline = ReferenceTimeline.from_frames(challenge.pose_timeline or [])
+    logger.info(
+        f"Loaded reference timeline for mimic challenge {challenge.id} "
+        f"({len(timeline)} frames, {timeline.nbytes / 1e6:.1f} MB)"
+    )
+    return timeline
+
+
+_reference_cache: Optional[ReferenceTimelineCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_reference_timeline_cache() -> ReferenceTimelineCache:
+    global _reference_cache
+    with _cache_lock:
+        if _reference_cache is None:
+            from ....config import get_settings
+            _reference_cache = ReferenceTimelineCache(get_settings().mimic_reference_cache_size)
+        return _reference_cache
+
+
+def get_reference_timeline(challenge) -> ReferenceTimeline:
+    """A challenge's reference timeline, through the process-wide cache.
+
+    Query the challenge with ``defer(MimicChallenge.pose_timeline)``; the
+    JSON column is only read for challenges without an ``.npz``.
+    """
+    key = (challenge.id, challenge.pose_timeline_version or 0)
+    return get_reference_timeline_cache().get(key, lambda: load_reference_timeline(challenge))
@@ -0,0 +1,90 @@
+"""
+Reference-video frames for the side-by-side comparison video.
+
+``video_comparator`` needs the reference frame matching every user frame.
+It used to ``set(CAP_PROP_POS_FRAMES)`` and ``read()`` per user frame; each
+seek decodes forward from the previous keyframe, which made rendering
+several times slower than real time.
+
+User frames map to monotonically increasing reference times (shifted by
+the audio offset, clamped at the end), so ``ReferenceFrameReader`` decodes
+sequentially: it grabs forward to the requested frame, returns the same
+panel again when the user video runs at a higher frame rate, and only
+seeks on a backward or long forward jump. Frames past the end of the
+video repeat the last one decoded, as before.
+"""
+
+import logging
+from typing import Optional
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Forward jumps longer than this seek instead of decoding every frame between
+_MAX_SKIP_SECONDS = 2.0
+
+
+def resize_to_height(frame, target_height: int):
+    """Resize frame to target height, preserving aspect ratio."""
+    h, w = frame.shape[:2]
+    if h == target_height:
+        return frame
+    scale = target_height / h
+    new_w = int(w * scale)
+    return cv2.resize(frame, (new_w, target_height))
+
+
+class ReferenceFrameReader:
+    """Reference video panels by time, decoded sequentially."""
+
+    def __init__(self, video_path: str, panel_height: int):
+        self._cap = cv2.VideoCapture(video_path)
+        self.fps = self._cap.get(cv2.CAP_PROP_FPS) or 30.0
+        self.panel_height = panel_height
+        self._max_skip = max(1, int(_MAX_SKIP_SECONDS * self.fps))
+        self._next: Optional[int] = 0  # frame the next read() returns; None: unknown
+        self._index: Optional[int] = None  # frame held in _panel
+        self._panel: Optional[np.ndarray] = None
+        self._failed: Optional[int] = None
+        self.seeks = 0
+        self.decoded = 0
+
+    def isOpened(self) -> bool:
+        return self._cap.isOpened()
+
+    def panel_at(self, t: float) -> Optional[np.ndarray]:
+        """Resized reference frame at ``t`` seconds, safe to draw on.
+
+        Falls back to the last frame decoded when ``t`` is past the end
+        (None if nothing has been decoded yet).
+        """
+        index = max(0, int(t * self.fps))
+        past_end = self._failed is not None and index >= self._failed
+        if index != self._index and not past_end:
+            self._decode(index)
+        return self._panel.copy() if self._panel is not None else None
+
+    def _decode(self, index: int):
+        if self._next is None or index < self._next or index - self._next > self._max_skip:
+            self._cap.set(cv2.CAP_PROP_POS_FRAMES, index)
+            self.seeks += 1
+        else:
+            while self._next < index:
+                if not self._cap.grab():
+                    break
+                self._next += 1
+        ok, frame = self._cap.read()
+        if not ok:
+            self._failed = index
+            self._next = None
+            return
+        self.decoded += 1
+        self._next = index + 1
+        self._index = index
+        self._failed = None
+        self._panel = resize_to_height(frame, self.panel_height)
+
+    def release(self):
+        self._cap.release()
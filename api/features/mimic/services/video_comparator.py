@@ -17,8 +17,11 @@ from datetime import datetime
 from pathlib import Path
 from typing import Optional, Tuple
 
-from ....core.streaming.pose_detector import PoseDetector, SKELETON_CONNECTIONS
+from ....core.streaming.pose_detector import SKELETON_CONNECTIONS
+from ....core.streaming.pose_pool import get_offline_pose_detector_pool
 from .pose_similarity import compute_all_similarities, generate_feedback
+from .reference_timeline import ReferenceTimeline, get_reference_timeline
+from .reference_video import ReferenceFrameReader, resize_to_height
 from .reference_processor import _processing_semaphore
 
 logger = logging.getLogger(__name__)
@@ -41,6 +44,7 @@ def compare_video(challenge_id: int, video_path: str, session_id: int):
 
 def _compare(challenge_id: int, video_path: str, session_id: int):
     """Run pose extraction on the user video and compare against reference."""
+    from sqlalchemy.orm import defer
     from ....database import SessionLocal
     from ..db_models.mimic import (
         MimicChallenge, MimicSession, MimicRecord,
@@ -50,7 +54,9 @@ def _compare(challenge_id: int, video_path: str, session_id: int):
     _processing_semaphore.acquire()
     db = SessionLocal()
     try:
-        challenge = db.query(MimicChallenge).filter(
+        challenge = db.query(MimicChallenge).options(
+            defer(MimicChallenge.pose_timeline)
+        ).filter(
             MimicChallenge.id == challenge_id
         ).first()
         session = db.query(MimicSession).filter(
@@ -61,7 +67,7 @@ def _compare(challenge_id: int, video_path: str, session_id: int):
             logger.error(f"Compare: challenge {challenge_id} or session {session_id} not found")
             return
 
-        ref_timeline = challenge.pose_timeline or []
+        ref_timeline = get_reference_timeline(challenge)
         ref_duration = challenge.video_duration or 1.0
 
         if not ref_timeline:
@@ -162,7 +168,7 @@ def _compare(challenge_id: int, video_path: str, session_id: int):
 
 def _process_user_video(
     video_path: str,
-    ref_timeline: list,
+    ref_timeline: ReferenceTimeline,
     ref_duration: float,
     audio_offset: float = 0.0,
     ref_video_path: Optional[str] = None,
@@ -177,20 +183,20 @@ def _process_user_video(
     fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
 
     # Open reference video for side-by-side rendering
-    ref_cap = None
+    ref_reader = None
     if ref_video_path and Path(ref_video_path).exists():
-        ref_cap = cv2.VideoCapture(ref_video_path)
-        if not ref_cap.isOpened():
+        ref_reader = ReferenceFrameReader(ref_video_path, _PANEL_HEIGHT)
+        if not ref_reader.isOpened():
             logger.warning(f"Cannot open reference video for comparison: {ref_video_path}")
-            ref_cap = None
+            ref_reader.release()
+            ref_reader = None
         else:
             logger.info(f"Opened reference video for side-by-side: {ref_video_path}")
     else:
         logger.warning(f"Reference video not available for side-by-side: {ref_video_path}")
 
-    ref_fps = ref_cap.get(cv2.CAP_PROP_FPS) if ref_cap else 30.0
-
-    detector = PoseDetector(
+    pool = get_offline_pose_detector_pool()
+    detector = pool.checkout(
         model_complexity=1,
         min_detection_confidence=0.5,
         min_tracking_confidence=0.4,
@@ -201,14 +207,15 @@ def _process_user_video(
     writer = None
     raw_out_path = None
     final_out_path = None
-    if ref_cap and session_id is not None:
+    if ref_reader and session_id is not None:
         out_dir = Path(video_path).parent
         raw_out_path = str(out_dir / f"sbs_{session_id}_raw.mp4")
         final_out_path = str(out_dir / f"sbs_{session_id}.mp4")
 
+    ref_cursor = ref_timeline.cursor()
+
     frame_scores = []
     frame_idx = 0
-    last_ref_frame = None
     recent_scores = []  # rolling buffer for median-smoothed video overlay
 
     try:
@@ -225,22 +232,22 @@ def _process_user_video(
             if ref_time < 0 or ref_time > ref_duration:
                 # Outside reference range — skip scoring but still write frame
                 ref_time = max(0.0, min(ref_time, ref_duration))
-            ref_idx = _find_closest_ref_frame(ref_timeline, ref_time)
-            ref_entry = ref_timeline[ref_idx] if ref_idx is not None else None
+            ref_idx = ref_cursor.seek(ref_time)
+            ref_lm = ref_timeline.landmarks(ref_idx) if ref_idx is not None else None
 
             # Compute score for this frame
             score = None
             if (
                 result.player_detected
                 and result.landmark_list
-                and ref_entry
-                and ref_entry.get("lm")
+                and ref_lm
             ):
-                ref_lm_dicts = [
-                    {"nx": lm[0], "ny": lm[1], "visibility": lm[2]}
-                    for lm in ref_entry["lm"]
-                ]
-                scores = compute_all_similarities(result.landmark_list, ref_lm_dicts)
+                ref_lm_dicts = ref_timeline.landmark_dicts(ref_idx)
+                scores = compute_all_similarities(
+                    result.landmark_list, ref_lm_dicts,
+                    ref_norm=ref_timeline.normalized_dicts(ref_idx),
+                    ref_angles=ref_timeline.joint_angles(ref_idx),
+                )
                 score = scores.get("angle_score", 0)
                 frame_scores.append({
                     "t": round(elapsed, 3),
@@ -261,28 +268,19 @@ def _process_user_video(
                 display_score = None
 
             # Generate side-by-side frame
-            if ref_cap is not None:
-                # Seek reference video to matching time
-                ref_frame_num = int(ref_time * ref_fps)
-                ref_cap.set(cv2.CAP_PROP_POS_FRAMES, ref_frame_num)
-                ref_ret, ref_frame = ref_cap.read()
-                if ref_ret:
-                    last_ref_frame = ref_frame
-                elif last_ref_frame is not None:
-                    ref_frame = last_ref_frame
-                else:
-                    ref_frame = np.zeros_like(user_frame)
-
-                # Resize both panels to same height
-                ref_panel = _resize_to_height(ref_frame, _PANEL_HEIGHT)
-                user_panel = _resize_to_height(user_frame, _PANEL_HEIGHT)
+            if ref_reader is not None:
+                # Reference frame at the matching time, resized to the panel height
+                ref_panel = ref_reader.panel_at(ref_time)
+                user_panel = resize_to_height(user_frame, _PANEL_HEIGHT)
+                if ref_panel is None:
+                    ref_panel = np.zeros_like(user_panel)
 
                 # Draw body mesh overlay (no skeleton lines)
                 rh, rw = ref_panel.shape[:2]
                 uh, uw = user_panel.shape[:2]
 
-                if ref_entry and ref_entry.get("lm"):
-                    _draw_body_mesh(ref_panel, ref_entry["lm"], rw, rh,
+                if ref_lm:
+                    _draw_body_mesh(ref_panel, ref_lm, rw, rh,
                                     color=(255, 150, 0), alpha=0.7)
 
                 if result.player_detected and result.landmark_list:
@@ -306,10 +304,14 @@ def _process_user_video(
 
             frame_idx += 1
     finally:
-        detector.close()
+        pool.checkin(detector)
         cap.release()
-        if ref_cap is not None:
-            ref_cap.release()
+        if ref_reader is not None:
+            logger.info(
+                f"Reference video for session {session_id}: "
+                f"{ref_reader.decoded} frames decoded, {ref_reader.seeks} seeks"
+            )
+            ref_reader.release()
         if writer is not None:
             writer.release()
 
@@ -326,16 +328,6 @@ def _process_user_video(
     return _build_report(frame_scores, frame_idx, fps), comparison_path
 
 
-def _resize_to_height(frame, target_height: int):
-    """Resize frame to target height, preserving aspect ratio."""
-    h, w = frame.shape[:2]
-    if h == target_height:
-        return frame
-    scale = target_height / h
-    new_w = int(w * scale)
-    return cv2.resize(frame, (new_w, target_height))
-
-
 def _make_canvas(ref_panel, user_panel, score: Optional[float] = None):
     """Concatenate two panels side-by-side with labels and score overlay."""
     rh, rw = ref_panel.shape[:2]
@@ -532,25 +524,6 @@ def _reencode_video(
     return final_path
 
 
-def _find_closest_ref_frame(timeline: list, ref_time: float) -> Optional[int]:
-    """Find the timeline frame closest to the given time."""
-    if not timeline:
-        return None
-
-    best_idx = 0
-    best_diff = abs(timeline[0].get("t", 0) - ref_time)
-
-    for i, entry in enumerate(timeline):
-        diff = abs(entry.get("t", 0) - ref_time)
-        if diff < best_diff:
-            best_diff = diff
-            best_idx = i
-        elif diff > best_diff:
-            break
-
-    return best_idx
-
-
 def _apply_rolling_window(frame_scores: list, window_seconds: float = 1.0) -> None:
     """Apply time-based centered rolling window to smooth scores.
 
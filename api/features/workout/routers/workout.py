@@ -493,7 +493,7 @@ async def session_action(
 
 
 @router.post("/sessions/{session_id}/start-tracking")
-async def start_tracking_session(
+def start_tracking_session(
     session_id: int,
     data: dict,
     current_user: User = Depends(get_current_user),
@@ -503,6 +503,8 @@ async def start_tracking_session(
 
     Reuses the exact same challenge infrastructure (GenericSessionManager,
     analyzers, /ws/challenge/ endpoint) that powers standalone challenges.
+    A plain ``def`` so the analyzer's (possibly blocking) detector checkout
+    runs in the threadpool, not on the event loop.
     """
     exercise_slug = data.get("exercise_slug", "")
 
@@ -517,7 +519,10 @@ async def start_tracking_session(
     from ...challenges.services.pushup_analyzer import PushupAnalyzer
     from ...challenges.services.squat_analyzer import SquatAnalyzer
     from ...challenges.services.plank_analyzer import PlankAnalyzer
-    from ...challenges.routers.challenges import ANALYZER_MAP, get_generic_session_manager
+    from ...challenges.routers.challenges import (
+        ANALYZER_MAP, _screenshot_prefix, get_generic_session_manager,
+    )
+    from ....core.streaming.pose_pool import PoseDetectorPoolExhausted
 
     if challenge_type not in ANALYZER_MAP:
         raise HTTPException(status_code=400, detail=f"No analyzer for type: {challenge_type}")
@@ -538,15 +543,21 @@ async def start_tracking_session(
     ).first()
     config_val = config_row.thresholds if config_row else None
     from ...challenges.services.arm_curl_analyzer import ArmRepAnalyzer
-    if analyzer_cls is SquatAnalyzer:
-        # Workout mode: count half squats as valid reps (tracked separately in report)
-        workout_config = dict(config_val) if config_val else {}
-        workout_config["count_half_squats"] = True
-        analyzer = analyzer_cls(challenge_type=challenge_type, config=workout_config)
-    elif analyzer_cls is ArmRepAnalyzer:
-        analyzer = analyzer_cls(exercise_slug=data.get("exercise_slug", "bicep-curl"), config=config_val)
-    else:
-        analyzer = analyzer_cls(config=config_val)
+    try:
+        if analyzer_cls is SquatAnalyzer:
+            # Workout mode: count half squats as valid reps (tracked separately in report)
+            workout_config = dict(config_val) if config_val else {}
+            workout_config["count_half_squats"] = True
+            analyzer = analyzer_cls(challenge_type=challenge_type, config=workout_config)
+        elif analyzer_cls is ArmRepAnalyzer:
+            analyzer = analyzer_cls(exercise_slug=data.get("exercise_slug", "bicep-curl"), config=config_val)
+        else:
+            analyzer = analyzer_cls(config=config_val)
+    except PoseDetectorPoolExhausted:
+        db.delete(session)
+        db.commit()
+        raise HTTPException(status_code=503, detail="Server busy — try again shortly")
+    analyzer.start_screenshots(_screenshot_prefix(current_user.id, session.id))
 
     gsm = get_generic_session_manager()
     gsm.register_session(session.id, f"challenge_{challenge_type}", analyzer)
@@ -1,8 +1,6 @@
 """FastAPI application entry point."""
 
 import os
-import json
-import base64
 import asyncio
 import logging
 import time
@@ -38,6 +36,15 @@ from .services.stream_service import get_stream_session_manager
 from .features.registry import build_registry
 from .core.streaming.session_manager import get_generic_session_manager
 from .core.metrics import statsd, session_opened, session_closed
+from .core.streaming.frame_protocol import receive_message, parse_client_message, hello_response
+from .core.tracing import FrameTrace, run_traced, send_traced, wants_trace
+from .core.streaming.inference_pool import (
+    POOL_FULL_CLOSE_CODE, InferencePoolFull, get_inference_pool, shutdown_inference_pools,
+)
+from .core.streaming.shard_pool import ShardPoolFull, shutdown_shard_pool
+from .core.streaming.resume import SessionCheckpoint, get_resume_registry, shutdown_resume_registry
+from .core.streaming.pose_pool import get_pose_detector_pool, shutdown_pose_detector_pool
+from .core.streaming.screenshots import shutdown_screenshot_uploader
 from .core.correlation import CorrelationIdMiddleware, install_log_correlation, request_id_var
 
 # Configure JSON logging for Datadog auto-parse
@@ -99,6 +106,15 @@ async def lifespan(app: FastAPI):
     logger.info(f"Upload directory: {settings.upload_path}")
     logger.info(f"Output directory: {settings.output_path}")
 
+    # Build pose detectors now so the first challenge session doesn't pay
+    # for MediaPipe graph construction
+    if settings.pose_pool_warm > 0:
+        try:
+            warmed = await asyncio.to_thread(get_pose_detector_pool().warm, settings.pose_pool_warm)
+            logger.info(f"Pose detector pool warmed with {warmed} detector(s)")
+        except Exception as e:
+            logger.warning(f"Pose detector warm-up failed: {e}")
+
     yield
 
     # Shutdown
@@ -106,6 +122,11 @@ async def lifespan(app: FastAPI):
     JobManager.get_instance().shutdown()
     get_stream_session_manager().close_all()
     get_generic_session_manager().close_all()
+    shutdown_inference_pools()
+    shutdown_shard_pool()
+    shutdown_resume_registry()
+    shutdown_pose_detector_pool()
+    shutdown_screenshot_uploader()
 
 
 # Create FastAPI app
@@ -272,6 +293,7 @@ async def websocket_stream(
         enable_tuning_data = bool(session.enable_tuning_data)
         enable_shuttle_tracking = bool(session.enable_shuttle_tracking)
         chunk_duration = session.chunk_duration or 60
+        was_streaming = session.status == StreamStatus.STREAMING
     finally:
         db.close()
 
@@ -279,21 +301,43 @@ async def websocket_stream(
     stream_manager = get_stream_connection_manager()
     session_manager = get_stream_session_manager()
 
-    # Get or create analyzer
+    # Get or create analyzer. A streamer reconnecting within the grace
+    # window reattaches to the live analyzer; if that analyzer is gone
+    # (server restart) it is rebuilt from the session's checkpoint.
+    if stream_manager.is_reclaiming(session_id):
+        # Grace window ran out; the session is being ended
+        await websocket.accept()
+        await websocket.close(code=4000, reason="Session not ready for streaming")
+        return
+    resumed_from = None
     analyzer = session_manager.get_session(session_id)
+    if analyzer is not None and get_resume_registry().reattach(session_id):
+        resumed_from = "memory"
     if not analyzer:
         from .config import get_settings
         settings = get_settings()
         output_dir = str(settings.output_path / str(token_data.user_id) / f"stream_{session_id}")
-        analyzer = session_manager.create_session(
-            session_id, court_boundary,
-            frame_rate=frame_rate,
-            enable_tuning_data=enable_tuning_data,
-            enable_shuttle_tracking=enable_shuttle_tracking,
-            output_dir=output_dir,
-            stream_mode=stream_mode,
-            chunk_duration=chunk_duration,
-        )
+        resume_state = None
+        if was_streaming:
+            resume_state = await asyncio.to_thread(SessionCheckpoint.for_session(session_id).load)
+        try:
+            analyzer = session_manager.create_session(
+                session_id, court_boundary,
+                frame_rate=frame_rate,
+                enable_tuning_data=enable_tuning_data,
+                enable_shuttle_tracking=enable_shuttle_tracking,
+                output_dir=output_dir,
+                stream_mode=stream_mode,
+                chunk_duration=chunk_duration,
+                resume_state=resume_state,
+            )
+        except ShardPoolFull as e:
+            logger.warning(f"Session {session_id}: {e}")
+            await websocket.accept()
+            await websocket.close(code=POOL_FULL_CLOSE_CODE, reason="Server busy — try again shortly")
+            return
+        if resume_state is not None:
+            resumed_from = "checkpoint"
 
     # Connect as streamer (this accepts the websocket internally)
     if not await stream_manager.connect_streamer(websocket, session_id):
@@ -302,7 +346,19 @@ async def websocket_stream(
             await websocket.accept()
         except Exception:
             pass  # Already accepted in some cases
-        await websocket.close(code=4002, reason="Session already has a streamer")
+        if stream_manager.is_reclaiming(session_id):
+            await websocket.close(code=4000, reason="Session not ready for streaming")
+        else:
+            await websocket.close(code=4002, reason="Session already has a streamer")
+        return
+
+    # Reserve an inference worker (released in disconnect_streamer)
+    try:
+        get_inference_pool("badminton").admit(session_id)
+    except InferencePoolFull as e:
+        logger.warning(f"Session {session_id}: {e}")
+        stream_manager.disconnect_streamer(session_id)
+        await websocket.close(code=POOL_FULL_CLOSE_CODE, reason="Server busy — try again shortly")
         return
 
     # Update session status
@@ -315,8 +371,15 @@ async def websocket_stream(
     finally:
         db.close()
 
+    # Tell a reconnecting client where the session stands
+    resumed = None
+    if resumed_from is not None:
+        resumed = await get_inference_pool("badminton").run(session_id, analyzer.resume_info)
+        statsd.increment("stream.resume", tags=[f"source:{resumed_from}"])
+        await websocket.send_json({"type": "session_resumed", "source": resumed_from, **resumed})
+
     # Handle stream
-    await stream_manager.handle_stream(websocket, session_id, analyzer)
+    await stream_manager.handle_stream(websocket, session_id, analyzer, resumed)
 
 
 @app.websocket("/ws/stream/{session_id}/view")
@@ -339,10 +402,9 @@ async def websocket_stream_viewer(
 
     try:
         while True:
-            # Keep connection alive
+            # Keepalive pings and results acks
             data = await websocket.receive_text()
-            if data == "ping":
-                await websocket.send_text("pong")
+            await stream_manager.handle_viewer_message(websocket, session_id, data)
     except WebSocketDisconnect:
         stream_manager.disconnect_viewer(websocket, session_id)
     except Exception as e:
@@ -365,6 +427,7 @@ async def websocket_challenge(
 
     Protocol (same as badminton stream):
       Client sends: { "type": "frame", "data": "<base64 jpeg>", "timestamp": <float> }
+        (or a binary_v1 frame after { "type": "hello" } negotiation)
       Server replies: { "type": "challenge_update", ... }
       Client sends: { "type": "end_session" } to finish.
     """
@@ -413,6 +476,14 @@ async def websocket_challenge(
 
     await websocket.accept()
 
+    inference_pool = get_inference_pool("challenge")
+    try:
+        inference_pool.admit(session_id)
+    except InferencePoolFull as e:
+        logger.warning(f"Challenge session {session_id}: {e}")
+        await websocket.close(code=POOL_FULL_CLOSE_CODE, reason="Server busy — try again shortly")
+        return
+
     # Correlation ID + metrics for this WS session
     ws_correlation_id = str(uuid.uuid4())
     _cid_token = request_id_var.set(ws_correlation_id)
@@ -420,6 +491,7 @@ async def websocket_challenge(
     ct_tag = f"challenge_type:{challenge_type}"
     session_opened(challenge_type)
     end_reason = "disconnect"  # default — overwritten on clean end
+    include_timing = False  # client asked for per-result timing in hello
 
     logger.info(f"Challenge session {session_id}: opened (type={challenge_type})")
 
@@ -441,10 +513,11 @@ async def websocket_challenge(
         processing = asyncio.Event()
 
         async def _reader():
+            nonlocal include_timing
             try:
                 while not end_event.is_set():
                     try:
-                        raw = await asyncio.wait_for(websocket.receive_text(), timeout=60.0)
+                        raw = await asyncio.wait_for(receive_message(websocket), timeout=60.0)
                     except asyncio.TimeoutError:
                         try:
                             await websocket.send_json({"type": "ping"})
@@ -452,22 +525,18 @@ async def websocket_challenge(
                             end_event.set()
                         continue
 
-                    if raw == "ping":
-                        await websocket.send_json({"type": "pong"})
-                        continue
-
-                    try:
-                        message = json.loads(raw)
-                    except json.JSONDecodeError:
+                    trace_start, trace_wall = time.perf_counter(), time.time()
+                    message = parse_client_message(raw, tags=[ct_tag])
+                    if message is None:
                         continue
 
                     msg_type = message.get("type")
                     if msg_type == "frame":
-                        frame_b64 = message.get("data", "")
-                        timestamp = message.get("timestamp", 0.0)
-                        if not frame_b64:
+                        frame = message.get("frame")
+                        if frame is None:
                             continue
-                        frame_data = base64.b64decode(frame_b64)
+                        frame_data, timestamp = frame.data, frame.timestamp
+                        trace = FrameTrace.for_frame("challenge", frame, trace_start, trace_wall)
                         statsd.increment("challenge.frame.received", tags=[ct_tag, "mode:hold"])
                         if latest_frame.full():
                             try:
@@ -475,10 +544,14 @@ async def websocket_challenge(
                                 statsd.increment("challenge.frame.dropped", tags=[ct_tag])
                             except asyncio.QueueEmpty:
                                 pass
-                        await latest_frame.put((frame_data, timestamp))
+                        trace.begin_wait()
+                        await latest_frame.put((frame_data, timestamp, trace))
                     elif msg_type == "end_session":
                         end_reason = "normal"
                         end_event.set()
+                    elif msg_type == "hello":
+                        include_timing = wants_trace(message)
+                        await websocket.send_json(hello_response(message))
                     elif msg_type == "ping":
                         await websocket.send_json({"type": "pong"})
             except WebSocketDisconnect:
@@ -488,25 +561,27 @@ async def websocket_challenge(
                 end_event.set()
 
         async def _processor():
-            loop = asyncio.get_event_loop()
             try:
                 while not end_event.is_set():
                     try:
-                        frame_data, timestamp = await asyncio.wait_for(
+                        frame_data, timestamp, trace = await asyncio.wait_for(
                             latest_frame.get(), timeout=1.0
                         )
                     except asyncio.TimeoutError:
                         continue
                     processing.set()
                     try:
+                        trace.end_wait("queue")
+                        trace.begin_wait()
                         t0 = time.monotonic()
-                        result = await loop.run_in_executor(
-                            None, analyzer.process_frame, frame_data, timestamp
+                        result = await inference_pool.run(
+                            session_id, run_traced, trace, analyzer.process_frame,
+                            frame_data, timestamp,
                         )
                         elapsed_ms = (time.monotonic() - t0) * 1000
                         statsd.histogram("challenge.frame.processing_ms", elapsed_ms, tags=[ct_tag])
                         statsd.increment("challenge.frame.processed", tags=[ct_tag])
-                        await websocket.send_json(result)
+                        await send_traced(websocket, result, trace, include_timing, tags=[ct_tag])
                     except Exception as e:
                         statsd.increment("challenge.frame.error", tags=[ct_tag])
                         logger.error(f"Challenge session {session_id}: process error: {e}")
@@ -538,6 +613,8 @@ async def websocket_challenge(
         except Exception as e:
             end_reason = "error"
             logger.error(f"Challenge session {session_id}: Error: {e}")
+        finally:
+            inference_pool.release(session_id)
 
     else:
         # --- Rep-based: sequential processing, every frame counts ---
@@ -545,7 +622,7 @@ async def websocket_challenge(
             while True:
                 try:
                     raw_message = await asyncio.wait_for(
-                        websocket.receive_text(), timeout=60.0,
+                        receive_message(websocket), timeout=60.0,
                     )
                 except asyncio.TimeoutError:
                     try:
@@ -554,34 +631,31 @@ async def websocket_challenge(
                     except Exception:
                         break
 
-                if raw_message == "ping":
-                    await websocket.send_json({"type": "pong"})
-                    continue
-
-                try:
-                    message = json.loads(raw_message)
-                except json.JSONDecodeError:
+                trace_start, trace_wall = time.perf_counter(), time.time()
+                message = parse_client_message(raw_message, tags=[ct_tag])
+                if message is None:
                     continue
 
                 msg_type = message.get("type")
 
                 if msg_type == "frame":
-                    frame_b64 = message.get("data", "")
-                    timestamp = message.get("timestamp", 0.0)
-                    if not frame_b64:
+                    frame = message.get("frame")
+                    if frame is None:
                         continue
-                    frame_data = base64.b64decode(frame_b64)
+                    frame_data, timestamp = frame.data, frame.timestamp
+                    trace = FrameTrace.for_frame("challenge", frame, trace_start, trace_wall)
                     statsd.increment("challenge.frame.received", tags=[ct_tag, "mode:sequential"])
-                    loop = asyncio.get_event_loop()
                     try:
+                        trace.begin_wait()
                         t0 = time.monotonic()
-                        result = await loop.run_in_executor(
-                            None, analyzer.process_frame, frame_data, timestamp
+                        result = await inference_pool.run(
+                            session_id, run_traced, trace, analyzer.process_frame,
+                            frame_data, timestamp,
                         )
                         elapsed_ms = (time.monotonic() - t0) * 1000
                         statsd.histogram("challenge.frame.processing_ms", elapsed_ms, tags=[ct_tag])
                         statsd.increment("challenge.frame.processed", tags=[ct_tag])
-                        await websocket.send_json(result)
+                        await send_traced(websocket, result, trace, include_timing, tags=[ct_tag])
                     except Exception as e:
                         statsd.increment("challenge.frame.error", tags=[ct_tag])
                         logger.error(f"Challenge session {session_id}: process error: {e}")
@@ -592,6 +666,10 @@ async def websocket_challenge(
                     await websocket.send_json({"type": "session_ended", "report": report})
                     break
 
+                elif msg_type == "hello":
+                    include_timing = wants_trace(message)
+                    await websocket.send_json(hello_response(message))
+
                 elif msg_type == "ping":
                     await websocket.send_json({"type": "pong"})
 
@@ -600,6 +678,8 @@ async def websocket_challenge(
         except Exception as e:
             end_reason = "error"
             logger.error(f"Challenge session {session_id}: Error: {e}")
+        finally:
+            inference_pool.release(session_id)
 
     # ---- Session-end metrics ----
     session_elapsed = time.monotonic() - session_start_time
@@ -611,9 +691,14 @@ async def websocket_challenge(
     # ---- Cleanup: end session if still active (e.g. user pressed back) ----
     try:
         from .features.challenges.db_models.challenge import (
-            ChallengeSession as CS, ChallengeStatus, ChallengeRecord,
+            ChallengeSession as CS, ChallengeStatus,
+        )
+        from .features.challenges.routers.challenges import (
+            _save_recording, _save_screenshots, _save_pose_timeline, _watch_screenshots,
+        )
+        from .features.challenges.services.leaderboard import (
+            get_leaderboard_cache, record_session_result, session_day,
         )
-        from .features.challenges.routers.challenges import _save_recording, _save_screenshots
 
         db2 = SessionLocal()
         try:
@@ -621,16 +706,18 @@ async def websocket_challenge(
             if sess and sess.status != ChallengeStatus.ENDED:
                 # Save recording if active
                 if analyzer and getattr(analyzer, 'is_recording', False):
-                    frames = analyzer.stop_recording()
-                    _save_recording(frames, sess, sess.user_id)
+                    recording = analyzer.stop_recording()
+                    _save_recording(recording, sess, sess.user_id)
                     sess.is_recording = False
 
-                # Save screenshots
-                screenshots = analyzer.get_screenshots() if analyzer else []
+                # Finish screenshots and pose timeline
+                screenshot_count = analyzer.finish_screenshots() if analyzer else 0
+                pose_timeline = analyzer.finish_pose_timeline() if analyzer else None
 
                 report = gsm.end_session(session_id) or {}
 
-                _save_screenshots(screenshots, sess, sess.user_id)
+                _save_screenshots(screenshot_count, sess, sess.user_id)
+                _save_pose_timeline(pose_timeline, sess, sess.user_id)
 
                 sess.status = ChallengeStatus.ENDED
                 sess.ended_at = datetime.utcnow()
@@ -639,22 +726,12 @@ async def websocket_challenge(
                 sess.extra_data = report
                 sess.form_summary = report.get("form_summary")
 
-                # Update personal best
-                record = db2.query(ChallengeRecord).filter(
-                    ChallengeRecord.user_id == sess.user_id,
-                    ChallengeRecord.challenge_type == sess.challenge_type,
-                ).first()
-                if record:
-                    if sess.score > record.best_score:
-                        record.best_score = sess.score
-                else:
-                    db2.add(ChallengeRecord(
-                        user_id=sess.user_id,
-                        challenge_type=sess.challenge_type,
-                        best_score=sess.score,
-                    ))
+                # Update personal best and today's leaderboard
+                record_session_result(db2, sess)
 
                 db2.commit()
+                _watch_screenshots(analyzer, screenshot_count, session_id)
+                get_leaderboard_cache().submit(session_day(sess), sess.challenge_type, sess.user_id, sess.score)
                 logger.info(f"Challenge session {session_id}: auto-ended on disconnect (score={sess.score})")
         finally:
             db2.close()
@@ -677,6 +754,7 @@ async def websocket_mimic(
 
     Protocol:
       Client sends: { "type": "frame", "data": "<base64 jpeg>", "timestamp": <float> }
+        (or a binary_v1 frame/audio message after { "type": "hello" } negotiation)
       Server replies: { "type": "mimic_update", ... }
       Client sends: { "type": "end_session" } to finish.
     """
@@ -719,6 +797,16 @@ async def websocket_mimic(
 
     await websocket.accept()
 
+    inference_pool = get_inference_pool("mimic")
+    try:
+        inference_pool.admit(session_id)
+    except InferencePoolFull as e:
+        logger.warning(f"Mimic session {session_id}: {e}")
+        await websocket.close(code=POOL_FULL_CLOSE_CODE, reason="Server busy — try again shortly")
+        return
+
+    include_timing = False  # client asked for per-result timing in hello
+
     # Initialise voice recognizer (graceful — disabled if model not present)
     voice_rec = None
     try:
@@ -743,7 +831,7 @@ async def websocket_mimic(
         while True:
             try:
                 raw_message = await asyncio.wait_for(
-                    websocket.receive_text(),
+                    receive_message(websocket),
                     timeout=60.0,
                 )
             except asyncio.TimeoutError:
@@ -753,37 +841,30 @@ async def websocket_mimic(
                 except Exception:
                     break
 
-            if raw_message == "ping":
-                await websocket.send_json({"type": "pong"})
-                continue
-
-            try:
-                message = json.loads(raw_message)
-            except json.JSONDecodeError:
+            trace_start, trace_wall = time.perf_counter(), time.time()
+            message = parse_client_message(raw_message, tags=["feature:mimic"])
+            if message is None:
                 continue
 
             msg_type = message.get("type")
 
             if msg_type == "frame":
-                frame_b64 = message.get("data", "")
-                timestamp = message.get("timestamp", 0.0)
-                ref_time = message.get("ref_time")
-                if not frame_b64:
+                frame = message.get("frame")
+                if frame is None:
                     continue
 
-                frame_data = base64.b64decode(frame_b64)
-
-                loop = asyncio.get_event_loop()
-                result = await loop.run_in_executor(
-                    None, analyzer.process_frame, frame_data, timestamp, ref_time
+                trace = FrameTrace.for_frame("mimic", frame, trace_start, trace_wall)
+                trace.begin_wait()
+                result = await inference_pool.run(
+                    session_id, run_traced, trace, analyzer.process_frame,
+                    frame.data, frame.timestamp, frame.ref_time,
                 )
-                await websocket.send_json(result)
+                await send_traced(websocket, result, trace, include_timing)
 
             elif msg_type == "audio":
-                audio_b64 = message.get("data", "")
-                if audio_b64 and voice_rec:
-                    pcm = base64.b64decode(audio_b64)
-                    cmd = voice_rec.feed(pcm)
+                audio = message.get("frame")
+                if audio is not None and voice_rec:
+                    cmd = voice_rec.feed(audio.data)
                     if cmd:
                         await websocket.send_json({"type": "voice_command", "command": cmd})
 
@@ -792,6 +873,10 @@ async def websocket_mimic(
                 await websocket.send_json({"type": "session_ended", "report": report})
                 break
 
+            elif msg_type == "hello":
+                include_timing = wants_trace(message)
+                await websocket.send_json(hello_response(message))
+
             elif msg_type == "ping":
                 await websocket.send_json({"type": "pong"})
 
@@ -799,6 +884,8 @@ async def websocket_mimic(
         logger.info(f"Mimic session {session_id}: WebSocket disconnected")
     except Exception as e:
         logger.error(f"Mimic session {session_id}: Error: {e}")
+    finally:
+        inference_pool.release(session_id)
 
     # Cleanup voice recognizer
     if voice_rec:
@@ -810,17 +897,19 @@ async def websocket_mimic(
         from .features.mimic.db_models.mimic import (
             MimicSession as MS, MimicSessionStatus, MimicRecord,
         )
-        from .features.mimic.routers.mimic import _save_mimic_screenshots
+        from .features.mimic.routers.mimic import (
+            _save_mimic_screenshots, _watch_mimic_screenshots,
+        )
 
         db2 = SessionLocal()
         try:
             sess = db2.query(MS).filter(MS.id == session_id).first()
             if sess and sess.status != MimicSessionStatus.ENDED:
-                # Grab screenshots before ending session
-                screenshots = []
+                # Finish screenshots before ending session
+                screenshot_count = 0
                 analyzer_ref = gsm.get_session(session_id)
-                if analyzer_ref and hasattr(analyzer_ref, 'get_screenshots'):
-                    screenshots = analyzer_ref.get_screenshots()
+                if analyzer_ref and hasattr(analyzer_ref, 'finish_screenshots'):
+                    screenshot_count = analyzer_ref.finish_screenshots()
 
                 report = gsm.end_session(session_id) or {}
 
@@ -850,9 +939,10 @@ async def websocket_mimic(
                     ))
 
                 # Save screenshots
-                _save_mimic_screenshots(screenshots, sess, sess.user_id)
+                _save_mimic_screenshots(screenshot_count, sess, sess.user_id)
 
                 db2.commit()
+                _watch_mimic_screenshots(analyzer_ref, screenshot_count, session_id)
                 logger.info(f"Mimic session {session_id}: auto-ended on disconnect (score={sess.overall_score})")
         finally:
             db2.close()
@@ -12,6 +12,9 @@ logger = logging.getLogger(__name__)
 from ..database import get_db
 from ..db_models.stream_session import StreamSession, StreamStatus
 from ..services.stream_service import get_stream_session_manager
+from ..core.streaming.shard_pool import ShardPoolFull
+from ..core.streaming.inference_pool import get_inference_pool
+from ..core.streaming.resume import SessionCheckpoint, get_resume_registry
 from ..services.storage_service import get_storage_service
 from ..websocket.stream_handler import get_stream_connection_manager
 from .auth import get_current_user
@@ -175,16 +178,19 @@ async def start_stream(
     session_manager = get_stream_session_manager()
     settings = get_settings()
     output_dir = str(settings.output_path / str(current_user.id) / f"stream_{session_id}")
-    session_manager.create_session(
-        session_id,
-        session.court_boundary,
-        frame_rate=float(session.frame_rate or 30),
-        enable_tuning_data=bool(session.enable_tuning_data),
-        enable_shuttle_tracking=bool(session.enable_shuttle_tracking),
-        output_dir=output_dir,
-        stream_mode=session.stream_mode or "basic",
-        chunk_duration=session.chunk_duration or 60,
-    )
+    try:
+        session_manager.create_session(
+            session_id,
+            session.court_boundary,
+            frame_rate=float(session.frame_rate or 30),
+            enable_tuning_data=bool(session.enable_tuning_data),
+            enable_shuttle_tracking=bool(session.enable_shuttle_tracking),
+            output_dir=output_dir,
+            stream_mode=session.stream_mode or "basic",
+            chunk_duration=session.chunk_duration or 60,
+        )
+    except ShardPoolFull:
+        raise HTTPException(status_code=503, detail="Server busy — try again shortly")
 
     session.status = StreamStatus.STREAMING
     session.started_at = datetime.utcnow()
@@ -207,8 +213,6 @@ async def end_stream(
     from pathlib import Path
     from ..config import get_settings
     from ..services.storage_service import get_storage_service
-    import cv2
-    import numpy as np
     import logging
 
     logger = logging.getLogger(__name__)
@@ -233,31 +237,14 @@ async def end_stream(
     # If recording was active, save it before ending
     if analyzer and session.is_recording:
         logger.info(f"Auto-saving recording for session {session_id} before ending")
-        frames = analyzer.stop_recording()
+        recording = analyzer.stop_recording()
         session.is_recording = False
 
-        if frames:
+        if recording:
             try:
-                # Create output directory
+                # The video was encoded while streaming; just move it into place
                 output_dir = settings.output_path / str(current_user.id) / f"stream_{session_id}"
-                output_dir.mkdir(parents=True, exist_ok=True)
-                video_path = str(output_dir / "recording.mp4")
-
-                # Decode first frame to get dimensions
-                first_frame = cv2.imdecode(np.frombuffer(frames[0], np.uint8), cv2.IMREAD_COLOR)
-                height, width = first_frame.shape[:2]
-
-                # Create video writer
-                fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-                fps = session.frame_rate or 10
-                out = cv2.VideoWriter(video_path, fourcc, fps, (width, height))
-
-                # Write all frames
-                for frame_data in frames:
-                    frame = cv2.imdecode(np.frombuffer(frame_data, np.uint8), cv2.IMREAD_COLOR)
-                    if frame is not None:
-                        out.write(frame)
-                out.release()
+                video_path = recording.move_to(str(output_dir / "recording.mp4"))
 
                 # Upload to S3 if enabled
                 if storage.is_s3():
@@ -274,13 +261,20 @@ async def end_stream(
                 else:
                     session.recording_local_path = video_path
 
-                logger.info(f"Auto-saved recording with {len(frames)} frames for session {session_id}")
+                logger.info(f"Auto-saved recording with {recording.frame_count} frames for session {session_id}")
             except Exception as e:
                 logger.error(f"Failed to auto-save recording: {e}")
 
     # Get final report (keeps analyzer alive for post-analysis)
     report = session_manager.end_session(session_id)
 
+    # Ended on purpose: no reconnect to wait for, nothing to resume
+    get_resume_registry().forget(session_id)
+    SessionCheckpoint.for_session(session_id).discard()
+    if session_id not in get_stream_connection_manager().get_active_sessions():
+        # A detached session keeps its inference slot for the grace window
+        get_inference_pool("badminton").release(session_id)
+
     # Update session in database
     session.status = StreamStatus.ENDED
     session.ended_at = datetime.utcnow()
@@ -392,8 +386,6 @@ async def stop_recording(
     from pathlib import Path
     from ..config import get_settings
     from ..services.storage_service import get_storage_service
-    import cv2
-    import numpy as np
     import logging
 
     logger = logging.getLogger(__name__)
@@ -423,36 +415,17 @@ async def stop_recording(
         logger.warning(f"Analyzer not found for session {session_id} - session may have ended")
         raise HTTPException(status_code=400, detail="Stream session not active. Recording may have been auto-saved when session ended.")
 
-    frames = analyzer.stop_recording()
+    recording = analyzer.stop_recording()
     session.is_recording = False
 
     video_path = None
     s3_key = None
-    if frames:
-        # Create output directory for local processing
+    if recording:
         output_dir = settings.output_path / str(current_user.id) / f"stream_{session_id}"
-        output_dir.mkdir(parents=True, exist_ok=True)
-
-        # Save frames as video locally first (needed for encoding)
-        video_path = str(output_dir / "recording.mp4")
 
         try:
-            # Decode first frame to get dimensions
-            first_frame = cv2.imdecode(np.frombuffer(frames[0], np.uint8), cv2.IMREAD_COLOR)
-            height, width = first_frame.shape[:2]
-
-            # Create video writer
-            fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-            fps = session.frame_rate or 10
-            out = cv2.VideoWriter(video_path, fourcc, fps, (width, height))
-
-            # Write all frames
-            for frame_data in frames:
-                frame = cv2.imdecode(np.frombuffer(frame_data, np.uint8), cv2.IMREAD_COLOR)
-                if frame is not None:
-                    out.write(frame)
-
-            out.release()
+            # The video was encoded while streaming; just move it into place
+            video_path = recording.move_to(str(output_dir / "recording.mp4"))
 
             # Upload to S3 if enabled
             if storage.is_s3():
@@ -483,7 +456,7 @@ async def stop_recording(
     return {
         "recording": False,
         "message": "Recording stopped and saved" if (video_path or s3_key) else "Recording stopped",
-        "frame_count": len(frames),
+        "frame_count": recording.frame_count if recording else 0,
         "has_video": (video_path is not None) or (s3_key is not None)
     }
 
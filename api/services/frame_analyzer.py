@@ -16,6 +16,8 @@ from typing import List, Dict, Tuple, Optional
 from collections import defaultdict
 import logging
 
+from ..core.tracing import stage
+
 logger = logging.getLogger(__name__)
 
 
@@ -305,7 +307,8 @@ class FrameAnalyzer:
         result = FrameAnalysisResult()
 
         # Detect pose within court
-        pose_landmarks, player_bbox = self._analyze_pose_in_court(frame)
+        with stage("pose"):
+            pose_landmarks, player_bbox = self._analyze_pose_in_court(frame)
 
         if pose_landmarks is None:
             return result
@@ -318,11 +321,12 @@ class FrameAnalyzer:
         if foot_pos:
             result.foot_position = foot_pos
 
-        # Analyze movement with timestamp for time-based velocity
-        movement_data = self._analyze_movement(pose_landmarks, timestamp)
+        with stage("classify"):
+            # Analyze movement with timestamp for time-based velocity
+            movement_data = self._analyze_movement(pose_landmarks, timestamp)
 
-        # Classify shot
-        shot_type, confidence = self._classify_shot(movement_data, pose_landmarks)
+            # Classify shot
+            shot_type, confidence = self._classify_shot(movement_data, pose_landmarks)
 
         # Apply cooldown for actual shots to prevent follow-through misclassification
         if shot_type in self.ACTUAL_SHOTS and confidence > 0.5:
@@ -763,6 +767,22 @@ class FrameAnalyzer:
         self._last_transform = None
         self.last_shot_timestamp = -999.0
 
+    def get_tracking_state(self) -> dict:
+        """Movement history and shot cooldown, for session checkpoints."""
+        return {
+            'pose_history': list(self.pose_history),
+            'last_transform': self._last_transform,
+            'last_shot_timestamp': self.last_shot_timestamp,
+            'frame_log_counter': self._frame_log_counter,
+        }
+
+    def set_tracking_state(self, state: dict):
+        """Restore what ``get_tracking_state`` returned."""
+        self.pose_history = list(state.get('pose_history', []))
+        self._last_transform = state.get('last_transform')
+        self.last_shot_timestamp = state.get('last_shot_timestamp', -999.0)
+        self._frame_log_counter = state.get('frame_log_counter', 0)
+
     def close(self):
         """Release resources."""
         if self.pose:
@@ -10,11 +10,105 @@ This is the classification layer — separate from the detection models
 
 import logging
 import math
+import time
 from typing import Any, Dict, List, Optional, Tuple
 
 logger = logging.getLogger(__name__)
 
 
+def _lap(timings: Optional[Dict[str, float]], phase: str, start: float) -> float:
+    """Add elapsed seconds since ``start`` to ``timings[phase]``; return now."""
+    now = time.perf_counter()
+    if timings is not None:
+        timings[phase] = timings.get(phase, 0.0) + (now - start)
+    return now
+
+
+def build_frame_columns(
+    raw_frames: List[dict],
+    velocity_data: Optional[List[dict]] = None,
+) -> Dict[str, Any]:
+    """Flatten per-frame dicts into columnar numpy arrays.
+
+    Built once per classification pass and shared by shuttle hit detection
+    and hit-centric window features, so each frame dict is only walked once.
+
+    Args:
+        raw_frames: Per-frame data (same format as ``classify_all`` input).
+        velocity_data: Optional output of ``ShotClassifier._compute_velocities``.
+            When omitted, ``wrist_velocity`` is read from the frame dicts.
+
+    Returns:
+        Dict of equal-length arrays: ``frame_number``, ``has_pose``,
+        ``wrist_x``, ``wrist_y``, ``shoulder_x``, ``shoulder_y``, ``hip_y``,
+        ``wrist_velocity``, ``shuttle_x``, ``shuttle_y``, ``shuttle_visible``.
+        Values are 0 where the corresponding ``has_pose`` /
+        ``shuttle_visible`` flag is False.
+    """
+    import numpy as np
+
+    # Filled as Python lists and converted once; per-element numpy stores
+    # would dominate the cost on long sessions.
+    no_pose = (0.0, 0.0, 0.0, 0.0, 0.0)
+    frame_numbers: List[int] = []
+    pose: List[tuple] = []
+    has_pose: List[bool] = []
+    wrist_vel: List[float] = []
+    shuttle_pos: List[tuple] = []
+    shuttle_visible: List[bool] = []
+    n_vel = len(velocity_data) if velocity_data is not None else 0
+
+    for i, fd in enumerate(raw_frames):
+        frame_numbers.append(fd.get("frame_number", i))
+
+        if velocity_data is not None:
+            vel_info = velocity_data[i] if i < n_vel else None
+            wv = vel_info.get("wrist_velocity", 0.0) if vel_info else 0.0
+        else:
+            wv = fd.get("wrist_velocity")
+        wrist_vel.append(wv if wv is not None and wv > 0 else 0.0)
+
+        ps = fd.get("pose_state")
+        if fd.get("player_detected") and ps:
+            wrist = ps["wrist"]
+            pose.append((
+                wrist[0],
+                wrist[1],
+                ps["shoulder_center"][0] if "shoulder_center" in ps else ps["shoulder"][0],
+                ps["shoulder"][1],
+                ps["hip_center"][1],
+            ))
+            has_pose.append(True)
+        else:
+            pose.append(no_pose)
+            has_pose.append(False)
+
+        shuttle = fd.get("shuttle")
+        if shuttle and shuttle.get("visible") and shuttle.get("x") is not None:
+            shuttle_pos.append((shuttle["x"], shuttle["y"]))
+            shuttle_visible.append(True)
+        else:
+            shuttle_pos.append((0.0, 0.0))
+            shuttle_visible.append(False)
+
+    n = len(frame_numbers)
+    pose_arr = np.array(pose, dtype=np.float64).reshape(n, 5)
+    shuttle_arr = np.array(shuttle_pos, dtype=np.float64).reshape(n, 2)
+    return {
+        "frame_number": np.array(frame_numbers, dtype=np.int64),
+        "has_pose": np.array(has_pose, dtype=bool),
+        "wrist_x": pose_arr[:, 0],
+        "wrist_y": pose_arr[:, 1],
+        "shoulder_x": pose_arr[:, 2],
+        "shoulder_y": pose_arr[:, 3],
+        "hip_y": pose_arr[:, 4],
+        "wrist_velocity": np.array(wrist_vel, dtype=np.float64),
+        "shuttle_x": shuttle_arr[:, 0],
+        "shuttle_y": shuttle_arr[:, 1],
+        "shuttle_visible": np.array(shuttle_visible, dtype=bool),
+    }
+
+
 def detect_shuttle_hits_windowed(
     raw_frames: List[dict],
     fps: float,
@@ -31,6 +125,8 @@ def detect_shuttle_hits_windowed(
     window: int = 30,
     direction_pct: float = 80.0,
     min_speed: float = 80.0,
+    columns: Optional[Dict[str, Any]] = None,
+    timings: Optional[Dict[str, float]] = None,
 ) -> List[dict]:
     """Detect shuttle hits using multi-signal trajectory analysis.
 
@@ -58,6 +154,11 @@ def detect_shuttle_hits_windowed(
             for the ≥2-signal gating rule. 0 disables gating.
         wrist_bonus: Weight for wrist velocity bonus signal. 0 disables.
         wrist_window: Half-window for wrist velocity max pooling (frames).
+        columns: Optional precomputed ``build_frame_columns()`` output for
+            ``raw_frames``; built on the fly when omitted.
+        timings: Optional dict that receives per-step wall time in seconds
+            (``prepare``, ``signal_a``, ``signal_b``, ``signal_c``,
+            ``combine``, ``peaks``, ``output``).
 
     Returns:
         List of hit dicts compatible with _match_shots_with_shuttle_hits().
@@ -68,17 +169,14 @@ def detect_shuttle_hits_windowed(
     if n == 0:
         return []
 
-    # --- Step 0: Build clean position arrays ---
-    raw_x = np.full(n, np.nan)
-    raw_y = np.full(n, np.nan)
-    has_pos = np.zeros(n, dtype=bool)
+    t0 = time.perf_counter()
+    if columns is None:
+        columns = build_frame_columns(raw_frames)
 
-    for i, frame in enumerate(raw_frames):
-        shuttle = frame.get("shuttle")
-        if shuttle and shuttle.get("visible") and shuttle.get("x") is not None:
-            raw_x[i] = shuttle["x"]
-            raw_y[i] = shuttle["y"]
-            has_pos[i] = True
+    # --- Step 0: Build clean position arrays ---
+    has_pos = columns["shuttle_visible"]
+    raw_x = np.where(has_pos, columns["shuttle_x"], np.nan)
+    raw_y = np.where(has_pos, columns["shuttle_y"], np.nan)
 
     # Interpolate gaps up to 5 frames
     interp_x = raw_x.copy()
@@ -132,6 +230,8 @@ def detect_shuttle_hits_windowed(
         vy[i] = (smooth_y[i] - smooth_y[i - 2]) / 2.0
         speed[i] = math.sqrt(vx[i] ** 2 + vy[i] ** 2)
 
+    t0 = _lap(timings, "prepare", t0)
+
     # --- Step 1: Signal A — Large-window net displacement cosine ---
     signal_a = np.zeros(n)
     min_span = max(1, disp_window // 3)
@@ -169,6 +269,8 @@ def detect_shuttle_hits_windowed(
         cos_sim = (b_dx * a_dx + b_dy * a_dy) / (b_mag * a_mag)
         signal_a[i] = max(0.0, -cos_sim)
 
+    t0 = _lap(timings, "signal_a", t0)
+
     # --- Step 2: Signal B — Speed ratio ---
     signal_b = np.zeros(n)
     for i in range(n):
@@ -191,6 +293,8 @@ def detect_shuttle_hits_windowed(
         ratio = max(after_avg / before_avg, before_avg / after_avg)
         signal_b[i] = ratio - 1.0
 
+    t0 = _lap(timings, "signal_b", t0)
+
     # --- Step 3: Signal C — Trajectory break / prediction error ---
     signal_c = np.zeros(n)
     K = 5  # prediction horizon
@@ -239,6 +343,8 @@ def detect_shuttle_hits_windowed(
         if err_cnt > 0:
             signal_c[i] = err_sum / err_cnt
 
+    t0 = _lap(timings, "signal_c", t0)
+
     # --- Step 4: Normalize and combine ---
     def _normalize(arr: np.ndarray, pct: int) -> np.ndarray:
         pos = arr[arr > 0]
@@ -268,11 +374,7 @@ def detect_shuttle_hits_windowed(
 
     # Wrist velocity bonus: boost combined score near wrist spikes
     if wrist_bonus > 0:
-        wrist_vel = np.zeros(n)
-        for i, frame in enumerate(raw_frames):
-            wv = frame.get("wrist_velocity")
-            if wv is not None and wv > 0:
-                wrist_vel[i] = wv
+        wrist_vel = columns["wrist_velocity"]
         if np.any(wrist_vel > 0):
             norm_wv = _normalize(wrist_vel, 95)
             # Max-pool over ±wrist_window to account for timing offset
@@ -283,6 +385,8 @@ def detect_shuttle_hits_windowed(
                 wv_pooled[i] = norm_wv[lo:hi].max()
             combined = combined + wrist_bonus * wv_pooled
 
+    t0 = _lap(timings, "combine", t0)
+
     # --- Step 5: Peak detection with NMS ---
     candidates = []
     for i in range(n):
@@ -302,6 +406,7 @@ def detect_shuttle_hits_windowed(
 
     # Build output in frame order
     hits_indices.sort(key=lambda h: h[0])
+    t0 = _lap(timings, "peaks", t0)
 
     result: List[dict] = []
     for idx, score in hits_indices:
@@ -324,6 +429,7 @@ def detect_shuttle_hits_windowed(
             "reversal_type": "multi_signal",
         })
 
+    _lap(timings, "output", t0)
     return result
 
 
@@ -407,6 +513,21 @@ def detect_shuttle_hits_windowed_tuning(
     )
 
 
+# Column layout of the hit-centric window feature matrix produced by
+# ShotClassifier._hit_window_features() — one row per shuttle hit.
+HF_HIT_IDX = 0            # index into raw_frame_data, -1 if the hit frame is missing
+HF_N_POSE = 1             # frames with pose data in the lookback window
+HF_MAX_VEL = 2            # peak wrist velocity in the window
+HF_AVG_WRIST_Y = 3
+HF_AVG_SHOULDER_Y = 4
+HF_AVG_HIP_Y = 5
+HF_PCT_OVERHEAD = 6       # fraction of pose frames with wrist above shoulder
+HF_STROKE_DIFF = 7        # largest-magnitude wrist-shoulder X offset
+HF_SHUTTLE_DIR = 8        # cosine of post-hit shuttle motion vs. direction to player
+HF_SHUTTLE_DIR_VALID = 9  # 1.0 when HF_SHUTTLE_DIR could be computed
+HF_NUM = 10
+
+
 class ShotClassifier:
     """Classifies shots using accumulated pose + shuttle raw data."""
 
@@ -492,7 +613,10 @@ class ShotClassifier:
         # Hit-centric lookback
         self.attribution_window = attribution_window
 
-    def classify_all(self, raw_frame_data: List[dict], fps: float) -> dict:
+    def classify_all(
+        self, raw_frame_data: List[dict], fps: float,
+        timings: Optional[Dict[str, float]] = None,
+    ) -> dict:
         """
         Process all raw frame data and produce classified results.
 
@@ -509,7 +633,13 @@ class ShotClassifier:
             shots, rallies, shuttle_hits, shot_timeline, summary,
             shot_distribution
         }
+
+        If ``timings`` is given it receives per-phase wall time in seconds
+        (``velocities``, ``columns``, ``shuttle_hits``, ``classification``,
+        ``rallies``, ``summary``, ``recovery``).
         """
+        t0 = time.perf_counter()
+
         # Phase 1: Compute velocities from pose state history
         velocity_data = self._compute_velocities(raw_frame_data)
 
@@ -519,8 +649,16 @@ class ShotClassifier:
             if vel_info and "wrist_velocity" in vel_info:
                 frame["wrist_velocity"] = vel_info["wrist_velocity"]
 
+        t0 = _lap(timings, "velocities", t0)
+
+        # Columnar view of pose + shuttle data, shared by hit detection and
+        # hit-centric window features
+        columns = build_frame_columns(raw_frame_data, velocity_data)
+        t0 = _lap(timings, "columns", t0)
+
         # Phase 2: Detect shuttle hits (arc direction changes)
-        shuttle_hits = self._detect_shuttle_hits(raw_frame_data, fps)
+        shuttle_hits = self._detect_shuttle_hits(raw_frame_data, fps, columns=columns)
+        t0 = _lap(timings, "shuttle_hits", t0)
 
         # Phase 3: Choose classification path
         has_shuttle = len(shuttle_hits) > 0
@@ -528,7 +666,7 @@ class ShotClassifier:
         if has_shuttle:
             # Hit-centric: for each shuttle hit, look back at player movement
             enriched_shots = self._classify_hits_centric(
-                raw_frame_data, shuttle_hits, velocity_data, fps
+                raw_frame_data, shuttle_hits, velocity_data, fps, columns=columns
             )
             session_stats: Dict[str, int] = {}
             player_stats: Dict[str, int] = {}
@@ -590,6 +728,8 @@ class ShotClassifier:
 
             enriched_shots = self._match_shots_with_shuttle_hits(shots, shuttle_hits)
 
+        t0 = _lap(timings, "classification", t0)
+
         # Phase 5: Build rallies
         # Use shuttle-based rally detection when shuttle data is available,
         # fall back to pose-based (shot time gaps) otherwise.
@@ -643,6 +783,8 @@ class ShotClassifier:
                 else:
                     rally["rally_duration"] = rally["duration"]
 
+        t0 = _lap(timings, "rallies", t0)
+
         # Build timeline
         shot_timeline = []
         for s in enriched_shots:
@@ -692,10 +834,13 @@ class ShotClassifier:
             "shuttle_hits_detected": len(shuttle_hits),
         }
 
+        t0 = _lap(timings, "summary", t0)
+
         # Compute center recovery metrics if court center was provided
         recovery = {}
         if self.court_center is not None:
             recovery = self._compute_recovery(raw_frame_data, enriched_shots, fps)
+        _lap(timings, "recovery", t0)
 
         result = {
             "shots": enriched_shots,
@@ -919,7 +1064,10 @@ class ShotClassifier:
     # Shuttle hit detection (arc direction changes)
     # ------------------------------------------------------------------
 
-    def _detect_shuttle_hits(self, raw_frames: List[dict], fps: float) -> List[dict]:
+    def _detect_shuttle_hits(
+        self, raw_frames: List[dict], fps: float,
+        columns: Optional[Dict[str, Any]] = None,
+    ) -> List[dict]:
         """Detect shuttle hit points using multi-signal trajectory analysis.
 
         Combines displacement cosine, speed ratio, and trajectory break signals
@@ -937,6 +1085,7 @@ class ShotClassifier:
             gate_min=self.hit_gate_min,
             wrist_bonus=self.hit_wrist_bonus,
             wrist_window=self.hit_wrist_window,
+            columns=columns,
         )
 
     def _compute_shuttle_speed(
@@ -1012,111 +1161,49 @@ class ShotClassifier:
         shuttle_hits: List[dict],
         velocity_data: List[dict],
         fps: float,
+        columns: Optional[Dict[str, Any]] = None,
     ) -> List[dict]:
         """Hit-centric shot classification using sliding window features.
 
-        For each shuttle hit, collect pose data over the preceding
-        ``attribution_window`` frames and compute aggregate features
-        (avg wrist/shoulder/hip positions, overhead %, peak velocity).
-        Classification uses these window-level features rather than a
-        single peak-velocity frame, which is more robust to frame-to-frame
-        noise.
+        For each shuttle hit, aggregate pose data over the preceding
+        ``attribution_window`` frames (avg wrist/shoulder/hip positions,
+        overhead %, peak velocity) plus the post-hit shuttle direction.
+        Features for all hits are computed together as a (hits x features)
+        matrix by ``_hit_window_features()``; the decision rules below then
+        run on its rows. Window-level features are more robust to
+        frame-to-frame noise than a single peak-velocity frame.
 
         Decision order: net_shot → smash → clear → drop → lift → drive.
 
         Returns list of shot dicts compatible with existing format.
         """
-        # Build frame_number → index lookup
-        frame_lookup: Dict[int, int] = {}
-        for i, fd in enumerate(raw_frame_data):
-            frame_lookup[fd.get("frame_number", i)] = i
+        if columns is None:
+            columns = build_frame_columns(raw_frame_data, velocity_data)
 
-        lookback = self.attribution_window
         T = self.T
         W = self.W  # window classification thresholds
         shots: List[dict] = []
 
-        for hit in shuttle_hits:
+        features = self._hit_window_features(raw_frame_data, shuttle_hits, columns)
+
+        for hit, row in zip(shuttle_hits, features.tolist()):
+            hit_idx = int(row[HF_HIT_IDX])
+            if hit_idx < 0:
+                continue
             hit_frame = hit["frame"]
             hit_ts = hit["timestamp"]
-            hit_idx = frame_lookup.get(hit_frame)
-            if hit_idx is None:
-                continue
-
-            lo = max(0, hit_idx - lookback)
-
-            # Collect window features from pose data
-            wrist_ys: List[float] = []
-            wrist_xs: List[float] = []
-            shoulder_ys: List[float] = []
-            shoulder_xs: List[float] = []
-            hip_ys: List[float] = []
-            velocities: List[float] = []
 
-            for i in range(lo, hit_idx + 1):
-                fd = raw_frame_data[i]
-                vel_info = velocity_data[i] if i < len(velocity_data) else {}
-                velocities.append(vel_info.get("wrist_velocity", 0.0))
-
-                if fd.get("player_detected") and fd.get("pose_state"):
-                    ps = fd["pose_state"]
-                    wrist_ys.append(ps["wrist"][1])
-                    wrist_xs.append(ps["wrist"][0])
-                    shoulder_ys.append(ps["shoulder"][1])
-                    shoulder_xs.append(ps["shoulder_center"][0] if "shoulder_center" in ps else ps["shoulder"][0])
-                    hip_ys.append(ps["hip_center"][1])
-
-            n_pose = len(wrist_ys)
-            max_vel = max(velocities) if velocities else 0.0
+            n_pose = int(row[HF_N_POSE])
+            max_vel = row[HF_MAX_VEL]
 
             # --- Player attribution ---
             # Signal 1: Wrist velocity (was the player swinging?)
             wrist_active = max_vel >= T["movement"]
 
             # Signal 2: Shuttle direction relative to player
-            # After the hit, is the shuttle moving TOWARD or AWAY from our player?
-            shuttle_direction_score = 0.0  # positive = toward player (opponent), negative = away (player)
-            shuttle_dir_computed = False
-
-            # Get player position in pixel space at hit frame
-            hit_fd = raw_frame_data[hit_idx]
-            ct = hit_fd.get("court_transform")
-            ps_at_hit = hit_fd.get("pose_state")
-            if ct and ps_at_hit and ps_at_hit.get("wrist"):
-                player_px_x = ps_at_hit["wrist"][0] * ct["court_w"] + ct["x1"]
-                player_px_y = ps_at_hit["wrist"][1] * ct["court_h"] + ct["y1"]
-
-                # Compute shuttle velocity vector after hit (next 10 visible frames)
-                shuttle_after = []
-                for j in range(hit_idx + 1, min(hit_idx + 30, len(raw_frame_data))):
-                    s = raw_frame_data[j].get("shuttle")
-                    if s and s.get("visible") and s.get("x") is not None:
-                        shuttle_after.append((s["x"], s["y"], raw_frame_data[j].get("timestamp", 0)))
-                        if len(shuttle_after) >= 5:
-                            break
-
-                if len(shuttle_after) >= 2:
-                    # Average shuttle velocity vector
-                    total_dx = shuttle_after[-1][0] - shuttle_after[0][0]
-                    total_dy = shuttle_after[-1][1] - shuttle_after[0][1]
-
-                    # Shuttle position at hit
-                    hit_shuttle = hit.get("hit_position", {})
-                    sx = hit_shuttle.get("x")
-                    sy = hit_shuttle.get("y")
-                    if sx is not None and sy is not None:
-                        # Vector from shuttle to player
-                        to_player_x = player_px_x - sx
-                        to_player_y = player_px_y - sy
-
-                        # Dot product: positive = shuttle moving toward player
-                        dot = total_dx * to_player_x + total_dy * to_player_y
-                        # Normalize by magnitudes to get cosine similarity
-                        mag_vel = math.sqrt(total_dx**2 + total_dy**2)
-                        mag_dir = math.sqrt(to_player_x**2 + to_player_y**2)
-                        if mag_vel > 0 and mag_dir > 0:
-                            shuttle_direction_score = dot / (mag_vel * mag_dir)
-                            shuttle_dir_computed = True
+            # positive = toward player (opponent), negative = away (player)
+            shuttle_dir_computed = row[HF_SHUTTLE_DIR_VALID] > 0
+            shuttle_direction_score = row[HF_SHUTTLE_DIR] if shuttle_dir_computed else 0.0
 
             # Combine signals for attribution
             # Shuttle direction is the primary signal (physics-based):
@@ -1158,16 +1245,9 @@ class ShotClassifier:
                 })
                 continue
 
-            avg_wy = sum(wrist_ys) / n_pose
-            avg_sy = sum(shoulder_ys) / n_pose
-            avg_hy = sum(hip_ys) / n_pose
-
-            # Overhead: % of frames with wrist above shoulder (small offset)
-            overhead_off = W["overhead_offset_window"]
-            pct_overhead = sum(
-                1 for wy, sy in zip(wrist_ys, shoulder_ys)
-                if wy < sy - overhead_off
-            ) / n_pose
+            avg_wy = row[HF_AVG_WRIST_Y]
+            avg_hy = row[HF_AVG_HIP_Y]
+            pct_overhead = row[HF_PCT_OVERHEAD]
 
             # Wrist-hip gap (positive = wrist above hip)
             wrist_hip_gap = avg_hy - avg_wy
@@ -1215,11 +1295,8 @@ class ShotClassifier:
                     else 0.4
                 )
 
-            # Compute wrist-shoulder X offset for forehand/backhand detection
-            stroke_diff = None
-            if wrist_xs and shoulder_xs:
-                diffs = [wx - sx for wx, sx in zip(wrist_xs, shoulder_xs)]
-                stroke_diff = max(diffs, key=abs)
+            # Wrist-shoulder X offset (largest magnitude) for forehand/backhand
+            stroke_diff = row[HF_STROKE_DIFF]
 
             shots.append({
                 "frame": hit_frame,
@@ -1232,7 +1309,7 @@ class ShotClassifier:
                 "shuttle_speed_px_per_sec": hit.get("speed_px_per_sec"),
                 "shuttle_hit_matched": True,
                 "hit_by": "player",
-                "stroke_diff": round(stroke_diff, 4) if stroke_diff is not None else None,
+                "stroke_diff": round(stroke_diff, 4),
             })
 
         # Post-processing: enforce hit alternation within rallies.
@@ -1261,6 +1338,149 @@ class ShotClassifier:
 
         return shots
 
+    def _hit_window_features(
+        self,
+        raw_frame_data: List[dict],
+        shuttle_hits: List[dict],
+        columns: Dict[str, Any],
+    ) -> "np.ndarray":
+        """Compute per-hit window features in one vectorised pass.
+
+        The ``attribution_window`` lookback for every hit is a strided view
+        over the columnar frame data from ``build_frame_columns()``, so all
+        hits are reduced together instead of one Python loop per hit.
+
+        Returns a float64 matrix of shape ``(len(shuttle_hits), HF_NUM)``
+        indexed by the ``HF_*`` column constants. Hits whose frame is not
+        present in ``raw_frame_data`` have ``HF_HIT_IDX == -1``.
+        """
+        import numpy as np
+        from numpy.lib.stride_tricks import sliding_window_view
+
+        n = len(raw_frame_data)
+        n_hits = len(shuttle_hits)
+        features = np.zeros((n_hits, HF_NUM))
+        features[:, HF_HIT_IDX] = -1
+        if n == 0 or n_hits == 0:
+            return features
+
+        frame_numbers = columns["frame_number"]
+        has_pose = columns["has_pose"]
+        wrist_x = columns["wrist_x"]
+        wrist_y = columns["wrist_y"]
+        shoulder_x = columns["shoulder_x"]
+        shoulder_y = columns["shoulder_y"]
+        hip_y = columns["hip_y"]
+        wrist_vel = columns["wrist_velocity"]
+        shuttle_x = columns["shuttle_x"]
+        shuttle_y = columns["shuttle_y"]
+        has_shuttle = columns["shuttle_visible"]
+
+        # --- Map hit frame numbers to frame indices ---
+        hit_frames = np.array([h["frame"] for h in shuttle_hits], dtype=np.int64)
+        if n == 1 or np.all(np.diff(frame_numbers) > 0):
+            pos = np.searchsorted(frame_numbers, hit_frames)
+            pos_c = np.minimum(pos, n - 1)
+            hit_idx = np.where(frame_numbers[pos_c] == hit_frames, pos_c, -1)
+        else:
+            frame_lookup = {int(fn): i for i, fn in enumerate(frame_numbers)}
+            hit_idx = np.array([frame_lookup.get(int(f), -1) for f in hit_frames], dtype=np.int64)
+        features[:, HF_HIT_IDX] = hit_idx
+        found = hit_idx >= 0
+        if not np.any(found):
+            return features
+        rows = np.nonzero(found)[0]
+        idx = hit_idx[found]
+
+        # --- Lookback window views: frames [hit_idx - lookback, hit_idx] ---
+        # Columns are front-padded with `lookback` empty frames so windows
+        # that would start before frame 0 are simply truncated.
+        lookback = max(0, int(self.attribution_window))
+        L = lookback + 1
+
+        def _windows(col: "np.ndarray", fill) -> "np.ndarray":
+            padded = np.concatenate((np.full(lookback, fill, dtype=col.dtype), col))
+            return sliding_window_view(padded, L)[idx]
+
+        pose_w = _windows(has_pose, False)
+        wy_w = _windows(wrist_y, 0.0)
+        sy_w = _windows(shoulder_y, 0.0)
+        hy_w = _windows(hip_y, 0.0)
+        diff_w = _windows(wrist_x, 0.0) - _windows(shoulder_x, 0.0)
+        vel_w = _windows(wrist_vel, 0.0)
+
+        n_pose = pose_w.sum(axis=1)
+        max_vel = vel_w.max(axis=1)
+
+        # Accumulate column by column (oldest frame first) so sums match the
+        # sequential per-hit accumulation bit for bit.
+        sum_wy = np.zeros(len(idx))
+        sum_sy = np.zeros(len(idx))
+        sum_hy = np.zeros(len(idx))
+        for k in range(L):
+            m = pose_w[:, k]
+            sum_wy = np.where(m, sum_wy + wy_w[:, k], sum_wy)
+            sum_sy = np.where(m, sum_sy + sy_w[:, k], sum_sy)
+            sum_hy = np.where(m, sum_hy + hy_w[:, k], sum_hy)
+
+        overhead_off = self.W["overhead_offset_window"]
+        n_overhead = (pose_w & (wy_w < sy_w - overhead_off)).sum(axis=1)
+
+        safe_n = np.maximum(n_pose, 1)
+        # First wrist-shoulder X offset with the largest magnitude
+        abs_diff = np.where(pose_w, np.abs(diff_w), -1.0)
+        stroke_diff = diff_w[np.arange(len(idx)), abs_diff.argmax(axis=1)]
+
+        features[rows, HF_N_POSE] = n_pose
+        features[rows, HF_MAX_VEL] = max_vel
+        features[rows, HF_AVG_WRIST_Y] = np.where(n_pose > 0, sum_wy / safe_n, 0.0)
+        features[rows, HF_AVG_SHOULDER_Y] = np.where(n_pose > 0, sum_sy / safe_n, 0.0)
+        features[rows, HF_AVG_HIP_Y] = np.where(n_pose > 0, sum_hy / safe_n, 0.0)
+        features[rows, HF_PCT_OVERHEAD] = np.where(n_pose > 0, n_overhead / safe_n, 0.0)
+        features[rows, HF_STROKE_DIFF] = np.where(n_pose > 0, stroke_diff, 0.0)
+
+        # --- Shuttle direction after the hit ---
+        # First and last of up to 5 visible shuttle frames in
+        # (hit_idx, hit_idx + 30), relative to the player's wrist in pixels.
+        vis_idx = np.nonzero(has_shuttle)[0]
+        start = np.searchsorted(vis_idx, idx + 1)
+        limit = np.minimum(idx + 30, n)
+        n_after = np.searchsorted(vis_idx, limit) - start
+        n_after = np.clip(n_after, 0, 5)
+
+        player_px = np.full((len(idx), 2), np.nan)
+        hit_pos = np.full((len(idx), 2), np.nan)
+        for r, (h, hi) in enumerate(zip(rows.tolist(), idx.tolist())):
+            hit_fd = raw_frame_data[hi]
+            ct = hit_fd.get("court_transform")
+            ps_at_hit = hit_fd.get("pose_state")
+            if ct and ps_at_hit and ps_at_hit.get("wrist"):
+                player_px[r, 0] = ps_at_hit["wrist"][0] * ct["court_w"] + ct["x1"]
+                player_px[r, 1] = ps_at_hit["wrist"][1] * ct["court_h"] + ct["y1"]
+            hp = shuttle_hits[h].get("hit_position", {})
+            if hp.get("x") is not None and hp.get("y") is not None:
+                hit_pos[r, 0] = hp["x"]
+                hit_pos[r, 1] = hp["y"]
+
+        usable = (n_after >= 2) & ~np.isnan(player_px[:, 0]) & ~np.isnan(hit_pos[:, 0])
+        if np.any(usable) and len(vis_idx):
+            first = vis_idx[np.minimum(start, len(vis_idx) - 1)]
+            last = vis_idx[np.clip(start + n_after - 1, 0, len(vis_idx) - 1)]
+            total_dx = shuttle_x[last] - shuttle_x[first]
+            total_dy = shuttle_y[last] - shuttle_y[first]
+            to_player_x = player_px[:, 0] - hit_pos[:, 0]
+            to_player_y = player_px[:, 1] - hit_pos[:, 1]
+            dot = total_dx * to_player_x + total_dy * to_player_y
+            mag_vel = np.sqrt(total_dx ** 2 + total_dy ** 2)
+            mag_dir = np.sqrt(to_player_x ** 2 + to_player_y ** 2)
+            valid_dir = usable & (mag_vel > 0) & (mag_dir > 0)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                score = dot / (mag_vel * mag_dir)
+            features[rows, HF_SHUTTLE_DIR] = np.where(valid_dir, score, 0.0)
+            features[rows, HF_SHUTTLE_DIR_VALID] = valid_dir
+
+        return features
+
     @staticmethod
     def _enforce_alternation(shots: List[dict]) -> List[dict]:
         """Enforce player/opponent alternation — flip weaker-evidence duplicates.
@@ -23,6 +23,16 @@ class StorageBackend(ABC):
         """Load data from storage."""
         pass
 
+    def load_range(self, file_path: str, offset: int, length: Optional[int] = None) -> bytes:
+        """Load part of a file: ``length`` bytes from ``offset`` (to the end if None).
+
+        A negative ``offset`` counts from the end of the file.
+        """
+        data = self.load(file_path)
+        if offset < 0:
+            offset = max(0, len(data) + offset)
+        return data[offset:] if length is None else data[offset:offset + length]
+
     @abstractmethod
     def get_url(self, file_path: str, expires: int = 3600) -> str:
         """Get URL to access the file. For local, returns file path. For S3, returns pre-signed URL."""
@@ -75,6 +85,15 @@ class LocalStorageBackend(StorageBackend):
             raise FileNotFoundError(f"File not found: {file_path}")
         return full_path.read_bytes()
 
+    def load_range(self, file_path: str, offset: int, length: Optional[int] = None) -> bytes:
+        """Read part of a local file without loading the rest."""
+        full_path = self._full_path(file_path)
+        if not full_path.exists():
+            raise FileNotFoundError(f"File not found: {file_path}")
+        with open(full_path, 'rb') as f:
+            f.seek(offset, os.SEEK_END if offset < 0 else os.SEEK_SET)
+            return f.read() if length is None else f.read(length)
+
     def get_url(self, file_path: str, expires: int = 3600) -> str:
         """Get local file path as URL."""
         return str(self._full_path(file_path))
@@ -155,6 +174,17 @@ class S3StorageBackend(StorageBackend):
         response = self.s3_client.get_object(Bucket=self.bucket, Key=file_path)
         return response['Body'].read()
 
+    def load_range(self, file_path: str, offset: int, length: Optional[int] = None) -> bytes:
+        """Download a byte range from S3 (HTTP Range request)."""
+        if offset < 0:
+            byte_range = f"bytes={offset}"  # suffix range: last -offset bytes
+            response = self.s3_client.get_object(Bucket=self.bucket, Key=file_path, Range=byte_range)
+            data = response['Body'].read()
+            return data if length is None else data[:length]
+        end = "" if length is None else offset + length - 1
+        response = self.s3_client.get_object(Bucket=self.bucket, Key=file_path, Range=f"bytes={offset}-{end}")
+        return response['Body'].read()
+
     def get_url(self, file_path: str, expires: int = 3600) -> str:
         """Get pre-signed URL or CloudFront URL."""
         if self.cloudfront_domain:
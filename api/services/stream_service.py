@@ -16,16 +16,23 @@ import base64
 import json
 import math
 import os
+import struct
 import tempfile
 import threading
+import time
 from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass, field
 from datetime import datetime
 from pathlib import Path
-from typing import List, Dict, Optional, Tuple
+from typing import Callable, List, Dict, Optional, Tuple, Union
 import logging
 
 from .frame_analyzer import FrameAnalyzer, CourtBoundary, ShotData
+from ..core.metrics import statsd
+from ..core.tracing import stage
+from ..core.streaming.recording import RecordingResult, StreamingRecorder
+from ..core.streaming.shard_pool import get_shard_pool
 
 logger = logging.getLogger(__name__)
 
@@ -40,6 +47,7 @@ class StreamStats:
     last_shot_confidence: float = 0.0
     last_shot_timestamp: float = 0.0
     frames_processed: int = 0
+    frames_dropped: int = 0
     player_detected_frames: int = 0
 
 
@@ -152,11 +160,12 @@ class BasicStreamAnalyzer:
         self.frames_since_last_shot = 0
         self.rally_gap_threshold = 90  # frames (~3 seconds at 30fps)
 
-        # Recording (annotated recording)
+        # Recording (annotated recording, encoded as frames arrive)
         self.is_recording = False
-        self.recorded_frames: List[bytes] = []
+        self._recorder: Optional[StreamingRecorder] = None
 
         self._frame_counter = 0
+        self._last_timestamp: Optional[float] = None
         self._start_time = datetime.now()
         self._frame_width = 0
         self._frame_height = 0
@@ -166,8 +175,16 @@ class BasicStreamAnalyzer:
         self.serialized_landmarks: List[Optional[List[dict]]] = []
         self._raw_video_writer: Optional[cv2.VideoWriter] = None
         self.raw_video_path: Optional[str] = None
+        self._raw_video_start = 0
         self._output_dir = output_dir
 
+        # Video-chunk ingest: the received chunks are the raw video, and
+        # decoded frame index -> raw_frame_data index for the frames that
+        # were analysed (the live queue may skip some)
+        self._raw_chunk_file = None
+        self._raw_passthrough = False
+        self._raw_source_frames: Dict[int, int] = {}
+
         # Shuttle tracking
         self._shuttle_tracker = None
         self._shuttle_frame_buffer: List[np.ndarray] = []
@@ -195,18 +212,20 @@ class BasicStreamAnalyzer:
         except Exception as e:
             logger.warning(f"Session {self.session_id}: Shuttle tracker init failed: {e}")
 
-    def _open_raw_video_writer(self, width: int, height: int):
-        """Open raw video writer on first frame."""
-        if self._raw_video_writer is not None:
-            return
-
+    def _raw_dir(self) -> Path:
         if self._output_dir:
             raw_dir = Path(self._output_dir) / "stream_raw" / str(self.session_id)
         else:
             raw_dir = Path(tempfile.gettempdir()) / "badminton_streams" / str(self.session_id)
         raw_dir.mkdir(parents=True, exist_ok=True)
+        return raw_dir
 
-        self.raw_video_path = str(raw_dir / "raw_stream.mp4")
+    def _open_raw_video_writer(self, width: int, height: int):
+        """Open raw video writer on first frame."""
+        if self._raw_video_writer is not None:
+            return
+
+        self.raw_video_path = str(self._raw_dir() / "raw_stream.mp4")
         fourcc = cv2.VideoWriter_fourcc(*'mp4v')
         fps = max(1, int(self.frame_rate))
         self._raw_video_writer = cv2.VideoWriter(
@@ -214,24 +233,64 @@ class BasicStreamAnalyzer:
         )
         logger.info(f"Session {self.session_id}: Raw video writer opened at {self.raw_video_path}")
 
-    def process_frame(self, frame_data: bytes, timestamp: float) -> Dict:
+    def start_video_passthrough(self, extension: str) -> bool:
+        """Record incoming video chunks as the raw video, untouched.
+
+        Only a session's first chunk stream can be recorded this way: a
+        client that reconnects starts a new stream (new init segment)
+        that cannot be appended to the same file, and a session that
+        already has JPEG frames keeps its mp4v raw video. Returns whether
+        ``append_video_chunk`` will record.
+        """
+        if (not self.enable_post_analysis or self._raw_passthrough
+                or self._raw_video_writer is not None or self.raw_frame_data):
+            return False
+        self.raw_video_path = str(self._raw_dir() / f"raw_stream{extension}")
+        self._raw_chunk_file = open(self.raw_video_path, "wb")
+        self._raw_passthrough = True
+        self._raw_video_start = 0
+        logger.info(f"Session {self.session_id}: Recording video chunks to {self.raw_video_path}")
+        return True
+
+    def append_video_chunk(self, chunk: bytes):
+        """Append a received chunk to the passthrough raw video."""
+        if self._raw_chunk_file is not None:
+            self._raw_chunk_file.write(chunk)
+
+    def process_frame(
+        self, frame_data: Union[bytes, np.ndarray], timestamp: float,
+        dropped_before: int = 0, source_frame: Optional[int] = None,
+    ) -> Dict:
         """
         Process a single frame from the stream.
 
         Args:
-            frame_data: JPEG encoded frame data
+            frame_data: JPEG encoded frame data, or a BGR frame decoded
+                from video chunks
             timestamp: Frame timestamp in seconds
+            dropped_before: Frames the ingest queue skipped since the last
+                processed frame (counted towards the rally gap)
+            source_frame: Index of a decoded frame in the passthrough raw
+                video (video-chunk ingest only)
 
         Returns:
             Dict with shot, position, shuttle, pose, and stats events
         """
         self._frame_counter += 1
+        self._last_timestamp = timestamp
         self.stats.frames_processed += 1
+        if dropped_before:
+            self.stats.frames_dropped += dropped_before
+            self.frames_since_last_shot += dropped_before
 
         # Decode frame
         try:
-            nparr = np.frombuffer(frame_data, np.uint8)
-            frame = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+            if isinstance(frame_data, np.ndarray):
+                frame = frame_data
+            else:
+                with stage("jpeg_decode"):
+                    nparr = np.frombuffer(frame_data, np.uint8)
+                    frame = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
             if frame is None:
                 logger.warning(f"Failed to decode frame {self._frame_counter}")
                 return self._empty_result()
@@ -243,8 +302,9 @@ class BasicStreamAnalyzer:
         self._frame_width = w
         self._frame_height = h
 
-        # Write raw frame to disk for post-analysis
-        if self.enable_post_analysis:
+        # Write raw frame to disk for post-analysis (video-chunk ingest
+        # records the chunks themselves instead)
+        if self.enable_post_analysis and not self._raw_passthrough:
             self._open_raw_video_writer(w, h)
             if self._raw_video_writer:
                 self._raw_video_writer.write(frame)
@@ -252,9 +312,11 @@ class BasicStreamAnalyzer:
         # Run shuttle tracking
         shuttle_result = None
         if self._shuttle_tracker is not None:
-            shuttle_result = self._track_shuttle(frame)
+            with stage("shuttle"):
+                shuttle_result = self._track_shuttle(frame)
 
-        # Analyze frame (pose detection + real-time classification)
+        # Analyze frame (pose detection + real-time classification; the
+        # analyzer times its "pose" and "classify" stages itself)
         result = self.frame_analyzer.analyze_frame(
             frame=frame,
             frame_number=self._frame_counter,
@@ -322,16 +384,19 @@ class BasicStreamAnalyzer:
             }
 
         # Record annotated frame if recording is enabled
-        if self.is_recording:
+        # stop_recording may clear _recorder from a REST thread at any point
+        recorder = self._recorder
+        if recorder is not None:
             annotated = self._draw_annotations(
                 frame, result.pose_landmarks, result.shot_data if result.is_actual_shot else None
             )
-            _, buf = cv2.imencode('.jpg', annotated, [cv2.IMWRITE_JPEG_QUALITY, 90])
-            self.recorded_frames.append(buf.tobytes())
+            recorder.add_frame(annotated)
 
         # Collect raw_frame_data for post-analysis
         if self.enable_post_analysis:
             self._collect_frame_data(frame, result, timestamp, shuttle_result)
+            if self._raw_passthrough and source_frame is not None:
+                self._raw_source_frames[source_frame] = len(self.raw_frame_data) - 1
 
         response['stats'] = self._get_stats_dict()
         return response
@@ -430,10 +495,7 @@ class BasicStreamAnalyzer:
 
         Returns dict with paths and classified summary.
         """
-        # Release raw video writer
-        if self._raw_video_writer:
-            self._raw_video_writer.release()
-            self._raw_video_writer = None
+        self.release_raw_video_writer()
 
         if not self.raw_frame_data:
             return {"error": "No frame data collected"}
@@ -550,12 +612,25 @@ class BasicStreamAnalyzer:
         last_trail_frame = None
         hit_color_idx = 0
 
-        frame_number = 0
+        # raw_frame_data index of the raw video's first frame (non-zero after
+        # a restore from checkpoint: the earlier video was never finalised)
+        frame_number = self._raw_video_start
+        # A passthrough recording holds every decoded frame; only the
+        # analysed ones are annotated
+        sources = self._raw_source_frames if self._raw_passthrough else None
+        video_index = -1
         try:
             while True:
                 ret, frame = cap.read()
                 if not ret:
                     break
+                if sources is not None:
+                    video_index += 1
+                    if video_index not in sources:
+                        continue
+                    frame_number = sources[video_index]
+                if frame.shape[0] != height or frame.shape[1] != width:
+                    frame = cv2.resize(frame, (width, height))
 
                 frame_data = raw_frame_data[frame_number] if frame_number < len(raw_frame_data) else {}
 
@@ -973,6 +1048,7 @@ class BasicStreamAnalyzer:
             'last_shot_type': self.stats.last_shot_type,
             'last_shot_confidence': self.stats.last_shot_confidence,
             'frames_processed': self.stats.frames_processed,
+            'frames_dropped': self.stats.frames_dropped,
             'player_detection_rate': (
                 self.stats.player_detected_frames / self.stats.frames_processed
                 if self.stats.frames_processed > 0 else 0
@@ -1084,18 +1160,23 @@ class BasicStreamAnalyzer:
         }
 
     def start_recording(self):
-        """Start recording frames."""
+        """Start recording annotated frames (encoded in the background)."""
+        if self._recorder is not None:
+            self._recorder.abort()
+        self._recorder = StreamingRecorder(self.frame_rate)
         self.is_recording = True
-        self.recorded_frames = []
-        logger.info(f"Session {self.session_id}: Recording started")
+        logger.info(f"Session {self.session_id}: Recording started ({self._recorder.encoder})")
 
-    def stop_recording(self) -> List[bytes]:
-        """Stop recording and return recorded frames."""
+    def stop_recording(self) -> Optional[RecordingResult]:
+        """Stop recording and return the finished video (None if no frames)."""
         self.is_recording = False
-        frames = self.recorded_frames
-        self.recorded_frames = []
-        logger.info(f"Session {self.session_id}: Recording stopped ({len(frames)} frames)")
-        return frames
+        recorder, self._recorder = self._recorder, None
+        recording = recorder.finish() if recorder is not None else None
+        logger.info(
+            f"Session {self.session_id}: Recording stopped "
+            f"({recording.frame_count if recording else 0} frames)"
+        )
+        return recording
 
     def get_final_report(self) -> Dict:
         """Generate final report when stream ends."""
@@ -1191,14 +1272,82 @@ class BasicStreamAnalyzer:
             'shot_cooldown_seconds': self.frame_analyzer.get_cooldown_seconds()
         }
 
+    # ------------------------------------------------------------------
+    # Checkpoint / resume (see core/streaming/resume.py)
+    # ------------------------------------------------------------------
+
+    # Per-frame lists that only grow; checkpoints carry just the new items
+    CHECKPOINT_LISTS = ('raw_frame_data', 'serialized_landmarks', 'foot_positions')
+
+    def checkpoint_state(self, since: Optional[Dict[str, int]] = None) -> Dict:
+        """Resumable snapshot of the live state.
+
+        ``since`` maps each name in ``CHECKPOINT_LISTS`` to the number of
+        items already checkpointed; only the items after it are included.
+        """
+        since = since or {}
+        return {
+            'mode': 'basic',
+            'stats': self.stats,
+            'shot_history': list(self.shot_history),
+            'current_rally_shots': list(self.current_rally_shots),
+            'rally_id_counter': self.rally_id_counter,
+            'frames_since_last_shot': self.frames_since_last_shot,
+            'frame_counter': self._frame_counter,
+            'last_timestamp': self._last_timestamp,
+            'start_time': self._start_time,
+            'frame_size': (self._frame_width, self._frame_height),
+            'tracking': self.frame_analyzer.get_tracking_state(),
+            'append': {
+                name: getattr(self, name)[since.get(name, 0):]
+                for name in self.CHECKPOINT_LISTS
+            },
+        }
+
+    def restore_state(self, state: Dict):
+        """Continue from a checkpoint (``SessionCheckpoint.load()``)."""
+        self.stats = state['stats']
+        self.shot_history = list(state['shot_history'])
+        self.current_rally_shots = list(state['current_rally_shots'])
+        self.rally_id_counter = state['rally_id_counter']
+        self.frames_since_last_shot = state['frames_since_last_shot']
+        self._frame_counter = state['frame_counter']
+        self._last_timestamp = state.get('last_timestamp')
+        self._start_time = state.get('start_time', self._start_time)
+        self._frame_width, self._frame_height = state.get('frame_size', (0, 0))
+        self.frame_analyzer.set_tracking_state(state.get('tracking', {}))
+        for name in self.CHECKPOINT_LISTS:
+            setattr(self, name, list(state['append'].get(name, [])))
+        # The raw video from before the restart was never finalised and is
+        # overwritten; annotation covers the frames recorded from here on
+        self._raw_video_start = len(self.raw_frame_data)
+        logger.info(
+            f"Session {self.session_id}: restored from checkpoint "
+            f"({self._frame_counter} frames, {self.stats.total_shots} shots)"
+        )
+
+    def resume_info(self) -> Dict:
+        """What a reconnecting client needs to carry on."""
+        return {
+            'frames_processed': self._frame_counter,
+            'last_timestamp': self._last_timestamp,
+            'stats': self._get_stats_dict(),
+        }
+
     def release_raw_video_writer(self):
         """Release the raw video writer (call before post-analysis)."""
         if self._raw_video_writer:
             self._raw_video_writer.release()
             self._raw_video_writer = None
+        if self._raw_chunk_file is not None:
+            self._raw_chunk_file.close()
+            self._raw_chunk_file = None
 
     def close(self):
         """Release resources."""
+        if self._recorder is not None:
+            self._recorder.abort()
+            self._recorder = None
         self.release_raw_video_writer()
         self.frame_analyzer.close()
 
@@ -1207,64 +1356,287 @@ class BasicStreamAnalyzer:
 # Advanced mode: continuous background processing
 # ---------------------------------------------------------------------------
 
-class FrameStore:
-    """
-    Append-only JPEG frame store backed by a single binary file.
+class FrameStoreFull(Exception):
+    """Raised by FrameStore.append when the store has reached max_bytes."""
 
-    Main thread appends JPEG bytes (fast disk write).
-    Background thread reads frames by index (seek + read, no locking needed
-    because written data is immutable once written).
 
-    File format: [4-byte length][jpeg_bytes][4-byte length][jpeg_bytes]...
+class FrameStore:
+    """
+    Append-only JPEG frame store backed by a data file plus an index file.
+
+    Main thread appends JPEG bytes (one unbuffered write per frame).
+    Background thread reads frames by index through a persistent file
+    descriptor (``os.pread``, no seek, no per-frame open); written data is
+    immutable, so reads need no lock.
+
+    Data file (``frames.bin``): [4-byte BE length][jpeg_bytes]...
+    Index file (``frames.idx``): ``INDEX_MAGIC`` then one ``INDEX_RECORD``
+    (payload offset, length) per frame, flushed every ``INDEX_FLUSH_EVERY``
+    frames and on close. ``FrameStore.open()`` reopens a store read-only
+    after a restart and ``FrameStore.resume()`` reopens it for appending
+    (a resumed live session); frames written after the last index flush
+    are recovered by scanning the data file.
+
+    ``max_bytes`` bounds the data file; appends beyond it raise
+    ``FrameStoreFull``. ``decode_workers > 1`` decodes ``read_range``
+    batches in parallel (cv2.imdecode releases the GIL). Consumers block
+    in ``wait_for()`` instead of polling; ``append`` and ``close`` wake them.
     """
 
-    def __init__(self, path: str):
+    INDEX_MAGIC = b"FSIX0001"
+    INDEX_RECORD = struct.Struct("<QI")
+    INDEX_FLUSH_EVERY = 30
+
+    def __init__(
+        self,
+        path: str,
+        max_bytes: Optional[int] = None,
+        decode_workers: int = 0,
+        _read_only: bool = False,
+        _resume: bool = False,
+    ):
         self._path = path
-        self._write_file = open(path, 'wb')
+        self._index_path = os.path.splitext(path)[0] + ".idx"
         self._index: List[Tuple[int, int]] = []  # (offset, length)
-        self._lock = threading.Lock()
+        self._max_bytes = max_bytes
+        self._size = 0
+        self._indexed = 0  # frames already persisted to the index file
+        self._rejected = 0
+        self._reads = 0
+        self._read_bytes = 0
+
+        if _read_only:
+            self._write_fd: Optional[int] = None
+            self._index_file = None
+            self._load_index()
+        elif _resume:
+            self._load_index()
+            self._write_fd = os.open(path, os.O_WRONLY | os.O_CREAT, 0o644)
+            # Drop a torn tail and continue after the last complete frame
+            os.ftruncate(self._write_fd, self._size)
+            os.lseek(self._write_fd, self._size, os.SEEK_SET)
+            # Rewrite the index so it matches what was recovered
+            self._index_file = open(self._index_path, "wb")
+            self._index_file.write(self.INDEX_MAGIC)
+            self._indexed = 0
+            self._flush_index()
+        else:
+            self._write_fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+            self._index_file = open(self._index_path, "wb")
+            self._index_file.write(self.INDEX_MAGIC)
+        self._read_fd: Optional[int] = os.open(path, os.O_RDONLY)
+
+        self._appended = threading.Condition()
+
+        # Reusable buffer for read_range (replaced, never resized, when too small)
+        self._range_buf = bytearray(0)
+        self._range_lock = threading.Lock()
+        self._decode_pool = (
+            ThreadPoolExecutor(max_workers=decode_workers, thread_name_prefix="frame-decode")
+            if decode_workers > 1 else None
+        )
+
+    @classmethod
+    def open(cls, path: str, decode_workers: int = 0) -> "FrameStore":
+        """Reopen an existing store read-only (post-analysis, re-finalise)."""
+        return cls(path, decode_workers=decode_workers, _read_only=True)
+
+    @classmethod
+    def resume(
+        cls, path: str, max_bytes: Optional[int] = None, decode_workers: int = 0
+    ) -> "FrameStore":
+        """Reopen an existing store for appending (session resumed after a restart)."""
+        return cls(path, max_bytes, decode_workers, _resume=True)
+
+    def _load_index(self):
+        """Rebuild the in-memory index from disk, tolerating a torn tail."""
+        data_size = os.path.getsize(self._path)
+        rec = self.INDEX_RECORD
+        try:
+            with open(self._index_path, "rb") as f:
+                raw = f.read()
+        except FileNotFoundError:
+            raw = b""
+        if raw.startswith(self.INDEX_MAGIC):
+            body = raw[len(self.INDEX_MAGIC):]
+            for i in range(len(body) // rec.size):
+                offset, length = rec.unpack_from(body, i * rec.size)
+                if offset + length > data_size:
+                    break
+                self._index.append((offset, length))
+
+        # Frames appended after the last index flush
+        pos = self._index[-1][0] + self._index[-1][1] if self._index else 0
+        with open(self._path, "rb") as f:
+            while pos + 4 <= data_size:
+                f.seek(pos)
+                length = int.from_bytes(f.read(4), "big")
+                if pos + 4 + length > data_size:
+                    break
+                self._index.append((pos + 4, length))
+                pos += 4 + length
+        self._size = pos
+        self._indexed = len(self._index)
 
     def append(self, jpeg_bytes: bytes):
-        """Append a JPEG frame. Called from main thread."""
+        """Append a JPEG frame. Called from the session's ingest thread."""
+        if self._write_fd is None:
+            raise ValueError("FrameStore is closed for writing")
         length = len(jpeg_bytes)
-        with self._lock:
-            offset = self._write_file.tell()
-            self._write_file.write(length.to_bytes(4, 'big'))
-            self._write_file.write(jpeg_bytes)
-            self._write_file.flush()
-            self._index.append((offset + 4, length))
+        if self._max_bytes is not None and self._size + 4 + length > self._max_bytes:
+            self._rejected += 1
+            statsd.increment("frame_store.rejected")
+            raise FrameStoreFull(
+                f"FrameStore {self._path} reached {self._max_bytes} bytes"
+            )
+
+        offset = self._size
+        parts = [length.to_bytes(4, 'big'), jpeg_bytes]
+        written = os.writev(self._write_fd, parts)
+        if written < 4 + length:
+            # Short write (rare on regular files) — finish it byte-wise
+            view = memoryview(b"".join(parts))[written:]
+            while view:
+                view = view[os.write(self._write_fd, view):]
+        self._size += 4 + length
+        # Publish after the data is in the file so readers never see a hole
+        self._index.append((offset + 4, length))
+        with self._appended:
+            self._appended.notify_all()
+
+        if len(self._index) - self._indexed >= self.INDEX_FLUSH_EVERY:
+            self._flush_index()
+
+    def wait_for(self, count: int, timeout: Optional[float] = None) -> bool:
+        """Block until more than ``count`` frames are stored (or woken/timeout)."""
+        with self._appended:
+            if len(self._index) > count:
+                return True
+            self._appended.wait(timeout)
+        return len(self._index) > count
+
+    def wake(self):
+        """Wake any thread blocked in wait_for (e.g. to notice a stop)."""
+        with self._appended:
+            self._appended.notify_all()
+
+    def flush(self):
+        """Persist the index now (checkpoints). Call from the ingest thread."""
+        self._flush_index()
+
+    def _flush_index(self):
+        if self._index_file is None:
+            return
+        rec = self.INDEX_RECORD
+        pending = self._index[self._indexed:]
+        self._index_file.write(b"".join(rec.pack(o, n) for o, n in pending))
+        self._index_file.flush()
+        self._indexed += len(pending)
+        statsd.gauge("frame_store.bytes", self._size)
+
+    def read_bytes(self, index: int) -> Optional[bytes]:
+        """Raw JPEG bytes of one frame, or None if not yet written."""
+        if index >= len(self._index) or self._read_fd is None:
+            return None
+        offset, length = self._index[index]
+        self._reads += 1
+        self._read_bytes += length
+        return os.pread(self._read_fd, length, offset)
 
     def read_frame(self, index: int) -> np.ndarray:
         """Read and decode a frame by index. Called from background thread."""
-        with self._lock:
-            if index >= len(self._index):
-                return None
-            offset, length = self._index[index]
-        # Read without lock — data at this offset is immutable
-        with open(self._path, 'rb') as f:
-            f.seek(offset)
-            jpeg_bytes = f.read(length)
+        jpeg_bytes = self.read_bytes(index)
+        if jpeg_bytes is None:
+            return None
         return cv2.imdecode(np.frombuffer(jpeg_bytes, np.uint8), cv2.IMREAD_COLOR)
 
+    def read_range(self, start: int, n: int) -> List[np.ndarray]:
+        """
+        Read and decode up to ``n`` consecutive frames starting at ``start``.
+
+        Frames are contiguous on disk, so the whole batch is one ``preadv``
+        into a reused buffer; decoding is parallel when decode_workers > 1.
+        Entries are None for frames that fail to decode.
+        """
+        end = min(start + n, len(self._index))
+        if start >= end or self._read_fd is None:
+            return []
+        entries = self._index[start:end]
+        base = entries[0][0]
+        span = entries[-1][0] + entries[-1][1] - base
+
+        with self._range_lock:
+            if len(self._range_buf) < span:
+                self._range_buf = bytearray(max(span, 2 * len(self._range_buf)))
+            buf = memoryview(self._range_buf)
+            os.preadv(self._read_fd, [buf[:span]], base)
+            views = [buf[o - base:o - base + length] for o, length in entries]
+
+            def _decode(view):
+                return cv2.imdecode(np.frombuffer(view, np.uint8), cv2.IMREAD_COLOR)
+
+            if self._decode_pool is not None and len(views) > 1:
+                frames = list(self._decode_pool.map(_decode, views))
+            else:
+                frames = [_decode(v) for v in views]
+            del views
+            buf.release()
+
+        self._reads += len(entries)
+        self._read_bytes += span
+        return frames
+
     def count(self) -> int:
-        with self._lock:
-            return len(self._index)
+        return len(self._index)
 
-    def close(self):
-        if self._write_file:
-            self._write_file.close()
-            self._write_file = None
+    @property
+    def size_bytes(self) -> int:
+        return self._size
 
+    def stats(self) -> Dict:
+        """Counters for status payloads and metrics."""
+        return {
+            "frames": len(self._index),
+            "bytes": self._size,
+            "max_bytes": self._max_bytes,
+            "rejected": self._rejected,
+            "reads": self._reads,
+            "read_bytes": self._read_bytes,
+        }
+
+    def close(self):
+        """Stop accepting writes and persist the index. Reads keep working."""
+        if self._write_fd is not None:
+            self._flush_index()
+            os.close(self._write_fd)
+            self._write_fd = None
+        if self._index_file is not None:
+            self._index_file.close()
+            self._index_file = None
+        self.wake()
+
+    def release(self):
+        """Close everything, including the read handle and decode pool."""
+        self.close()
+        if self._read_fd is not None:
+            os.close(self._read_fd)
+            self._read_fd = None
+        if self._decode_pool is not None:
+            self._decode_pool.shutdown(wait=False)
+            self._decode_pool = None
 
 
 class BackgroundProcessor(threading.Thread):
     """
     Daemon thread that continuously processes frames from a FrameStore.
 
-    Reads frames one at a time, runs pose + shuttle detection, appends
-    to raw_frame_data.  Every ``classify_interval`` processed frames it
-    runs classify_all on ALL accumulated data and stores the result so
-    the WebSocket layer can push it to the frontend.
+    Sleeps on the FrameStore until frames arrive, then pulls them in
+    batches (``read_range``, optionally decoded in parallel), runs batched
+    shuttle detection and per-frame pose detection, and appends to
+    raw_frame_data.  Every ``classify_interval`` processed frames it asks
+    a separate classification thread to run classify_all on a snapshot of
+    the accumulated data, so detection keeps going while results refresh.
+    The WebSocket layer pushes each new result to the frontend.
     """
 
     def __init__(
@@ -1277,8 +1649,10 @@ class BackgroundProcessor(threading.Thread):
         shot_cooldown_seconds: float = 0.4,
         enable_tuning_data: bool = False,
         classify_interval: int = 300,  # frames (~10s at 30fps)
+        read_batch: int = 8,
     ):
         super().__init__(daemon=True)
+        self._read_batch = max(1, read_batch)
         self._frame_store = frame_store
         self._court_boundary = court_boundary
         self._frame_rate = frame_rate
@@ -1302,9 +1676,24 @@ class BackgroundProcessor(threading.Thread):
         self.processed_count = 0
         self.raw_frame_data: List[dict] = []
         self.serialized_landmarks: List = []
+        # List lengths as of the last processed_count update (consistent
+        # with it for checkpoints; frames that fail to decode add no entry)
+        self._committed_lists = (0, 0)
+        self._resume_tracking: Optional[dict] = None
         self._latest_results: Optional[dict] = None
         self._results_version = 0  # incremented on each classify
 
+        # Classification thread state (snapshots of raw_frame_data)
+        self._classify_request = threading.Event()
+        self._classify_final = False
+        self._classify_running = False
+        self._classified_frames = 0   # frames covered by _latest_results
+        self._last_classify_s = 0.0
+        self._classify_thread = threading.Thread(
+            target=self._classify_loop, name="stream-classify", daemon=True
+        )
+        self._results_listeners: List[Callable[[], None]] = []
+
         # Timing instrumentation
         self._timing_shuttle_total = 0.0
         self._timing_pose_total = 0.0
@@ -1341,8 +1730,11 @@ class BackgroundProcessor(threading.Thread):
 
     def run(self):
         """Main processing loop — runs in daemon thread."""
-        import time
         self._ensure_analyzers()
+        if self._resume_tracking is not None:
+            self._frame_analyzer.set_tracking_state(self._resume_tracking)
+            self._resume_tracking = None
+        self._classify_thread.start()
         frames_since_classify = 0
 
         while not self._stop_event.is_set():
@@ -1351,65 +1743,92 @@ class BackgroundProcessor(threading.Thread):
                 if self._drain_event.is_set():
                     # No more frames coming, we're done
                     break
-                time.sleep(0.01)
+                # Woken by FrameStore.append / close, request_drain or stop
+                self._frame_store.wait_for(self.processed_count, timeout=1.0)
                 continue
 
-            # Read and process one frame
-            frame = self._frame_store.read_frame(self.processed_count)
-            if frame is None:
-                time.sleep(0.01)
-                continue
-
-            frame_number = self.processed_count + 1  # 1-indexed
-            timestamp = frame_number / self._frame_rate
+            # Read (and decode) a batch of frames in one go
+            batch = self._frame_store.read_range(
+                self.processed_count, min(available - self.processed_count, self._read_batch)
+            )
+            shuttle_results = self._track_shuttle_batch(batch)
 
-            try:
-                self._process_one_frame(frame, frame_number, timestamp)
-            except Exception as e:
-                logger.error(f"BackgroundProcessor: frame {frame_number} error: {e}")
+            for frame, shuttle_result in zip(batch, shuttle_results):
+                if self._stop_event.is_set():
+                    break
+                frame_number = self.processed_count + 1  # 1-indexed
+                timestamp = frame_number / self._frame_rate
+
+                if frame is not None:
+                    try:
+                        self._process_one_frame(frame, frame_number, timestamp, shuttle_result)
+                    except Exception as e:
+                        logger.error(f"BackgroundProcessor: frame {frame_number} error: {e}")
+                else:
+                    logger.warning(f"BackgroundProcessor: frame {frame_number} failed to decode")
 
-            with self._lock:
-                self.processed_count += 1
+                with self._lock:
+                    self.processed_count += 1
+                    self._committed_lists = (
+                        len(self.raw_frame_data), len(self.serialized_landmarks)
+                    )
 
-            frames_since_classify += 1
-            if frames_since_classify >= self._classify_interval:
-                self._run_classification()
-                frames_since_classify = 0
+                frames_since_classify += 1
+                if frames_since_classify >= self._classify_interval:
+                    self._classify_request.set()
+                    frames_since_classify = 0
 
-        # Final classification after draining
-        if self.processed_count > 0:
-            self._run_classification()
+        # Final classification after draining: the classify thread runs one
+        # last snapshot covering every frame (skipped on hard stop), then exits
+        self._classify_final = True
+        self._classify_request.set()
+        self._classify_thread.join()
 
         if self._frame_analyzer:
             self._frame_analyzer.close()
 
         self._done_event.set()
 
-    def _process_one_frame(self, frame: np.ndarray, frame_number: int, timestamp: float):
-        """Run pose + shuttle detection on a single frame."""
-        import time as _time
+    def _track_shuttle_batch(self, frames: List[Optional[np.ndarray]]) -> List[Optional[dict]]:
+        """Shuttle detection for a batch, one TrackNet call over all windows."""
+        results: List[Optional[dict]] = [None] * len(frames)
+        if self._shuttle_tracker is None:
+            return results
 
-        # Shuttle tracking
-        t0 = _time.monotonic()
-        shuttle_result = None
-        if self._shuttle_tracker is not None:
-            self._shuttle_buffer.append(frame)
-            if len(self._shuttle_buffer) > 3:
-                self._shuttle_buffer.pop(0)
-            if len(self._shuttle_buffer) >= 3:
-                try:
-                    visible, x, y, conf = self._shuttle_tracker.detect_in_frame(self._shuttle_buffer)
-                    shuttle_result = {
-                        'visible': visible,
-                        'x': int(x), 'y': int(y),
-                        'confidence': float(conf),
-                    }
-                except Exception:
-                    pass
-        t1 = _time.monotonic()
-        self._timing_shuttle_total += (t1 - t0)
+        t0 = time.monotonic()
+        # Keep the last two frames of the previous batch as window context
+        context = self._shuttle_buffer[-2:]
+        window = context + [f for f in frames if f is not None]
+        positions = [i for i, f in enumerate(frames) if f is not None]
+        try:
+            detections = self._shuttle_tracker.detect_in_windows(window)
+        except Exception as e:
+            logger.warning(f"BackgroundProcessor: shuttle batch failed: {e}")
+            detections = []
+        # detections[k] is for window[k + 2]; map back to batch positions
+        offset = len(context) - 2
+        for j, pos in enumerate(positions):
+            k = j + offset
+            if 0 <= k < len(detections):
+                visible, x, y, conf = detections[k]
+                results[pos] = {
+                    'visible': visible,
+                    'x': int(x), 'y': int(y),
+                    'confidence': float(conf),
+                }
+        self._shuttle_buffer = window[-2:]
+        self._timing_shuttle_total += time.monotonic() - t0
+        return results
+
+    def _process_one_frame(
+        self, frame: np.ndarray, frame_number: int, timestamp: float,
+        shuttle_result: Optional[dict] = None,
+    ):
+        """Run pose detection on a single frame (shuttle already detected)."""
+        import time as _time
 
         # Pose detection
+        t1 = _time.monotonic()
         result = self._frame_analyzer.analyze_frame(
             frame=frame,
             frame_number=frame_number,
@@ -1485,9 +1904,29 @@ class BackgroundProcessor(threading.Thread):
                 f"classify={self._timing_classify_total:.1f}s total"
             )
 
+    def _classify_loop(self):
+        """Classification thread: classify snapshots on request until told to finish."""
+        while True:
+            self._classify_request.wait(timeout=1.0)
+            if not self._classify_request.is_set():
+                if self._stop_event.is_set():
+                    return
+                continue
+            self._classify_request.clear()
+            if self._stop_event.is_set():
+                return
+            if self.raw_frame_data:
+                self._run_classification()
+            if self._classify_final and not self._classify_request.is_set():
+                return
+
     def _run_classification(self):
-        """Run classify_all on all accumulated raw_frame_data."""
+        """Run classify_all on a snapshot of the accumulated raw_frame_data."""
         import time as _time
+        # Shallow copy: entries are never modified by the detection thread
+        # after they are appended (classify_all only adds wrist_velocity).
+        snapshot = list(self.raw_frame_data)
+        self._classify_running = True
         t0 = _time.monotonic()
         try:
             from .shot_classifier import ShotClassifier
@@ -1498,7 +1937,7 @@ class BackgroundProcessor(threading.Thread):
                 effective_fps=self._frame_rate,
             )
             classified = sc.classify_all(
-                self.raw_frame_data, max(1, int(self._frame_rate))
+                snapshot, max(1, int(self._frame_rate))
             )
         except Exception as e:
             logger.error(f"BackgroundProcessor: classification failed: {e}", exc_info=True)
@@ -1509,14 +1948,75 @@ class BackgroundProcessor(threading.Thread):
         with self._lock:
             self._latest_results = classified
             self._results_version += 1
+            self._classified_frames = len(snapshot)
+            self._last_classify_s = elapsed
+            self._classify_running = False
+
+        for listener in list(self._results_listeners):
+            try:
+                listener()
+            except Exception as e:
+                logger.warning(f"BackgroundProcessor: results listener failed: {e}")
 
         summary = classified.get("summary", {})
         logger.info(
-            f"BackgroundProcessor: classified {self.processed_count} frames in {elapsed:.2f}s — "
+            f"BackgroundProcessor: classified {len(snapshot)} frames in {elapsed:.2f}s — "
             f"shots={summary.get('total_shots', 0)}, "
             f"rallies={summary.get('total_rallies', 0)}"
         )
 
+    def pipeline_status(self) -> Dict:
+        """Per-stage backlog (frames) and lag (seconds) for status payloads."""
+        stored = self._frame_store.count()
+        with self._lock:
+            processed = self.processed_count
+            classified = self._classified_frames
+            running = self._classify_running
+            last_s = self._last_classify_s
+        fps = self._frame_rate or 1.0
+        return {
+            'detect_queue': stored - processed,
+            'detect_lag_s': round((stored - processed) / fps, 2),
+            'classify_queue': processed - classified,
+            'classify_lag_s': round((stored - classified) / fps, 2),
+            'classify_running': running,
+            'last_classify_s': round(last_s, 2),
+        }
+
+    def checkpoint_state(self, since: Dict[str, int]) -> Dict:
+        """Processed-frame state for a session checkpoint (any thread)."""
+        with self._lock:
+            processed = self.processed_count
+            n_frames, n_landmarks = self._committed_lists
+            latest = self._latest_results
+            classified = self._classified_frames
+            version = self._results_version
+        analyzer = self._frame_analyzer
+        return {
+            'processed_count': processed,
+            'latest_results': latest,
+            'classified_frames': classified,
+            'results_version': version,
+            'tracking': analyzer.get_tracking_state() if analyzer else None,
+            'append': {
+                'raw_frame_data': self.raw_frame_data[since.get('raw_frame_data', 0):n_frames],
+                'serialized_landmarks': self.serialized_landmarks[
+                    since.get('serialized_landmarks', 0):n_landmarks
+                ],
+            },
+        }
+
+    def restore(self, state: Dict):
+        """Continue after the checkpointed frames. Call before ``start()``."""
+        self.processed_count = state['processed_count']
+        self.raw_frame_data = list(state['append'].get('raw_frame_data', []))
+        self.serialized_landmarks = list(state['append'].get('serialized_landmarks', []))
+        self._committed_lists = (len(self.raw_frame_data), len(self.serialized_landmarks))
+        self._latest_results = state.get('latest_results')
+        self._classified_frames = state.get('classified_frames', 0)
+        self._results_version = state.get('results_version', 0)
+        self._resume_tracking = state.get('tracking')
+
     def get_latest_results(self) -> Optional[dict]:
         """Thread-safe read of latest classification results."""
         with self._lock:
@@ -1526,9 +2026,18 @@ class BackgroundProcessor(threading.Thread):
         with self._lock:
             return self._results_version
 
+    def add_results_listener(self, callback: Callable[[], None]):
+        """Call ``callback()`` (from the classify thread) after each classification."""
+        self._results_listeners.append(callback)
+
+    def remove_results_listener(self, callback: Callable[[], None]):
+        if callback in self._results_listeners:
+            self._results_listeners.remove(callback)
+
     def request_drain(self):
         """Signal that no more frames will be added — process remaining and stop."""
         self._drain_event.set()
+        self._frame_store.wake()
 
     def wait_until_done(self, timeout: float = 600):
         """Block until all frames are processed."""
@@ -1537,15 +2046,17 @@ class BackgroundProcessor(threading.Thread):
     def stop(self):
         """Hard stop."""
         self._stop_event.set()
+        self._classify_request.set()
+        self._frame_store.wake()
 
 
 class AdvancedStreamAnalyzer:
     """
     Advanced stream analyzer: FrameStore + BackgroundProcessor.
 
-    - process_frame(): appends JPEG to FrameStore (~0.1ms), returns buffer status
+    - process_frame(): appends JPEG to FrameStore (no decode), returns buffer status
     - BackgroundProcessor daemon thread reads frames, runs pose + shuttle + classify
-    - finalize(): drains processor, writes annotated video
+    - finalize(): drains processor, writes raw + annotated video from the FrameStore
     """
 
     ACTUAL_SHOTS = ['smash', 'clear', 'drop_shot', 'net_shot', 'drive', 'lift']
@@ -1563,6 +2074,7 @@ class AdvancedStreamAnalyzer:
         enable_tuning_data: bool = False,
         output_dir: Optional[str] = None,
         chunk_duration_seconds: float = 60.0,
+        resume_state: Optional[Dict] = None,
     ):
         self.session_id = session_id
         self.frame_rate = frame_rate
@@ -1586,11 +2098,29 @@ class AdvancedStreamAnalyzer:
             raw_dir = Path(tempfile.gettempdir()) / "badminton_streams" / str(session_id)
         raw_dir.mkdir(parents=True, exist_ok=True)
 
+        # Encoded from the FrameStore in finalize() — nothing is decoded on
+        # ingest. With video-chunk ingest the received chunks are the raw
+        # video instead (start_video_passthrough)
+        self._raw_dir = raw_dir
         self.raw_video_path = str(raw_dir / "raw_stream.mp4")
-        self._raw_video_writer: Optional[cv2.VideoWriter] = None
-
-        # FrameStore: append-only JPEG file
-        self._frame_store = FrameStore(str(raw_dir / "frames.bin"))
+        self._raw_chunk_file = None
+        self._raw_passthrough = False
+
+        # FrameStore: append-only JPEG file (+ index, reopenable after a restart)
+        from ..config import get_settings
+        settings = get_settings()
+        store_path = str(raw_dir / "frames.bin")
+        store_kwargs = dict(
+            max_bytes=settings.frame_store_max_mb * 1024 * 1024 if settings.frame_store_max_mb else None,
+            decode_workers=settings.frame_store_decode_workers,
+        )
+        if resume_state is not None and os.path.exists(store_path):
+            # Restored from a checkpoint: keep every frame already stored
+            self._frame_store = FrameStore.resume(store_path, **store_kwargs)
+        else:
+            resume_state = None
+            self._frame_store = FrameStore(store_path, **store_kwargs)
+        self._frames_rejected = 0
 
         # Classify interval: ~10 seconds worth of frames
         classify_interval = max(30, int(10 * frame_rate))
@@ -1606,6 +2136,17 @@ class AdvancedStreamAnalyzer:
             enable_tuning_data=enable_tuning_data,
             classify_interval=classify_interval,
         )
+        if resume_state is not None:
+            self._processor.restore(resume_state)
+            # Frames stored after the checkpoint are still in the FrameStore
+            self._frame_counter = max(resume_state.get('frame_counter', 0), self._frame_store.count())
+            self._frames_rejected = resume_state.get('frames_rejected', 0)
+            self._frame_width, self._frame_height = resume_state.get('frame_size', (0, 0))
+            logger.info(
+                f"Session {session_id}: restored from checkpoint "
+                f"({self._frame_store.count()} frames stored, "
+                f"{resume_state['processed_count']} processed)"
+            )
         self._processor.start()
 
         # For annotation pass
@@ -1613,6 +2154,8 @@ class AdvancedStreamAnalyzer:
         self.court = CourtBoundary.from_dict(court_boundary)
 
         self._start_time = datetime.now()
+        if resume_state is not None:
+            self._start_time = resume_state.get('start_time', self._start_time)
         self._last_results_version = 0
 
         logger.info(
@@ -1620,49 +2163,68 @@ class AdvancedStreamAnalyzer:
             f"(classify every {classify_interval} frames)"
         )
 
-    def process_frame(self, frame_data: bytes, timestamp: float) -> Dict:
+    # JPEG quality for frames decoded from video chunks (analysis copy only)
+    STORE_JPEG_QUALITY = 90
+
+    def start_video_passthrough(self, extension: str) -> bool:
+        """Record incoming video chunks as the raw video, untouched.
+
+        Only when nothing is stored yet: otherwise the FrameStore holds
+        frames the chunk file would not, and finalize() encodes the raw
+        video from the store as usual.
         """
-        Append JPEG bytes to FrameStore. Near-instant (~0.1ms).
+        if self._raw_passthrough or self._frame_store.count() > 0:
+            return False
+        self.raw_video_path = str(self._raw_dir / f"raw_stream{extension}")
+        self._raw_chunk_file = open(self.raw_video_path, "wb")
+        self._raw_passthrough = True
+        logger.info(f"Session {self.session_id}: Recording video chunks to {self.raw_video_path}")
+        return True
+
+    def append_video_chunk(self, chunk: bytes):
+        """Append a received chunk to the passthrough raw video."""
+        if self._raw_chunk_file is not None:
+            self._raw_chunk_file.write(chunk)
+
+    def process_frame(self, frame_data: Union[bytes, np.ndarray], timestamp: float) -> Dict:
+        """
+        Append JPEG bytes to FrameStore (a copy plus a file write).
         Returns buffer/processing status for the frontend.
+
+        Frames are decoded only by the BackgroundProcessor and once more
+        in finalize(), which also produces the raw video. Frames decoded
+        from video chunks are JPEG-encoded for the store.
         """
         self._frame_counter += 1
-
-        # Store the raw JPEG bytes directly (no decode needed here)
-        self._frame_store.append(frame_data)
-
-        # Lazily open video writer for the final raw video (decode once)
-        if self._raw_video_writer is None or self._frame_width == 0:
-            nparr = np.frombuffer(frame_data, np.uint8)
-            frame = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-            if frame is not None:
-                h, w = frame.shape[:2]
-                self._frame_width = w
-                self._frame_height = h
-                fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-                fps = max(1, int(self.frame_rate))
-                self._raw_video_writer = cv2.VideoWriter(
-                    self.raw_video_path, fourcc, fps, (w, h)
-                )
-                self._raw_video_writer.write(frame)
-        else:
-            # Decode and write to raw video for annotation pass
-            nparr = np.frombuffer(frame_data, np.uint8)
-            frame = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-            if frame is not None and self._raw_video_writer:
-                self._raw_video_writer.write(frame)
-
+        if isinstance(frame_data, np.ndarray):
+            ok, buf = cv2.imencode(
+                ".jpg", frame_data, [cv2.IMWRITE_JPEG_QUALITY, self.STORE_JPEG_QUALITY]
+            )
+            if not ok:
+                return self._build_status()
+            frame_data = buf.tobytes()
+        try:
+            self._frame_store.append(frame_data)
+        except FrameStoreFull as e:
+            if self._frames_rejected == 0:
+                logger.warning(f"Session {self.session_id}: {e} — dropping further frames")
+            self._frames_rejected += 1
         return self._build_status()
 
     def _build_status(self) -> Dict:
         """Build status dict for WebSocket response."""
         processed = self._processor.processed_count
+        buffered = self._frame_store.count()
         return {
             'mode': 'advanced',
-            'frames_buffered': self._frame_counter,
-            'seconds_buffered': round(self._frame_counter / self.frame_rate, 1),
+            'frames_buffered': buffered,
+            'seconds_buffered': round(buffered / self.frame_rate, 1),
             'frames_processed': processed,
             'seconds_processed': round(processed / self.frame_rate, 1),
-            'is_processing': processed < self._frame_counter,
+            'is_processing': processed < buffered,
+            'storage_bytes': self._frame_store.size_bytes,
+            'frames_rejected': self._frames_rejected,
+            'pipeline': self._processor.pipeline_status(),
         }
 
     def has_new_results(self) -> bool:
@@ -1673,6 +2235,13 @@ class AdvancedStreamAnalyzer:
             return True
         return False
 
+    def add_results_listener(self, callback):
+        """Notify ``callback()`` whenever new classification results are ready."""
+        self._processor.add_results_listener(callback)
+
+    def remove_results_listener(self, callback):
+        self._processor.remove_results_listener(callback)
+
     def get_accumulated_results(self) -> dict:
         """Get latest classification results from processor."""
         classified = self._processor.get_latest_results()
@@ -1697,15 +2266,10 @@ class AdvancedStreamAnalyzer:
         import time as _time
         finalize_start = _time.monotonic()
 
-        # 1. Close raw video writer
-        if self._raw_video_writer:
-            self._raw_video_writer.release()
-            self._raw_video_writer = None
-
         if progress_callback:
             progress_callback(5, "Waiting for background processing to complete")
 
-        # 2. Signal processor to drain and wait
+        # 1. Signal processor to drain and wait
         t0 = _time.monotonic()
         self._processor.request_drain()
         self._processor.wait_until_done(timeout=600)
@@ -1731,7 +2295,7 @@ class AdvancedStreamAnalyzer:
         if progress_callback:
             progress_callback(30, "Running final classification")
 
-        # 3. Final classify_all
+        # 2. Final classify_all
         t0 = _time.monotonic()
         fps = max(1, int(self.frame_rate))
         raw_frame_data = self._processor.raw_frame_data
@@ -1753,18 +2317,19 @@ class AdvancedStreamAnalyzer:
         if progress_callback:
             progress_callback(50, "Writing annotated video")
 
-        # 4. Annotated video
+        # 3. Raw + annotated video, one decode per stored frame
         t0 = _time.monotonic()
         out_dir = Path(output_dir)
         out_dir.mkdir(parents=True, exist_ok=True)
         annotated_path = str(out_dir / "annotated_stream.mp4")
 
-        if self.raw_video_path and Path(self.raw_video_path).exists():
+        self.release_raw_video_writer()
+        if self._frame_store.count() > 0:
             try:
                 self._write_annotated_video(
-                    self.raw_video_path, annotated_path,
-                    raw_frame_data, classified,
-                    fps, self._frame_width, self._frame_height
+                    annotated_path, raw_frame_data, classified, fps,
+                    # A passthrough recording is already the raw video
+                    raw_video_path=None if self._raw_passthrough else self.raw_video_path,
                 )
             except Exception as e:
                 logger.error(f"Session {self.session_id}: Annotated video failed: {e}", exc_info=True)
@@ -1777,7 +2342,7 @@ class AdvancedStreamAnalyzer:
         if progress_callback:
             progress_callback(80, "Extracting tuning data")
 
-        # 5. Tuning data
+        # 4. Tuning data
         t0 = _time.monotonic()
         frame_data_path = None
         if self.enable_tuning_data and classified:
@@ -1844,16 +2409,21 @@ class AdvancedStreamAnalyzer:
     # -- Annotated video (reuses BasicStreamAnalyzer pattern) ---------------
 
     def _write_annotated_video(
-        self, video_path: str, output_path: str,
+        self, output_path: str,
         raw_frame_data: List[dict], classified: dict,
-        fps: int, width: int, height: int
+        fps: int, raw_video_path: Optional[str] = None,
     ):
-        cap = cv2.VideoCapture(video_path)
-        if not cap.isOpened():
+        """Decode each stored frame once; write it raw, then annotated."""
+        total = self._frame_store.count()
+        first = self._frame_store.read_frame(0) if total else None
+        if first is None:
             return
+        height, width = first.shape[:2]
+        self._frame_width, self._frame_height = width, height
 
         fourcc = cv2.VideoWriter_fourcc(*'mp4v')
         out = cv2.VideoWriter(output_path, fourcc, fps, (width, height))
+        raw_out = cv2.VideoWriter(raw_video_path, fourcc, fps, (width, height)) if raw_video_path else None
 
         shot_by_frame = {s["frame"]: s for s in classified.get("shots", [])}
         hit_by_frame = {h["frame"]: h for h in classified.get("shuttle_hits", [])}
@@ -1871,10 +2441,13 @@ class AdvancedStreamAnalyzer:
 
         frame_number = 0
         try:
-            while True:
-                ret, frame = cap.read()
-                if not ret:
-                    break
+            while frame_number < total:
+                frame = first if frame_number == 0 else self._frame_store.read_frame(frame_number)
+                if frame is None:
+                    frame_number += 1
+                    continue
+                if raw_out is not None:
+                    raw_out.write(frame)
 
                 fd = raw_frame_data[frame_number] if frame_number < len(raw_frame_data) else {}
 
@@ -1982,8 +2555,9 @@ class AdvancedStreamAnalyzer:
                 out.write(frame)
                 frame_number += 1
         finally:
-            cap.release()
             out.release()
+            if raw_out is not None:
+                raw_out.release()
 
         logger.info(f"Annotated video written: {output_path} ({frame_number} frames)")
 
@@ -2184,15 +2758,46 @@ class AdvancedStreamAnalyzer:
             'has_post_analysis_data': True,
         }
 
+    def checkpoint_state(self, since: Optional[Dict[str, int]] = None) -> Dict:
+        """Resumable snapshot: processor state plus FrameStore position.
+
+        The frames themselves are already on disk in the FrameStore; the
+        index is flushed here so a restart finds all of them.
+        """
+        self._frame_store.flush()
+        state = self._processor.checkpoint_state(since or {})
+        state.update({
+            'mode': 'advanced',
+            'frame_counter': self._frame_counter,
+            'frames_rejected': self._frames_rejected,
+            'frame_size': (self._frame_width, self._frame_height),
+            'start_time': self._start_time,
+            'frame_store': {
+                'frames': self._frame_store.count(),
+                'bytes': self._frame_store.size_bytes,
+            },
+        })
+        return state
+
+    def resume_info(self) -> Dict:
+        """What a reconnecting client needs to carry on."""
+        return {
+            'frames_processed': self._frame_counter,
+            'last_timestamp': None,
+            'stats': self._build_status(),
+        }
+
     def release_raw_video_writer(self):
-        if self._raw_video_writer:
-            self._raw_video_writer.release()
-            self._raw_video_writer = None
+        """Close the passthrough recording, if any; otherwise the raw
+        video is written from the FrameStore in finalize()."""
+        if self._raw_chunk_file is not None:
+            self._raw_chunk_file.close()
+            self._raw_chunk_file = None
 
     def close(self):
-        self.release_raw_video_writer()
         self._processor.stop()
-        self._frame_store.close()
+        self._frame_store.release()
+        self.release_raw_video_writer()
 
 
 class StreamSessionManager:
@@ -2219,8 +2824,13 @@ class StreamSessionManager:
         output_dir: Optional[str] = None,
         stream_mode: str = "basic",
         chunk_duration: int = 60,
+        resume_state: Optional[Dict] = None,
     ) -> 'BasicStreamAnalyzer':
-        """Create a new streaming session."""
+        """Create a new streaming session.
+
+        ``resume_state`` is a ``SessionCheckpoint.load()`` result to continue
+        from (the analyzer was lost, e.g. to a server restart).
+        """
         if session_id in self._sessions:
             self._sessions[session_id].close()
 
@@ -2235,11 +2845,12 @@ class StreamSessionManager:
                 enable_tuning_data=enable_tuning_data,
                 output_dir=output_dir,
                 chunk_duration_seconds=float(chunk_duration),
+                resume_state=resume_state,
             )
             self._sessions[session_id] = analyzer
             return analyzer
 
-        analyzer = BasicStreamAnalyzer(
+        kwargs = dict(
             court_boundary=court_boundary,
             session_id=session_id,
             frame_rate=frame_rate,
@@ -2251,6 +2862,14 @@ class StreamSessionManager:
             enable_shuttle_tracking=enable_shuttle_tracking,
             output_dir=output_dir,
         )
+        shard_pool = get_shard_pool()
+        if shard_pool is not None:
+            # Same interface, but the analyzer runs in an analysis worker process
+            analyzer = shard_pool.open_session(session_id, BasicStreamAnalyzer, kwargs)
+        else:
+            analyzer = BasicStreamAnalyzer(**kwargs)
+        if resume_state is not None:
+            analyzer.restore_state(resume_state)
         self._sessions[session_id] = analyzer
         return analyzer
 
@@ -5,26 +5,131 @@ This module manages WebSocket connections for live video streaming,
 processing frames in real-time and broadcasting results.
 
 Supports two modes:
-- Basic: real-time pose analysis, instant results per frame
+- Basic: real-time pose analysis, instant results per frame (stale frames
+  are dropped when the server falls behind, see ``stream_ingest_mode``)
 - Advanced: frames stored to disk, background processing, periodic results
+
+Frames arrive either as JSON/base64 or as binary_v1 messages negotiated
+per connection (see api/core/streaming/frame_protocol.py). Clients may
+instead negotiate compressed video chunks, decoded per connection and
+recorded as received (see api/core/streaming/video_ingest.py).
+
+Every frame is traced per stage (see api/core/tracing.py); clients that
+send ``"trace": true`` in ``hello`` get a ``timing`` field on results.
+
+Analyzer state is checkpointed while streaming. A streamer that drops
+without ``end_stream`` has ``stream_resume_grace_s`` to reconnect and
+carry on with the same analyzer before the session is reclaimed (see
+api/core/streaming/resume.py).
 """
 
-import json
-import base64
 import asyncio
-from typing import Dict, List, Set, Optional
+import json
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Set, Tuple, Union
 from datetime import datetime
 from fastapi import WebSocket, WebSocketDisconnect
 import logging
 
+import numpy as np
+
 from ..services.stream_service import (
     get_stream_session_manager, BasicStreamAnalyzer, AdvancedStreamAnalyzer,
 )
+from ..core.streaming.frame_protocol import (
+    VIDEO_FRAME_FORMATS, FrameMessage, receive_message, parse_client_message, hello_response,
+)
+from ..core.streaming.inference_pool import SessionNotAdmitted, get_inference_pool
+from ..core.streaming.result_delta import ResultDeltaTracker, dumps_compact
+from ..core.streaming.resume import SessionCheckpoint, get_resume_registry
+from ..core.streaming.video_ingest import ChunkDecoder, available_video_formats
+from ..core.streaming.viewer_fanout import ViewerFanout
+from ..core.metrics import statsd
+from ..core.tracing import FrameTrace, run_traced, send_traced, wants_trace
+from ..config import get_settings
 from ..database import SessionLocal
 from ..db_models.stream_session import StreamSession, StreamStatus
 
 logger = logging.getLogger(__name__)
 
+# Smoothing factor for the per-stream lag / compute-time averages
+_EWMA_ALPHA = 0.2
+
+
+@dataclass
+class _QueuedFrame:
+    """A received frame waiting for the basic-mode processor."""
+    data: Union[bytes, np.ndarray]  # JPEG, or a frame decoded from video chunks
+    timestamp: float
+    received_at: float
+    dropped_before: int = 0
+    trace: Optional[FrameTrace] = None
+    source_frame: Optional[int] = None  # index in the passthrough raw video
+
+
+@dataclass
+class _VideoIngest:
+    """A connection's video-chunk decoder."""
+    decoder: ChunkDecoder
+    record: bool  # chunks are appended to the session's raw video
+
+
+class _IngestClock:
+    """
+    Keeps frame timestamps monotonic across drops and client clock gaps.
+
+    The client timestamp is used whenever it advances. If it is missing or
+    goes backwards, the server receive interval is added to the previous
+    timestamp instead, so FrameAnalyzer's time-based velocities see the
+    real elapsed time even when frames in between were skipped.
+    """
+
+    def __init__(self, start_ts: Optional[float] = None):
+        # start_ts: last timestamp of a resumed session, so a client that
+        # restarts its clock on reconnect still moves time forward
+        self._last_ts: Optional[float] = start_ts
+        self._last_received = time.monotonic()
+
+    def stamp(self, client_ts: float, received_at: float) -> float:
+        if self._last_ts is None:
+            ts = client_ts or 0.0
+        elif client_ts > self._last_ts:
+            ts = client_ts
+        else:
+            ts = self._last_ts + max(received_at - self._last_received, 1e-3)
+        self._last_ts = ts
+        self._last_received = received_at
+        return ts
+
+
+@dataclass
+class _IngestStats:
+    """Backpressure figures reported to the client with each result."""
+    mode: str
+    dropped: int = 0
+    lag_ms: float = 0.0
+    compute_ms: float = 0.0
+
+    def update(self, lag_ms: float, compute_ms: float):
+        if self.compute_ms == 0.0:
+            self.lag_ms, self.compute_ms = lag_ms, compute_ms
+        else:
+            self.lag_ms += _EWMA_ALPHA * (lag_ms - self.lag_ms)
+            self.compute_ms += _EWMA_ALPHA * (compute_ms - self.compute_ms)
+
+    def to_dict(self, frame_lag_ms: float, queue_depth: int) -> dict:
+        return {
+            "mode": self.mode,
+            "lag_ms": round(frame_lag_ms, 1),
+            "avg_lag_ms": round(self.lag_ms, 1),
+            "avg_compute_ms": round(self.compute_ms, 1),
+            "queue_depth": queue_depth,
+            "frames_dropped": self.dropped,
+            # Highest send rate the server is currently keeping up with
+            "suggested_max_fps": round(1000.0 / self.compute_ms, 1) if self.compute_ms > 0 else None,
+        }
+
 
 class StreamConnectionManager:
     """
@@ -40,8 +145,9 @@ class StreamConnectionManager:
         # Active streaming connections (one per session - the streamer)
         self._stream_connections: Dict[int, WebSocket] = {}
 
-        # Viewer connections (multiple per session - observers)
-        self._viewer_connections: Dict[int, Set[WebSocket]] = {}
+        # Viewer connections (multiple per session - observers), each
+        # behind its own bounded outbox
+        self._viewers: Dict[int, ViewerFanout] = {}
 
         # Session analyzers
         self._session_manager = get_stream_session_manager()
@@ -49,21 +155,42 @@ class StreamConnectionManager:
         # Background tasks for advanced mode result broadcasting
         self._broadcast_tasks: Dict[int, asyncio.Task] = {}
 
+        # Advanced mode delta results: per-session version history and the
+        # last version each connection (streamer or viewer) acknowledged
+        self._result_trackers: Dict[int, ResultDeltaTracker] = {}
+        self._result_acks: Dict[int, Dict[WebSocket, int]] = {}
+
+        # Sessions whose streamer asked for per-result timing in hello
+        self._traced_sessions: Set[int] = set()
+
+        # Resumable state on disk, per live session
+        self._checkpoints: Dict[int, SessionCheckpoint] = {}
+
+        # Sessions being ended after their grace window; reconnects are refused
+        self._reclaiming: Set[int] = set()
+
     async def connect_streamer(self, websocket: WebSocket, session_id: int) -> bool:
         """
         Connect a streamer (frame sender) to a session.
 
-        Only one streamer per session is allowed.
+        Only one streamer per session is allowed, and none while the
+        session is being reclaimed.
         """
         if session_id in self._stream_connections:
             logger.warning(f"Session {session_id} already has a streamer")
             return False
+        if session_id in self._reclaiming:
+            logger.warning(f"Session {session_id} is being reclaimed")
+            return False
 
-        await websocket.accept()
+        # Claimed before the accept, so a reclaim can't start meanwhile
         self._stream_connections[session_id] = websocket
-
-        if session_id not in self._viewer_connections:
-            self._viewer_connections[session_id] = set()
+        try:
+            await websocket.accept()
+        except Exception:
+            self._stream_connections.pop(session_id, None)
+            raise
+        self._get_fanout(session_id)
 
         logger.info(f"Streamer connected to session {session_id}")
         return True
@@ -72,18 +199,33 @@ class StreamConnectionManager:
         """
         Connect a viewer (results receiver) to a session.
         """
-        if session_id not in self._viewer_connections:
-            self._viewer_connections[session_id] = set()
+        fanout = self._get_fanout(session_id)
 
         await websocket.accept()
-        self._viewer_connections[session_id].add(websocket)
+        fanout.add(websocket)
 
         logger.info(f"Viewer connected to session {session_id} "
-                   f"(total viewers: {len(self._viewer_connections[session_id])})")
+                   f"(total viewers: {len(fanout)})")
         return True
 
-    def disconnect_streamer(self, session_id: int):
-        """Disconnect streamer from session."""
+    def _get_fanout(self, session_id: int) -> ViewerFanout:
+        fanout = self._viewers.get(session_id)
+        if fanout is None:
+            settings = get_settings()
+            fanout = ViewerFanout(
+                session_id,
+                max_pending=settings.viewer_outbox_size,
+                send_timeout=settings.viewer_send_timeout_s,
+            )
+            self._viewers[session_id] = fanout
+        return fanout
+
+    def disconnect_streamer(self, session_id: int, release_worker: bool = True):
+        """Disconnect streamer from session.
+
+        ``release_worker=False`` keeps the session's inference slot for a
+        reconnect within the grace window (freed by ``_reclaim_session``).
+        """
         if session_id in self._stream_connections:
             del self._stream_connections[session_id]
             logger.info(f"Streamer disconnected from session {session_id}")
@@ -93,59 +235,286 @@ class StreamConnectionManager:
         if task:
             task.cancel()
 
+        fanout = self._viewers.get(session_id)
+        if fanout is not None and not fanout:
+            del self._viewers[session_id]
+
+        self._traced_sessions.discard(session_id)
+        if release_worker:
+            get_inference_pool("badminton").release(session_id)
+
     def disconnect_viewer(self, websocket: WebSocket, session_id: int):
         """Disconnect viewer from session."""
-        if session_id in self._viewer_connections:
-            self._viewer_connections[session_id].discard(websocket)
+        fanout = self._viewers.get(session_id)
+        if fanout is not None and websocket in fanout:
+            fanout.remove(websocket)
             logger.info(f"Viewer disconnected from session {session_id}")
-
-    async def broadcast_to_viewers(self, session_id: int, message: dict):
-        """Broadcast message to all viewers of a session."""
-        if session_id not in self._viewer_connections:
+            if not fanout and session_id not in self._stream_connections:
+                self._viewers.pop(session_id, None)
+        self._result_acks.get(session_id, {}).pop(websocket, None)
+
+    async def handle_viewer_message(self, websocket: WebSocket, session_id: int, data: str):
+        """Handle a text message from a viewer (keepalive or results ack)."""
+        if data == "ping":
+            await websocket.send_text("pong")
             return
+        message = parse_client_message(data)
+        if message and message.get("type") == "results_ack":
+            self.ack_results(session_id, websocket, message.get("version"))
+
+    def ack_results(self, session_id: int, websocket: WebSocket, version):
+        """Record the result version a client has applied (delta base)."""
+        if isinstance(version, int) and version > 0:
+            self._result_acks.setdefault(session_id, {})[websocket] = version
+
+    async def broadcast_to_viewers(
+        self,
+        session_id: int,
+        message: Union[dict, str],
+        coalesce_key: Optional[str] = None,
+        final: bool = False,
+    ):
+        """
+        Queue a message for all viewers of a session.
 
-        viewers = list(self._viewer_connections[session_id])
-        dead_connections = []
-
-        for viewer in viewers:
-            try:
-                await viewer.send_json(message)
-            except Exception as e:
-                logger.warning(f"Failed to send to viewer: {e}")
-                dead_connections.append(viewer)
+        The message is serialized once and never awaits a viewer socket.
+        Messages sharing a ``coalesce_key`` replace each other in a lagging
+        viewer's outbox. ``final`` messages are never dropped and are given
+        a moment to reach every viewer before returning.
+        """
+        fanout = self._viewers.get(session_id)
+        if not fanout:
+            return
+        fanout.publish(message, coalesce_key=coalesce_key, droppable=not final)
+        if final:
+            await fanout.drain(timeout=get_settings().viewer_send_timeout_s)
 
-        # Remove dead connections
-        for conn in dead_connections:
-            self._viewer_connections[session_id].discard(conn)
+    def get_viewer_stats(self, session_id: int) -> dict:
+        """Viewer count, outbox depth, lag and drop totals for a session."""
+        fanout = self._viewers.get(session_id)
+        if fanout is None:
+            return {"viewers": 0, "max_pending": 0, "max_lag_ms": 0.0, "dropped": 0, "coalesced": 0}
+        return fanout.stats()
 
     # -------------------------------------------------------------------
     # Main stream handler (dispatches based on analyzer type)
     # -------------------------------------------------------------------
 
-    async def handle_stream(self, websocket: WebSocket, session_id: int, analyzer):
+    async def handle_stream(
+        self, websocket: WebSocket, session_id: int, analyzer,
+        resumed: Optional[dict] = None,
+    ):
         """
         Handle incoming stream frames from the streamer.
 
         Dispatches to basic or advanced handler based on analyzer type.
+        ``resumed`` is the analyzer's ``resume_info()`` when the streamer
+        reconnected to an existing session.
         """
         if isinstance(analyzer, AdvancedStreamAnalyzer):
             await self._handle_advanced_stream(websocket, session_id, analyzer)
         else:
-            await self._handle_basic_stream(websocket, session_id, analyzer)
+            await self._handle_basic_stream(websocket, session_id, analyzer, resumed)
+
+    # -------------------------------------------------------------------
+    # Checkpoints and reconnects
+    # -------------------------------------------------------------------
+
+    async def _checkpoint(self, session_id: int, analyzer):
+        """Snapshot the analyzer (between frames) and write it to disk."""
+        checkpoint = self._checkpoints.get(session_id)
+        if checkpoint is None:
+            checkpoint = self._checkpoints[session_id] = SessionCheckpoint.for_session(session_id)
+        try:
+            since = await asyncio.to_thread(checkpoint.since)
+            state = await get_inference_pool("badminton").run(
+                session_id, analyzer.checkpoint_state, since
+            )
+            await asyncio.to_thread(checkpoint.write, state)
+        except Exception as e:
+            logger.warning(f"Session {session_id}: checkpoint failed: {e}")
+
+    async def _checkpoint_loop(self, session_id: int, analyzer):
+        interval = get_settings().stream_checkpoint_interval_s
+        if interval <= 0:
+            return
+        while True:
+            await asyncio.sleep(interval)
+            await self._checkpoint(session_id, analyzer)
+
+    async def _detach(self, session_id: int, analyzer):
+        """Streamer dropped mid-session: start the grace window, then checkpoint.
+
+        The connection is released and the detach registered before the
+        checkpoint round trip, so a reconnect arriving meanwhile is accepted
+        and reattaches to the live analyzer.
+        """
+        self.disconnect_streamer(session_id, release_worker=False)
+        get_resume_registry().detach(
+            session_id, on_expire=lambda: self._reclaim_session(session_id)
+        )
+        logger.info(f"Session {session_id}: streamer lost, waiting for reconnect")
+        await self._checkpoint(session_id, analyzer)
+
+    async def _drop_checkpoint(self, session_id: int):
+        checkpoint = self._checkpoints.pop(session_id, None) or SessionCheckpoint.for_session(session_id)
+        await asyncio.to_thread(checkpoint.discard)
+
+    def is_reclaiming(self, session_id: int) -> bool:
+        return session_id in self._reclaiming
+
+    async def _reclaim_session(self, session_id: int):
+        """Grace window over: end the session with what was analysed and free it.
+
+        The decision is made before the first await: from then on
+        ``connect_streamer`` refuses the session, so a streamer can't attach
+        to an analyzer that is being ended.
+        """
+        if session_id in self._stream_connections:
+            return  # reconnected in the meantime
+        self._reclaiming.add(session_id)
+        try:
+            await self._end_reclaimed(session_id)
+        finally:
+            self._reclaiming.discard(session_id)
+
+    async def _end_reclaimed(self, session_id: int):
+        get_inference_pool("badminton").release(session_id)
+        report = None
+        db = SessionLocal()
+        try:
+            session = db.query(StreamSession).filter(StreamSession.id == session_id).first()
+            # Ended over REST meanwhile: the analyzer is kept for post-analysis
+            ended_elsewhere = session is not None and session.status == StreamStatus.ENDED
+            if not ended_elsewhere and self._session_manager.get_session(session_id) is not None:
+                try:
+                    report = await asyncio.to_thread(self._session_manager.end_session, session_id)
+                except Exception as e:
+                    logger.error(f"Session {session_id}: final report failed: {e}")
+                await asyncio.to_thread(self._session_manager.cleanup_session, session_id)
+            if session is not None and not ended_elsewhere:
+                session.status = StreamStatus.ENDED
+                session.ended_at = datetime.utcnow()
+                if report and 'summary' in report:
+                    session.total_shots = report['summary'].get('total_shots', 0)
+                if report and 'shot_distribution' in report:
+                    session.shot_distribution = report['shot_distribution']
+                session.analysis_status = "none"
+                db.commit()
+        except Exception as e:
+            logger.error(f"Session {session_id}: Failed to save to DB: {e}")
+            db.rollback()
+        finally:
+            db.close()
+
+        await self._drop_checkpoint(session_id)
+        fanout = self._viewers.pop(session_id, None)
+        if fanout is not None:
+            fanout.publish(
+                {"type": "stream_ended", "report": report, "reason": "streamer_lost"},
+                droppable=False,
+            )
+            await fanout.drain()
+            fanout.close()
+
+    # -------------------------------------------------------------------
+    # Negotiation and video-chunk ingest (both modes)
+    # -------------------------------------------------------------------
+
+    async def _hello(self, websocket: WebSocket, session_id: int, message: dict) -> Optional[str]:
+        """Answer ``hello``; returns the negotiated video-chunk format, if any."""
+        if wants_trace(message):
+            self._traced_sessions.add(session_id)
+        reply = hello_response(message, available_video_formats())
+        await websocket.send_json(reply)
+        fmt = reply["frame_format"]
+        return fmt if fmt in VIDEO_FRAME_FORMATS else None
+
+    async def _open_video_ingest(
+        self, session_id: int, analyzer, video_format: str,
+        first_chunk: FrameMessage, on_frame,
+    ) -> Optional[_VideoIngest]:
+        """Start decoding a connection's chunks (on its first chunk).
+
+        Nothing is decoded before the first ``feed``, so ``on_frame`` never
+        runs before the caller has the returned ``_VideoIngest``.
+        """
+        try:
+            decoder = ChunkDecoder(
+                video_format, first_chunk.width, first_chunk.height, on_frame,
+                loop=asyncio.get_running_loop(), start_ts=first_chunk.timestamp,
+            )
+        except (ValueError, OSError) as e:
+            logger.error(f"Session {session_id}: cannot decode video chunks: {e}")
+            return None
+        record = await get_inference_pool("badminton").run(
+            session_id, analyzer.start_video_passthrough, decoder.extension,
+        )
+        logger.info(
+            f"Session {session_id}: {video_format} ingest at "
+            f"{first_chunk.width}x{first_chunk.height} (recorded={record})"
+        )
+        return _VideoIngest(decoder, record)
+
+    async def _ingest_video_chunk(
+        self, websocket: WebSocket, session_id: int, analyzer, video: _VideoIngest, chunk: bytes
+    ) -> bool:
+        """Record and decode one chunk; tells the client if decoding failed."""
+        if video.record:
+            await get_inference_pool("badminton").run(session_id, analyzer.append_video_chunk, chunk)
+        if await asyncio.to_thread(video.decoder.feed, chunk):
+            return True
+        # The client can fall back to JPEG frames on the same connection
+        await websocket.send_json({"type": "video_ingest_failed"})
+        return False
 
     # -------------------------------------------------------------------
     # Basic mode: real-time analysis per frame
     # -------------------------------------------------------------------
 
     async def _handle_basic_stream(
-        self, websocket: WebSocket, session_id: int, analyzer: BasicStreamAnalyzer
+        self, websocket: WebSocket, session_id: int, analyzer: BasicStreamAnalyzer,
+        resumed: Optional[dict] = None,
     ):
-        """Basic mode: analyze each frame in real-time, return results immediately."""
+        """
+        Basic mode: analyze frames in real-time, return results immediately.
+
+        Frames pass through a small bounded queue. In "latest" ingest mode
+        the oldest queued frame is dropped when the server falls behind, so
+        feedback stays live instead of lagging further with every frame;
+        "sequential" mode blocks the reader instead and processes them all.
+        Each result carries an ``ingest`` block with the measured lag so the
+        client can lower its send FPS or JPEG quality.
+        """
+        settings = get_settings()
+        drop_oldest = settings.stream_ingest_mode != "sequential"
+        queue: asyncio.Queue = asyncio.Queue(maxsize=max(1, settings.stream_ingest_queue_size))
+        ingest = _IngestStats(mode="latest" if drop_oldest else "sequential")
+        clock = _IngestClock((resumed or {}).get("last_timestamp"))
+        pool = get_inference_pool("badminton")
+        ended = False
+        video_format: Optional[str] = None
+        video: Optional[_VideoIngest] = None
+
+        async def enqueue_decoded(image: np.ndarray, timestamp: float, index: int):
+            received_at = time.monotonic()
+            await self._enqueue_basic(queue, _QueuedFrame(
+                data=image,
+                timestamp=clock.stamp(timestamp, received_at),
+                received_at=received_at,
+                trace=FrameTrace("badminton", seq=index),
+                source_frame=index if video.record else None,
+            ), drop_oldest, ingest)
+
+        processor = asyncio.create_task(
+            self._process_basic_queue(websocket, session_id, analyzer, queue, ingest)
+        )
+        checkpointer = asyncio.create_task(self._checkpoint_loop(session_id, analyzer))
         try:
             while True:
                 try:
                     raw_message = await asyncio.wait_for(
-                        websocket.receive_text(), timeout=60.0
+                        receive_message(websocket), timeout=60.0
                     )
                 except asyncio.TimeoutError:
                     try:
@@ -154,38 +523,69 @@ class StreamConnectionManager:
                     except Exception:
                         break
 
-                if raw_message == "ping":
-                    await websocket.send_json({"type": "pong"})
-                    continue
-
-                try:
-                    message = json.loads(raw_message)
-                except json.JSONDecodeError:
+                trace_start, trace_wall = time.perf_counter(), time.time()
+                message = parse_client_message(raw_message, tags=["feature:badminton"])
+                if message is None:
                     continue
 
                 msg_type = message.get("type")
 
                 if msg_type == "frame":
-                    result = await self._process_basic_frame(analyzer, message)
-
-                    if result.get('stats', {}).get('frames_processed', 0) % 30 == 0:
-                        logger.info(f"Session {session_id}: Frame {result.get('stats', {}).get('frames_processed')}")
-
-                    await websocket.send_json({"type": "analysis_result", **result})
-                    await self.broadcast_to_viewers(session_id, {"type": "analysis_result", **result})
+                    frame = message.get("frame")
+                    if frame is None:
+                        continue
+                    received_at = time.monotonic()
+                    await self._enqueue_basic(queue, _QueuedFrame(
+                        data=frame.data,
+                        timestamp=clock.stamp(frame.timestamp, received_at),
+                        received_at=received_at,
+                        trace=FrameTrace.for_frame("badminton", frame, trace_start, trace_wall),
+                    ), drop_oldest, ingest)
+
+                elif msg_type == "video_chunk":
+                    chunk = message.get("frame")
+                    if chunk is None or video_format is None:
+                        continue
+                    if video is None:
+                        video = await self._open_video_ingest(
+                            session_id, analyzer, video_format, chunk, enqueue_decoded
+                        )
+                        if video is None:
+                            video_format = None
+                            await websocket.send_json({"type": "video_ingest_failed"})
+                            continue
+                    if not await self._ingest_video_chunk(websocket, session_id, analyzer, video, chunk.data):
+                        video_format = None
 
                 elif msg_type == "start_recording":
-                    analyzer.start_recording()
+                    # Runs on the session's inference worker, between frames
+                    await pool.run(session_id, analyzer.start_recording)
                     await websocket.send_json({"type": "recording_started"})
 
                 elif msg_type == "stop_recording":
-                    frames = analyzer.stop_recording()
-                    await websocket.send_json({"type": "recording_stopped", "frame_count": len(frames)})
+                    recording = await pool.run(session_id, analyzer.stop_recording)
+                    # Only the HTTP stop/end endpoints persist recordings
+                    if recording is not None:
+                        recording.discard()
+                    await websocket.send_json({
+                        "type": "recording_stopped",
+                        "frame_count": recording.frame_count if recording else 0,
+                    })
 
                 elif msg_type == "end_stream":
+                    ended = True
+                    checkpointer.cancel()
+                    if video is not None:
+                        # Decode and queue the frames still buffered in ffmpeg
+                        await asyncio.to_thread(video.decoder.close)
+                    await queue.join()
+                    processor.cancel()
                     await self._end_basic_stream(websocket, session_id, analyzer)
                     break
 
+                elif msg_type == "hello":
+                    video_format = await self._hello(websocket, session_id, message)
+
                 elif msg_type == "ping":
                     await websocket.send_json({"type": "pong"})
 
@@ -194,32 +594,112 @@ class StreamConnectionManager:
         except Exception as e:
             logger.error(f"Session {session_id}: Error in stream handler: {e}")
         finally:
-            self.disconnect_streamer(session_id)
+            if video is not None:
+                video.decoder.abort()
+            processor.cancel()
+            checkpointer.cancel()
+            await asyncio.gather(processor, checkpointer, return_exceptions=True)
+            if ended:
+                self.disconnect_streamer(session_id)
+            else:
+                await self._detach(session_id, analyzer)
+
+    async def _enqueue_basic(
+        self, queue: asyncio.Queue, item: _QueuedFrame, drop_oldest: bool, ingest: _IngestStats
+    ):
+        """Queue a frame for the basic processor, dropping the oldest when behind."""
+        if item.trace is not None:
+            item.trace.begin_wait()
+        if drop_oldest and queue.full():
+            try:
+                stale = queue.get_nowait()
+                queue.task_done()
+                item.dropped_before = stale.dropped_before + 1
+                ingest.dropped += 1
+                statsd.increment("stream.frame.dropped", tags=["feature:badminton"])
+            except asyncio.QueueEmpty:
+                pass
+        await queue.put(item)
+
+    async def _process_basic_queue(
+        self,
+        websocket: WebSocket,
+        session_id: int,
+        analyzer: BasicStreamAnalyzer,
+        queue: asyncio.Queue,
+        ingest: _IngestStats,
+    ):
+        """Consume queued frames and send each result with ingest lag figures."""
+        while True:
+            item: _QueuedFrame = await queue.get()
+            trace = item.trace
+            try:
+                if trace is not None:
+                    trace.end_wait("queue")
+                started = time.monotonic()
+                result = await self._process_basic_frame(session_id, analyzer, item)
+                done = time.monotonic()
+
+                lag_ms = (done - item.received_at) * 1000
+                ingest.update(lag_ms, (done - started) * 1000)
+                statsd.histogram("stream.frame.lag_ms", lag_ms, tags=["feature:badminton"])
+                result["ingest"] = ingest.to_dict(lag_ms, queue.qsize())
+
+                if result.get('stats', {}).get('frames_processed', 0) % 30 == 0:
+                    logger.info(f"Session {session_id}: Frame {result.get('stats', {}).get('frames_processed')}")
+
+                if trace is None:
+                    text = json.dumps({"type": "analysis_result", **result})
+                    await websocket.send_text(text)
+                    await self.broadcast_to_viewers(session_id, text, coalesce_key="analysis_result")
+                    continue
+                if session_id in self._traced_sessions:
+                    result["timing"] = trace.timing()
+                with trace.span("send"):
+                    text = json.dumps({"type": "analysis_result", **result})
+                    await websocket.send_text(text)
+                    await self.broadcast_to_viewers(session_id, text, coalesce_key="analysis_result")
+                trace.emit(["mode:basic"])
+            except Exception as e:
+                logger.error(f"Session {session_id}: Failed to deliver result: {e}")
+            finally:
+                queue.task_done()
 
-    async def _process_basic_frame(self, analyzer: BasicStreamAnalyzer, message: dict) -> dict:
+    async def _process_basic_frame(
+        self, session_id: int, analyzer: BasicStreamAnalyzer, item: _QueuedFrame
+    ) -> dict:
         """Process a single frame for basic mode."""
         try:
-            frame_b64 = message.get("data", "")
-            timestamp = message.get("timestamp", 0.0)
-            if not frame_b64:
-                return {"error": "No frame data"}
-
-            frame_data = base64.b64decode(frame_b64)
-            loop = asyncio.get_event_loop()
-            result = await loop.run_in_executor(
-                None, analyzer.process_frame, frame_data, timestamp
+            if item.trace is not None:
+                item.trace.begin_wait()
+            args = (item.data, item.timestamp, item.dropped_before)
+            if item.source_frame is not None:
+                args += (item.source_frame,)
+            result = await get_inference_pool("badminton").run(
+                session_id, run_traced, item.trace, analyzer.process_frame, *args,
             )
             return result
         except Exception as e:
             logger.error(f"Frame processing error: {e}", exc_info=True)
             return {"error": str(e)}
 
+    @staticmethod
+    def _finish_basic_analyzer(analyzer: BasicStreamAnalyzer) -> Tuple[dict, Optional[str]]:
+        """Close the raw recording; returns the final report and its path."""
+        analyzer.release_raw_video_writer()
+        return analyzer.get_final_report(), analyzer.raw_video_path
+
     async def _end_basic_stream(
         self, websocket: WebSocket, session_id: int, analyzer: BasicStreamAnalyzer
     ):
         """End a basic mode stream."""
-        analyzer.release_raw_video_writer()
-        report = analyzer.get_final_report()
+        # Blocking (a sharded analyzer answers over its pipe), so off the event loop
+        try:
+            report, raw_video_path = await get_inference_pool("badminton").run(
+                session_id, self._finish_basic_analyzer, analyzer
+            )
+        except SessionNotAdmitted:
+            report, raw_video_path = await asyncio.to_thread(self._finish_basic_analyzer, analyzer)
 
         db = SessionLocal()
         try:
@@ -235,8 +715,8 @@ class StreamConnectionManager:
                     session.foot_positions = report['heatmap_data']
                 if report and 'shot_timeline' in report:
                     session.shot_timeline = report['shot_timeline']
-                if analyzer.raw_video_path:
-                    session.raw_video_local_path = analyzer.raw_video_path
+                if raw_video_path:
+                    session.raw_video_local_path = raw_video_path
                 has_data = report.get('has_post_analysis_data', False)
                 session.analysis_status = "pending" if has_data else "none"
                 db.commit()
@@ -246,16 +726,14 @@ class StreamConnectionManager:
         finally:
             db.close()
 
-        await websocket.send_json({
-            "type": "stream_ended",
-            "report": report,
-            "analysis_available": report.get('has_post_analysis_data', False),
-        })
-        await self.broadcast_to_viewers(session_id, {
+        text = json.dumps({
             "type": "stream_ended",
             "report": report,
             "analysis_available": report.get('has_post_analysis_data', False),
         })
+        await self._drop_checkpoint(session_id)
+        await websocket.send_text(text)
+        await self.broadcast_to_viewers(session_id, text, final=True)
         logger.info(f"Session {session_id}: Basic stream ended")
 
     # -------------------------------------------------------------------
@@ -271,12 +749,31 @@ class StreamConnectionManager:
         self._broadcast_tasks[session_id] = asyncio.create_task(
             self._broadcast_advanced_results(websocket, session_id, analyzer)
         )
+        checkpointer = asyncio.create_task(self._checkpoint_loop(session_id, analyzer))
+        ended = False
+        video_format: Optional[str] = None
+        video: Optional[_VideoIngest] = None
+
+        async def store_decoded(image: np.ndarray, timestamp: float, index: int):
+            trace = FrameTrace("badminton", seq=index)
+            trace.begin_wait()
+            try:
+                result = await get_inference_pool("badminton").run(
+                    session_id, run_traced, trace, analyzer.process_frame, image, timestamp,
+                )
+                await send_traced(
+                    websocket, {"type": "frame_buffered", **result}, trace,
+                    include_timing=session_id in self._traced_sessions,
+                    tags=["mode:advanced"],
+                )
+            except Exception as e:
+                logger.error(f"Advanced frame error: {e}")
 
         try:
             while True:
                 try:
                     raw_message = await asyncio.wait_for(
-                        websocket.receive_text(), timeout=60.0
+                        receive_message(websocket), timeout=60.0
                     )
                 except asyncio.TimeoutError:
                     try:
@@ -285,27 +782,60 @@ class StreamConnectionManager:
                     except Exception:
                         break
 
-                if raw_message == "ping":
-                    await websocket.send_json({"type": "pong"})
-                    continue
-
-                try:
-                    message = json.loads(raw_message)
-                except json.JSONDecodeError:
+                trace_start, trace_wall = time.perf_counter(), time.time()
+                message = parse_client_message(raw_message, tags=["feature:badminton"])
+                if message is None:
                     continue
 
                 msg_type = message.get("type")
 
                 if msg_type == "frame":
-                    result = await self._process_advanced_frame(analyzer, message)
+                    trace = None
+                    if message.get("frame") is not None:
+                        trace = FrameTrace.for_frame(
+                            "badminton", message["frame"], trace_start, trace_wall
+                        )
+                    result = await self._process_advanced_frame(
+                        session_id, analyzer, message, trace
+                    )
 
                     # Send lightweight buffer status back (~every 30 frames)
-                    await websocket.send_json({"type": "frame_buffered", **result})
+                    await send_traced(
+                        websocket, {"type": "frame_buffered", **result}, trace,
+                        include_timing=session_id in self._traced_sessions,
+                        tags=["mode:advanced"],
+                    )
+
+                elif msg_type == "video_chunk":
+                    chunk = message.get("frame")
+                    if chunk is None or video_format is None:
+                        continue
+                    if video is None:
+                        video = await self._open_video_ingest(
+                            session_id, analyzer, video_format, chunk, store_decoded
+                        )
+                        if video is None:
+                            video_format = None
+                            await websocket.send_json({"type": "video_ingest_failed"})
+                            continue
+                    if not await self._ingest_video_chunk(websocket, session_id, analyzer, video, chunk.data):
+                        video_format = None
+
+                elif msg_type == "results_ack":
+                    self.ack_results(session_id, websocket, message.get("version"))
 
                 elif msg_type == "end_stream":
+                    ended = True
+                    checkpointer.cancel()
+                    if video is not None:
+                        # Store the frames still buffered in ffmpeg
+                        await asyncio.to_thread(video.decoder.close)
                     await self._end_advanced_stream(websocket, session_id, analyzer)
                     break
 
+                elif msg_type == "hello":
+                    video_format = await self._hello(websocket, session_id, message)
+
                 elif msg_type == "ping":
                     await websocket.send_json({"type": "pong"})
 
@@ -314,22 +844,34 @@ class StreamConnectionManager:
         except Exception as e:
             logger.error(f"Session {session_id}: Error in advanced stream: {e}")
         finally:
-            self.disconnect_streamer(session_id)
+            if video is not None:
+                video.decoder.abort()
+            self._result_acks.get(session_id, {}).pop(websocket, None)
+            checkpointer.cancel()
+            await asyncio.gather(checkpointer, return_exceptions=True)
+            if ended:
+                self.disconnect_streamer(session_id)
+            else:
+                await self._detach(session_id, analyzer)
 
     async def _process_advanced_frame(
-        self, analyzer: AdvancedStreamAnalyzer, message: dict
+        self,
+        session_id: int,
+        analyzer: AdvancedStreamAnalyzer,
+        message: dict,
+        trace: Optional[FrameTrace] = None,
     ) -> dict:
         """Process a single frame for advanced mode (just store it)."""
         try:
-            frame_b64 = message.get("data", "")
-            timestamp = message.get("timestamp", 0.0)
-            if not frame_b64:
+            frame = message.get("frame")
+            if frame is None:
                 return {"error": "No frame data"}
 
-            frame_data = base64.b64decode(frame_b64)
-            loop = asyncio.get_event_loop()
-            result = await loop.run_in_executor(
-                None, analyzer.process_frame, frame_data, timestamp
+            if trace is not None:
+                trace.begin_wait()
+            result = await get_inference_pool("badminton").run(
+                session_id, run_traced, trace, analyzer.process_frame,
+                frame.data, frame.timestamp,
             )
             return result
         except Exception as e:
@@ -339,28 +881,82 @@ class StreamConnectionManager:
     async def _broadcast_advanced_results(
         self, websocket: WebSocket, session_id: int, analyzer: AdvancedStreamAnalyzer
     ):
-        """Periodically check for new classification results and push to client."""
+        """Push new classification results as soon as the processor publishes them."""
+        loop = asyncio.get_running_loop()
+        ready = asyncio.Event()
+
+        def _on_results():
+            # Called from the classification thread
+            loop.call_soon_threadsafe(ready.set)
+
+        analyzer.add_results_listener(_on_results)
+        tracker = self._result_trackers.setdefault(session_id, ResultDeltaTracker())
         try:
             while True:
-                await asyncio.sleep(2.0)
+                await ready.wait()
+                ready.clear()
 
                 if analyzer.has_new_results():
-                    results = analyzer.get_accumulated_results()
+                    tracker.publish(analyzer.get_accumulated_results())
                     status = analyzer._build_status()
-                    msg = {
-                        "type": "chunk_results",
-                        "seconds_processed": status['seconds_processed'],
-                        "seconds_buffered": status['seconds_buffered'],
-                        "frames_processed": status['frames_processed'],
-                        **results,
-                    }
                     try:
-                        await websocket.send_json(msg)
-                        await self.broadcast_to_viewers(session_id, msg)
+                        await self._send_results(session_id, websocket, tracker, {
+                            "type": "chunk_results",
+                            "seconds_processed": status['seconds_processed'],
+                            "seconds_buffered": status['seconds_buffered'],
+                            "frames_processed": status['frames_processed'],
+                            "pipeline": status['pipeline'],
+                        })
                     except Exception:
                         break
         except asyncio.CancelledError:
             pass
+        finally:
+            analyzer.remove_results_listener(_on_results)
+
+    async def _send_results(
+        self, session_id: int, websocket: WebSocket,
+        tracker: ResultDeltaTracker, header: dict,
+    ):
+        """
+        Send the latest results to the streamer and every viewer.
+
+        Each connection gets a delta from the version it last acked (or a
+        snapshot); connections sharing a base share one serialized message.
+        """
+        acks = self._result_acks.get(session_id, {})
+        fanout = self._viewers.get(session_id)
+        viewers = fanout.viewers if fanout is not None else []
+        encoded: Dict[Optional[int], str] = {}
+
+        def _encode(ws: WebSocket) -> str:
+            base = acks.get(ws)
+            if base not in encoded:
+                t0 = time.perf_counter()
+                body = tracker.message_for(base)
+                encoded[base] = dumps_compact({**header, **body})
+                kind = "delta" if body.get("delta") else "snapshot"
+                statsd.histogram(
+                    "stream.results.serialize_us", (time.perf_counter() - t0) * 1e6,
+                    tags=["feature:badminton", f"kind:{kind}"],
+                )
+            return encoded[base]
+
+        viewer_texts = {ws: _encode(ws) for ws in viewers}
+        for text in viewer_texts.values():
+            statsd.histogram(
+                "stream.results.bytes", len(text), tags=["feature:badminton", "role:viewer"],
+            )
+        if fanout is not None:
+            # A newer result always supersedes a queued one: it is encoded
+            # against the same acked base, so nothing is lost by coalescing
+            fanout.publish_encoded(viewer_texts, coalesce_key="chunk_results")
+
+        text = _encode(websocket)
+        statsd.histogram(
+            "stream.results.bytes", len(text), tags=["feature:badminton", "role:streamer"],
+        )
+        await websocket.send_text(text)
 
     async def _end_advanced_stream(
         self, websocket: WebSocket, session_id: int, analyzer: AdvancedStreamAnalyzer
@@ -370,6 +966,9 @@ class StreamConnectionManager:
         task = self._broadcast_tasks.pop(session_id, None)
         if task:
             task.cancel()
+        self._result_trackers.pop(session_id, None)
+        self._result_acks.pop(session_id, None)
+        await self._drop_checkpoint(session_id)
 
         # Send preliminary report + "finalizing" status
         report = analyzer.get_final_report()
@@ -397,7 +996,6 @@ class StreamConnectionManager:
             db.close()
 
         # Run finalize in executor (this takes a while — annotated video etc.)
-        from ..config import get_settings
         settings = get_settings()
         output_dir = str(settings.output_path / str(session_id))
 
@@ -448,8 +1046,9 @@ class StreamConnectionManager:
             "analysis_available": success,
             "analysis_status": "complete" if success else "failed",
         }
-        await websocket.send_json(msg)
-        await self.broadcast_to_viewers(session_id, msg)
+        text = json.dumps(msg)
+        await websocket.send_text(text)
+        await self.broadcast_to_viewers(session_id, text, final=True)
         logger.info(f"Session {session_id}: Advanced stream ended and finalized")
 
     # -------------------------------------------------------------------
@@ -459,8 +1058,8 @@ class StreamConnectionManager:
     def get_session_stats(self, session_id: int) -> Optional[dict]:
         """Get current stats for a session."""
         analyzer = self._session_manager.get_session(session_id)
-        if analyzer and isinstance(analyzer, BasicStreamAnalyzer):
-            return analyzer._get_stats_dict()
+        if analyzer and not isinstance(analyzer, AdvancedStreamAnalyzer):
+            return {**analyzer._get_stats_dict(), "viewers": self.get_viewer_stats(session_id)}
         return None
 
     def get_active_sessions(self) -> List[int]:
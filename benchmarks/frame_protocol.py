@@ -0,0 +1,110 @@
+"""Server-side cost per live frame: JSON/base64 vs binary_v1.
+
+Measures the event-loop CPU spent turning one received WebSocket message
+into JPEG bytes (``parse_client_message``) and the bytes on the wire, for
+synthetic camera-like JPEGs at common phone resolutions.
+
+Usage:
+    python -m benchmarks.frame_protocol
+    python -m benchmarks.frame_protocol --frames 2000 -o frame_protocol.json
+"""
+
+import argparse
+import base64
+import json
+import os
+import sys
+import time
+from typing import Any, Dict
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import cv2
+import numpy as np
+
+from api.core.streaming.frame_protocol import encode_binary_frame, parse_client_message
+
+RESOLUTIONS = {"480p": (640, 480), "720p": (1280, 720), "1080p": (1920, 1080)}
+
+
+def synthetic_jpeg(width: int, height: int, quality: int = 80, seed: int = 0) -> bytes:
+    """Gradient + noise image — compresses roughly like a camera frame."""
+    rng = np.random.default_rng(seed)
+    yy, xx = np.mgrid[0:height, 0:width]
+    base = ((xx * 255 // max(width - 1, 1) + yy * 255 // max(height - 1, 1)) // 2).astype(np.uint8)
+    img = np.dstack([base, base[::-1], base[:, ::-1]])
+    noise = rng.integers(0, 24, size=img.shape, dtype=np.uint8)
+    ok, buf = cv2.imencode(".jpg", cv2.add(img, noise), [cv2.IMWRITE_JPEG_QUALITY, quality])
+    assert ok
+    return buf.tobytes()
+
+
+def _time_per_frame(messages, repeats: int) -> float:
+    """Median-of-repeats CPU microseconds per parse_client_message call."""
+    samples = []
+    for _ in range(repeats):
+        start = time.process_time()
+        for m in messages:
+            parse_client_message(m)
+        samples.append((time.process_time() - start) / len(messages) * 1e6)
+    samples.sort()
+    return samples[len(samples) // 2]
+
+
+def run(frames: int, repeats: int, quality: int) -> Dict[str, Any]:
+    results: Dict[str, Any] = {}
+    for name, (w, h) in RESOLUTIONS.items():
+        jpeg = synthetic_jpeg(w, h, quality)
+        json_msgs = [
+            json.dumps({
+                "type": "frame",
+                "data": base64.b64encode(jpeg).decode("ascii"),
+                "timestamp": i / 10,
+                "width": w,
+                "height": h,
+            })
+            for i in range(frames)
+        ]
+        binary_msgs = [encode_binary_frame(jpeg, i / 10, i, w, h) for i in range(frames)]
+
+        json_us = _time_per_frame(json_msgs, repeats)
+        binary_us = _time_per_frame(binary_msgs, repeats)
+        results[name] = {
+            "jpeg_bytes": len(jpeg),
+            "json": {"wire_bytes": len(json_msgs[0]), "decode_cpu_us": round(json_us, 2)},
+            "binary_v1": {"wire_bytes": len(binary_msgs[0]), "decode_cpu_us": round(binary_us, 2)},
+            "bandwidth_saving_pct": round((1 - len(binary_msgs[0]) / len(json_msgs[0])) * 100, 1),
+            "cpu_speedup": round(json_us / binary_us, 1) if binary_us > 0 else None,
+        }
+    return results
+
+
+def main() -> int:
+    p = argparse.ArgumentParser(
+        prog="python -m benchmarks.frame_protocol",
+        description="Compare server decode CPU/bandwidth for JSON vs binary frames.",
+    )
+    p.add_argument("--frames", type=int, default=500, help="Messages per measurement")
+    p.add_argument("--repeats", type=int, default=5, help="Measurements (median reported)")
+    p.add_argument("--jpeg-quality", type=int, default=80, help="JPEG quality 0-100")
+    p.add_argument("--output", "-o", help="Save JSON report to this path")
+    args = p.parse_args()
+
+    results = run(args.frames, args.repeats, args.jpeg_quality)
+    for name, r in results.items():
+        print(
+            f"{name:>6}: jpeg {r['jpeg_bytes'] / 1024:.0f}KB | "
+            f"json {r['json']['decode_cpu_us']:.1f}us {r['json']['wire_bytes'] / 1024:.0f}KB | "
+            f"binary {r['binary_v1']['decode_cpu_us']:.1f}us {r['binary_v1']['wire_bytes'] / 1024:.0f}KB | "
+            f"-{r['bandwidth_saving_pct']}% bytes, x{r['cpu_speedup']} CPU"
+        )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"benchmark": "frame_protocol", "results": results}, f, indent=2)
+        print(f"Report saved to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
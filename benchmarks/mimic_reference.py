@@ -0,0 +1,114 @@
+"""Mimic reference-frame lookup benchmark.
+
+Times the closest-reference-frame lookup done for every user frame, on a
+synthetic 3-minute dance reference at 30 fps (5400 frames), for:
+
+    live      one lookup per camera frame, client-reported playback time
+              with jitter and a loop back to the start
+    offline   one lookup per frame of an uploaded video, shifted by an
+              audio offset (``video_comparator``)
+
+comparing the old linear scan from frame 0 against ``ReferenceTimeline``
+(bisect) and ``ReferenceCursor``. Every method must pick the same frame
+as the old scan; a mismatch exits non-zero.
+
+Usage:
+    python -m benchmarks.mimic_reference
+    python -m benchmarks.mimic_reference --minutes 5 --fps 60 --irregular
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from typing import Callable, List, Optional
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from api.features.mimic.services.reference_timeline import ReferenceTimeline
+
+
+def build_reference(minutes: float, fps: float, irregular: bool, seed: int = 0) -> List[dict]:
+    """Reference timeline as stored on ``MimicChallenge.pose_timeline``."""
+    rng = random.Random(seed)
+    n = int(minutes * 60 * fps)
+    timeline, t = [], 0.0
+    for _ in range(n):
+        lm = [[round(rng.random(), 4), round(rng.random(), 4), round(rng.random(), 3)] for _ in range(33)]
+        timeline.append({"t": round(t, 3), "lm": lm})
+        # Irregular: frames without a detected pose are missing from the timeline
+        t += (1 / fps) * (rng.choice((1, 1, 1, 2, 3)) if irregular else 1)
+    return timeline
+
+
+def live_times(duration: float, fps: float = 30.0, seed: int = 1) -> List[float]:
+    rng = random.Random(seed)
+    n = int(duration * 1.5 * fps)  # plays through and loops halfway again
+    return [((i / fps) + rng.uniform(-0.02, 0.02)) % duration for i in range(n)]
+
+
+def offline_times(duration: float, fps: float = 30.0, offset: float = 0.35) -> List[float]:
+    n = int(duration * fps)
+    return [max(0.0, min(i / fps + offset, duration)) for i in range(n)]
+
+
+def linear_scan(timeline: List[dict], ref_time: float) -> Optional[int]:
+    """The lookup both mimic paths used before ``ReferenceTimeline``."""
+    if not timeline:
+        return None
+    best_idx = 0
+    best_diff = abs(timeline[0].get("t", 0) - ref_time)
+    for i, entry in enumerate(timeline):
+        diff = abs(entry.get("t", 0) - ref_time)
+        if diff < best_diff:
+            best_diff = diff
+            best_idx = i
+        elif diff > best_diff:
+            break
+    return best_idx
+
+
+def _run(lookup: Callable[[float], Optional[int]], times: List[float]):
+    start = time.perf_counter()
+    picks = [lookup(t) for t in times]
+    return picks, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mimic reference-frame lookup benchmark")
+    parser.add_argument("--minutes", type=float, default=3.0)
+    parser.add_argument("--fps", type=float, default=30.0, help="reference frame rate")
+    parser.add_argument("--irregular", action="store_true", help="drop frames from the reference")
+    args = parser.parse_args()
+
+    raw = build_reference(args.minutes, args.fps, args.irregular)
+    start = time.perf_counter()
+    reference = ReferenceTimeline.from_frames(raw)
+    build_ms = (time.perf_counter() - start) * 1000
+    duration = reference.times[-1]
+    print(f"Reference: {len(raw)} frames, {duration:.0f}s, index built in {build_ms:.1f} ms")
+
+    failed = False
+    for name, times in (("live", live_times(duration)), ("offline", offline_times(duration))):
+        expected, scan_s = _run(lambda t: linear_scan(raw, t), times)
+        bisect_picks, bisect_s = _run(reference.index_at, times)
+        cursor = reference.cursor()
+        cursor_picks, cursor_s = _run(cursor.seek, times)
+
+        print(f"\n{name}: {len(times)} lookups")
+        for method, picks, seconds in (
+            ("linear scan", expected, scan_s),
+            ("bisect", bisect_picks, bisect_s),
+            ("cursor", cursor_picks, cursor_s),
+        ):
+            same = picks == expected
+            failed |= not same
+            print(f"  {method:<12} {seconds * 1000:9.1f} ms  {seconds / len(times) * 1e6:8.2f} us/frame  "
+                  f"{scan_s / seconds:7.0f}x  {'ok' if same else 'MISMATCH'}")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
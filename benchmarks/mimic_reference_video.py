@@ -0,0 +1,106 @@
+"""Mimic side-by-side reference-video reading benchmark.
+
+Writes a synthetic inter-coded reference video (mp4v, moving content) and
+times fetching the reference panel for every frame of a user video, as
+``video_comparator`` does, with:
+
+    seek      ``set(CAP_PROP_POS_FRAMES)`` + ``read()`` per user frame
+    reader    ``ReferenceFrameReader`` (sequential decode, seeks on jumps)
+
+The user video is shifted by an audio offset and runs past the end of the
+reference. Both methods must return the same frames; a mismatch exits
+non-zero.
+
+Usage:
+    python -m benchmarks.mimic_reference_video
+    python -m benchmarks.mimic_reference_video --seconds 30 --user-fps 60
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from api.features.mimic.services.reference_video import ReferenceFrameReader, resize_to_height
+
+PANEL_HEIGHT = 480
+
+
+def write_reference(path: str, seconds: float, fps: float, width: int = 1280, height: int = 720):
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), fps, (width, height))
+    rng = np.random.default_rng(0)
+    background = rng.integers(0, 255, (height, width, 3), np.uint8)
+    for i in range(int(seconds * fps)):
+        frame = np.roll(background, i * 4, axis=1)
+        cv2.putText(frame, str(i), (40, 120), cv2.FONT_HERSHEY_SIMPLEX, 3, (255, 255, 255), 6)
+        writer.write(frame)
+    writer.release()
+
+
+def seek_panels(path: str, times):
+    """The per-frame seek the comparator used before ``ReferenceFrameReader``."""
+    cap = cv2.VideoCapture(path)
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+    panels, last = [], None
+    for t in times:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, int(t * fps))
+        ok, frame = cap.read()
+        if ok:
+            last = frame
+        panels.append(resize_to_height(last, PANEL_HEIGHT) if last is not None else None)
+    cap.release()
+    return panels
+
+
+def reader_panels(path: str, times):
+    reader = ReferenceFrameReader(path, PANEL_HEIGHT)
+    panels = [reader.panel_at(t) for t in times]
+    reader.release()
+    return panels, reader
+
+
+def _same(a, b) -> bool:
+    if a is None or b is None:
+        return a is b
+    return a.shape == b.shape and float(np.abs(a.astype(np.int16) - b).mean()) < 1.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mimic reference-video reading benchmark")
+    parser.add_argument("--seconds", type=float, default=5.0, help="reference length")
+    parser.add_argument("--fps", type=float, default=30.0, help="reference frame rate")
+    parser.add_argument("--user-fps", type=float, default=30.0)
+    parser.add_argument("--offset", type=float, default=0.35, help="audio offset in seconds")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "reference.mp4")
+        write_reference(path, args.seconds, args.fps)
+        n = int((args.seconds + 1) * args.user_fps)
+        times = [max(0.0, min(i / args.user_fps + args.offset, args.seconds)) for i in range(n)]
+        print(f"Reference: {args.seconds:.0f}s at {args.fps:.0f} fps; {n} user frames at {args.user_fps:.0f} fps")
+
+        start = time.perf_counter()
+        expected = seek_panels(path, times)
+        seek_s = time.perf_counter() - start
+        start = time.perf_counter()
+        panels, reader = reader_panels(path, times)
+        reader_s = time.perf_counter() - start
+
+    mismatches = sum(not _same(a, b) for a, b in zip(expected, panels))
+    for method, seconds in (("seek", seek_s), ("reader", reader_s)):
+        print(f"  {method:<8} {seconds:7.2f} s  {seconds / n * 1000:7.2f} ms/frame  "
+              f"{args.seconds / seconds if seconds else 0:5.1f}x real time")
+    print(f"  reader: {reader.decoded} decoded, {reader.seeks} seeks; "
+          f"{seek_s / reader_s:.1f}x faster; {mismatches} mismatched frames")
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""Challenge pose-geometry benchmark.
+
+Times the per-frame joint geometry the challenge analyzers compute, on
+random ``(33, 4)`` landmark arrays, for:
+
+    angle_between   ``PoseDetector.angle_between`` per joint on landmark
+                    dicts (the analyzers before ``pose_geometry``)
+    scalar          ``pose_geometry`` (one frame, scalar math)
+    numpy           ``pose_geometry_batch`` on a single frame (the
+                    vectorised kernel paying NumPy overhead per frame)
+    batch           ``pose_geometry_batch`` over all frames at once
+                    (offline replay)
+
+plus ``SquatAnalyzer._process_pose`` and the frontend landmark dicts
+(``landmarks_to_dicts``) per live frame. Each time is the best of
+``--repeat`` runs. Every method must produce the same angles; a mismatch
+exits non-zero.
+
+Usage:
+    python -m benchmarks.pose_geometry
+    python -m benchmarks.pose_geometry --frames 20000
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from api.core.streaming.pose_detector import PoseDetector
+from api.core.streaming.pose_geometry import (
+    JOINTS, landmarks_to_dicts, pose_geometry, pose_geometry_batch,
+)
+from api.features.challenges.services.squat_analyzer import SquatAnalyzer
+
+
+def angle_between_angles(landmarks):
+    points = [(lm["nx"], lm["ny"]) for lm in landmarks]
+    return {name: PoseDetector.angle_between(points[a], points[b], points[c])
+            for name, (a, b, c) in JOINTS.items()}
+
+
+def _time(fn, items, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        out = [fn(item) for item in items]
+        best = min(best, time.perf_counter() - start)
+    return best, out
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Challenge pose-geometry benchmark")
+    parser.add_argument("--frames", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    r = args.repeat
+
+    arrays = np.random.default_rng(0).random((args.frames, 33, 4)).astype(np.float32)
+    frames = list(arrays)
+    dicts = [landmarks_to_dicts(a, 1280, 720) for a in frames]
+    n = args.frames
+    print(f"{n} frames of 33 landmarks")
+
+    timings = {}
+    timings["angle_between"], reference = _time(angle_between_angles, dicts, r)
+    timings["scalar"], scalar = _time(pose_geometry, frames, r)
+    timings["numpy"], numpy_single = _time(lambda a: pose_geometry_batch(a[None])[0], frames, r)
+    timings["batch"], (batch,) = _time(pose_geometry_batch, [arrays], r)
+
+    analyzer = SquatAnalyzer(challenge_type="squat_full", replay=True)
+    timings["_process_pose"], _ = _time(lambda a: analyzer._process_pose(a, 0.0), frames, r)
+    analyzer.close()
+    timings["landmark dicts"], _ = _time(lambda a: landmarks_to_dicts(a, 1280, 720), frames, r)
+
+    for method, seconds in timings.items():
+        print(f"  {method:<15} {seconds * 1e6 / n:7.2f} us/frame")
+
+    mismatches = sum(
+        any(abs(geo.angles[name] - ref[name]) > 1e-6 for name in JOINTS)
+        for results in (scalar, numpy_single, batch)
+        for geo, ref in zip(results, reference)
+    )
+    print(f"  scalar {timings['numpy'] / timings['scalar']:.1f}x faster than numpy per frame; "
+          f"batch {timings['scalar'] / timings['batch']:.1f}x faster than scalar; "
+          f"{mismatches} mismatched frames")
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
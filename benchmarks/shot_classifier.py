@@ -0,0 +1,271 @@
+"""ShotClassifier benchmark and golden-output regression check.
+
+Runs ``ShotClassifier.classify_all`` and ``detect_shuttle_hits_windowed`` on
+synthetic rallies (see ``benchmarks/synthetic.py``), times each phase, and
+compares a SHA-256 digest of the full output against the stored golden
+digest so optimisations can be checked for exact equivalence.
+
+Usage:
+    python -m benchmarks.shot_classifier                      # 1k/10k/100k frames
+    python -m benchmarks.shot_classifier --sizes 1000,10000 -o report.json
+    python -m benchmarks.shot_classifier --compare old.json   # flag regressions
+    python -m benchmarks.shot_classifier --update-golden      # after an intended change
+
+Exit status is non-zero when an output differs from its golden digest or a
+phase is slower than ``--compare`` by more than ``--threshold``.
+"""
+
+import argparse
+import copy
+import hashlib
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from api.services.shot_classifier import ShotClassifier, detect_shuttle_hits_windowed
+from benchmarks.synthetic import generate_rally_frames
+
+GOLDEN_PATH = os.path.join(os.path.dirname(__file__), "golden", "shot_classifier.json")
+DEFAULT_SIZES = [1_000, 10_000, 100_000]
+FPS = 30.0
+COURT_CENTER = [0.5, 0.85]
+
+
+def output_digest(result: Any) -> str:
+    """SHA-256 of the canonical JSON encoding of a classifier output."""
+    blob = json.dumps(result, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(blob.encode()).hexdigest()
+
+
+def output_counts(result: dict) -> Dict[str, int]:
+    """Small human-readable fingerprint stored next to the digest."""
+    return {
+        "shots": len(result.get("shots", [])),
+        "rallies": len(result.get("rallies", [])),
+        "shuttle_hits": len(result.get("shuttle_hits", [])),
+        "gap_zones": len(result.get("gap_zones", [])),
+    }
+
+
+def run_size(n_frames: int, repeats: int) -> Dict[str, Any]:
+    """Benchmark one synthetic session of ``n_frames`` frames."""
+    frames = generate_rally_frames(n_frames, fps=FPS, seed=n_frames)
+
+    classify_runs: List[Dict[str, float]] = []
+    detect_runs: List[Dict[str, float]] = []
+    classified: dict = {}
+    hits: List[dict] = []
+
+    for _ in range(repeats):
+        # classify_all mutates frames (injects wrist_velocity) — start fresh
+        raw = copy.deepcopy(frames)
+        timings: Dict[str, float] = {}
+        start = time.perf_counter()
+        classified = ShotClassifier(court_center=COURT_CENTER).classify_all(raw, FPS, timings=timings)
+        timings["total"] = time.perf_counter() - start
+        classify_runs.append(timings)
+
+        # Standalone hit detection, on its own fresh frames
+        raw = copy.deepcopy(frames)
+        timings = {}
+        start = time.perf_counter()
+        hits = detect_shuttle_hits_windowed(raw, FPS, timings=timings)
+        timings["total"] = time.perf_counter() - start
+        detect_runs.append(timings)
+
+    return {
+        "frames": n_frames,
+        "classify_all": _summarise(classify_runs),
+        "detect_shuttle_hits_windowed": _summarise(detect_runs),
+        "output": {
+            "classify_all": {
+                "sha256": output_digest(classified),
+                "counts": output_counts(classified),
+            },
+            "detect_shuttle_hits_windowed": {
+                "sha256": output_digest(hits),
+                "counts": {"shuttle_hits": len(hits)},
+            },
+        },
+    }
+
+
+def _summarise(runs: List[Dict[str, float]]) -> Dict[str, Dict[str, float]]:
+    """Collapse repeated runs into min/median seconds per phase."""
+    phases = sorted({k for r in runs for k in r})
+    return {
+        phase: {
+            "min_s": round(min(r.get(phase, 0.0) for r in runs), 6),
+            "median_s": round(statistics.median(r.get(phase, 0.0) for r in runs), 6),
+        }
+        for phase in phases
+    }
+
+
+def check_golden(report: Dict[str, Any], golden: Dict[str, Any]) -> List[str]:
+    """Annotate report with golden matches; return mismatch descriptions."""
+    mismatches = []
+    for size, res in report["results"].items():
+        expected = golden.get(size)
+        for name, out in res["output"].items():
+            if expected is None or name not in expected:
+                out["golden_match"] = None
+                continue
+            match = out["sha256"] == expected[name]["sha256"]
+            out["golden_match"] = match
+            if not match:
+                mismatches.append(
+                    f"{name} @ {size} frames: output differs from golden "
+                    f"(counts {out['counts']} vs {expected[name]['counts']})"
+                )
+    return mismatches
+
+
+def compare_reports(
+    current: Dict[str, Any], baseline: Dict[str, Any], threshold: float,
+) -> List[str]:
+    """Return phases whose median time regressed by more than ``threshold``."""
+    regressions = []
+    for size, res in current["results"].items():
+        base = baseline.get("results", {}).get(size)
+        if not base:
+            continue
+        for func in ("classify_all", "detect_shuttle_hits_windowed"):
+            for phase, t in res[func].items():
+                old = base.get(func, {}).get(phase)
+                if not old or old["median_s"] <= 0:
+                    continue
+                ratio = t["median_s"] / old["median_s"]
+                t["vs_baseline"] = round(ratio, 3)
+                # Ignore sub-millisecond phases — timer noise dominates
+                if ratio > 1.0 + threshold and t["median_s"] > 1e-3:
+                    regressions.append(
+                        f"{func}.{phase} @ {size} frames: "
+                        f"{old['median_s'] * 1000:.1f}ms -> {t['median_s'] * 1000:.1f}ms "
+                        f"(x{ratio:.2f})"
+                    )
+    return regressions
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "HEAD"],
+            cwd=os.path.dirname(__file__), stderr=subprocess.DEVNULL, text=True,
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _environment() -> Dict[str, Any]:
+    import numpy as np
+
+    return {
+        "git_commit": _git_commit(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def print_summary(report: Dict[str, Any]):
+    for size, res in report["results"].items():
+        print(f"\n--- {size} frames ---")
+        for func in ("classify_all", "detect_shuttle_hits_windowed"):
+            out = res["output"][func]
+            golden = {True: "match", False: "MISMATCH", None: "no golden"}[out.get("golden_match")]
+            print(f"  {func}: {res[func]['total']['median_s'] * 1000:.1f}ms  [{golden}]")
+            for phase, t in res[func].items():
+                if phase == "total":
+                    continue
+                extra = f"  x{t['vs_baseline']:.2f}" if "vs_baseline" in t else ""
+                print(f"    {phase:<16} {t['median_s'] * 1000:9.2f}ms{extra}")
+
+
+def parse_args() -> argparse.Namespace:
+    p = argparse.ArgumentParser(
+        prog="python -m benchmarks.shot_classifier",
+        description="Time ShotClassifier phases on synthetic rallies and check golden outputs.",
+    )
+    p.add_argument(
+        "--sizes", default=",".join(str(s) for s in DEFAULT_SIZES),
+        help="Comma-separated frame counts (default: 1000,10000,100000)",
+    )
+    p.add_argument("--repeats", type=int, default=3, help="Runs per size (min/median reported)")
+    p.add_argument("--output", "-o", help="Save JSON report to this path")
+    p.add_argument("--compare", help="Baseline JSON report to diff timings against")
+    p.add_argument(
+        "--threshold", type=float, default=0.10,
+        help="Relative slowdown that counts as a regression (default 0.10 = 10%%)",
+    )
+    p.add_argument(
+        "--update-golden", action="store_true",
+        help="Overwrite golden digests with this run's outputs",
+    )
+    p.add_argument("--verbose", "-v", action="store_true", help="Verbose logging")
+    return p.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING)
+
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    report: Dict[str, Any] = {
+        "benchmark": "shot_classifier",
+        "environment": _environment(),
+        "repeats": args.repeats,
+        "results": {},
+    }
+    for n in sizes:
+        print(f"Running {n} frames x{args.repeats}...", flush=True)
+        report["results"][str(n)] = run_size(n, args.repeats)
+
+    golden: Dict[str, Any] = {}
+    if os.path.exists(GOLDEN_PATH):
+        with open(GOLDEN_PATH) as f:
+            golden = json.load(f)
+
+    if args.update_golden:
+        for size, res in report["results"].items():
+            golden[size] = {
+                name: {"sha256": out["sha256"], "counts": out["counts"]}
+                for name, out in res["output"].items()
+            }
+        with open(GOLDEN_PATH, "w") as f:
+            json.dump(golden, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"Golden outputs updated: {GOLDEN_PATH}")
+
+    mismatches = check_golden(report, golden)
+
+    regressions: List[str] = []
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare_reports(report, json.load(f), args.threshold)
+
+    report["golden_mismatches"] = mismatches
+    report["regressions"] = regressions
+    print_summary(report)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+        print(f"\nReport saved to {args.output}")
+
+    for msg in mismatches + regressions:
+        print(f"FAIL: {msg}")
+    return 1 if mismatches or regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
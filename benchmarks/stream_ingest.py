@@ -0,0 +1,140 @@
+"""Advanced-mode ingest cost per frame: decode + mp4v write vs FrameStore append.
+
+``AdvancedStreamAnalyzer.process_frame`` runs on the session's inference
+worker for every received frame. It used to decode each JPEG and encode it
+into an ``mp4v`` raw video on the spot; it now only appends the JPEG bytes
+to the FrameStore. This benchmark times both paths on synthetic JPEGs,
+plus the background processor's read side: one ``read_frame`` per frame
+vs ``read_range`` batches with parallel decode.
+
+Usage:
+    python -m benchmarks.stream_ingest
+    python -m benchmarks.stream_ingest --frames 600 -o stream_ingest.json
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import cv2
+import numpy as np
+
+from api.services.stream_service import AdvancedStreamAnalyzer, FrameStore
+from benchmarks.frame_protocol import RESOLUTIONS, synthetic_jpeg
+
+COURT = {
+    "top_left": [0, 0], "top_right": [1, 0],
+    "bottom_left": [0, 1], "bottom_right": [1, 1],
+}
+
+
+def _legacy_ingest(jpegs: List[bytes], workdir: str, fps: int) -> float:
+    """The previous process_frame body: append, decode, mp4v write."""
+    store = FrameStore(os.path.join(workdir, "legacy.bin"))
+    writer = None
+    start = time.perf_counter()
+    for jpeg in jpegs:
+        store.append(jpeg)
+        frame = cv2.imdecode(np.frombuffer(jpeg, np.uint8), cv2.IMREAD_COLOR)
+        if writer is None:
+            h, w = frame.shape[:2]
+            writer = cv2.VideoWriter(
+                os.path.join(workdir, "legacy.mp4"), cv2.VideoWriter_fourcc(*"mp4v"), fps, (w, h)
+            )
+        writer.write(frame)
+    elapsed = time.perf_counter() - start
+    writer.release()
+    store.close()
+    return elapsed / len(jpegs) * 1e6
+
+
+def _current_ingest(jpegs: List[bytes], workdir: str, fps: int) -> float:
+    """AdvancedStreamAnalyzer.process_frame with the background processor stopped."""
+    analyzer = AdvancedStreamAnalyzer(COURT, session_id=0, frame_rate=fps, output_dir=workdir)
+    analyzer._processor.stop()
+    analyzer._processor.join()
+    start = time.perf_counter()
+    for i, jpeg in enumerate(jpegs):
+        analyzer.process_frame(jpeg, i / fps)
+    elapsed = time.perf_counter() - start
+    analyzer.close()
+    return elapsed / len(jpegs) * 1e6
+
+
+def _read_side(jpegs: List[bytes], workdir: str, batch: int, workers: int) -> Dict[str, float]:
+    """Per-frame microseconds to read + decode the whole store."""
+    store = FrameStore(os.path.join(workdir, "read.bin"), decode_workers=workers)
+    for jpeg in jpegs:
+        store.append(jpeg)
+
+    start = time.perf_counter()
+    for i in range(store.count()):
+        store.read_frame(i)
+    single_us = (time.perf_counter() - start) / len(jpegs) * 1e6
+
+    start = time.perf_counter()
+    for i in range(0, store.count(), batch):
+        store.read_range(i, batch)
+    range_us = (time.perf_counter() - start) / len(jpegs) * 1e6
+    store.release()
+    return {"read_frame_us": round(single_us, 1), "read_range_us": round(range_us, 1)}
+
+
+def run(frames: int, fps: int, batch: int = 8, workers: int = 2) -> Dict[str, Any]:
+    results: Dict[str, Any] = {}
+    for name, (w, h) in RESOLUTIONS.items():
+        jpegs = [synthetic_jpeg(w, h, seed=i % 8) for i in range(frames)]
+        workdir = tempfile.mkdtemp(prefix="bench_ingest_")
+        try:
+            legacy_us = _legacy_ingest(jpegs, workdir, fps)
+            current_us = _current_ingest(jpegs, workdir, fps)
+            read = _read_side(jpegs, workdir, batch, workers)
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+        results[name] = {
+            "jpeg_bytes": len(jpegs[0]),
+            "decode_and_mp4v_us": round(legacy_us, 1),
+            "frame_store_append_us": round(current_us, 1),
+            "speedup": round(legacy_us / current_us, 1) if current_us > 0 else None,
+            **read,
+        }
+    return results
+
+
+def main() -> int:
+    p = argparse.ArgumentParser(
+        prog="python -m benchmarks.stream_ingest",
+        description="Compare advanced-mode per-frame ingest cost before/after decode-once.",
+    )
+    p.add_argument("--frames", type=int, default=300, help="Frames per resolution")
+    p.add_argument("--fps", type=int, default=30, help="Stream frame rate")
+    p.add_argument("--batch", type=int, default=8, help="read_range batch size")
+    p.add_argument("--decode-workers", type=int, default=2, help="FrameStore decode threads")
+    p.add_argument("--output", "-o", help="Save JSON report to this path")
+    args = p.parse_args()
+
+    results = run(args.frames, args.fps, args.batch, args.decode_workers)
+    for name, r in results.items():
+        print(
+            f"{name:>6}: jpeg {r['jpeg_bytes'] / 1024:.0f}KB | "
+            f"decode+mp4v {r['decode_and_mp4v_us']:.0f}us | "
+            f"append {r['frame_store_append_us']:.0f}us | x{r['speedup']} || "
+            f"read_frame {r['read_frame_us']:.0f}us | read_range {r['read_range_us']:.0f}us"
+        )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"benchmark": "stream_ingest", "results": results}, f, indent=2)
+        print(f"Report saved to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,128 @@
+"""Deterministic synthetic rally generator for ShotClassifier benchmarks.
+
+Produces raw_frame_data in the same format as
+``AdvancedStreamAnalyzer._collect_frame_data`` / ``classify_all`` input:
+parabolic shuttle arcs that reverse on every hit, pixel noise, shuttle and
+player detection dropouts, pauses between rallies, and wrist velocity
+spikes around each hit.
+"""
+
+import math
+import random
+from typing import List
+
+# Pixel-space court region used for the court_transform of every frame
+_COURT = {"x1": 100, "y1": 50, "court_w": 1000, "court_h": 600}
+
+
+def generate_rally_frames(n_frames: int, fps: float = 30.0, seed: int = 0) -> List[dict]:
+    """Generate ``n_frames`` of synthetic rally data.
+
+    The output depends only on ``(n_frames, fps, seed)`` so it can be used
+    to check optimisations for exact output equivalence.
+    """
+    rng = random.Random(seed)
+    frames: List[dict] = []
+
+    # Shuttle state: position/velocity at the start of the current arc
+    arc_t = 0
+    arc_len = rng.randint(20, 45)
+    x0, y0 = rng.uniform(300, 900), rng.uniform(200, 500)
+    vx = rng.choice([-1, 1]) * rng.uniform(8, 20)
+    vy = -rng.uniform(10, 20)
+    gravity = 0.8
+
+    in_rally = True
+    rally_left = rng.randint(150, 600)
+    pause_left = 0
+    dropout_left = 0
+
+    # Player state (normalised court coordinates)
+    wrist_x, wrist_y = 0.5, 0.4
+    hip_base = rng.uniform(0.35, 0.5)
+    spike_left = 0
+    overhead = False
+
+    for i in range(n_frames):
+        shuttle = {"x": 0, "y": 0, "confidence": 0.0, "visible": False}
+
+        if in_rally:
+            if arc_t >= arc_len:
+                # Hit: shuttle reverses horizontally and is launched upward
+                x0 += vx * arc_t
+                y0 += vy * arc_t + 0.5 * gravity * arc_t ** 2
+                x0 = min(max(x0, 150.0), 1050.0)
+                y0 = min(max(y0, 80.0), 600.0)
+                vx = -math.copysign(rng.uniform(8, 22), vx)
+                vy = -rng.uniform(8, 22)
+                arc_t = 0
+                arc_len = rng.randint(18, 45)
+                spike_left = rng.randint(3, 6)
+                overhead = rng.random() < 0.4
+                hip_base = rng.uniform(0.2, 0.5)
+
+            x = x0 + vx * arc_t + rng.gauss(0, 2.0)
+            y = y0 + vy * arc_t + 0.5 * gravity * arc_t ** 2 + rng.gauss(0, 2.0)
+            arc_t += 1
+
+            if dropout_left > 0:
+                dropout_left -= 1
+            elif rng.random() < 0.03:
+                dropout_left = rng.randint(1, 8)
+            elif rng.random() > 0.05:
+                shuttle = {
+                    "x": int(x),
+                    "y": int(y),
+                    "confidence": round(rng.uniform(0.5, 1.0), 3),
+                    "visible": True,
+                }
+
+            rally_left -= 1
+            if rally_left <= 0:
+                in_rally = False
+                pause_left = rng.randint(60, 200)
+        else:
+            pause_left -= 1
+            if pause_left <= 0:
+                in_rally = True
+                rally_left = rng.randint(150, 600)
+                arc_t = 0
+
+        # Wrist: slow drift, large jumps (velocity spike) around each hit
+        if spike_left > 0:
+            wrist_x += rng.uniform(-0.08, 0.08)
+            wrist_y += rng.uniform(-0.12, 0.04) if overhead else rng.uniform(-0.05, 0.08)
+            spike_left -= 1
+        else:
+            wrist_x += rng.gauss(0, 0.005)
+            wrist_y += rng.gauss(0, 0.005)
+        wrist_x = min(max(wrist_x, 0.05), 0.95)
+        wrist_y = min(max(wrist_y, 0.0), 0.9)
+
+        player_detected = rng.random() > 0.08
+        pose_state = None
+        if player_detected:
+            shoulder_y = 0.3 + rng.gauss(0, 0.01)
+            hip_y = hip_base + rng.gauss(0, 0.02)
+            pose_state = {
+                "wrist": (wrist_x, wrist_y),
+                "elbow": ((wrist_x + 0.5) / 2, (wrist_y + shoulder_y) / 2),
+                "shoulder": (0.5, shoulder_y),
+                "shoulder_center": (0.5 + rng.gauss(0, 0.01), shoulder_y),
+                "hip_center": (0.5, hip_y),
+            }
+
+        frames.append({
+            "frame_number": i,
+            "timestamp": round(i / fps, 4),
+            "player_detected": player_detected,
+            "pose_state": pose_state,
+            "shuttle": shuttle,
+            "court_transform": dict(_COURT) if rng.random() > 0.05 else None,
+            "player_bbox": None,
+            "foot_position": (
+                [wrist_x, min(hip_base + 0.4, 1.0)] if player_detected else None
+            ),
+        })
+
+    return frames
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Benchmark pose detection throughput on one CPU core.
+
+Decodes each video up front, then times ``PoseDetector.detect`` over the
+frames in three modes: full-frame inference (the old behaviour), ROI
+tracking alone (``pose_roi_tracking``) and ROI tracking with downscaling
+(``pose_target_width``). ``--synthetic`` benchmarks a generated clip of a
+drawn figure squatting and drifting sideways instead of a video file.
+
+Usage:
+    python scripts/pose_benchmark.py <video> [<video> ...] [--width 640] [--max-frames 600]
+    python scripts/pose_benchmark.py --synthetic 1280x720 --synthetic 1920x1080
+
+Outputs, per video and mode (best of ``--repeat`` runs):
+    - frames/sec on a single core
+    - detection rate (frames with a player found)
+    - mean landmark distance from the full-frame result, in pixels
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import cv2
+import numpy as np
+
+from api.core.streaming.pose_detector import PoseDetector
+
+
+def load_frames(path, max_frames):
+    cap = cv2.VideoCapture(path)
+    frames = []
+    while len(frames) < max_frames:
+        ok, frame = cap.read()
+        if not ok:
+            break
+        frames.append(frame)
+    cap.release()
+    return frames
+
+
+def synthetic_frames(width, height, count):
+    """A drawn figure squatting while drifting across a plain court."""
+    frames = []
+    s = height / 720
+    skin, shirt, pants = (140, 170, 220), (180, 60, 40), (60, 40, 30)
+    for i in range(count):
+        img = np.full((height, width, 3), (90, 110, 100), np.uint8)
+        cv2.rectangle(img, (0, int(height * 0.8)), (width, height), (60, 70, 80), -1)
+        cx = int(width * 0.45 + 120 * s * np.sin(i / 40))
+        bend = 0.5 + 0.5 * np.sin(i / 15)
+        hip_y = int((420 + 80 * bend) * s)
+        sh_y = hip_y - int(170 * s)
+        foot_y = int(650 * s)
+        knee_y = (hip_y + foot_y) // 2
+        head = (cx, sh_y - int(60 * s))
+        ls, rs = (cx - int(45 * s), sh_y), (cx + int(45 * s), sh_y)
+        lh, rh = (cx - int(30 * s), hip_y), (cx + int(30 * s), hip_y)
+        lk = (cx - int((40 + 40 * bend) * s), knee_y)
+        rk = (cx + int((40 + 40 * bend) * s), knee_y)
+        la, ra = (cx - int(35 * s), foot_y), (cx + int(35 * s), foot_y)
+        le, re = (ls[0] - int(40 * s), sh_y + int(70 * s)), (rs[0] + int(40 * s), sh_y + int(70 * s))
+        lw, rw = (le[0] + int(10 * s), le[1] + int(75 * s)), (re[0] - int(10 * s), re[1] + int(75 * s))
+        t = int(26 * s)
+        for a, b in ((lh, lk), (lk, la), (rh, rk), (rk, ra)):
+            cv2.line(img, a, b, pants, t + 6)
+        cv2.fillPoly(img, [np.array([ls, rs, rh, lh])], shirt)
+        for a, b in ((ls, le), (rs, re)):
+            cv2.line(img, a, b, shirt, t)
+        for a, b in ((le, lw), (re, rw)):
+            cv2.line(img, a, b, skin, t - 6)
+        cv2.line(img, (cx, sh_y), (cx, head[1]), skin, t)
+        cv2.ellipse(img, head, (int(34 * s), int(44 * s)), 0, 0, 360, skin, -1)
+        for dx in (-12, 12):
+            cv2.circle(img, (head[0] + int(dx * s), head[1] - int(8 * s)), int(4 * s), (30, 30, 30), -1)
+        for p in (la, ra):
+            cv2.ellipse(img, (p[0], p[1] + 8), (int(28 * s), int(12 * s)), 0, 0, 360, (20, 20, 20), -1)
+        frames.append(img)
+    return frames
+
+
+def run(frames, repeat=1, **options):
+    """Best fps over ``repeat`` runs, detection rate and per-frame landmarks."""
+    best = 0.0
+    for _ in range(repeat):
+        detector = PoseDetector(model_complexity=1, **options)
+        try:
+            poses = []
+            start = time.perf_counter()
+            for frame in frames:
+                result = detector.detect(frame)
+                poses.append(result.array[:, :2].copy() if result.player_detected else None)
+            elapsed = time.perf_counter() - start
+        finally:
+            detector.close()
+        best = max(best, len(frames) / elapsed)
+    detected = sum(p is not None for p in poses)
+    return best, detected / len(frames), poses
+
+
+def drift_px(poses, reference, width, height):
+    """Mean landmark distance (pixels) from the reference, on frames both detected."""
+    scale = np.array([width, height], np.float32)
+    dists = [np.linalg.norm((p - r) * scale, axis=1).mean()
+             for p, r in zip(poses, reference) if p is not None and r is not None]
+    return float(np.mean(dists)) if dists else float("nan")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("videos", nargs="*")
+    parser.add_argument("--synthetic", action="append", default=[], metavar="WxH",
+                        help="benchmark a generated clip of this size (repeatable)")
+    parser.add_argument("--width", type=int, default=640, help="target width in ROI mode")
+    parser.add_argument("--max-frames", type=int, default=600)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    if not args.videos and not args.synthetic:
+        parser.error("give a video or --synthetic WxH")
+
+    # One core, so the numbers are per-core throughput
+    if hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, {min(os.sched_getaffinity(0))})
+    cv2.setNumThreads(1)
+
+    modes = {
+        "full frame": dict(roi_tracking=False, target_width=0),
+        "roi": dict(roi_tracking=True, target_width=0),
+        f"roi + {args.width}px": dict(roi_tracking=True, target_width=args.width),
+    }
+
+    clips = [(path, lambda path=path: load_frames(path, args.max_frames)) for path in args.videos]
+    for size in args.synthetic:
+        w, h = (int(v) for v in size.lower().split("x"))
+        clips.append((f"synthetic {size}", lambda w=w, h=h: synthetic_frames(w, h, args.max_frames)))
+
+    for name, load in clips:
+        frames = load()
+        if not frames:
+            print(f"{name}: no frames decoded")
+            continue
+        h, w = frames[0].shape[:2]
+        print(f"\n{name}  ({len(frames)} frames, {w}x{h})")
+        baseline = reference = None
+        for mode, options in modes.items():
+            fps, rate, poses = run(frames, args.repeat, **options)
+            baseline = baseline or fps
+            reference = reference or poses
+            print(f"  {mode:<16} {fps:7.1f} fps/core   detected {rate:6.1%}   "
+                  f"x{fps / baseline:.2f}   drift {drift_px(poses, reference, w, h):5.1f}px")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Re-score stored challenge sessions with the real analyzers, offline.
+
+Feeds stored pose timelines into SquatAnalyzer / SquatHoldAnalyzer /
+PlankAnalyzer / PushupAnalyzer (no video, no MediaPipe) under the
+current CHALLENGE_DEFAULTS and any number of alternative threshold
+configs, in parallel across cores, and reports score deltas per config.
+
+Usage:
+    python scripts/session_analysis/replay_sessions.py <file_or_dir> [...] [options]
+    python scripts/session_analysis/replay_sessions.py --db [--type squat_full] [--limit 5000] [options]
+
+Inputs:
+    .ptl pose timelines (need --type) or pose-data JSON exports from
+    GET /api/v1/challenges/admin/sessions/{id}/pose-data; with --db,
+    every ended session with a stored timeline.
+
+Options:
+    --config NAME=PATH   JSON of per-type overrides, e.g.
+                         {"squat_full": {"down_angle": 95}}; repeatable
+    --workers N          worker processes (default: all cores)
+    --json PATH          write every per-session result as JSON
+
+Outputs:
+    - Baseline fidelity (replayed vs recorded score)
+    - Per config: sessions changed, net and mean absolute score delta
+    - Biggest per-session changes
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from dataclasses import asdict
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
+
+from api.features.challenges.services.replay import (
+    BASELINE, REPLAYABLE_TYPES, replay_sessions, sources_from_db, sources_from_paths, summarize,
+)
+
+
+def parse_configs(specs):
+    configs = {}
+    for spec in specs:
+        name, _, path = spec.partition("=")
+        if not path:
+            sys.exit(f"--config expects NAME=PATH, got {spec!r}")
+        with open(path) as f:
+            configs[name] = json.load(f)
+    return configs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("paths", nargs="*")
+    parser.add_argument("--db", action="store_true", help="replay sessions from the database")
+    parser.add_argument("--type", choices=REPLAYABLE_TYPES, help="challenge type filter / type of .ptl files")
+    parser.add_argument("--limit", type=int)
+    parser.add_argument("--config", action="append", default=[])
+    parser.add_argument("--workers", type=int)
+    parser.add_argument("--json", dest="json_path")
+    args = parser.parse_args()
+
+    if args.db:
+        from api.database import SessionLocal
+        db = SessionLocal()
+        try:
+            sources = sources_from_db(db, args.type, args.limit)
+        finally:
+            db.close()
+    elif args.paths:
+        sources = sources_from_paths(args.paths, args.type)[:args.limit]
+    else:
+        parser.error("give timeline files/directories or --db")
+
+    configs = parse_configs(args.config)
+    print(f"Replaying {len(sources)} sessions x {len(configs) + 1} configs")
+    start = time.perf_counter()
+    results = replay_sessions(sources, configs, workers=args.workers)
+    elapsed = time.perf_counter() - start
+    print(f"Done in {elapsed:.1f}s ({len(results) / max(elapsed, 1e-9):.0f} replays/s)\n")
+
+    errors = [r for r in results if r.error]
+    for r in errors[:10]:
+        print(f"  ERROR {r.source} [{r.config}]: {r.error}")
+    if errors:
+        print(f"  {len(errors)} replays failed\n")
+
+    base = [r for r in results if r.config == BASELINE and not r.error and r.recorded_score is not None]
+    if base:
+        matching = sum(1 for r in base if r.score == r.recorded_score)
+        print(f"Baseline vs recorded score: {matching}/{len(base)} identical")
+
+    summaries = summarize(results)
+    for name, s in summaries.items():
+        if name == BASELINE:
+            continue
+        print(f"\n== {name} ==")
+        print(f"  sessions {s.sessions}   changed {s.changed}   "
+              f"net delta {s.total_delta:+d}   mean |delta| {s.mean_abs_delta:.2f}")
+        for d in s.biggest:
+            print(f"    {d['source']:<40} {d['challenge_type']:<11} "
+                  f"{d['baseline']:>4} -> {d['score']:>4} ({d['delta']:+d})")
+
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump([asdict(r) for r in results], f, indent=1)
+        print(f"\nWrote {args.json_path}")
+
+
+if __name__ == "__main__":
+    main()
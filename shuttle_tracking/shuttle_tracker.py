@@ -156,6 +156,47 @@ class ShuttleTracker:
         heatmap = output[0, 2]  # [288, 512]
         return self._extract_position(heatmap, orig_w, orig_h)
 
+    def detect_in_windows(
+        self, frames: List[np.ndarray], batch_size: int = 8,
+    ) -> List[Tuple[bool, int, int, float]]:
+        """Batched detect_in_frame over every 3-frame sliding window.
+
+        Each frame is preprocessed once (detect_in_frame redoes it for all
+        three windows it appears in) and windows go through the model
+        ``batch_size`` at a time.
+
+        Args:
+            frames: Consecutive BGR frames.
+            batch_size: Windows per model call.
+
+        Returns:
+            len(frames) - 2 (visible, x, y, confidence) tuples; entry i is
+            the detection for frames[i + 2].
+        """
+        if len(frames) < 3:
+            return []
+
+        torch = self._torch
+        tensors = []
+        for frame in frames:
+            rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+            resized = cv2.resize(rgb, (TRACKNET_INPUT_W, TRACKNET_INPUT_H))
+            tensors.append(self.transform(resized))  # [3, 288, 512]
+
+        results = []
+        n_windows = len(frames) - 2
+        for start in range(0, n_windows, batch_size):
+            stop = min(start + batch_size, n_windows)
+            batch = torch.stack(
+                [torch.cat(tensors[i:i + 3], dim=0) for i in range(start, stop)]
+            ).to(self.device)  # [B, 9, 288, 512]
+            with torch.no_grad():
+                output = self.model(batch)  # [B, 3, 288, 512]
+            for b, i in enumerate(range(start, stop)):
+                orig_h, orig_w = frames[i + 2].shape[:2]
+                results.append(self._extract_position(output[b, 2], orig_w, orig_h))
+        return results
+
     def detect_in_video(
         self,
         video_path: str,
@@ -0,0 +1,148 @@
+"""
+Tests for the incremental challenge leaderboards (api/features/challenges/services/leaderboard.py).
+"""
+
+import sys
+import os
+import threading
+from datetime import date, datetime, timedelta
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from api.database import Base
+from api.db_models.user import User  # noqa: F401  (users table for the foreign keys)
+from api.features.challenges.db_models.challenge import (
+    ChallengeDailyBest, ChallengeRecord, ChallengeSession, ChallengeStatus,
+)
+from api.features.challenges.services.leaderboard import (
+    LeaderboardCache, RankedBoard, record_session_result, session_day,
+)
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+
+
+def _end_session(db, cache, user_id, score, challenge_type="pushup", created_at=None):
+    session = ChallengeSession(
+        user_id=user_id, challenge_type=challenge_type, status=ChallengeStatus.ENDED,
+        score=score, created_at=created_at or datetime.now(),
+    )
+    db.add(session)
+    best = record_session_result(db, session)
+    db.commit()
+    cache.submit(session_day(session), challenge_type, user_id, score)
+    return best
+
+
+class TestRankedBoard:
+
+    def test_rank_and_top(self):
+        board = RankedBoard({1: 10, 2: 30, 3: 20})
+        assert board.top(2) == [(2, 30), (3, 20)]
+        assert [board.rank(u) for u in (1, 2, 3, 4)] == [3, 1, 2, None]
+
+    def test_submit_keeps_best_only(self):
+        board = RankedBoard({1: 10, 2: 30})
+        assert board.submit(1, 40)
+        assert not board.submit(1, 35)
+        assert not board.submit(3, 0)
+        assert board.top(3) == [(1, 40), (2, 30)]
+        assert len(board) == 2
+
+    def test_ties_ordered_by_user_id(self):
+        board = RankedBoard({5: 10, 2: 10, 9: 12})
+        assert [board.rank(u) for u in (9, 2, 5)] == [1, 2, 3]
+
+
+class TestLeaderboardCache:
+
+    def test_loads_from_daily_bests_and_updates_incrementally(self, db):
+        cache = LeaderboardCache()
+        assert _end_session(db, cache, 1, 10) == 10
+        _end_session(db, cache, 2, 25)
+        assert cache.rank(db, "daily", "pushup", 1) == 2
+
+        # Loaded board is updated in place, personal best only ever rises
+        assert _end_session(db, cache, 1, 30) == 30
+        assert _end_session(db, cache, 1, 5) == 30
+        assert cache.top(db, "daily", "pushup", 3) == [(1, 30), (2, 25)]
+        assert cache.rank(db, "daily", "pushup", 3) is None
+        assert db.query(ChallengeRecord).filter_by(user_id=1).one().best_score == 30
+        assert db.query(ChallengeDailyBest).count() == 2
+
+        # A fresh cache (e.g. after restart) loads the same board from the table
+        assert LeaderboardCache().top(db, "daily", "pushup", 3) == [(1, 30), (2, 25)]
+
+    def test_weekly_board_and_zero_scores(self, db):
+        cache = LeaderboardCache()
+        today = date.today()
+        monday = today - timedelta(days=today.weekday())
+        earlier = datetime.combine(monday, datetime.min.time()) + timedelta(hours=1)
+        _end_session(db, cache, 1, 40, created_at=earlier)
+        _end_session(db, cache, 2, 20)
+        _end_session(db, cache, 3, 0)
+
+        assert cache.top(db, "weekly", "pushup", 5) == [(1, 40), (2, 20)]
+        if monday != today:
+            assert cache.top(db, "daily", "pushup", 5) == [(2, 20)]
+
+    def test_daily_best_row_inserted_meanwhile(self, db):
+        # Another session of the same user ended (and committed) first
+        db.add(ChallengeDailyBest(day=date.today(), challenge_type="pushup", user_id=1, best_score=20))
+        db.commit()
+        cache = LeaderboardCache()
+        _end_session(db, cache, 1, 15)
+        assert db.query(ChallengeDailyBest).one().best_score == 20
+        _end_session(db, cache, 1, 35)
+        assert db.query(ChallengeDailyBest).one().best_score == 35
+
+    def test_board_loads_outside_the_cache_lock(self):
+        release = threading.Event()
+        loading = threading.Event()
+
+        class _SlowCache(LeaderboardCache):
+            def _load(self, db, since, challenge_type):
+                if challenge_type == "pushup":
+                    loading.set()
+                    release.wait(5)
+                    return {1: 10}
+                return {2: 5}
+
+        cache = _SlowCache()
+        loaded = []
+        loader = threading.Thread(target=lambda: loaded.append(cache.top(None, "daily", "pushup", 3)))
+        loader.start()
+        assert loading.wait(5)
+        # Other boards stay readable; a score committed mid-load isn't lost
+        assert cache.top(None, "daily", "squat", 3) == [(2, 5)]
+        cache.submit(date.today(), "pushup", 3, 40)
+        release.set()
+        loader.join(5)
+        assert loaded == [[(3, 40), (1, 10)]]
+        assert cache.top(None, "daily", "pushup", 3) == [(3, 40), (1, 10)]
+
+    def test_day_rollover_drops_boards(self, db, monkeypatch):
+        cache = LeaderboardCache()
+        _end_session(db, cache, 1, 10)
+        assert cache.rank(db, "daily", "pushup", 1) == 1
+
+        import api.features.challenges.services.leaderboard as leaderboard
+
+        class _Tomorrow(date):
+            @classmethod
+            def today(cls):
+                return date.fromordinal(date.today().toordinal() + 1)
+
+        monkeypatch.setattr(leaderboard, "date", _Tomorrow)
+        assert cache.rank(db, "daily", "pushup", 1) is None
@@ -0,0 +1,109 @@
+"""
+Tests for offline replay of stored pose timelines (api/features/challenges/services/replay.py).
+"""
+
+import json
+import math
+import sys
+import os
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import numpy as np
+
+from api.core.streaming.pose_geometry import (
+    NOSE, L_SHOULDER, R_SHOULDER, L_HIP, R_HIP, L_KNEE, R_KNEE, L_ANKLE, R_ANKLE,
+)
+from api.core.streaming.pose_timeline import PoseTimelineWriter
+from api.features.challenges.services.replay import (
+    BASELINE, ReplaySource, replay_sessions, replay_timeline, sources_from_paths, summarize,
+    timeline_geometry,
+)
+from api.features.challenges.services.squat_analyzer import SquatAnalyzer
+
+
+def _squat_pose(knee_angle):
+    """``[[nx, ny, vis], ...]`` for a squatter seen half from the side."""
+    lm = np.full((33, 3), 0.5, np.float32)
+    lm[:, 2] = 1.0
+    a = math.radians(knee_angle)
+    for knee, hip, ankle, shoulder, x in (
+        (L_KNEE, L_HIP, L_ANKLE, L_SHOULDER, 0.42),
+        (R_KNEE, R_HIP, R_ANKLE, R_SHOULDER, 0.58),
+    ):
+        hip_xy = (x - 0.2 * math.sin(a), 0.7 + 0.2 * math.cos(a))
+        lm[knee, :2] = (x, 0.7)
+        lm[ankle, :2] = (x, 0.9)
+        lm[hip, :2] = hip_xy
+        lm[shoulder, :2] = (hip_xy[0], hip_xy[1] - 0.3)
+    lm[NOSE, :2] = (lm[L_SHOULDER, 0] + 0.08, lm[L_SHOULDER, 1] - 0.1)
+    return lm
+
+
+def _squat_frames(depths, fps=10):
+    """Stand, then one squat per entry in ``depths`` (knee angle at the bottom)."""
+    frames, t = [], 0.0
+    for angle in [170] * 10 + [a for d in depths for a in [d] * 5 + [170] * 5]:
+        frames.append({"t": round(t, 2), "lm": _squat_pose(angle).tolist()})
+        t += 1 / fps
+    return frames
+
+
+def _write_ptl(path, frames):
+    writer = PoseTimelineWriter(path=str(path), chunk_frames=16)
+    for f in frames:
+        writer.append(f["t"], np.asarray(f["lm"], np.float32))
+    return writer.finish()
+
+
+class TestReplay:
+
+    def test_replay_analyzer_has_no_detector(self):
+        analyzer = SquatAnalyzer(challenge_type="squat_full", replay=True)
+        assert analyzer.detector is None
+        analyzer.close()
+
+    def test_replay_counts_reps_with_real_analyzer(self):
+        frames = _squat_frames([80, 80, 95, 120])
+        assert replay_timeline("squat_full", frames)["reps"] == 3
+        strict = replay_timeline("squat_full", frames, {"down_angle": 90})
+        assert strict["reps"] == 2
+
+    def test_precomputed_geometry_gives_the_same_report(self):
+        frames = _squat_frames([80, 95, 120])
+        frames.insert(12, {"t": 1.15, "lm": None})  # no player
+        geometries = timeline_geometry(frames)
+        assert geometries[12] is None
+        for config in (None, {"down_angle": 90}):
+            assert (replay_timeline("squat_full", frames, config, geometries)
+                    == replay_timeline("squat_full", frames, config))
+
+    def test_replay_sessions_reports_deltas(self, tmp_path):
+        sources = []
+        for i, depths in enumerate(([80, 95], [80, 80], [95, 95, 95])):
+            result = _write_ptl(tmp_path / f"{i}.ptl", _squat_frames(depths))
+            sources.append(ReplaySource(path=result.path, challenge_type="squat_full"))
+
+        results = replay_sessions(sources, {"deep": {"squat_full": {"down_angle": 90}}}, workers=1)
+        assert len(results) == 6 and not any(r.error for r in results)
+
+        summary = summarize(results)
+        assert summary[BASELINE].changed == 0
+        deep = summary["deep"]
+        assert (deep.sessions, deep.changed, deep.total_delta) == (3, 2, -4)
+        assert deep.biggest[0]["delta"] == -3
+
+    def test_json_exports_and_load_errors(self, tmp_path):
+        export = tmp_path / "exports" / "session_7.json"
+        export.parent.mkdir()
+        export.write_text(json.dumps({
+            "session_id": 7, "challenge_type": "squat_full", "score": 2,
+            "frame_timeline": _squat_frames([80, 80]),
+        }))
+        (tmp_path / "exports" / "broken.ptl").write_bytes(b"x" * 32)
+
+        sources = sources_from_paths([str(export.parent)])
+        results = replay_sessions(sources, workers=1)
+        good = [r for r in results if r.error is None]
+        assert [(r.source, r.score, r.recorded_score) for r in good] == [("session 7", 2, 2)]
+        assert any(r.error and r.error.startswith("load failed") for r in results)
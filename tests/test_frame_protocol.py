@@ -0,0 +1,103 @@
+"""
+Tests for the live-stream frame wire format (JSON/base64 and binary_v1).
+"""
+
+import base64
+import json
+import sys
+import os
+import pytest
+
+# Add project root to path so we can import the protocol module
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from api.core.streaming.frame_protocol import (
+    FRAME_FORMAT_BINARY,
+    FRAME_FORMAT_JSON,
+    HEADER_SIZE,
+    MSG_AUDIO,
+    FrameProtocolError,
+    decode_binary_frame,
+    encode_binary_frame,
+    hello_response,
+    parse_client_message,
+)
+from tools.replay.protocols import make_binary_frame_message
+
+JPEG = b"\xff\xd8\xff\xe0" + bytes(range(256)) * 4 + b"\xff\xd9"
+
+
+class TestBinaryFrame:
+
+    def test_round_trip(self):
+        msg = encode_binary_frame(JPEG, 12.5, seq=7, width=1280, height=720)
+        assert len(msg) == HEADER_SIZE + len(JPEG)
+        frame = decode_binary_frame(msg)
+        assert frame.data == JPEG
+        assert frame.timestamp == 12.5
+        assert (frame.seq, frame.width, frame.height) == (7, 1280, 720)
+        assert frame.ref_time is None
+        assert frame.frame_format == FRAME_FORMAT_BINARY
+
+    def test_ref_time_carried(self):
+        frame = decode_binary_frame(encode_binary_frame(JPEG, 1.0, ref_time=3.25))
+        assert frame.ref_time == 3.25
+
+    def test_replay_encoder_matches_server(self):
+        msg = make_binary_frame_message(JPEG, 2.0, 640, 480, 3)
+        assert msg == encode_binary_frame(JPEG, 2.0, seq=3, width=640, height=480)
+
+    def test_short_message_rejected(self):
+        with pytest.raises(FrameProtocolError):
+            decode_binary_frame(b"\x01\x01")
+
+    def test_bad_version_rejected(self):
+        msg = bytearray(encode_binary_frame(JPEG, 0.0))
+        msg[0] = 99
+        with pytest.raises(FrameProtocolError):
+            decode_binary_frame(bytes(msg))
+
+
+class TestParseClientMessage:
+
+    def test_json_frame(self):
+        raw = json.dumps({"type": "frame", "data": base64.b64encode(JPEG).decode(), "timestamp": 4.0})
+        message = parse_client_message(raw)
+        assert message["type"] == "frame"
+        assert message["frame"].data == JPEG
+        assert message["frame"].timestamp == 4.0
+        assert message["frame"].frame_format == FRAME_FORMAT_JSON
+
+    def test_json_frame_without_data_has_no_frame(self):
+        message = parse_client_message(json.dumps({"type": "frame", "data": ""}))
+        assert message["type"] == "frame"
+        assert "frame" not in message
+
+    def test_binary_frame(self):
+        message = parse_client_message(encode_binary_frame(JPEG, 1.5, seq=2))
+        assert message["type"] == "frame"
+        assert message["frame"].data == JPEG
+
+    def test_binary_audio(self):
+        message = parse_client_message(encode_binary_frame(b"\x00\x01", 0.0, msg_type=MSG_AUDIO))
+        assert message["type"] == "audio"
+        assert message["frame"].data == b"\x00\x01"
+
+    def test_plain_ping_and_garbage(self):
+        assert parse_client_message("ping") == {"type": "ping"}
+        assert parse_client_message("not json") is None
+        assert parse_client_message(b"\x00") is None
+
+    def test_control_messages_pass_through(self):
+        assert parse_client_message('{"type": "end_stream"}') == {"type": "end_stream"}
+
+
+class TestNegotiation:
+
+    def test_binary_offered(self):
+        reply = hello_response({"type": "hello", "frame_formats": ["binary_v1", "json"]})
+        assert reply["frame_format"] == FRAME_FORMAT_BINARY
+
+    def test_unknown_formats_fall_back_to_json(self):
+        assert hello_response({"type": "hello", "frame_formats": ["h264"]})["frame_format"] == FRAME_FORMAT_JSON
+        assert hello_response({"type": "hello"})["frame_format"] == FRAME_FORMAT_JSON
@@ -0,0 +1,95 @@
+"""
+Tests for the advanced-mode FrameStore (batched reads, reopen, disk cap).
+"""
+
+import sys
+import os
+import pytest
+
+# Add project root to path so we can import the store
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import cv2
+import numpy as np
+
+from api.services.stream_service import FrameStore, FrameStoreFull
+
+
+def _jpeg(value: int) -> bytes:
+    ok, buf = cv2.imencode(".jpg", np.full((24, 32, 3), value, np.uint8))
+    return buf.tobytes()
+
+
+JPEGS = [_jpeg(v) for v in range(0, 250, 25)]
+
+
+@pytest.fixture
+def store(tmp_path):
+    s = FrameStore(str(tmp_path / "frames.bin"))
+    for j in JPEGS:
+        s.append(j)
+    yield s
+    s.release()
+
+
+class TestReads:
+
+    def test_read_bytes_round_trip(self, store):
+        assert store.count() == len(JPEGS)
+        assert [store.read_bytes(i) for i in range(store.count())] == JPEGS
+        assert store.read_bytes(len(JPEGS)) is None
+
+    @pytest.mark.parametrize("workers", [0, 3])
+    def test_read_range_matches_read_frame(self, tmp_path, workers):
+        s = FrameStore(str(tmp_path / "frames.bin"), decode_workers=workers)
+        for j in JPEGS:
+            s.append(j)
+        batch = s.read_range(2, 5)
+        assert len(batch) == 5
+        for i, frame in enumerate(batch, start=2):
+            assert np.array_equal(frame, s.read_frame(i))
+        # Clamped at the end of the store, empty past it
+        assert len(s.read_range(8, 10)) == 2
+        assert s.read_range(50, 3) == []
+        s.release()
+
+
+class TestReopen:
+
+    def test_reopen_after_close(self, store, tmp_path):
+        store.close()
+        reopened = FrameStore.open(str(tmp_path / "frames.bin"))
+        assert reopened.count() == len(JPEGS)
+        assert reopened.read_bytes(9) == JPEGS[9]
+        with pytest.raises(ValueError):
+            reopened.append(JPEGS[0])
+        reopened.release()
+
+    def test_recovers_unindexed_frames_and_torn_tail(self, tmp_path):
+        path = str(tmp_path / "frames.bin")
+        s = FrameStore(path)
+        for _ in range(FrameStore.INDEX_FLUSH_EVERY + 3):
+            s.append(JPEGS[1])
+        # Simulate a crash: no index flush for the last frames, half-written tail
+        os.write(s._write_fd, (10_000).to_bytes(4, "big") + b"partial")
+        s._index_file.flush()
+
+        reopened = FrameStore.open(path)
+        assert reopened.count() == FrameStore.INDEX_FLUSH_EVERY + 3
+        assert reopened.read_bytes(reopened.count() - 1) == JPEGS[1]
+        reopened.release()
+        s.release()
+
+
+class TestDiskCap:
+
+    def test_append_beyond_max_bytes_is_rejected(self, tmp_path):
+        cap = sum(len(j) + 4 for j in JPEGS[:3])
+        s = FrameStore(str(tmp_path / "frames.bin"), max_bytes=cap)
+        for j in JPEGS[:3]:
+            s.append(j)
+        with pytest.raises(FrameStoreFull):
+            s.append(JPEGS[3])
+        assert s.stats()["rejected"] == 1
+        assert s.stats()["bytes"] == cap
+        s.release()
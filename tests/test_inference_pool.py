@@ -0,0 +1,87 @@
+"""
+Tests for the per-feature live inference pools.
+"""
+
+import asyncio
+import threading
+import sys
+import os
+import pytest
+
+# Add project root to path so we can import the pool module
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from api.core.streaming.inference_pool import InferencePool, InferencePoolFull, SessionNotAdmitted
+
+
+@pytest.fixture
+def pool():
+    p = InferencePool("test", workers=2, max_sessions_per_worker=2)
+    yield p
+    p.shutdown()
+
+
+class TestAdmission:
+
+    def test_spreads_sessions_across_workers(self, pool):
+        assert {pool.admit(1), pool.admit(2)} == {0, 1}
+
+    def test_readmit_keeps_worker(self, pool):
+        idx = pool.admit(1)
+        pool.admit(2)
+        assert pool.admit(1) == idx
+
+    def test_full_pool_rejects(self, pool):
+        for sid in range(pool.capacity):
+            pool.admit(sid)
+        with pytest.raises(InferencePoolFull):
+            pool.admit(99)
+
+    def test_release_frees_slot(self, pool):
+        for sid in range(pool.capacity):
+            pool.admit(sid)
+        pool.release(0)
+        pool.release(12345)  # unknown session is a no-op
+        pool.admit(99)
+        assert sum(w["sessions"] for w in pool.stats()) == pool.capacity
+
+
+class TestRun:
+
+    def test_session_always_runs_on_same_thread(self, pool):
+        async def go():
+            pool.admit(1)
+            pool.admit(2)
+            a = {await pool.run(1, threading.get_ident) for _ in range(5)}
+            b = {await pool.run(2, threading.get_ident) for _ in range(5)}
+            return a, b
+
+        a, b = asyncio.run(go())
+        assert len(a) == 1 and len(b) == 1
+        assert a != b
+
+    def test_run_propagates_errors(self, pool):
+        def boom():
+            raise ValueError("bad frame")
+
+        async def go():
+            pool.admit(7)
+            assert await pool.run(7, lambda x: x * 2, 21) == 42
+            with pytest.raises(ValueError):
+                await pool.run(7, boom)
+
+        asyncio.run(go())
+        assert pool.stats()[0]["pending"] == 0
+
+    def test_run_rejects_released_sessions(self, pool):
+        async def go():
+            with pytest.raises(SessionNotAdmitted):
+                await pool.run(8, lambda: None)
+            pool.admit(8)
+            await pool.run(8, lambda: None)
+            pool.release(8)
+            with pytest.raises(SessionNotAdmitted):
+                await pool.run(8, lambda: None)
+
+        asyncio.run(go())
+        assert sum(w["sessions"] for w in pool.stats()) == 0
@@ -0,0 +1,100 @@
+"""
+Tests for array-backed landmarks and the geometry kernel
+(api/core/streaming/pose_geometry.py).
+"""
+
+import math
+import sys
+import os
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import numpy as np
+
+from api.core.streaming.pose_detector import PoseDetector, PoseResult
+from api.core.streaming.pose_geometry import (
+    JOINTS, L_HIP, R_HIP, L_SHOULDER, R_SHOULDER, NX, NY, VIS,
+    landmark_array, landmarks_to_dicts, pose_geometry, pose_geometry_batch,
+)
+
+
+def _random_landmarks(seed: int) -> np.ndarray:
+    return np.random.default_rng(seed).random((33, 4)).astype(np.float32)
+
+
+class TestPoseGeometry:
+
+    @pytest.mark.parametrize("seed", range(5))
+    def test_angles_match_angle_between(self, seed):
+        array = _random_landmarks(seed)
+        geo = pose_geometry(array)
+        xy = array[:, :2].astype(np.float64)
+        for name, (a, b, c) in JOINTS.items():
+            expected = PoseDetector.angle_between(tuple(xy[a]), tuple(xy[b]), tuple(xy[c]))
+            assert geo.angles[name] == pytest.approx(expected, abs=1e-9)
+
+    def test_zero_length_limb_gives_zero_angle(self):
+        array = np.zeros((33, 4), np.float32)
+        geo = pose_geometry(array)
+        assert all(value == 0.0 for value in geo.angles.values())
+        assert geo.lean_angle == 0
+
+    def test_midpoints_spreads_and_lean(self):
+        array = np.zeros((33, 4), np.float64)
+        array[L_SHOULDER, :2] = (0.4, 0.2)
+        array[R_SHOULDER, :2] = (0.6, 0.2)
+        array[L_HIP, :2] = (0.3, 0.5)
+        array[R_HIP, :2] = (0.5, 0.5)
+        geo = pose_geometry(array)
+        assert geo.shoulder == pytest.approx((0.5, 0.2))
+        assert geo.hip == pytest.approx((0.4, 0.5))
+        assert geo.shoulder_x_gap == pytest.approx(0.2)
+        assert geo.lean_angle == pytest.approx(math.degrees(math.atan2(0.1, 0.3)))
+        # Plain floats, so results stay JSON-serialisable
+        assert type(geo.y_spread) is float
+        assert type(geo.angles["l_knee"]) is float
+
+    def test_dict_landmarks_match_array(self):
+        array = _random_landmarks(7).astype(np.float64)
+        dicts = [{"nx": x, "ny": y, "visibility": v} for x, y, _, v in array.tolist()]
+        assert np.array_equal(landmark_array(dicts)[:, (NX, NY, VIS)], array[:, (NX, NY, VIS)])
+        assert pose_geometry(dicts).angles == pose_geometry(array).angles
+
+    def test_batch_matches_single_frames(self):
+        arrays = np.stack([_random_landmarks(seed) for seed in range(6)])
+        arrays[2] = 0  # zero-length limbs, level shoulders
+        for batched, array in zip(pose_geometry_batch(arrays), arrays):
+            single = pose_geometry(array)
+            assert batched.angles == pytest.approx(single.angles, abs=1e-9)
+            for name in ("shoulder", "hip", "knee", "ankle", "wrist"):
+                assert getattr(batched, name) == pytest.approx(getattr(single, name))
+            assert batched.knee_x_gap == pytest.approx(single.knee_x_gap)
+            assert batched.lean_angle == pytest.approx(single.lean_angle)
+            assert batched.y_spread == pytest.approx(single.y_spread)
+            assert (batched.nx, batched.visibility) == (single.nx, single.visibility)
+        assert pose_geometry(batched) is batched
+        assert pose_geometry_batch(np.zeros((0, 33, 4))) == []
+
+
+class TestPoseResult:
+
+    def test_landmark_list_built_lazily_from_array(self):
+        array = _random_landmarks(3)
+        result = PoseResult(player_detected=True, frame_width=640, frame_height=480, array=array)
+        assert result._landmark_list is None
+        lm = result.landmark_list
+        assert result.landmark_list is lm
+        assert len(lm) == 33
+        assert lm[5]["x"] == int(float(array[5, NX]) * 640)
+        assert lm[5]["y"] == int(float(array[5, NY]) * 480)
+        assert lm[5]["nx"] == float(array[5, NX])
+        assert lm[5]["visibility"] == float(array[5, VIS])
+
+    def test_no_pose_has_no_landmarks(self):
+        assert PoseResult(frame_width=10, frame_height=10).landmark_list is None
+
+    def test_landmarks_to_dicts_keys(self):
+        lm = landmarks_to_dicts(np.full((2, 4), 0.5, np.float32), 100, 50)
+        assert lm[0] == {"x": 50, "y": 25, "visibility": 0.5, "nx": 0.5, "ny": 0.5}
@@ -0,0 +1,195 @@
+"""
+Tests for the shared pose detector pool (api/core/streaming/pose_pool.py).
+"""
+
+import sys
+import os
+import threading
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import cv2
+import numpy as np
+
+from api.core.streaming import pose_pool
+from api.core.streaming.pose_pool import PoseDetectorPool, PoseDetectorPoolExhausted
+
+
+class _FakeDetector:
+    """Stands in for PoseDetector so the pool logic runs without MediaPipe."""
+
+    def __init__(self, model_complexity=1, min_detection_confidence=0.5, min_tracking_confidence=0.4,
+                 **options):
+        self.config = (model_complexity, min_detection_confidence, min_tracking_confidence)
+        self.resets = 0
+        self.closed = False
+
+    def reset(self):
+        self.resets += 1
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def fake_detectors(monkeypatch):
+    monkeypatch.setattr(pose_pool, "PoseDetector", _FakeDetector)
+
+
+class TestPoseDetectorPool:
+
+    def test_checkin_resets_and_reuses(self, fake_detectors):
+        pool = PoseDetectorPool(max_detectors=4)
+        first = pool.checkout()
+        pool.checkin(first)
+        assert first.resets == 1
+        assert pool.checkout() is first
+        assert pool.stats()["created"] == 1
+
+    def test_configurations_are_not_mixed(self, fake_detectors):
+        pool = PoseDetectorPool(max_detectors=4)
+        lite = pool.checkout(model_complexity=0)
+        pool.checkin(lite)
+        full = pool.checkout(model_complexity=1)
+        assert full is not lite
+        assert full.config[0] == 1
+
+    def test_idle_detector_of_other_config_is_evicted_at_limit(self, fake_detectors):
+        pool = PoseDetectorPool(max_detectors=1)
+        lite = pool.checkout(model_complexity=0)
+        pool.checkin(lite)
+        full = pool.checkout(model_complexity=1, timeout=0)
+        assert lite.closed
+        assert full.config[0] == 1
+
+    def test_exhausted_after_timeout(self, fake_detectors):
+        pool = PoseDetectorPool(max_detectors=1)
+        pool.checkout()
+        with pytest.raises(PoseDetectorPoolExhausted):
+            pool.checkout(timeout=0.05)
+        assert pool.stats()["exhausted"] == 1
+
+    def test_waiter_gets_checked_in_detector(self, fake_detectors):
+        pool = PoseDetectorPool(max_detectors=1)
+        held = pool.checkout()
+        got = []
+        waiter = threading.Thread(target=lambda: got.append(pool.checkout(timeout=5)))
+        waiter.start()
+        pool.checkin(held)
+        waiter.join(5)
+        assert got == [held]
+
+    def test_warm_and_shutdown(self, fake_detectors):
+        pool = PoseDetectorPool(max_detectors=3)
+        assert pool.warm(5) == 3
+        assert pool.stats()["idle"] == 3
+        in_use = pool.checkout()
+        pool.shutdown()
+        assert pool.stats()["idle"] == 0
+        # Checked-out detectors are closed when they come back
+        pool.checkin(in_use)
+        assert in_use.closed
+
+    def test_collected_owner_returns_detector(self, fake_detectors):
+        class Owner:
+            pass
+
+        pool = PoseDetectorPool(max_detectors=1)
+        owner = Owner()
+        detector = pool.checkout(owner=owner)
+        del owner
+        assert pool.stats()["in_use"] == 0
+        assert pool.checkout(timeout=0) is detector
+
+    def test_unknown_detector_is_not_pooled(self, fake_detectors):
+        pool = PoseDetectorPool(max_detectors=2)
+        stranger = _FakeDetector()
+        pool.checkin(stranger)
+        assert pool.stats()["idle"] == 0
+
+
+    def test_evicted_detector_is_closed_outside_the_lock(self, fake_detectors):
+        pool = PoseDetectorPool(max_detectors=1)
+        lite = pool.checkout(model_complexity=0)
+        pool.checkin(lite)
+        lock_free = []
+
+        def close():
+            # Another thread can use the pool while the evicted graph closes
+            probe = threading.Thread(target=pool.stats)
+            probe.start()
+            probe.join(2)
+            lock_free.append(not probe.is_alive())
+
+        lite.close = close
+        pool.checkout(model_complexity=1, timeout=0)
+        assert lock_free == [True]
+
+    def test_offline_jobs_have_their_own_budget(self, fake_detectors):
+        pose_pool.shutdown_pose_detector_pool()
+        try:
+            live = pose_pool.get_pose_detector_pool()
+            offline = pose_pool.get_offline_pose_detector_pool()
+            assert offline is not live
+            held = [offline.checkout(timeout=0) for _ in range(offline.max_detectors)]
+            with pytest.raises(PoseDetectorPoolExhausted):
+                offline.checkout(timeout=0)
+            assert live.checkout(timeout=0) is not None
+            for detector in held:
+                offline.checkin(detector)
+        finally:
+            pose_pool.shutdown_pose_detector_pool()
+
+    def test_live_pool_sized_to_inference_admission(self, fake_detectors):
+        from api.config import get_settings
+        from api.core.streaming.inference_pool import InferencePool
+
+        settings = get_settings()
+        admitted = sum(
+            InferencePool(feature, getattr(settings, f"inference_workers_{feature}"),
+                          settings.inference_max_sessions_per_worker).capacity
+            for feature in ("challenge", "mimic")
+        )
+        pose_pool.shutdown_pose_detector_pool()
+        try:
+            assert pose_pool.get_pose_detector_pool().max_detectors == admitted
+        finally:
+            pose_pool.shutdown_pose_detector_pool()
+
+    def test_full_live_pool_fails_session_start_at_once(self, fake_detectors):
+        from api.features.challenges.services.squat_analyzer import SquatAnalyzer
+
+        pose_pool.shutdown_pose_detector_pool()
+        try:
+            live = pose_pool.get_pose_detector_pool()
+            held = [live.checkout() for _ in range(live.max_detectors)]
+            start = time.monotonic()
+            # The start endpoints answer this with a 503
+            with pytest.raises(PoseDetectorPoolExhausted):
+                SquatAnalyzer(challenge_type="squat_full")
+            assert time.monotonic() - start < 1.0
+            for detector in held:
+                live.checkin(detector)
+        finally:
+            pose_pool.shutdown_pose_detector_pool()
+
+class TestAnalyzerBorrowsDetector:
+
+    def test_close_returns_detector_to_pool(self):
+        from api.features.challenges.services.squat_analyzer import SquatAnalyzer
+
+        pool = pose_pool.get_pose_detector_pool()
+        first = SquatAnalyzer(challenge_type="squat_full")
+        detector = first.detector
+        first.process_frame(cv2.imencode(".jpg", np.zeros((120, 160, 3), np.uint8))[1].tobytes(), 0.0)
+        first.close()
+        first.close()  # idempotent
+
+        second = SquatAnalyzer(challenge_type="squat_full")
+        assert second.detector is detector
+        assert pool.stats()["in_use"] >= 1
+        second.close()
+
@@ -0,0 +1,123 @@
+"""
+Tests for ROI-tracked pose detection (api/core/streaming/pose_detector.py).
+
+MediaPipe is replaced by a stub that "detects" the white rectangle in the
+image it is given, so crop placement and the mapping back to full-frame
+coordinates can be checked exactly.
+"""
+
+import sys
+import os
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import numpy as np
+
+from api.core.streaming.pose_detector import PoseDetector
+from api.core.streaming.pose_geometry import NX, NY
+
+
+class _RectanglePose:
+    """Landmarks at the corners of the white rectangle in the RGB image."""
+
+    def __init__(self):
+        self.shapes = []
+        self.resets = 0
+
+    def process(self, image):
+        self.shapes.append(image.shape[:2])
+        h, w = image.shape[:2]
+        ys, xs = np.nonzero(image[:, :, 0] > 127)
+        if len(xs) == 0:
+            return SimpleNamespace(pose_landmarks=None)
+        corners = [(xs.min(), ys.min()), (xs.max() + 1, ys.max() + 1)]
+        points = [corners[i % 2] for i in range(33)]
+        landmarks = [
+            SimpleNamespace(x=x / w, y=y / h, z=0.0, visibility=0.9) for x, y in points
+        ]
+        return SimpleNamespace(pose_landmarks=SimpleNamespace(landmark=landmarks))
+
+    def reset(self):
+        self.resets += 1
+
+    def close(self):
+        pass
+
+
+def _frame(x0, y0, x1, y1, size=(720, 1280)):
+    frame = np.zeros(size + (3,), np.uint8)
+    frame[y0:y1, x0:x1] = 255
+    return frame
+
+
+@pytest.fixture
+def detector():
+    det = PoseDetector(roi_tracking=True, roi_margin=0.3, target_width=0)
+    det.pose.close()
+    det.pose = _RectanglePose()
+    return det
+
+
+class TestRoiTracking:
+
+    def test_second_frame_uses_crop_and_maps_back(self, detector):
+        detector.detect(_frame(500, 200, 700, 600))
+        assert detector.pose.shapes[0] == (720, 1280)
+        assert detector._roi is not None
+
+        result = detector.detect(_frame(510, 210, 710, 610))
+        crop_h, crop_w = detector.pose.shapes[1]
+        assert crop_w < 1280 and crop_h < 720
+        assert result.array[0, NX] == pytest.approx(510 / 1280, abs=1e-6)
+        assert result.array[0, NY] == pytest.approx(210 / 720, abs=1e-6)
+        assert result.array[1, NX] == pytest.approx(710 / 1280, abs=1e-6)
+        assert result.landmark_list[1]["y"] in (609, 610)  # int() of a float32
+
+    def test_crop_stays_put_while_body_fits(self, detector):
+        detector.detect(_frame(500, 200, 700, 600))
+        roi = detector._roi
+        resets = detector.pose.resets
+        detector.detect(_frame(505, 205, 705, 605))
+        assert detector._roi == roi
+        assert detector.pose.resets == resets
+
+    def test_lost_in_crop_falls_back_to_full_frame(self, detector):
+        detector.detect(_frame(100, 100, 300, 400))
+        assert detector._roi is not None
+        # Person moved to the far side of the frame, outside the crop
+        result = detector.detect(_frame(1000, 300, 1200, 650))
+        assert result.player_detected
+        assert detector.pose.shapes[-1] == (720, 1280)
+        assert result.array[0, NX] == pytest.approx(1000 / 1280, abs=1e-6)
+        assert detector._roi[0] > 300
+
+    def test_downscale_keeps_normalised_coordinates(self, detector):
+        detector.roi_tracking = False
+        detector.target_width = 640
+        result = detector.detect(_frame(500, 200, 700, 600))
+        assert detector.pose.shapes[0] == (360, 640)
+        assert result.array[0, NX] == pytest.approx(500 / 1280, abs=1e-6)
+
+    def test_reset_clears_roi(self, detector):
+        detector.detect(_frame(500, 200, 700, 600))
+        detector.reset()
+        assert detector._roi is None
+
+    def test_small_recentre_keeps_tracking_state(self, detector):
+        detector.detect(_frame(500, 200, 700, 600))
+        roi = detector._roi
+        resets = detector.pose.resets
+        # Body reaches the crop's right edge: the crop moves a little
+        detector.detect(_frame(600, 200, 800, 600))
+        assert detector._roi != roi
+        assert detector.pose.resets == resets
+
+    def test_large_crop_jump_resets_graph(self, detector):
+        detector.detect(_frame(500, 200, 700, 600))
+        resets = detector.pose.resets
+        # Person steps towards the camera: the crop grows well past the threshold
+        detector.detect(_frame(450, 100, 800, 700))
+        assert detector.pose.resets == resets + 1
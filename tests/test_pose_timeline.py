@@ -0,0 +1,155 @@
+"""
+Tests for chunked pose timeline storage (api/core/streaming/pose_timeline.py).
+"""
+
+import sys
+import os
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import numpy as np
+
+from api.core.streaming.pose_timeline import PoseTimelineReader, PoseTimelineWriter
+from api.services.storage_service import LocalStorageBackend
+
+
+def _write(path, frames, chunk_frames=4):
+    writer = PoseTimelineWriter(path=str(path), chunk_frames=chunk_frames)
+    rng = np.random.default_rng(0)
+    landmarks = []
+    for i in range(frames):
+        lm = rng.random((33, 3)).astype(np.float32)
+        landmarks.append(lm)
+        writer.append(
+            i / 10, lm,
+            angle=None if i % 3 == 0 else 90.0 + i,
+            state="down" if i % 2 else True,
+            feedback="Good form" if i < 5 else "Go lower",
+            reps=i // 4,
+            hold=i * 0.25,
+        )
+    return writer.finish(), landmarks
+
+
+class TestPoseTimeline:
+
+    def test_round_trip_across_chunks(self, tmp_path):
+        result, landmarks = _write(tmp_path / "t.ptl", 10)
+        assert result.frame_count == 10
+        assert result.duration == pytest.approx(0.9)
+        assert result.size_bytes == os.path.getsize(result.path)
+
+        frames = PoseTimelineReader.from_path(result.path).read()
+        assert len(frames) == 10
+        assert frames[0]["angle"] is None
+        assert frames[0]["state"] is True
+        assert frames[7] == {
+            "t": 0.7,
+            "lm": frames[7]["lm"],
+            "angle": 97.0,
+            "state": "down",
+            "fb": "Go lower",
+            "reps": 1,
+            "hold": 1.8,
+        }
+        assert np.allclose(frames[7]["lm"], landmarks[7], atol=0.005)
+
+    def test_range_reads_only_needed_chunks(self, tmp_path):
+        result, _ = _write(tmp_path / "t.ptl", 10)
+        full = PoseTimelineReader.from_path(result.path).read()
+
+        reads = []
+        base = PoseTimelineReader.from_path(result.path)._read_range
+
+        def counting(offset, length):
+            reads.append(offset)
+            return base(offset, length)
+
+        reader = PoseTimelineReader(counting)
+        reads.clear()
+        assert reader.read(5, 7) == full[5:7]  # inside chunk 1 (frames 4-7)
+        assert len(reads) == 1
+        assert reader.read(3, 9) == full[3:9]
+        assert reader.read(8, 100) == full[8:]
+
+    def test_empty_writer_produces_no_file(self, tmp_path):
+        writer = PoseTimelineWriter(path=str(tmp_path / "t.ptl"), chunk_frames=4)
+        assert writer.finish() is None
+        assert not (tmp_path / "t.ptl").exists()
+
+    def test_discard_removes_partial_file(self):
+        writer = PoseTimelineWriter(chunk_frames=1)
+        writer.append(0.0, np.zeros((33, 3)))
+        assert os.path.exists(writer.path)
+        writer.discard()
+        assert not os.path.exists(writer.path)
+
+    def test_finished_writer_ignores_late_frames(self, tmp_path):
+        writer = PoseTimelineWriter(path=str(tmp_path / "t.ptl"), chunk_frames=1)
+        writer.append(0.0, np.zeros((33, 3)))
+        result = writer.finish()
+        size = os.path.getsize(result.path)
+        # A frame from the inference thread after session end, then close()
+        writer.append(0.1, np.ones((33, 3)))
+        writer.discard()
+        assert writer.finish() is None
+        assert os.path.getsize(result.path) == size
+        assert PoseTimelineReader.from_path(result.path).frame_count == 1
+
+    def test_read_from_storage_backend(self, tmp_path):
+        backend = LocalStorageBackend(tmp_path / "store")
+        result, _ = _write(tmp_path / "t.ptl", 6)
+        with open(result.path, "rb") as f:
+            backend.save("challenges/1/challenge_2/pose_timeline.ptl", f)
+        reader = PoseTimelineReader.from_storage(backend, "challenges/1/challenge_2/pose_timeline.ptl")
+        assert reader.frame_count == 6
+        assert reader.duration == pytest.approx(0.5)
+        assert [f["t"] for f in reader.read(4)] == [0.4, 0.5]
+
+    def test_not_a_timeline(self, tmp_path):
+        path = tmp_path / "junk.ptl"
+        path.write_bytes(b"x" * 64)
+        with pytest.raises(ValueError):
+            PoseTimelineReader.from_path(str(path))
+
+
+class TestLoadRange:
+
+    def test_local_backend_ranges(self, tmp_path):
+        backend = LocalStorageBackend(tmp_path)
+        backend.save("f.bin", bytes(range(10)))
+        assert backend.load_range("f.bin", 2, 3) == bytes([2, 3, 4])
+        assert backend.load_range("f.bin", 7) == bytes([7, 8, 9])
+        assert backend.load_range("f.bin", -2) == bytes([8, 9])
+        assert backend.load_range("f.bin", -4, 2) == bytes([6, 7])
+
+
+class TestFinishOnInferenceWorker:
+
+    def test_finish_runs_on_the_session_worker_while_admitted(self):
+        import asyncio
+        import threading
+
+        import anyio.to_thread
+
+        from api.core.streaming.inference_pool import get_inference_pool
+        from api.features.challenges.routers.challenges import _finish_pose_timeline
+
+        class _Analyzer:
+            def finish_pose_timeline(self):
+                return threading.current_thread().name
+
+        pool = get_inference_pool("challenge")
+
+        async def finish(session_id):
+            return await anyio.to_thread.run_sync(_finish_pose_timeline, session_id, _Analyzer())
+
+        pool.admit(9001)
+        try:
+            assert asyncio.run(finish(9001)).startswith("infer-challenge-")
+        finally:
+            pool.release(9001)
+        # WebSocket gone: finished right in the request thread
+        assert not asyncio.run(finish(9001)).startswith("infer-")
@@ -0,0 +1,182 @@
+"""
+Tests for the mimic reference timeline (api/features/mimic/services/reference_timeline.py).
+"""
+
+import random
+import sys
+import os
+import threading
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from api.features.mimic.services.pose_similarity import compute_all_similarities, generate_feedback
+from api.features.mimic.services.reference_timeline import ReferenceTimeline, ReferenceTimelineCache
+from benchmarks.mimic_reference import build_reference, linear_scan
+
+
+def _pose(rng):
+    return [[round(rng.random(), 4), round(rng.random(), 4), round(rng.random(), 3)] for _ in range(33)]
+
+
+class TestReferenceTimeline:
+
+    def test_matches_linear_scan(self):
+        rng = random.Random(3)
+        for irregular in (False, True):
+            raw = build_reference(0.2, 30, irregular)
+            reference = ReferenceTimeline.from_frames(raw)
+            times = [rng.uniform(-1, reference.times[-1] + 1) for _ in range(500)]
+            times += [e["t"] for e in raw] + [(a["t"] + b["t"]) / 2 for a, b in zip(raw, raw[1:])]
+            assert [reference.index_at(t) for t in times] == [linear_scan(raw, t) for t in times]
+
+    def test_ties_pick_earlier_frame(self):
+        reference = ReferenceTimeline.from_frames([{"t": 0.0}, {"t": 1.0}, {"t": 1.0}, {"t": 2.0}])
+        assert reference.index_at(0.5) == 0
+        assert reference.index_at(1.0) == 1
+        assert reference.index_at(1.5) == 1
+
+    def test_unsorted_and_empty(self):
+        pose = _pose(random.Random(0))
+        reference = ReferenceTimeline.from_frames([{"t": 2.0, "lm": pose}, {"t": 0.0}, {"t": 1.0, "lm": []}])
+        assert reference.times == [0.0, 1.0, 2.0]
+        assert reference.index_at(1.9) == 2
+        assert reference.landmarks(2) == pose
+        assert not reference.has_pose(0) and not reference.has_pose(1)
+        empty = ReferenceTimeline.from_frames([])
+        assert not empty
+        assert empty.index_at(1.0) is None
+        assert empty.cursor().seek(1.0) is None
+
+    def test_cursor_follows_playback_and_loops(self):
+        raw = build_reference(0.1, 30, irregular=True)
+        reference = ReferenceTimeline.from_frames(raw)
+        duration = reference.times[-1]
+        cursor = reference.cursor()
+        # Forward, a loop back to the start, then a jump far ahead
+        times = [(i / 30) % duration for i in range(int(duration * 45))] + [duration * 0.9]
+        assert [cursor.seek(t) for t in times] == [linear_scan(raw, t) for t in times]
+
+    def test_cursor_agrees_with_index_at_on_duplicate_times(self):
+        reference = ReferenceTimeline.from_frames(
+            [{"t": t} for t in (0.0, 0.5, 0.5, 1.0, 1.0, 1.0, 1.2, 2.0)]
+        )
+        times = [0.0, 0.5, 0.9, 1.0, 1.05, 1.1, 1.1, 1.15, 1.6, 1.6, 2.5]
+        cursor = reference.cursor()
+        assert [cursor.seek(t) for t in times] == [reference.index_at(t) for t in times]
+        # Seeked to a duplicate, then forward past the next frame
+        cursor = reference.cursor()
+        assert cursor.seek(0.5) == 1
+        assert cursor.seek(0.9) == 3
+
+    def test_views(self):
+        reference = ReferenceTimeline.from_frames([{"t": 0.0, "lm": [[0.1, 0.2, 0.9]] * 33}, {"t": 1.0}])
+        assert reference.landmark_dicts(0)[0] == {"nx": 0.1, "ny": 0.2, "visibility": 0.9}
+        assert len(reference.normalized_dicts(0)) == 33
+        assert reference.joint_angles(0)["L_knee"] == 0.0
+        assert reference.landmark_dicts(1) is None
+        assert reference.normalized_dicts(1) is None
+        assert reference.joint_angles(1) is None
+
+    def test_npz_round_trip(self):
+        raw = build_reference(0.05, 30, irregular=True)
+        raw[3]["lm"] = None
+        reference = ReferenceTimeline.from_frames(raw)
+        loaded = ReferenceTimeline.from_npz(reference.to_npz())
+        assert loaded.times == reference.times
+        assert not loaded.has_pose(3)
+        assert [loaded.landmarks(i) for i in range(len(loaded))] == [e["lm"] for e in raw]
+
+    def test_precomputed_matches_recomputed(self):
+        rng = random.Random(5)
+        raw = [{"t": i / 30, "lm": _pose(rng)} for i in range(20)]
+        reference = ReferenceTimeline.from_frames(raw)
+        for i in range(len(raw)):
+            user = [{"nx": p[0], "ny": p[1], "visibility": p[2]} for p in _pose(rng)]
+            ref = reference.landmark_dicts(i)
+            norm, angles = reference.normalized_dicts(i), reference.joint_angles(i)
+            expected = compute_all_similarities(user, ref)
+            actual = compute_all_similarities(user, ref, ref_norm=norm, ref_angles=angles)
+            assert actual == pytest.approx(expected, abs=0.15)
+            assert generate_feedback(user, ref, angles) == generate_feedback(user, ref)
+
+
+class TestReferenceTimelineCache:
+
+    def test_lru_eviction(self):
+        cache = ReferenceTimelineCache(max_entries=2)
+        loads = []
+
+        def loader(key):
+            def load():
+                loads.append(key)
+                return ReferenceTimeline.from_frames([{"t": 0.0}])
+            return load
+
+        a = cache.get((1, 1), loader((1, 1)))
+        cache.get((2, 1), loader((2, 1)))
+        assert cache.get((1, 1), loader((1, 1))) is a
+        cache.get((3, 1), loader((3, 1)))  # evicts (2, 1), the least recently used
+        cache.get((2, 1), loader((2, 1)))
+        assert loads == [(1, 1), (2, 1), (3, 1), (2, 1)]
+        assert (cache.hits, cache.misses) == (1, 4)
+
+        cache.invalidate(2)
+        cache.get((2, 1), loader((2, 1)))
+        assert loads[-1] == (2, 1) and len(loads) == 5
+
+    def test_concurrent_misses_load_once(self):
+        cache = ReferenceTimelineCache()
+        loads = []
+
+        def load():
+            loads.append(1)
+            time.sleep(0.05)
+            return ReferenceTimeline.from_frames([{"t": 0.0}])
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(cache.get((7, 0), load))) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert len(loads) == 1
+        assert all(r is results[0] for r in results)
+
+
+class _MemoryOutputs:
+    def __init__(self):
+        self.saved = {}
+
+    def save(self, key, data, content_type=None):
+        self.saved[key] = data
+        return key
+
+    def delete(self, key):
+        return self.saved.pop(key, None) is not None
+
+
+class TestReprocessing:
+
+    def test_previous_version_is_deleted(self, monkeypatch):
+        from types import SimpleNamespace
+        import api.services.storage_service as storage_service
+        from api.features.mimic.services.reference_processor import (
+            _delete_reference_timeline, _save_reference_timeline,
+        )
+
+        outputs = _MemoryOutputs()
+        monkeypatch.setattr(storage_service, "get_storage_service",
+                            lambda: SimpleNamespace(outputs=outputs))
+        challenge = SimpleNamespace(id=77, pose_timeline=None, pose_timeline_key=None,
+                                    pose_timeline_version=None)
+        raw = build_reference(0.05, 30, irregular=False)
+
+        assert _save_reference_timeline(challenge, raw) is None
+        first = challenge.pose_timeline_key
+        superseded = _save_reference_timeline(challenge, raw)
+        assert superseded == first != challenge.pose_timeline_key
+        _delete_reference_timeline(superseded)
+        assert list(outputs.saved) == [challenge.pose_timeline_key]
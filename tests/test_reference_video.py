@@ -0,0 +1,96 @@
+"""
+Tests for sequential reference-video reading (api/features/mimic/services/reference_video.py).
+"""
+
+import sys
+import os
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import cv2
+import numpy as np
+
+from api.features.mimic.services.reference_video import ReferenceFrameReader
+
+FPS = 30
+FRAMES = 150
+
+
+@pytest.fixture(scope="module")
+def reference_video(tmp_path_factory):
+    # MJPG is intra-only, so a seek lands on exactly the requested frame
+    path = str(tmp_path_factory.mktemp("ref") / "ref.avi")
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), FPS, (64, 48))
+    if not writer.isOpened():
+        pytest.skip("MJPG writer not available")
+    for i in range(FRAMES):
+        writer.write(_numbered_frame(i))
+    writer.release()
+    return path
+
+
+def _numbered_frame(i: int):
+    """Frame number as 8 black/white stripes (bit 0 leftmost), robust to JPEG."""
+    frame = np.zeros((48, 64, 3), np.uint8)
+    for bit in range(8):
+        if i >> bit & 1:
+            frame[:, bit * 8:(bit + 1) * 8] = 255
+    return frame
+
+
+def _frame_number(panel) -> int:
+    stripes = panel.mean(axis=(0, 2)).reshape(8, -1).mean(axis=1)
+    return sum(1 << bit for bit, level in enumerate(stripes) if level > 128)
+
+
+def _seek_read(path, times):
+    """The per-frame seek the comparator used before ``ReferenceFrameReader``."""
+    cap = cv2.VideoCapture(path)
+    picks, last = [], None
+    for t in times:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, int(t * FPS))
+        ok, frame = cap.read()
+        if ok:
+            last = frame
+        picks.append(_frame_number(last) if last is not None else None)
+    cap.release()
+    return picks
+
+
+class TestReferenceFrameReader:
+
+    def test_matches_seeking_with_few_seeks(self, reference_video):
+        # User video at 60 fps with an audio offset, running past the end (clamped)
+        duration = FRAMES / FPS
+        times = [min(i / 60 + 0.4, duration) for i in range(int(duration * 60))]
+        reader = ReferenceFrameReader(reference_video, 48)
+        picks = [_frame_number(reader.panel_at(t)) for t in times]
+        reader.release()
+
+        assert picks == _seek_read(reference_video, times)
+        assert reader.seeks == 0
+        assert reader.decoded == FRAMES - int(0.4 * FPS)
+
+    def test_jumps_seek(self, reference_video):
+        reader = ReferenceFrameReader(reference_video, 48)
+        times = [0.0, 0.1, 4.0, 1.0, 1.1]
+        assert [_frame_number(reader.panel_at(t)) for t in times] == [0, 3, 120, 30, 33]
+        assert reader.seeks == 2
+        reader.release()
+
+    def test_panels_resized_and_independent(self, reference_video):
+        reader = ReferenceFrameReader(reference_video, 96)
+        first = reader.panel_at(0.5)
+        assert first.shape == (96, 128, 3)
+        first[:] = 255  # drawing on a panel must not touch the cached one
+        assert _frame_number(reader.panel_at(0.5)) == 15
+        reader.release()
+
+    def test_past_end_repeats_last_frame(self, reference_video):
+        reader = ReferenceFrameReader(reference_video, 48)
+        assert reader.panel_at(60.0) is None
+        assert _frame_number(reader.panel_at(4.9)) == FRAMES - 3
+        assert _frame_number(reader.panel_at(60.0)) == FRAMES - 3
+        reader.release()
@@ -0,0 +1,128 @@
+"""
+Tests for delta-encoded live classification results.
+"""
+
+import json
+import sys
+import os
+
+# Add project root to path so we can import the delta module
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from api.core.streaming.result_delta import ResultDeltaTracker, dumps_compact
+
+
+def _results(shots, rallies=(), summary=None):
+    return {
+        "shots": [{"frame": f, "shot": s} for f, s in shots],
+        "rallies": [{"rally_id": r, "length": n} for r, n in rallies],
+        "shuttle_hits": [],
+        "summary": summary or {"total_shots": len(shots)},
+        "shot_distribution": {},
+    }
+
+
+def _apply(state, message):
+    """Minimal client: upsert by key, drop removed keys."""
+    if not message["delta"]:
+        return {
+            "shots": {s["frame"]: s for s in message["shots"]},
+            "rallies": {r["rally_id"]: r for r in message["rallies"]},
+        }
+    for name in message.get("replace", []):
+        state[name] = {}
+    for s in message["shots"]:
+        state["shots"][s["frame"]] = s
+    for r in message["rallies"]:
+        state["rallies"][r["rally_id"]] = r
+    for key in message["removed"]["shots"]:
+        state["shots"].pop(key, None)
+    for key in message["removed"]["rallies"]:
+        state["rallies"].pop(key, None)
+    return state
+
+
+class TestResultDeltaTracker:
+
+    def test_first_message_is_snapshot(self):
+        tracker = ResultDeltaTracker()
+        tracker.publish(_results([(10, "smash")]))
+        msg = tracker.message_for(None)
+        assert msg["delta"] is False
+        assert msg["version"] == 1
+        assert msg["shots"] == [{"frame": 10, "shot": "smash"}]
+
+    def test_delta_only_carries_changes(self):
+        tracker = ResultDeltaTracker()
+        tracker.publish(_results([(10, "smash"), (40, "clear")], [(1, 2)]))
+        tracker.publish(_results([(10, "smash"), (40, "drop"), (90, "lift")], [(1, 3)]))
+        msg = tracker.message_for(1)
+        assert msg["delta"] is True
+        assert msg["base_version"] == 1
+        assert [s["frame"] for s in msg["shots"]] == [40, 90]
+        assert msg["rallies"] == [{"rally_id": 1, "length": 3}]
+        assert msg["removed"]["shots"] == []
+
+    def test_removed_keys_and_client_reconstruction(self):
+        tracker = ResultDeltaTracker()
+        seq = [
+            _results([(10, "smash"), (40, "clear")], [(1, 2)]),
+            _results([(10, "smash"), (55, "clear")], [(1, 2), (2, 1)]),
+            _results([(55, "drive"), (80, "net")], [(2, 2)]),
+        ]
+        state, acked = None, None
+        for results in seq:
+            tracker.publish(results)
+            state = _apply(state, tracker.message_for(acked))
+            acked = tracker.version
+        assert state["shots"] == {s["frame"]: s for s in seq[-1]["shots"]}
+        assert state["rallies"] == {r["rally_id"]: r for r in seq[-1]["rallies"]}
+
+    def test_unknown_base_falls_back_to_snapshot(self):
+        tracker = ResultDeltaTracker(history=2)
+        for i in range(4):
+            tracker.publish(_results([(i, "clear")]))
+        assert tracker.message_for(1)["delta"] is False
+        assert tracker.message_for(3)["delta"] is True
+
+    def test_periodic_snapshot(self):
+        tracker = ResultDeltaTracker(snapshot_every=3)
+        for i in range(3):
+            tracker.publish(_results([(i, "clear")]))
+        assert tracker.message_for(2)["delta"] is False
+
+    def test_duplicate_keys_are_kept(self):
+        tracker = ResultDeltaTracker()
+        tracker.publish(_results([(10, "smash"), (10, "clear")]))
+        assert len(tracker.message_for(None)["shots"]) == 2
+
+    def test_duplicate_keys_send_the_full_collection(self):
+        tracker = ResultDeltaTracker()
+        tracker.publish(_results([(10, "smash"), (40, "clear")], [(1, 2)]))
+        tracker.publish(_results([(10, "smash"), (10, "clear"), (40, "clear")], [(1, 3)]))
+        msg = tracker.message_for(1)
+        assert msg["replace"] == ["shots"]
+        assert [s["frame"] for s in msg["shots"]] == [10, 10, 40]
+        assert msg["removed"]["shots"] == []
+        assert msg["rallies"] == [{"rally_id": 1, "length": 3}]
+
+        # Back to unique keys: a delta from the duplicated base still replaces
+        tracker.publish(_results([(10, "smash"), (40, "drop")], [(1, 3)]))
+        msg = tracker.message_for(2)
+        assert msg["replace"] == ["shots"]
+        assert msg["shots"] == [{"frame": 10, "shot": "smash"}, {"frame": 40, "shot": "drop"}]
+        assert msg["rallies"] == []
+        assert "replace" not in tracker.message_for(1)
+
+        state = _apply(_apply(None, tracker.message_for(None)), tracker.message_for(2))
+        assert state["shots"] == {10: {"frame": 10, "shot": "smash"}, 40: {"frame": 40, "shot": "drop"}}
+
+    def test_delta_is_smaller_than_snapshot(self):
+        tracker = ResultDeltaTracker()
+        shots = [(i * 30, "clear") for i in range(200)]
+        tracker.publish(_results(shots))
+        tracker.publish(_results(shots + [(6000, "smash")]))
+        delta = dumps_compact(tracker.message_for(1))
+        snapshot = dumps_compact(tracker.message_for(None))
+        assert len(delta) * 10 < len(snapshot)
+        assert json.loads(delta)["shots"] == [{"frame": 6000, "shot": "smash"}]
@@ -0,0 +1,265 @@
+"""
+Tests for reconnect-safe live sessions (api/core/streaming/resume.py):
+incremental checkpoints, the resume grace window and analyzer restore.
+"""
+
+import asyncio
+import sys
+import os
+import threading
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import cv2
+import numpy as np
+
+from api.core.streaming.inference_pool import get_inference_pool
+from api.core.streaming.resume import (
+    ResumeRegistry, SessionCheckpoint, get_resume_registry, shutdown_resume_registry,
+)
+from api.services.stream_service import FrameStore
+from api.websocket.stream_handler import StreamConnectionManager
+
+COURT = {"top_left": [0, 0], "top_right": [160, 0],
+         "bottom_left": [0, 120], "bottom_right": [160, 120]}
+
+
+def _jpeg(value: int = 80) -> bytes:
+    return cv2.imencode(".jpg", np.full((120, 160, 3), value, np.uint8))[1].tobytes()
+
+
+class TestSessionCheckpoint:
+
+    def test_incremental_appends_round_trip(self, tmp_path):
+        ckpt = SessionCheckpoint(str(tmp_path / "stream_1"))
+        frames = [{"frame": i} for i in range(5)]
+
+        ckpt.write({"frame_counter": 3, "append": {"raw_frame_data": frames[:3]}})
+        assert ckpt.since() == {"raw_frame_data": 3}
+        ckpt.write({"frame_counter": 5, "append": {"raw_frame_data": frames[3:]}})
+
+        state = SessionCheckpoint(str(tmp_path / "stream_1")).load()
+        assert state["frame_counter"] == 5
+        assert state["append"]["raw_frame_data"] == frames
+
+    def test_since_picks_up_existing_checkpoint(self, tmp_path):
+        SessionCheckpoint(str(tmp_path / "s")).write({"append": {"a": [1, 2]}})
+        reopened = SessionCheckpoint(str(tmp_path / "s"))
+        assert reopened.since() == {"a": 2}
+        reopened.write({"append": {"a": [3]}})
+        assert reopened.load()["append"]["a"] == [1, 2, 3]
+
+    def test_torn_log_tail_is_ignored(self, tmp_path):
+        ckpt = SessionCheckpoint(str(tmp_path / "s"))
+        ckpt.write({"append": {"a": [1]}})
+        with open(tmp_path / "s" / "frames.log", "ab") as log:
+            log.write(b"\x00\x00\x10\x00garbage")
+        assert ckpt.load()["append"]["a"] == [1]
+        # The next write overwrites the torn bytes
+        ckpt.write({"append": {"a": [2]}})
+        assert SessionCheckpoint(str(tmp_path / "s")).load()["append"]["a"] == [1, 2]
+
+    def test_missing_and_discarded(self, tmp_path):
+        ckpt = SessionCheckpoint(str(tmp_path / "s"))
+        assert ckpt.load() is None
+        ckpt.write({"append": {}})
+        assert ckpt.exists()
+        ckpt.discard()
+        assert not ckpt.exists()
+        assert ckpt.since() == {}
+
+
+class TestResumeRegistry:
+
+    def test_reattach_within_grace(self):
+        async def scenario():
+            registry = ResumeRegistry(grace_s=60)
+            expired = []
+            registry.detach(7, lambda: expired.append(7))
+            assert registry.is_detached(7)
+            assert registry.reattach(7)
+            assert not registry.reattach(7)
+            assert await registry.reap() == []
+            registry.shutdown()
+            return expired
+
+        assert asyncio.run(scenario()) == []
+
+    def test_reap_awaits_async_callback(self):
+        async def scenario():
+            registry = ResumeRegistry(grace_s=0)
+            reclaimed = []
+
+            async def reclaim():
+                reclaimed.append(8)
+
+            registry.detach(8, reclaim)
+            assert await registry.reap() == [8]
+            assert not registry.is_detached(8)
+            registry.shutdown()
+            return reclaimed, registry.stats()
+
+        reclaimed, stats = asyncio.run(scenario())
+        assert reclaimed == [8]
+        assert stats["expired"] == 1
+
+    def test_forget_cancels_reclaim(self):
+        async def scenario():
+            registry = ResumeRegistry(grace_s=0)
+            registry.detach(9, lambda: pytest.fail("should not be reclaimed"))
+            registry.forget(9)
+            expired = await registry.reap()
+            registry.shutdown()
+            return expired
+
+        assert asyncio.run(scenario()) == []
+
+
+class _SlowCheckpointAnalyzer:
+    def __init__(self):
+        self.entered = threading.Event()
+        self.proceed = threading.Event()
+
+    def checkpoint_state(self, since):
+        self.entered.set()
+        self.proceed.wait(5)
+        return {"frame_counter": 1, "append": {}}
+
+
+class TestDetach:
+
+    def test_reconnect_accepted_while_checkpoint_is_written(self, tmp_path):
+        session_id = 931
+        manager = StreamConnectionManager()
+        manager._checkpoints[session_id] = SessionCheckpoint(str(tmp_path / "s"))
+        analyzer = _SlowCheckpointAnalyzer()
+        pool = get_inference_pool("badminton")
+
+        async def scenario():
+            pool.admit(session_id)
+            manager._stream_connections[session_id] = object()
+            detach = asyncio.create_task(manager._detach(session_id, analyzer))
+            while not analyzer.entered.is_set():
+                await asyncio.sleep(0.01)
+            # Mid-checkpoint: the slot is free for the streamer to come back
+            free = session_id not in manager.get_active_sessions()
+            reattached = get_resume_registry().reattach(session_id)
+            analyzer.proceed.set()
+            await detach
+            return free, reattached
+
+        try:
+            free, reattached = asyncio.run(scenario())
+            assert free and reattached
+            # The inference slot was kept for the reconnect
+            assert any(w["sessions"] for w in pool.stats())
+            assert SessionCheckpoint(str(tmp_path / "s")).load()["frame_counter"] == 1
+        finally:
+            pool.release(session_id)
+            shutdown_resume_registry()
+
+
+class _SlowEndSessionManager:
+    def __init__(self):
+        self.entered = threading.Event()
+        self.proceed = threading.Event()
+        self.ended = []
+
+    def get_session(self, session_id):
+        return None if self.ended else object()
+
+    def end_session(self, session_id):
+        self.entered.set()
+        self.proceed.wait(5)
+        return {"summary": {"total_shots": 0}}
+
+    def cleanup_session(self, session_id):
+        self.ended.append(session_id)
+
+
+class _AcceptingSocket:
+    async def accept(self):
+        pass
+
+
+class TestReclaim:
+
+    def test_reconnect_refused_until_reclaim_finishes(self, tmp_path, monkeypatch):
+        from sqlalchemy import create_engine
+        from sqlalchemy.orm import sessionmaker
+        from api.database import Base
+        from api.db_models.stream_session import StreamSession  # noqa: F401 (registers the table)
+        import api.websocket.stream_handler as stream_handler
+
+        engine = create_engine(f"sqlite:///{tmp_path / 'db.sqlite'}")
+        Base.metadata.create_all(engine)
+        monkeypatch.setattr(stream_handler, "SessionLocal", sessionmaker(bind=engine))
+        session_id = 932
+        manager = StreamConnectionManager()
+        manager._session_manager = sessions = _SlowEndSessionManager()
+        manager._checkpoints[session_id] = SessionCheckpoint(str(tmp_path / "s"))
+
+        async def scenario():
+            reclaim = asyncio.create_task(manager._reclaim_session(session_id))
+            await asyncio.wait_for(asyncio.to_thread(sessions.entered.wait), 5)
+            # Mid end_session: the analyzer is half-ended, no one may attach
+            during = await manager.connect_streamer(_AcceptingSocket(), session_id)
+            reclaiming = manager.is_reclaiming(session_id)
+            sessions.proceed.set()
+            await reclaim
+            return during, reclaiming
+
+        during, reclaiming = asyncio.run(scenario())
+        assert not during and reclaiming
+        assert sessions.ended == [session_id]
+        assert not manager.is_reclaiming(session_id)
+
+
+class TestFrameStoreResume:
+
+    def test_resume_continues_appending(self, tmp_path):
+        path = str(tmp_path / "frames.bin")
+        store = FrameStore(path)
+        for v in (10, 20, 30):
+            store.append(_jpeg(v))
+        store.flush()
+        store.release()
+
+        resumed = FrameStore.resume(path)
+        assert resumed.count() == 3
+        resumed.append(_jpeg(40))
+        assert resumed.count() == 4
+        assert resumed.read_bytes(3) == _jpeg(40)
+        assert resumed.read_bytes(0) == _jpeg(10)
+        resumed.release()
+
+
+class TestAnalyzerRestore:
+
+    def test_basic_round_trip(self, tmp_path):
+        from api.services.stream_service import BasicStreamAnalyzer
+
+        first = BasicStreamAnalyzer(COURT, session_id=911, frame_rate=10,
+                                    enable_shuttle_tracking=False, output_dir=str(tmp_path))
+        for i in range(4):
+            first.process_frame(_jpeg(), i / 10)
+        ckpt = SessionCheckpoint(str(tmp_path / "ckpt"))
+        ckpt.write(first.checkpoint_state(ckpt.since()))
+        first.close()
+
+        second = BasicStreamAnalyzer(COURT, session_id=911, frame_rate=10,
+                                     enable_shuttle_tracking=False, output_dir=str(tmp_path))
+        second.restore_state(ckpt.load())
+        info = second.resume_info()
+        assert info["frames_processed"] == 4
+        assert info["last_timestamp"] == pytest.approx(0.3)
+        assert len(second.raw_frame_data) == len(first.raw_frame_data)
+
+        second.process_frame(_jpeg(), 0.4)
+        assert second.resume_info()["frames_processed"] == 5
+        # Only the new frame goes into the next checkpoint
+        appended = second.checkpoint_state(ckpt.since())["append"]
+        assert len(appended["raw_frame_data"]) == len(second.raw_frame_data) - len(first.raw_frame_data)
+        second.close()
@@ -0,0 +1,180 @@
+"""
+Tests for the background screenshot pipeline (api/core/streaming/screenshots.py).
+"""
+
+import sys
+import os
+import threading
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import numpy as np
+
+from api.core.streaming.screenshots import ScreenshotStream, ScreenshotUploader
+
+
+class _MemoryStorage:
+    def __init__(self):
+        self.saved = {}
+        self.lock = threading.Lock()
+        self.fail = set()  # keys whose next save fails
+
+    def save(self, key, data, content_type=None):
+        with self.lock:
+            if key in self.fail:
+                self.fail.discard(key)
+                raise IOError("upload failed")
+            self.saved[key] = data
+        return key
+
+    def delete(self, key):
+        with self.lock:
+            return self.saved.pop(key, None) is not None
+
+
+def _wait_for(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+def _image():
+    return np.zeros((48, 64, 3), np.uint8)
+
+
+@pytest.fixture
+def storage():
+    return _MemoryStorage()
+
+
+@pytest.fixture
+def uploader(storage):
+    up = ScreenshotUploader(workers=1, max_queue=8, batch_size=3, storage=storage)
+    yield up
+    up.shutdown()
+
+
+class TestScreenshotStream:
+
+    def test_uploads_in_batches_while_running(self, uploader, storage):
+        stream = ScreenshotStream("s/1/", uploader=uploader)
+        for _ in range(7):
+            assert stream.capture(_image)
+        # Two full batches go out without finishing the stream
+        assert _wait_for(lambda: len(storage.saved) == 6)
+        assert stream.finish() == 7
+        assert stream.wait(5)
+        assert sorted(storage.saved) == [f"s/1/{i:04d}.jpg" for i in range(7)]
+        assert storage.saved["s/1/0000.jpg"][:2] == b"\xff\xd8"  # JPEG
+
+    def test_unbound_stream_ignores_captures(self, uploader, storage):
+        stream = ScreenshotStream(uploader=uploader)
+        assert not stream.capture(_image)
+        assert stream.finish() == 0
+        assert stream.wait(1)
+        assert storage.saved == {}
+
+    def test_full_queue_drops_without_blocking(self, storage):
+        release = threading.Event()
+        up = ScreenshotUploader(workers=1, max_queue=1, batch_size=1, storage=storage)
+        try:
+            stream = ScreenshotStream("s/2/", uploader=up)
+
+            def slow():
+                release.wait(5)
+                return _image()
+
+            assert stream.capture(slow)
+            assert _wait_for(lambda: up._queue.empty())
+            assert not stream.capture(_image)  # first one still rendering
+            assert up.dropped == 1
+            release.set()
+            assert stream.finish() == 1
+            assert stream.wait(5)
+            assert list(storage.saved) == ["s/2/0000.jpg"]
+        finally:
+            release.set()
+            up.shutdown()
+
+    def test_render_runs_on_worker_thread(self, uploader):
+        threads = []
+
+        def render():
+            threads.append(threading.current_thread().name)
+            return _image()
+
+        stream = ScreenshotStream("s/3/", uploader=uploader)
+        stream.capture(render)
+        stream.finish()
+        assert stream.wait(5)
+        assert threads == ["screenshot-worker-0"]
+
+    def test_discard_drops_pending_batch(self, uploader, storage):
+        stream = ScreenshotStream("s/4/", uploader=uploader)
+        stream.capture(_image)
+        stream.discard()
+        assert stream.wait(1)
+        assert not stream.capture(_image)
+        uploader.shutdown()
+        assert storage.saved == {}
+        # Discarding after finish doesn't cancel the upload
+        second = ScreenshotUploader(workers=1, storage=storage)
+        done = ScreenshotStream("s/5/", uploader=second)
+        done.capture(_image)
+        done.finish()
+        done.discard()
+        assert done.wait(5)
+        second.shutdown()
+        assert list(storage.saved) == ["s/5/0000.jpg"]
+
+    def test_discard_deletes_uploaded_screenshots(self, uploader, storage):
+        stream = ScreenshotStream("s/6/", uploader=uploader)
+        for _ in range(4):
+            stream.capture(_image)
+        assert _wait_for(lambda: len(storage.saved) == 3)
+        stream.discard()
+        assert _wait_for(lambda: storage.saved == {})
+        assert stream.count == 0
+
+    def test_discard_wait_deletes_before_returning(self, uploader, storage):
+        stream = ScreenshotStream("s/7/", uploader=uploader)
+        for _ in range(3):
+            stream.capture(_image)
+        assert _wait_for(lambda: len(storage.saved) == 3)
+        stream.discard(wait=True)
+        assert storage.saved == {}
+
+    def test_failed_render_leaves_no_gap(self, uploader, storage):
+        stream = ScreenshotStream("s/8/", uploader=uploader)
+        counts = []
+        stream.capture(_image)
+        stream.capture(lambda: None)  # render fails
+        for _ in range(3):
+            stream.capture(_image)
+        assert stream.finish() == 5
+        stream.on_uploaded(counts.append)
+        assert stream.wait(5)
+        assert sorted(storage.saved) == [f"s/8/{i:04d}.jpg" for i in range(4)]
+        assert stream.count == 4
+        assert counts == [4]
+        # Registered after completion: called right away
+        stream.on_uploaded(counts.append)
+        assert counts == [4, 4]
+
+    def test_failed_upload_leaves_no_gap(self, uploader, storage):
+        storage.fail.add("s/9/0001.jpg")
+        stream = ScreenshotStream("s/9/", uploader=uploader)
+        counts = []
+        stream.on_uploaded(counts.append)
+        for _ in range(4):
+            stream.capture(_image)
+        stream.finish()
+        assert stream.wait(5)
+        assert sorted(storage.saved) == [f"s/9/{i:04d}.jpg" for i in range(3)]
+        assert counts == [3]
@@ -0,0 +1,167 @@
+"""
+Tests for process-sharded live analyzers.
+"""
+
+import os
+import signal
+import sys
+import time
+import numpy as np
+import pytest
+
+# Add project root to path so we can import the shard pool
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from api.core.streaming.shard_pool import (
+    AnalysisShardPool, RemoteAnalyzerError, ShardedAnalyzer, ShardPoolFull, ShardWorkerDied,
+)
+
+
+class CounterAnalyzer:
+    """Stand-in analyzer; must be importable by the worker processes."""
+
+    def __init__(self, session_id, start=0):
+        self.session_id = session_id
+        self.count = start
+        self.raw_video_path = None
+
+    def process_frame(self, data, timestamp):
+        self.count += 1
+        return {"frames": self.count, "pid": os.getpid(), "bytes": len(data),
+                "type": type(data).__name__}
+
+    def run_post_analysis(self, output_dir, progress_callback=None):
+        for pct in (50, 100):
+            progress_callback(pct, "working")
+        return {"output_dir": output_dir}
+
+    def fail(self):
+        raise ValueError("bad frame")
+
+    def sleep(self, seconds):
+        time.sleep(seconds)
+
+    def close(self):
+        pass
+
+
+METHODS = ("process_frame", "run_post_analysis", "fail", "sleep")
+
+
+def _open(pool, session_id, **kwargs):
+    return pool.open_session(session_id, CounterAnalyzer, dict(kwargs, session_id=session_id), METHODS)
+
+
+@pytest.fixture(scope="module")
+def pool():
+    p = AnalysisShardPool(workers=2, max_sessions_per_worker=2, call_timeout=20.0)
+    yield p
+    p.shutdown()
+
+
+class TestShardPool:
+
+    def test_sessions_are_spread_and_state_stays_remote(self, pool):
+        a = _open(pool, 1)
+        b = _open(pool, 2, start=10)
+        try:
+            assert {a.shard_index, b.shard_index} == {0, 1}
+            for _ in range(3):
+                ra = a.process_frame(b"jpeg", 0.0)
+            rb = b.process_frame(b"jpeg", 0.0)
+            assert ra["frames"] == 3 and rb["frames"] == 11
+            assert ra["pid"] != rb["pid"] != os.getpid()
+            assert a.session_id == 1
+            assert a.raw_video_path is None
+        finally:
+            a.close()
+            b.close()
+
+    def test_errors_and_progress_are_relayed(self, pool):
+        a = _open(pool, 3)
+        try:
+            with pytest.raises(RemoteAnalyzerError, match="bad frame"):
+                a.fail()
+            seen = []
+            result = a.run_post_analysis("/tmp/out", lambda pct, msg: seen.append(pct))
+            assert result == {"output_dir": "/tmp/out"}
+            assert seen == [50, 100]
+        finally:
+            a.close()
+
+    def test_full_pool_rejects(self, pool):
+        opened = [_open(pool, 10 + i) for i in range(pool.capacity)]
+        try:
+            with pytest.raises(ShardPoolFull):
+                _open(pool, 99)
+        finally:
+            for a in opened:
+                a.close()
+
+    def test_dead_worker_is_restarted_and_sessions_recreated(self, pool):
+        a = _open(pool, 20)
+        try:
+            a.process_frame(b"jpeg", 0.0)
+            victim = pool.stats()[a.shard_index]["pid"]
+            restarts = pool.restarts
+            os.kill(victim, signal.SIGKILL)
+            with pytest.raises(ShardWorkerDied):
+                a.sleep(5)
+
+            deadline = time.time() + 20
+            while pool.restarts == restarts and time.time() < deadline:
+                time.sleep(0.05)
+            assert pool.restarts == restarts + 1
+            assert all(s["alive"] for s in pool.stats())
+            assert victim not in [s["pid"] for s in pool.stats()]
+
+            # Analyzer was re-created with fresh state
+            assert a.process_frame(b"jpeg", 0.0)["frames"] == 1
+        finally:
+            a.close()
+
+    def test_only_allowed_methods_are_forwarded(self, pool):
+        a = _open(pool, 30)
+        try:
+            assert hasattr(a, "process_frame")
+            assert not hasattr(a, "finish_screenshots")
+            assert not hasattr(a, "_build_status")
+            assert not hasattr(a, "__array__")
+            assert hasattr(ShardedAnalyzer(pool, 30), "_get_stats_dict")
+        finally:
+            a.close()
+
+    def test_close_while_calls_arrive_keeps_the_worker(self, pool):
+        # Close and reopen sessions while frames for them are still arriving
+        restarts = pool.restarts
+        for _ in range(20):
+            a = _open(pool, 40)
+            a.process_frame(b"jpeg", 0.0)
+            futures = [
+                pool._assignments[40].submit(next(pool._req_ids), "call", 40,
+                                             ("process_frame", (b"jpeg", 0.0), {}, False))
+                for _ in range(5)
+            ]
+            a.close()
+            for future in futures:
+                try:
+                    future.result(timeout=5)
+                except RemoteAnalyzerError:
+                    pass  # ran after the close: no analyzer
+        b = _open(pool, 41)
+        try:
+            assert b.process_frame(b"jpeg", 0.0)["frames"] == 1
+            assert pool.restarts == restarts
+        finally:
+            b.close()
+
+    def test_decoded_frames_cross_the_pipe_as_jpeg(self, pool):
+        a = _open(pool, 50)
+        try:
+            frame = np.zeros((1080, 1920, 3), np.uint8)
+            result = a.process_frame(frame, 0.0)
+            assert result["type"] == "bytes"
+            assert result["bytes"] < frame.nbytes // 20
+            assert a.process_frame(b"jpeg", 0.0)["bytes"] == 4
+        finally:
+            a.close()
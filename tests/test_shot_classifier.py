@@ -0,0 +1,96 @@
+"""
+Golden-output regression tests for ShotClassifier.
+
+Runs classify_all() and detect_shuttle_hits_windowed() on the synthetic
+rallies from benchmarks/synthetic.py and compares output digests with
+benchmarks/golden/shot_classifier.json. The 100k-frame golden is only
+checked by the benchmark runner (python -m benchmarks.shot_classifier).
+"""
+
+import copy
+import json
+import sys
+import os
+import pytest
+
+# Add project root to path so we can import the classifier
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from api.services.shot_classifier import (
+    HF_HIT_IDX,
+    HF_NUM,
+    ShotClassifier,
+    build_frame_columns,
+    detect_shuttle_hits_windowed,
+)
+from benchmarks.shot_classifier import COURT_CENTER, FPS, GOLDEN_PATH, output_digest
+from benchmarks.synthetic import generate_rally_frames
+
+
+@pytest.fixture(scope="module")
+def golden():
+    with open(GOLDEN_PATH) as f:
+        return json.load(f)
+
+
+@pytest.fixture(scope="module", params=[1_000, 10_000])
+def session(request):
+    n = request.param
+    frames = generate_rally_frames(n, fps=FPS, seed=n)
+    # classify_all mutates its frames (injects wrist_velocity); keep these pristine
+    result = ShotClassifier(court_center=COURT_CENTER).classify_all(copy.deepcopy(frames), FPS)
+    return n, frames, result
+
+
+class TestGoldenOutputs:
+    """Outputs must match the stored golden digests exactly."""
+
+    def test_classify_all_matches_golden(self, session, golden):
+        n, _, result = session
+        assert output_digest(result) == golden[str(n)]["classify_all"]["sha256"]
+
+    def test_detect_hits_matches_golden(self, session, golden):
+        n, frames, _ = session
+        hits = detect_shuttle_hits_windowed(copy.deepcopy(frames), FPS)
+        assert output_digest(hits) == golden[str(n)]["detect_shuttle_hits_windowed"]["sha256"]
+
+    def test_generator_is_deterministic(self):
+        assert generate_rally_frames(500, seed=7) == generate_rally_frames(500, seed=7)
+
+
+class TestHitWindowFeatures:
+    """Vectorised hit-centric features."""
+
+    def test_shared_columns_give_same_result(self, session):
+        n, frames, result = session
+        raw = copy.deepcopy(frames)
+        sc = ShotClassifier(court_center=COURT_CENTER)
+        velocity_data = sc._compute_velocities(raw)
+        columns = build_frame_columns(raw, velocity_data)
+        with_cols = sc._classify_hits_centric(
+            raw, copy.deepcopy(result["shuttle_hits"]), velocity_data, FPS, columns=columns,
+        )
+        without = sc._classify_hits_centric(
+            raw, copy.deepcopy(result["shuttle_hits"]), velocity_data, FPS,
+        )
+        assert with_cols == without
+
+    def test_feature_matrix_shape(self, session):
+        _, frames, result = session
+        sc = ShotClassifier()
+        columns = build_frame_columns(frames, sc._compute_velocities(frames))
+        features = sc._hit_window_features(frames, result["shuttle_hits"], columns)
+        assert features.shape == (len(result["shuttle_hits"]), HF_NUM)
+        assert (features[:, HF_HIT_IDX] >= 0).all()
+
+    def test_missing_hit_frame_is_skipped(self):
+        frames = generate_rally_frames(300, seed=3)
+        sc = ShotClassifier()
+        velocity_data = sc._compute_velocities(frames)
+        hits = [{"frame": 10_000, "timestamp": 0.0, "hit_position": {"x": 1, "y": 1}}]
+        assert sc._classify_hits_centric(frames, hits, velocity_data, FPS) == []
+
+    def test_empty_hits(self):
+        sc = ShotClassifier()
+        columns = build_frame_columns([])
+        assert sc._hit_window_features([], [], columns).shape == (0, HF_NUM)
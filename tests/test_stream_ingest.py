@@ -0,0 +1,209 @@
+"""
+Tests for basic-mode stream ingest (drop-oldest backpressure).
+"""
+
+import asyncio
+import json
+import threading
+import time
+import sys
+import os
+import pytest
+
+# Add project root to path so we can import the handler
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from fastapi import WebSocketDisconnect
+
+from api.core.streaming.frame_protocol import encode_binary_frame
+from api.core.streaming.inference_pool import get_inference_pool
+from api.websocket.stream_handler import StreamConnectionManager, _IngestClock
+
+
+class _SlowAnalyzer:
+    """Records what the handler passes to process_frame."""
+
+    def __init__(self, delay: float):
+        self.delay = delay
+        self.calls = []
+
+    def process_frame(self, data, timestamp, dropped_before=0):
+        time.sleep(self.delay)
+        self.calls.append((timestamp, dropped_before))
+        return {"stats": {"frames_processed": len(self.calls)}}
+
+
+class _FakeWebSocket:
+    """Delivers frames in a burst, then disconnects once results stop."""
+
+    def __init__(self, n_frames: int):
+        self._incoming = [
+            {"type": "websocket.receive", "bytes": encode_binary_frame(b"jpeg", i / 30, i)}
+            for i in range(n_frames)
+        ]
+        self.sent = []
+
+    async def receive(self):
+        if self._incoming:
+            return self._incoming.pop(0)
+        await asyncio.sleep(0.5)
+        raise WebSocketDisconnect(1000)
+
+    async def send_json(self, message):
+        self.sent.append(message)
+
+    async def send_text(self, text):
+        self.sent.append(json.loads(text))
+
+
+class _EndingAnalyzer:
+    """Records the thread each end-of-stream call runs on."""
+
+    def __init__(self):
+        self.threads = []
+
+    def release_raw_video_writer(self):
+        self.threads.append(threading.get_ident())
+
+    def get_final_report(self):
+        self.threads.append(threading.get_ident())
+        return {"summary": {"total_shots": 2}}
+
+    @property
+    def raw_video_path(self):
+        self.threads.append(threading.get_ident())
+        return "/tmp/raw.mp4"
+
+
+class TestIngestClock:
+
+    def test_uses_advancing_client_timestamps(self):
+        clock = _IngestClock()
+        assert [clock.stamp(t, t) for t in (1.0, 1.5, 2.0)] == [1.0, 1.5, 2.0]
+
+    def test_fills_missing_timestamps_from_receive_time(self):
+        clock = _IngestClock()
+        assert clock.stamp(0.0, 10.0) == 0.0
+        assert clock.stamp(0.0, 10.25) == pytest.approx(0.25)
+        assert clock.stamp(0.0, 10.75) == pytest.approx(0.75)
+
+
+class TestLatestFrameWins:
+
+    def test_slow_server_drops_stale_frames(self):
+        manager = StreamConnectionManager()
+        analyzer = _SlowAnalyzer(delay=0.05)
+        ws = _FakeWebSocket(n_frames=20)
+
+        get_inference_pool("badminton").admit(901)
+        asyncio.run(manager._handle_basic_stream(ws, 901, analyzer))
+        get_inference_pool("badminton").release(901)
+
+        results = [m for m in ws.sent if m.get("type") == "analysis_result"]
+        dropped = sum(d for _, d in analyzer.calls)
+        assert len(analyzer.calls) < 20
+        assert len(analyzer.calls) + dropped == 20
+        # Last frame always survives, and timestamps stay in order
+        assert analyzer.calls[-1][0] == pytest.approx(19 / 30)
+        timestamps = [t for t, _ in analyzer.calls]
+        assert timestamps == sorted(timestamps)
+        assert results[-1]["ingest"]["frames_dropped"] == dropped
+        assert results[-1]["ingest"]["lag_ms"] > 0
+
+
+class TestEndBasicStream:
+
+    def test_analyzer_calls_run_off_the_event_loop(self, tmp_path, monkeypatch):
+        from sqlalchemy import create_engine
+        from sqlalchemy.orm import sessionmaker
+        from api.database import Base
+        from api.db_models.stream_session import StreamSession  # noqa: F401 (registers the table)
+        import api.websocket.stream_handler as stream_handler
+
+        engine = create_engine(f"sqlite:///{tmp_path / 'db.sqlite'}")
+        Base.metadata.create_all(engine)
+        monkeypatch.setattr(stream_handler, "SessionLocal", sessionmaker(bind=engine))
+        session_id = 905
+        manager = StreamConnectionManager()
+        analyzer = _EndingAnalyzer()
+        ws = _FakeWebSocket(0)
+        pool = get_inference_pool("badminton")
+        pool.admit(session_id)
+        try:
+            asyncio.run(manager._end_basic_stream(ws, session_id, analyzer))
+        finally:
+            pool.release(session_id)
+
+        assert len(analyzer.threads) == 3
+        assert threading.get_ident() not in analyzer.threads
+        assert ws.sent[-1]["type"] == "stream_ended"
+        assert ws.sent[-1]["report"]["summary"]["total_shots"] == 2
+
+
+class TestAdvancedIngest:
+
+    def test_raw_video_is_written_from_frame_store(self, tmp_path):
+        import cv2
+        import numpy as np
+        from api.services.stream_service import AdvancedStreamAnalyzer
+
+        court = {"top_left": [0, 0], "top_right": [160, 0],
+                 "bottom_left": [0, 120], "bottom_right": [160, 120]}
+        analyzer = AdvancedStreamAnalyzer(court, session_id=902, output_dir=str(tmp_path))
+        analyzer._processor.stop()
+        analyzer._processor.join()
+
+        ok, buf = cv2.imencode(".jpg", np.full((120, 160, 3), 80, np.uint8))
+        for i in range(5):
+            status = analyzer.process_frame(buf.tobytes(), i / 30)
+        assert status["frames_buffered"] == 5
+        assert not os.path.exists(analyzer.raw_video_path)
+
+        annotated = str(tmp_path / "annotated.mp4")
+        analyzer._write_annotated_video(annotated, [], {}, 30, raw_video_path=analyzer.raw_video_path)
+        analyzer.close()
+
+        for path in (analyzer.raw_video_path, annotated):
+            cap = cv2.VideoCapture(path)
+            assert int(cap.get(cv2.CAP_PROP_FRAME_COUNT)) == 5
+            cap.release()
+
+
+class TestBackgroundProcessor:
+
+    @pytest.fixture
+    def analyzer(self, tmp_path):
+        from api.services.stream_service import AdvancedStreamAnalyzer
+
+        court = {"top_left": [0, 0], "top_right": [160, 0],
+                 "bottom_left": [0, 120], "bottom_right": [160, 120]}
+        a = AdvancedStreamAnalyzer(court, session_id=903, frame_rate=10, output_dir=str(tmp_path))
+        yield a
+        a.close()
+
+    @staticmethod
+    def _jpeg():
+        import cv2
+        import numpy as np
+        return cv2.imencode(".jpg", np.full((120, 160, 3), 80, np.uint8))[1].tobytes()
+
+    def test_drain_processes_everything_and_classifies_last_snapshot(self, analyzer):
+        jpeg = self._jpeg()
+        for i in range(45):
+            analyzer.process_frame(jpeg, i / 10)
+        analyzer._processor.request_drain()
+        analyzer._processor.wait_until_done(timeout=60)
+
+        status = analyzer._build_status()
+        assert status["frames_processed"] == 45
+        assert status["pipeline"]["detect_queue"] == 0
+        assert status["pipeline"]["classify_queue"] == 0
+        assert analyzer._processor.get_results_version() >= 1
+
+    def test_idle_processor_stops_promptly(self, analyzer):
+        time.sleep(0.2)
+        start = time.monotonic()
+        analyzer._processor.stop()
+        analyzer._processor.join(timeout=5)
+        assert not analyzer._processor.is_alive()
+        assert time.monotonic() - start < 2.0
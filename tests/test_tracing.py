@@ -0,0 +1,145 @@
+"""
+Tests for per-frame latency tracing (api/core/tracing.py) and the
+replay tool's latency report.
+"""
+
+import asyncio
+import base64
+import json
+import sys
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from api.core.streaming.frame_protocol import hello_response, parse_client_message
+from api.core.tracing import (
+    FrameTrace, current_trace, run_traced, send_traced, stage, wants_trace,
+)
+from tools.replay.protocols import BadmintonProtocol, make_hello_message
+from tools.replay.reporter import latency_table, percentile
+
+
+class _FakeWebSocket:
+    def __init__(self):
+        self.sent = []
+
+    async def send_json(self, data):
+        self.sent.append(data)
+
+
+class TestFrameTrace:
+    def test_span_and_add_accumulate(self):
+        trace = FrameTrace("badminton")
+        with trace.span("pose"):
+            time.sleep(0.002)
+        trace.add("pose", 1.0)
+        assert trace.stages["pose"] >= 3.0
+
+    def test_wait_is_recorded_once(self):
+        trace = FrameTrace("badminton")
+        trace.begin_wait()
+        trace.end_wait("queue")
+        trace.end_wait("queue")
+        assert list(trace.stages) == ["queue"]
+
+    def test_network_from_client_clock(self):
+        trace = FrameTrace("badminton")
+        trace.set_network(100.0, 100.25)
+        assert round(trace.stages["network"]) == 250
+        trace = FrameTrace("badminton")
+        trace.set_network(None, 100.0)
+        assert "network" not in trace.stages
+
+    def test_for_frame_uses_seq_and_sent_at(self):
+        start, wall = time.perf_counter(), time.time()
+        raw = json.dumps({
+            "type": "frame", "data": base64.b64encode(b"jpeg").decode(), "timestamp": 1.0,
+            "seq": 41, "sent_at": wall - 0.01,
+        })
+        frame = parse_client_message(raw)["frame"]
+        trace = FrameTrace.for_frame("mimic", frame, start, wall)
+        assert trace.seq == 41
+        assert "decode" in trace.stages
+        assert trace.stages["network"] >= 9.0
+
+    def test_timing_shape(self):
+        trace = FrameTrace("challenge", seq=7)
+        trace.add("pose", 12.345)
+        timing = trace.timing()
+        assert timing["seq"] == 7
+        assert timing["stages_ms"] == {"pose": 12.35}
+        assert timing["server_ms"] >= 0
+
+
+class TestStage:
+    def test_noop_without_trace(self):
+        with stage("pose"):
+            pass
+        assert current_trace() is None
+
+    def test_run_traced_on_worker_thread(self):
+        trace = FrameTrace("badminton")
+
+        def analyze(x):
+            assert current_trace() is trace
+            with stage("pose"):
+                time.sleep(0.002)
+            return x * 2
+
+        trace.begin_wait()
+        with ThreadPoolExecutor(1) as pool:
+            assert pool.submit(run_traced, trace, analyze, 21).result() == 42
+            # Trace does not leak into later work on the same thread
+            assert pool.submit(current_trace).result() is None
+        assert "pool_wait" in trace.stages
+        assert trace.stages["pose"] >= 2.0
+
+    def test_run_traced_without_trace(self):
+        assert run_traced(None, lambda: current_trace()) is None
+
+
+class TestSendTraced:
+    def test_timing_only_when_requested(self):
+        ws = _FakeWebSocket()
+        trace = FrameTrace("mimic", seq=3)
+        asyncio.run(send_traced(ws, {"type": "mimic_update"}, trace))
+        asyncio.run(send_traced(ws, {"type": "mimic_update"}, trace, include_timing=True))
+        assert "timing" not in ws.sent[0]
+        assert ws.sent[1]["timing"]["seq"] == 3
+        assert "send" in trace.stages
+
+
+class TestNegotiation:
+    def test_hello_echoes_trace(self):
+        hello = json.loads(make_hello_message(binary=False, trace=True))
+        assert wants_trace(hello)
+        assert hello_response(hello)["trace"] is True
+        assert "trace" not in hello_response({"type": "hello"})
+
+    def test_replay_json_frame_carries_trace_fields(self):
+        msg = json.loads(BadmintonProtocol.make_frame_message(b"x", 1.0, 2, 2, 5, 123.0))
+        assert msg["seq"] == 5 and msg["sent_at"] == 123.0
+        msg = json.loads(BadmintonProtocol.make_frame_message(b"x", 1.0, 2, 2))
+        assert "seq" not in msg and "sent_at" not in msg
+
+
+class TestLatencyReport:
+    def test_percentile(self):
+        values = list(range(1, 101))
+        assert percentile(values, 50) == 50
+        assert percentile(values, 99) == 99
+        assert percentile([], 50) == 0.0
+
+    def test_latency_table(self):
+        timings = [
+            {"seq": i, "server_ms": 10.0 + i, "rtt_ms": 20.0 + i,
+             "stages_ms": {"pose": float(i)}}
+            for i in range(10)
+        ]
+        table = latency_table(timings)
+        assert set(table) == {"pose", "server_ms", "rtt_ms"}
+        assert table["pose"]["n"] == 10
+        assert table["pose"]["p50"] == 4.0
+        assert table["rtt_ms"]["p99"] == 29.0
@@ -0,0 +1,224 @@
+"""
+Tests for compressed video-chunk ingest (api/core/streaming/video_ingest.py)
+and the replay tool's fMP4 chunker.
+"""
+
+import io
+import shutil
+import struct
+import sys
+import time
+import os
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import cv2
+import numpy as np
+
+from api.core.streaming.frame_protocol import (
+    FRAME_FORMAT_BINARY, FRAME_FORMAT_VIDEO_FMP4, MSG_VIDEO_CHUNK, VIDEO_FRAME_FORMATS,
+    encode_binary_frame, hello_response, parse_client_message,
+)
+from api.core.streaming import video_ingest
+from api.core.streaming.video_ingest import ChunkDecoder, parse_frame_info, parse_pts
+from tools.replay.protocols import make_hello_message, make_video_chunk_message
+from tools.replay.video_chunker import FMP4Chunker, fragment_sample_count, split_fragments
+
+COURT = {"top_left": [0, 0], "top_right": [160, 0],
+         "bottom_left": [0, 120], "bottom_right": [160, 120]}
+
+needs_ffmpeg = pytest.mark.skipif(not shutil.which("ffmpeg"), reason="ffmpeg not installed")
+
+
+def _box(box_type: bytes, body: bytes = b"") -> bytes:
+    return struct.pack(">I4s", 8 + len(body), box_type) + body
+
+
+def _moof(samples: int) -> bytes:
+    trun = _box(b"trun", b"\x00\x00\x00\x00" + struct.pack(">I", samples))
+    return _box(b"moof", _box(b"mfhd", b"\x00" * 8) + _box(b"traf", _box(b"tfhd", b"\x00" * 8) + trun))
+
+
+class TestProtocol:
+
+    def test_video_chunk_message(self):
+        msg = make_video_chunk_message(b"fragment", 1.5, 640, 360, 4)
+        assert msg == encode_binary_frame(
+            b"fragment", 1.5, seq=4, width=640, height=360, msg_type=MSG_VIDEO_CHUNK
+        )
+        parsed = parse_client_message(msg)
+        assert parsed["type"] == "video_chunk"
+        assert parsed["frame"].data == b"fragment"
+        assert (parsed["frame"].width, parsed["frame"].height) == (640, 360)
+
+    def test_video_only_negotiated_when_offered_by_server(self):
+        hello = __import__("json").loads(make_hello_message(binary=False, video=True))
+        assert hello["frame_formats"][0] == FRAME_FORMAT_VIDEO_FMP4
+        assert hello_response(hello)["frame_format"] == FRAME_FORMAT_BINARY
+        reply = hello_response(hello, VIDEO_FRAME_FORMATS)
+        assert reply["frame_format"] == FRAME_FORMAT_VIDEO_FMP4
+        assert FRAME_FORMAT_VIDEO_FMP4 in reply["frame_formats"]
+
+    def test_parse_pts(self):
+        line = b"[Parsed_showinfo_1 @ 0x55d] n:   3 pts:   3000 pts_time:0.1     duration: 1000"
+        assert parse_pts(line) == pytest.approx(0.1)
+        assert parse_pts(b"Input #0, mov,mp4, from 'pipe:0':") is None
+        assert parse_frame_info(line) == (3, pytest.approx(0.1))
+
+
+class TestChunker:
+
+    def test_split_fragments(self):
+        init = _box(b"ftyp", b"isom") + _box(b"moov", b"\x00" * 16)
+        stream = init + _moof(5) + _box(b"mdat", b"a" * 10) + _moof(3) + _box(b"mdat", b"b" * 4)
+        chunks = list(split_fragments(io.BytesIO(stream)))
+        assert [frames for _, frames in chunks] == [5, 3]
+        assert chunks[0][0].startswith(init)
+        assert b"".join(c for c, _ in chunks) == stream
+
+    def test_fragment_sample_count_ignores_other_boxes(self):
+        assert fragment_sample_count(_box(b"moof", _box(b"mfhd", b"\x00" * 8))) == 0
+        assert fragment_sample_count(_moof(12)) == 12
+
+
+class TestPassthrough:
+
+    def test_basic_records_chunks_and_maps_analysed_frames(self, tmp_path):
+        from api.services.stream_service import BasicStreamAnalyzer
+
+        analyzer = BasicStreamAnalyzer(COURT, session_id=921, frame_rate=10,
+                                       enable_shuttle_tracking=False, output_dir=str(tmp_path))
+        assert analyzer.start_video_passthrough(".mp4")
+        analyzer.append_video_chunk(b"init+frag0")
+        analyzer.append_video_chunk(b"frag1")
+        image = np.full((120, 160, 3), 80, np.uint8)
+        # Decoded frames 0, 2 and 3 analysed; 1 was skipped by the live queue
+        for ts, source in ((0.0, 0), (0.2, 2), (0.3, 3)):
+            analyzer.process_frame(image, ts, source_frame=source)
+        # A reconnect's new stream is not appended to the same file
+        assert not analyzer.start_video_passthrough(".mp4")
+        analyzer.release_raw_video_writer()
+
+        assert analyzer.raw_video_path.endswith("raw_stream.mp4")
+        with open(analyzer.raw_video_path, "rb") as f:
+            assert f.read() == b"init+frag0frag1"
+        assert analyzer._raw_source_frames == {0: 0, 2: 1, 3: 2}
+        assert analyzer.stats.frames_processed == 3
+        analyzer.close()
+
+    def test_advanced_stores_decoded_frames(self, tmp_path):
+        from api.services.stream_service import AdvancedStreamAnalyzer
+
+        analyzer = AdvancedStreamAnalyzer(COURT, session_id=922, output_dir=str(tmp_path))
+        analyzer._processor.stop()
+        analyzer._processor.join()
+        assert analyzer.start_video_passthrough(".webm")
+        status = analyzer.process_frame(np.full((120, 160, 3), 80, np.uint8), 0.0)
+        assert status["frames_buffered"] == 1
+        assert analyzer._frame_store.read_frame(0).shape == (120, 160, 3)
+        assert analyzer.raw_video_path.endswith("raw_stream.webm")
+        analyzer.close()
+
+    def test_advanced_keeps_store_video_once_frames_are_stored(self, tmp_path):
+        from api.services.stream_service import AdvancedStreamAnalyzer
+
+        analyzer = AdvancedStreamAnalyzer(COURT, session_id=923, output_dir=str(tmp_path))
+        analyzer._processor.stop()
+        analyzer._processor.join()
+        analyzer.process_frame(cv2.imencode(".jpg", np.zeros((120, 160, 3), np.uint8))[1].tobytes(), 0.0)
+        assert not analyzer.start_video_passthrough(".mp4")
+        analyzer.close()
+
+
+def _showinfo(n: int, pts_time: float) -> bytes:
+    return f"[Parsed_showinfo_1 @ 0x55d] n:{n:4d} pts:{n * 100:6d} pts_time:{pts_time:<8g}\n".encode()
+
+
+class _StubFfmpeg:
+    """Stands in for the ffmpeg decoder: fixed raw frames, scripted showinfo log."""
+
+    def __init__(self, frames, log):
+        self.stdin = io.BytesIO()
+        self.stdout = io.BytesIO(b"".join(f.tobytes() for f in frames))
+        self.stderr = log
+        self.returncode = 0
+
+    def poll(self):
+        return 0
+
+    def wait(self, timeout=None):
+        return 0
+
+    def kill(self):
+        pass
+
+
+class TestChunkDecoderStub:
+    """ChunkDecoder against a stub process, so it runs without ffmpeg."""
+
+    def _decode(self, monkeypatch, n_frames, log, on_frame=None):
+        frames = [np.full((4, 6, 3), i, np.uint8) for i in range(n_frames)]
+        monkeypatch.setattr(video_ingest.subprocess, "Popen", lambda *a, **k: _StubFfmpeg(frames, log))
+        decoded = []
+
+        def deliver(image, ts, index):
+            decoded.append((int(image[0, 0, 0]), ts, index))
+            if on_frame is not None:
+                on_frame(index)
+
+        decoder = ChunkDecoder(FRAME_FORMAT_VIDEO_FMP4, 6, 4, deliver, start_ts=5.0)
+        assert decoder.feed(b"chunk")
+        assert decoder.close() == n_frames
+        return decoded
+
+    def test_frames_get_their_pts(self, monkeypatch):
+        decoded = self._decode(monkeypatch, 3, iter([_showinfo(n, n * 0.1) for n in range(3)]))
+        assert [(v, i) for v, _, i in decoded] == [(0, 0), (1, 1), (2, 2)]
+        assert [ts for _, ts, _ in decoded] == pytest.approx([5.0, 5.1, 5.2])
+
+    def test_late_log_line_does_not_shift_later_frames(self, monkeypatch):
+        monkeypatch.setattr(video_ingest, "_PTS_WAIT_S", 0.05)
+
+        def log():
+            yield _showinfo(0, 0.0)
+            yield _showinfo(1, 0.1)
+            time.sleep(0.1)  # the log falls behind: frame 2 is delivered first
+            for n in range(2, 5):
+                yield _showinfo(n, n * 0.1)
+
+        def slow_analyzer(index):
+            if index == 2:
+                time.sleep(0.2)  # the log catches up meanwhile
+
+        decoded = self._decode(monkeypatch, 5, log(), slow_analyzer)
+        times = [ts - 5.0 for _, ts, _ in decoded]
+        assert times[:2] == pytest.approx([0.0, 0.1])
+        assert times[2] == pytest.approx(0.1 + 1 / 30)  # estimated
+        assert times[3:] == pytest.approx([0.3, 0.4])   # back on the real pts
+
+
+@needs_ffmpeg
+class TestChunkDecoder:
+
+    def test_decodes_replay_chunks(self, tmp_path):
+        source = str(tmp_path / "source.mp4")
+        writer = cv2.VideoWriter(source, cv2.VideoWriter_fourcc(*"mp4v"), 10, (160, 120))
+        for i in range(20):
+            writer.write(np.full((120, 160, 3), i * 10, np.uint8))
+        writer.release()
+
+        decoded = []
+        decoder = ChunkDecoder(
+            FRAME_FORMAT_VIDEO_FMP4, 160, 120,
+            lambda image, ts, index: decoded.append((image.shape, ts, index)),
+            start_ts=5.0,
+        )
+        for chunk, _, _ in FMP4Chunker(source, chunk_seconds=0.5).chunks(10):
+            assert decoder.feed(chunk)
+        assert decoder.close() == 20
+        assert not decoder.failed
+        assert [index for _, _, index in decoded] == list(range(20))
+        assert decoded[0][0] == (120, 160, 3)
+        assert decoded[10][1] == pytest.approx(6.0, abs=0.05)
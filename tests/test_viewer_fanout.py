@@ -0,0 +1,176 @@
+"""
+Tests for the per-viewer outbox fan-out.
+"""
+
+import asyncio
+import sys
+import os
+
+# Add project root to path so we can import the fan-out module
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from api.core.streaming.viewer_fanout import (
+    SLOW_VIEWER_CLOSE_CODE, ViewerFanout, ViewerOutbox,
+)
+
+
+class FakeViewer:
+    """Records sent texts; ``delay`` simulates a slow link, ``gate`` a stalled one."""
+
+    def __init__(self, delay: float = 0.0, gate: asyncio.Event = None):
+        self.delay = delay
+        self.gate = gate
+        self.sent = []
+        self.closed_with = None
+
+    async def send_text(self, text):
+        if self.gate is not None:
+            await self.gate.wait()
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        self.sent.append(text)
+
+    async def close(self, code=1000, reason=""):
+        self.closed_with = code
+
+
+async def _settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+class TestViewerOutbox:
+
+    def test_drops_oldest_when_full(self):
+        async def go():
+            gate = asyncio.Event()
+            ws = FakeViewer(gate=gate)
+            outbox = ViewerOutbox(ws, max_pending=2)
+            await _settle()
+            for i in range(5):
+                outbox.offer(str(i))
+            gate.set()
+            await outbox.drain(1.0)
+            outbox.close()
+            return ws.sent, outbox.dropped
+
+        sent, dropped = asyncio.run(go())
+        assert sent == ["3", "4"]
+        assert dropped == 3
+
+    def test_coalesces_by_key(self):
+        async def go():
+            gate = asyncio.Event()
+            ws = FakeViewer(gate=gate)
+            outbox = ViewerOutbox(ws, max_pending=8)
+            outbox.offer("first")
+            await _settle()
+            for i in range(3):
+                outbox.offer(f"result {i}", coalesce_key="result")
+            gate.set()
+            await outbox.drain(1.0)
+            outbox.close()
+            return ws.sent, outbox.coalesced
+
+        sent, coalesced = asyncio.run(go())
+        assert sent == ["first", "result 2"]
+        assert coalesced == 2
+
+    def test_final_message_is_never_dropped(self):
+        async def go():
+            gate = asyncio.Event()
+            ws = FakeViewer(gate=gate)
+            outbox = ViewerOutbox(ws, max_pending=1)
+            await _settle()
+            outbox.offer("in flight")
+            await _settle()
+            outbox.offer("end-1", droppable=False)
+            outbox.offer("end-2", droppable=False)
+            assert outbox.offer("late result") is False
+            gate.set()
+            await outbox.drain(1.0)
+            outbox.close()
+            return ws.sent
+
+        assert asyncio.run(go()) == ["in flight", "end-1", "end-2"]
+
+    def test_stalled_viewer_is_closed(self):
+        removed = []
+
+        async def go():
+            ws = FakeViewer(gate=asyncio.Event())
+            outbox = ViewerOutbox(ws, send_timeout=0.05, on_close=removed.append)
+            outbox.offer("hello")
+            await asyncio.sleep(0.2)
+            return ws, outbox
+
+        ws, outbox = asyncio.run(go())
+        assert outbox.closed
+        assert removed == [ws]
+        assert ws.closed_with == SLOW_VIEWER_CLOSE_CODE
+
+
+class TestViewerFanout:
+
+    def test_slow_viewer_does_not_delay_others(self):
+        async def go():
+            fanout = ViewerFanout(1, max_pending=4, send_timeout=5.0)
+            fast = [FakeViewer() for _ in range(20)]
+            slow = FakeViewer(delay=0.5)
+            for ws in fast + [slow]:
+                fanout.add(ws)
+            for i in range(3):
+                assert fanout.publish({"type": "analysis_result", "n": i}) == 21
+            await asyncio.sleep(0.05)
+            snapshot = [len(ws.sent) for ws in fast], len(slow.sent)
+            fanout.close()
+            return snapshot
+
+        fast_counts, slow_count = asyncio.run(go())
+        assert fast_counts == [3] * 20
+        assert slow_count == 0
+
+    def test_publish_serializes_once(self):
+        async def go():
+            fanout = ViewerFanout(1)
+            viewers = [FakeViewer() for _ in range(3)]
+            for ws in viewers:
+                fanout.add(ws)
+            fanout.publish({"type": "stream_ended"}, droppable=False)
+            await fanout.drain(1.0)
+            fanout.close()
+            return viewers
+
+        viewers = asyncio.run(go())
+        texts = [ws.sent[0] for ws in viewers]
+        assert texts[0] == '{"type": "stream_ended"}'
+        assert all(t is texts[0] for t in texts)
+
+    def test_drain_waits_for_send_in_flight(self):
+        async def go():
+            fanout = ViewerFanout(1)
+            viewer = FakeViewer(delay=0.1)
+            fanout.add(viewer)
+            fanout.publish({"type": "stream_ended"}, droppable=False)
+            await _settle()  # the sender has popped it and is mid-send
+            await fanout.drain(1.0)
+            fanout.close()
+            return viewer.sent
+
+        assert asyncio.run(go()) == ['{"type": "stream_ended"}']
+
+    def test_remove_and_stats(self):
+        async def go():
+            fanout = ViewerFanout(1)
+            a, b = FakeViewer(), FakeViewer()
+            fanout.add(a)
+            fanout.add(b)
+            fanout.remove(a)
+            fanout.remove(a)
+            stats = fanout.stats()
+            fanout.close()
+            return stats
+
+        stats = asyncio.run(go())
+        assert stats["viewers"] == 1
+        assert stats["dropped"] == 0
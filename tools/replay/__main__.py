@@ -70,12 +70,25 @@ def parse_args() -> ReplayConfig:
 
     # Streaming
     stream = p.add_argument_group("streaming")
+    stream.add_argument(
+        "--frame-format", default="json", choices=["json", "binary", "video"],
+        help="Frame encoding: json (base64 text), binary (raw JPEG) or video "
+             "(fMP4/H.264 chunks, needs ffmpeg); negotiated, falls back to json",
+    )
+    stream.add_argument(
+        "--chunk-seconds", type=float, default=0.5,
+        help="Video chunk length for --frame-format video",
+    )
     stream.add_argument("--max-frames", type=int, default=0, help="Max frames to send (0=all)")
     stream.add_argument("--start-frame", type=int, default=0, help="Frame index to start from")
     stream.add_argument(
         "--speed", type=float, default=1.0,
         help="Playback speed multiplier (0=max throughput)",
     )
+    stream.add_argument(
+        "--trace", action="store_true",
+        help="Ask the server for per-stage timing and report p50/p95/p99 latency",
+    )
 
     # Output
     out = p.add_argument_group("output")
@@ -101,9 +114,12 @@ def parse_args() -> ReplayConfig:
         record=args.record or is_advanced,  # advanced always records
         enable_tuning=args.tuning or is_advanced,  # advanced always enables tuning
         enable_shuttle=args.shuttle or is_advanced,  # advanced always enables shuttle
+        frame_format=args.frame_format,
+        chunk_seconds=args.chunk_seconds,
         max_frames=args.max_frames,
         start_frame=args.start_frame,
         playback_speed=args.speed,
+        trace=args.trace,
         output_file=args.output,
         verbose=args.verbose,
     )
@@ -33,9 +33,12 @@ class ReplayConfig:
     record: bool = False
 
     # Streaming
+    frame_format: str = "json"  # "json" (base64), "binary" (binary_v1) or "video" (fMP4 chunks); negotiated
+    chunk_seconds: float = 0.5  # video chunk length (frame_format "video")
     max_frames: int = 0  # 0 = all
     start_frame: int = 0
     playback_speed: float = 1.0  # 0 = max throughput
+    trace: bool = False  # ask the server for per-stage timing on every result
 
     # Output
     output_file: Optional[str] = None
@@ -1,8 +1,10 @@
 """Protocol definitions for badminton and challenge WebSocket sessions."""
 
+import base64
 import json
 import logging
-from typing import Any, Dict
+import struct
+from typing import Any, Dict, Optional
 
 from .client import AuthenticatedClient
 from .config import ReplayConfig
@@ -10,6 +12,53 @@ from .video_reader import VideoFrameReader
 
 logger = logging.getLogger(__name__)
 
+# binary_v1 frame header — must match api/core/streaming/frame_protocol.py:
+# version, msg_type, header_len, seq, timestamp, width, height, ref_time
+BINARY_FRAME_FORMAT = "binary_v1"
+VIDEO_FRAME_FORMAT = "video_fmp4"
+_BINARY_HEADER = struct.Struct("<BBHIdHHd")
+_MSG_FRAME = 1
+_MSG_VIDEO_CHUNK = 3
+
+
+def make_hello_message(binary: bool = True, trace: bool = False, video: bool = False) -> str:
+    """hello offering binary_v1 frames (and fMP4 video chunks before them)
+    and/or asking for per-result timing."""
+    formats = [BINARY_FRAME_FORMAT, "json"] if binary or video else ["json"]
+    if video:
+        formats.insert(0, VIDEO_FRAME_FORMAT)
+    hello: Dict[str, Any] = {"type": "hello", "frame_formats": formats}
+    if trace:
+        hello["trace"] = True
+    return json.dumps(hello)
+
+
+def _with_trace_fields(msg: Dict[str, Any], seq: int, sent_at: Optional[float]) -> Dict[str, Any]:
+    # seq lets results be matched to send times; sent_at gives the server
+    # the network stage (same-host clocks only)
+    if sent_at is not None:
+        msg["seq"] = seq
+        msg["sent_at"] = sent_at
+    return msg
+
+
+def make_binary_frame_message(jpeg: bytes, timestamp: float, w: int, h: int, seq: int) -> bytes:
+    """Raw JPEG behind a 28-byte binary_v1 header (no base64)."""
+    return _binary_message(_MSG_FRAME, jpeg, timestamp, w, h, seq)
+
+
+def make_video_chunk_message(chunk: bytes, timestamp: float, w: int, h: int, seq: int) -> bytes:
+    """An fMP4 chunk behind a binary_v1 header (msg_type 3, video chunk)."""
+    return _binary_message(_MSG_VIDEO_CHUNK, chunk, timestamp, w, h, seq)
+
+
+def _binary_message(msg_type: int, payload: bytes, timestamp: float, w: int, h: int, seq: int) -> bytes:
+    header = _BINARY_HEADER.pack(
+        1, msg_type, _BINARY_HEADER.size, seq & 0xFFFFFFFF, float(timestamp),
+        min(w, 0xFFFF), min(h, 0xFFFF), float("nan"),
+    )
+    return header + payload
+
 
 class BadmintonProtocol:
     WS_PATH_TEMPLATE = "/ws/stream/{session_id}?token={token}"
@@ -17,14 +66,17 @@ class BadmintonProtocol:
     END_RESPONSE_TYPE = "stream_ended"
 
     @staticmethod
-    def make_frame_message(b64: str, timestamp: float, w: int, h: int) -> str:
-        return json.dumps({
+    def make_frame_message(
+        jpeg: bytes, timestamp: float, w: int, h: int,
+        seq: int = 0, sent_at: Optional[float] = None,
+    ) -> str:
+        return json.dumps(_with_trace_fields({
             "type": "frame",
-            "data": b64,
+            "data": base64.b64encode(jpeg).decode("ascii"),
             "timestamp": timestamp,
             "width": w,
             "height": h,
-        })
+        }, seq, sent_at))
 
     @staticmethod
     def setup_session(
@@ -78,12 +130,15 @@ class ChallengeProtocol:
     END_RESPONSE_TYPE = "session_ended"
 
     @staticmethod
-    def make_frame_message(b64: str, timestamp: float, w: int, h: int) -> str:
-        return json.dumps({
+    def make_frame_message(
+        jpeg: bytes, timestamp: float, w: int, h: int,
+        seq: int = 0, sent_at: Optional[float] = None,
+    ) -> str:
+        return json.dumps(_with_trace_fields({
             "type": "frame",
-            "data": b64,
+            "data": base64.b64encode(jpeg).decode("ascii"),
             "timestamp": timestamp,
-        })
+        }, seq, sent_at))
 
     @staticmethod
     def setup_session(
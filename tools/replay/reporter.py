@@ -2,13 +2,42 @@
 
 import json
 import logging
-from typing import Optional
+from typing import Dict, List, Optional
 
 from .sender import FrameSender
 
 logger = logging.getLogger(__name__)
 
 
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile (``pct`` in 0-100)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * pct // 100))
+    return ordered[int(min(rank, len(ordered))) - 1]
+
+
+def latency_table(timings: List[Dict]) -> Dict[str, Dict[str, float]]:
+    """p50/p95/p99 per server stage, plus server_ms and client rtt_ms."""
+    series: Dict[str, List[float]] = {}
+    for t in timings:
+        for stage, ms in t.get("stages_ms", {}).items():
+            series.setdefault(stage, []).append(ms)
+        for key in ("server_ms", "rtt_ms"):
+            if key in t:
+                series.setdefault(key, []).append(t[key])
+    return {
+        name: {
+            "n": len(values),
+            "p50": round(percentile(values, 50), 2),
+            "p95": round(percentile(values, 95), 2),
+            "p99": round(percentile(values, 99), 2),
+        }
+        for name, values in series.items()
+    }
+
+
 class ResultReporter:
     def __init__(self, sender: FrameSender):
         self.sender = sender
@@ -17,6 +46,11 @@ class ResultReporter:
         s = self.sender
         print("\n--- Replay Summary ---")
         print(f"  Frames sent:   {s.frames_sent}")
+        print(f"  Frame format:  {s.frame_format}")
+        if s.chunks_sent:
+            print(f"  Chunks sent:   {s.chunks_sent}")
+        if s.frames_sent:
+            print(f"  Bytes/frame:   {s.bytes_sent / s.frames_sent:.0f}")
         print(f"  Results recv:  {len(s.results)}")
         print(f"  Elapsed:       {s.elapsed:.1f}s")
         print(f"  Effective FPS: {s.effective_fps:.1f}")
@@ -33,6 +67,15 @@ class ResultReporter:
         else:
             print("  (No final report received)")
 
+        if s.timings:
+            print("\n--- Latency (ms) ---")
+            print(f"  {'stage':<12} {'n':>6} {'p50':>8} {'p95':>8} {'p99':>8}")
+            for name, row in latency_table(s.timings).items():
+                print(
+                    f"  {name:<12} {row['n']:>6} {row['p50']:>8.1f} "
+                    f"{row['p95']:>8.1f} {row['p99']:>8.1f}"
+                )
+
         # Challenge-specific: show last known state from results
         if s.config.feature == "challenge" and s.results:
             last = s.results[-1]
@@ -54,11 +97,15 @@ class ResultReporter:
         data = {
             "summary": {
                 "frames_sent": s.frames_sent,
+                "frame_format": s.frame_format,
+                "chunks_sent": s.chunks_sent,
+                "bytes_sent": s.bytes_sent,
                 "results_received": len(s.results),
                 "elapsed_seconds": round(s.elapsed, 2),
                 "effective_fps": round(s.effective_fps, 2),
             },
             "final_report": s.final_report,
+            "latency": latency_table(s.timings),
             "results": s.results,
         }
         with open(path, "w") as f:
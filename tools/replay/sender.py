@@ -3,14 +3,19 @@
 import asyncio
 import json
 import logging
+import shutil
 import time
 from typing import Any, Dict, List
 
 import websockets
 
 from .config import ReplayConfig
-from .protocols import get_protocol
+from .protocols import (
+    BINARY_FRAME_FORMAT, VIDEO_FRAME_FORMAT, get_protocol, make_binary_frame_message,
+    make_hello_message, make_video_chunk_message,
+)
 from .client import AuthenticatedClient
+from .video_chunker import FMP4Chunker
 from .video_reader import VideoFrameReader
 
 logger = logging.getLogger(__name__)
@@ -22,11 +27,18 @@ class FrameSender:
         self.client = client
         self.protocol = get_protocol(config.feature)
         self.results: List[Dict[str, Any]] = []
+        self.timings: List[Dict[str, Any]] = []  # server "timing" + client rtt_ms
         self.final_report: Dict[str, Any] = {}
         self.frames_sent = 0
+        self.chunks_sent = 0
+        self.bytes_sent = 0
+        self.frame_format = "json"  # wire format actually used after negotiation
         self.start_time = 0.0
         self.end_time = 0.0
         self._auto_ended = asyncio.Event()  # server signalled session over
+        self._hello = asyncio.Event()  # server answered frame-format negotiation
+        self._negotiated_format = "json"
+        self._send_times: Dict[int, float] = {}  # seq -> perf_counter at send
 
     async def run(self, reader: VideoFrameReader):
         # REST setup
@@ -46,46 +58,15 @@ class FrameSender:
             receive_done = asyncio.Event()
             recv_task = asyncio.create_task(self._receive_loop(ws, receive_done))
 
+            if self.config.frame_format in ("binary", "video") or self.config.trace:
+                await self._negotiate(ws)
+
             # Send frames
             self.start_time = time.monotonic()
-            frame_gen = reader.frames(
-                self.config.fps,
-                max_frames=self.config.max_frames,
-                start_frame=self.config.start_frame,
-            )
-
-            for b64, ts, w, h, idx in frame_gen:
-                # Stop sending if server signalled auto-end (collapse, time limit, etc.)
-                if self._auto_ended.is_set():
-                    last = self.results[-1] if self.results else {}
-                    reason = last.get("end_reason", "auto_end")
-                    logger.info(f"Server auto-ended session: {reason} — stopping send loop")
-                    break
-
-                msg = self.protocol.make_frame_message(b64, ts, w, h)
-                await ws.send(msg)
-                self.frames_sent += 1
-
-                log_interval = 10 if self.config.feature == "challenge" else 30
-                if self.config.verbose and self.frames_sent % log_interval == 0:
-                    pct = (
-                        f"{idx / reader.total_frames * 100:.0f}%"
-                        if reader.total_frames > 0
-                        else "?"
-                    )
-                    stats = (
-                        self.protocol.extract_stats(self.results[-1])
-                        if self.results
-                        else ""
-                    )
-                    logger.info(
-                        f"  frame {self.frames_sent} (idx={idx}, {pct}) {stats}"
-                    )
-
-                # Rate limiting
-                if self.config.playback_speed > 0:
-                    delay = 1.0 / self.config.fps / self.config.playback_speed
-                    await asyncio.sleep(delay)
+            if self.frame_format == VIDEO_FRAME_FORMAT:
+                await self._send_chunks(ws, reader)
+            else:
+                await self._send_frames(ws, reader)
 
             # REST end-session — saves recording (badminton) or persists score (challenges)
             rest_report = None
@@ -118,6 +99,124 @@ class FrameSender:
         if rest_report and not self.final_report:
             self.final_report = rest_report
 
+    async def _send_frames(self, ws, reader: VideoFrameReader):
+        """Send one JPEG per frame (JSON or binary_v1)."""
+        frame_gen = reader.frames(
+            self.config.fps,
+            max_frames=self.config.max_frames,
+            start_frame=self.config.start_frame,
+        )
+
+        for jpeg, ts, w, h, idx in frame_gen:
+            # Stop sending if server signalled auto-end (collapse, time limit, etc.)
+            if self._auto_ended.is_set():
+                last = self.results[-1] if self.results else {}
+                reason = last.get("end_reason", "auto_end")
+                logger.info(f"Server auto-ended session: {reason} — stopping send loop")
+                break
+
+            seq = self.frames_sent
+            if self.frame_format == BINARY_FRAME_FORMAT:
+                msg = make_binary_frame_message(jpeg, ts, w, h, seq)
+            elif self.config.trace:
+                msg = self.protocol.make_frame_message(jpeg, ts, w, h, seq, time.time())
+            else:
+                msg = self.protocol.make_frame_message(jpeg, ts, w, h)
+            if self.config.trace:
+                self._send_times[seq] = time.perf_counter()
+            await ws.send(msg)
+            self.frames_sent += 1
+            self.bytes_sent += len(msg)
+
+            log_interval = 10 if self.config.feature == "challenge" else 30
+            if self.config.verbose and self.frames_sent % log_interval == 0:
+                pct = (
+                    f"{idx / reader.total_frames * 100:.0f}%"
+                    if reader.total_frames > 0
+                    else "?"
+                )
+                stats = (
+                    self.protocol.extract_stats(self.results[-1])
+                    if self.results
+                    else ""
+                )
+                logger.info(
+                    f"  frame {self.frames_sent} (idx={idx}, {pct}) {stats}"
+                )
+
+            # Rate limiting
+            if self.config.playback_speed > 0:
+                delay = 1.0 / self.config.fps / self.config.playback_speed
+                await asyncio.sleep(delay)
+
+    async def _send_chunks(self, ws, reader: VideoFrameReader):
+        """Send the video as fMP4 chunks, paced by the frames each holds."""
+        native = reader.native_fps if reader.native_fps > 0 else 30.0
+        chunker = FMP4Chunker(self.config.video_path, self.config.chunk_seconds)
+        chunk_gen = chunker.chunks(
+            self.config.fps,
+            start_time=self.config.start_frame / native,
+            max_frames=self.config.max_frames,
+        )
+        # ffmpeg encodes on its own process; reading its pipe blocks, so
+        # pull each chunk on a worker thread
+        while True:
+            item = await asyncio.to_thread(next, chunk_gen, None)
+            if item is None:
+                break
+            chunk, ts, frames = item
+            if self._auto_ended.is_set():
+                logger.info("Server auto-ended session — stopping send loop")
+                break
+
+            msg = make_video_chunk_message(chunk, ts, reader.width, reader.height, self.chunks_sent)
+            await ws.send(msg)
+            self.chunks_sent += 1
+            self.frames_sent += frames
+            self.bytes_sent += len(msg)
+
+            if self.config.verbose:
+                stats = self.protocol.extract_stats(self.results[-1]) if self.results else ""
+                logger.info(
+                    f"  chunk {self.chunks_sent} ({len(chunk) / 1024:.0f} KB, "
+                    f"{frames} frames, t={ts:.1f}s) {stats}"
+                )
+
+            if self.config.playback_speed > 0 and frames:
+                await asyncio.sleep(frames / self.config.fps / self.config.playback_speed)
+        chunk_gen.close()
+
+    async def _negotiate(self, ws):
+        """Send hello: offer fMP4 chunks and/or binary_v1 frames (falling
+        back to JSON if the server doesn't agree) and/or ask for per-result
+        timing."""
+        binary = self.config.frame_format == "binary"
+        video = self.config.frame_format == "video"
+        if video and not shutil.which("ffmpeg"):
+            logger.warning("ffmpeg not found — sending binary JPEG frames instead of video chunks")
+            video, binary = False, True
+        await ws.send(make_hello_message(binary=binary, trace=self.config.trace, video=video))
+        try:
+            await asyncio.wait_for(self._hello.wait(), timeout=5.0)
+        except asyncio.TimeoutError:
+            logger.warning("No hello response from server — falling back to JSON frames")
+            return
+        if not (binary or video):
+            return
+        if self._negotiated_format in (VIDEO_FRAME_FORMAT, BINARY_FRAME_FORMAT):
+            self.frame_format = self._negotiated_format
+            logger.info(f"Negotiated {self._negotiated_format} frames")
+        else:
+            logger.warning(f"Server chose {self._negotiated_format} frames — using JSON")
+
+    def _record_timing(self, timing: Dict[str, Any]):
+        """Pair a result's server timing with the client round trip."""
+        sent = self._send_times.pop(timing.get("seq"), None)
+        entry = dict(timing)
+        if sent is not None:
+            entry["rtt_ms"] = round((time.perf_counter() - sent) * 1000, 2)
+        self.timings.append(entry)
+
     async def _receive_loop(self, ws, done_event: asyncio.Event):
         """Collect server responses until the end message arrives."""
         try:
@@ -128,6 +227,8 @@ class FrameSender:
                     continue
 
                 msg_type = msg.get("type", "")
+                if "timing" in msg:
+                    self._record_timing(msg["timing"])
 
                 if msg_type in ("analysis_result", "challenge_update"):
                     self.results.append(msg)
@@ -137,10 +238,15 @@ class FrameSender:
                         reps = msg.get("reps", 0)
                         logger.info(f"Challenge auto-ended: {reason} (reps={reps})")
                         self._auto_ended.set()
+                elif msg_type == "hello":
+                    self._negotiated_format = msg.get("frame_format", "json")
+                    self._hello.set()
                 elif msg_type == self.protocol.END_RESPONSE_TYPE:
                     self.final_report = msg.get("report", {})
                     done_event.set()
                     return
+                elif msg_type == "video_ingest_failed":
+                    logger.warning("Server could not decode the video chunks")
                 elif msg_type in ("pong", "ping", "recording_started", "recording_stopped"):
                     pass
                 else:
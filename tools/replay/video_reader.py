@@ -1,6 +1,5 @@
-"""Read video frames and yield base64-encoded JPEGs."""
+"""Read video frames and yield JPEG-encoded bytes."""
 
-import base64
 from typing import Generator, Tuple
 
 import cv2
@@ -44,9 +43,9 @@ class VideoFrameReader:
         target_fps: int,
         max_frames: int = 0,
         start_frame: int = 0,
-    ) -> Generator[Tuple[str, float, int, int, int], None, None]:
+    ) -> Generator[Tuple[bytes, float, int, int, int], None, None]:
         """
-        Yield (base64_jpeg, timestamp, width, height, frame_idx) tuples.
+        Yield (jpeg_bytes, timestamp, width, height, frame_idx) tuples.
 
         Subsamples to target_fps from the native video FPS.
         """
@@ -73,9 +72,8 @@ class VideoFrameReader:
                     ".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality]
                 )
                 if ok:
-                    b64 = base64.b64encode(buf.tobytes()).decode("ascii")
                     timestamp = frame_idx / native
-                    yield b64, timestamp, self.width, self.height, frame_idx
+                    yield buf.tobytes(), timestamp, self.width, self.height, frame_idx
                     yielded += 1
 
             frame_idx += 1